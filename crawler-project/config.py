@@ -2,21 +2,101 @@
 爬虫配置管理
 基于TikTok项目实战经验的完整配置
 参考: https://github.com/huangxianwu/tiktok_web_crawler_pyqt
+
+配置来源优先级: 环境变量 > 配置档案 > 代码中的默认值
+配置档案为 profiles/<名称>.yaml（dev / crawlab / benchmark），键与环境变量同名，
+由 CRAWLER_PROFILE 选择（Crawlab任务中默认 crawlab，其他默认 dev），CRAWLER_PROFILE_FILE 可指定其他文件。
+Config 的值在导入时计算一次；get_settings() 返回经过校验的只读快照。
 """
 import os
-from typing import List
+import json
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from utils.lazy_import import lazy_import
+
+yaml = lazy_import("yaml")
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+PROFILES = ("dev", "crawlab", "benchmark")
+
+
+def _profile_value(value: Any) -> str:
+    """档案中的值统一转换为环境变量形式的字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(item) for item in value)
+    return str(value)
+
+
+def load_profile(name: str, path: Optional[str] = None) -> Dict[str, str]:
+    """
+    读取配置档案
+
+    Args:
+        name: 档案名称
+        path: 档案文件，默认 profiles/<name>.yaml
+
+    Returns:
+        Dict[str, str]: 配置项（键为环境变量名），文件不存在或格式错误时返回空字典
+    """
+    path = path or os.path.join(PROFILE_DIR, f"{name}.yaml")
+    if not os.path.exists(path):
+        print(f"⚠️ 配置档案不存在: {path}")
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+    except Exception as e:
+        print(f"⚠️ 读取配置档案失败: {path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {str(key): _profile_value(value) for key, value in data.items()}
+
+
+PROFILE = os.getenv("CRAWLER_PROFILE") or ("crawlab" if os.getenv("CRAWLAB_TASK_ID") else "dev")
+PROFILE_FILE = os.getenv("CRAWLER_PROFILE_FILE", "")
+_PROFILE_VALUES = load_profile(PROFILE, PROFILE_FILE or None)
+
+
+# 每个配置项的取值和来源（env / profile / default），供 dump_config 输出
+SETTING_SOURCES: Dict[str, tuple] = {}
+
+
+def _setting(name: str, default: Any = None) -> Any:
+    """读取配置项: 环境变量 > 配置档案 > 默认值"""
+    value = os.getenv(name)
+    if value is not None:
+        SETTING_SOURCES[name] = (value, "env")
+    elif name in _PROFILE_VALUES:
+        value = _PROFILE_VALUES[name]
+        SETTING_SOURCES[name] = (value, "profile")
+    else:
+        value = default
+        SETTING_SOURCES[name] = ("" if value is None else str(value), "default")
+    return value
 
 
 class Config:
     """爬虫配置类 - 基于TikTok项目实战经验"""
     
+    # 当前配置档案
+    PROFILE = PROFILE
+    
     # ==================== 目标网站配置 ====================
     
     # TikTok Shop URL配置（重要：确保URL正确）
-    BASE_URL = "https://www.tiktok.com"
-    TARGET_URL = "https://www.tiktok.com/shop"
-    SHOP_BASE_URL = "https://www.tiktok.com/shop"
-    SEARCH_BASE_URL = "https://www.tiktok.com/shop/s"  # 搜索基础URL
+    # TIKTOK_BASE_URL 仅用于指向本地替身服务做基准测试，线上采集保持默认值
+    BASE_URL = _setting("TIKTOK_BASE_URL", "https://www.tiktok.com").rstrip("/")
+    TARGET_URL = f"{BASE_URL}/shop"
+    SHOP_BASE_URL = f"{BASE_URL}/shop"
+    SEARCH_BASE_URL = f"{BASE_URL}/shop/s"  # 搜索基础URL
+    PRODUCT_LIST_API_URL = f"{BASE_URL}/api/shop/brandy_desktop/s/product_list"  # 翻页接口
     
     # 搜索URL构建方法
     @classmethod
@@ -35,6 +115,20 @@ class Config:
         encoded_keyword = urllib.parse.quote(keyword)
         return f"{cls.SEARCH_BASE_URL}/{encoded_keyword}"
     
+    @classmethod
+    def build_detail_url(cls, product_id: str) -> str:
+        """
+        构建商品详情页URL
+        格式: https://www.tiktok.com/view/product/{product_id}?source=product_detail
+        
+        Args:
+            product_id: 商品ID
+            
+        Returns:
+            str: 完整的详情页URL
+        """
+        return f"{cls.BASE_URL}/view/product/{product_id}?source=product_detail&enter_from=product_detail"
+    
     # ==================== 页面选择器配置 ====================
     
     # 搜索相关选择器
@@ -77,20 +171,38 @@ class Config:
     # ==================== 爬虫行为配置 ====================
     
     # 延时配置（秒）
-    MIN_DELAY = 2  # 最小延时
-    MAX_DELAY = 5  # 最大延时
-    PAGE_LOAD_TIMEOUT = 30  # 页面加载超时
-    ELEMENT_WAIT_TIMEOUT = 10  # 元素等待超时
+    MIN_DELAY = float(_setting("MIN_DELAY", "2"))  # 最小延时
+    MAX_DELAY = float(_setting("MAX_DELAY", "5"))  # 最大延时
+    PAGE_LOAD_TIMEOUT = int(_setting("PAGE_LOAD_TIMEOUT", "30"))  # 页面加载超时
+    ELEMENT_WAIT_TIMEOUT = int(_setting("ELEMENT_WAIT_TIMEOUT", "10"))  # 元素等待超时
     
     # 重试配置
-    MAX_RETRY = 3  # 最大重试次数
-    RETRY_DELAY = 5  # 重试间隔（秒）
+    MAX_RETRY = int(_setting("MAX_RETRY", "3"))  # 最大重试次数
+    RETRY_DELAY = float(_setting("RETRY_DELAY", "5"))  # 重试间隔（秒）
     
     # 滑块处理配置
-    SLIDER_MAX_RETRY = 3  # 滑块最大重试次数
-    SLIDER_TIMEOUT = 30  # 滑块处理超时时间
+    SLIDER_MAX_RETRY = int(_setting("SLIDER_MAX_RETRY", "3"))  # 滑块最大重试次数
+    SLIDER_TIMEOUT = int(_setting("SLIDER_TIMEOUT", "30"))  # 滑块处理超时时间
     SLIDE_DURATION = 0.2  # 滑动持续时间（秒）
-    
+
+    # 验证码样本录制目录（为空则不录制，用于离线回放基准测试）
+    CAPTCHA_CORPUS_DIR = _setting("CAPTCHA_CORPUS_DIR", "")
+
+    # 请求速率控制（utils.rate_controller）：按目标域名的令牌桶，页面正常时加性提速，
+    # 遇到验证码或错误时乘性降速，取代固定的随机延时
+    RATE_CONTROL_ENABLED = _setting("RATE_CONTROL_ENABLED", "True").lower() == "true"
+    RATE_INITIAL_RPS = float(_setting("RATE_INITIAL_RPS", "0.33"))  # 初始每秒请求数
+    RATE_MIN_RPS = float(_setting("RATE_MIN_RPS", "0.05"))
+    RATE_MAX_RPS = float(_setting("RATE_MAX_RPS", "2.0"))
+    RATE_INCREASE_STEP = float(_setting("RATE_INCREASE_STEP", "0.05"))  # 每个正常页面增加的每秒请求数
+    RATE_CAPTCHA_BACKOFF = float(_setting("RATE_CAPTCHA_BACKOFF", "0.5"))  # 遇到验证码时速率乘以该系数
+    RATE_ERROR_BACKOFF = float(_setting("RATE_ERROR_BACKOFF", "0.75"))  # 请求出错时速率乘以该系数
+    RATE_BURST = float(_setting("RATE_BURST", "1"))  # 令牌桶容量
+    # 最近验证码比例高于该值时停止提速
+    RATE_TARGET_CAPTCHA_RATE = float(_setting("RATE_TARGET_CAPTCHA_RATE", "0.05"))
+    RATE_COOLDOWN_SECONDS = float(_setting("RATE_COOLDOWN_SECONDS", "60"))  # 降速后暂停提速的时间
+    RATE_JITTER = 0.3  # 等待时间的随机抖动比例
+
     # ==================== 浏览器配置 ====================
     
     # Chrome浏览器选项
@@ -106,6 +218,8 @@ class Config:
     USER_AGENTS = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     ]
     
     # 窗口大小配置
@@ -115,21 +229,41 @@ class Config:
         (1440, 900),
     ]
     
+    # 请求拦截规则（CDP引擎 Network.setBlockedURLs，支持*通配），如 *.mp4,*/log/*；滑块需要图片，不要拦截图片
+    BLOCKED_URL_PATTERNS = [p.strip() for p in _setting("BLOCKED_URL_PATTERNS", "").split(",") if p.strip()]
+    
     # ==================== 数据库配置 ====================
     
     # MongoDB配置
-    MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-    DATABASE_NAME = os.getenv("DATABASE_NAME", "crawler_db")
-    COLLECTION_NAME = os.getenv("COLLECTION_NAME", "products")
+    MONGO_URI = _setting("MONGO_URI", "mongodb://localhost:27017")
+    DATABASE_NAME = _setting("DATABASE_NAME", "crawler_db")
+    COLLECTION_NAME = _setting("COLLECTION_NAME", "products")
     
     # 数据库连接配置
-    MONGO_CONNECT_TIMEOUT = 5000  # 连接超时（毫秒）
-    MONGO_SERVER_SELECTION_TIMEOUT = 5000  # 服务器选择超时（毫秒）
+    MONGO_CONNECT_TIMEOUT = int(_setting("MONGO_CONNECT_TIMEOUT", "5000"))  # 连接超时（毫秒）
+    MONGO_SERVER_SELECTION_TIMEOUT = int(_setting("MONGO_SERVER_SELECTION_TIMEOUT", "5000"))  # 服务器选择超时（毫秒）
+    
+    # 商品变化检测（utils.change_detection）：按指纹判断商品是否变化，
+    # 未变化的商品不写库，变化时只更新变化的字段并在快照集合中追加一条记录
+    PRODUCT_DELTA_WRITES = _setting("PRODUCT_DELTA_WRITES", "True").lower() == "true"
+    SNAPSHOT_COLLECTION_NAME = _setting("SNAPSHOT_COLLECTION_NAME", "product_snapshots")
+    PRODUCT_FINGERPRINT_FIELDS = [
+        "title", "current_price", "origin_price", "shipping_fee",
+        "sold_count", "product_rating", "review_count", "shop_name"
+    ]
+    PRODUCT_FINGERPRINT_CACHE_SIZE = int(_setting("PRODUCT_FINGERPRINT_CACHE_SIZE", "100000"))  # 内存中缓存的指纹数
+    
+    # 价格/销量历史（utils.price_history）：记录每次采集的观测，维护小时/天汇总
+    HISTORY_ENABLED = _setting("HISTORY_ENABLED", "False").lower() == "true"
+    HISTORY_BACKEND = _setting("HISTORY_BACKEND", "mongo")  # mongo / file
+    HISTORY_COLLECTION = _setting("HISTORY_COLLECTION", "price_history")
+    HISTORY_DIR = _setting("HISTORY_DIR", os.path.join("output", "history"))
+    HISTORY_RETENTION_DAYS = float(_setting("HISTORY_RETENTION_DAYS", "90"))  # 原始观测保留天数，0表示不过期
     
     # ==================== 日志配置 ====================
     
     # 日志级别
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVEL = _setting("LOG_LEVEL", "INFO")
     
     # 日志文件配置
     LOG_DIR = "logs"
@@ -141,6 +275,23 @@ class Config:
     LOG_FORMAT = "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
     LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
     
+    # 异步日志：调用方只入队，后台线程批量写控制台和文件
+    LOG_ASYNC = _setting("LOG_ASYNC", "False").lower() == "true"
+    LOG_ASYNC_BATCH_SIZE = int(_setting("LOG_ASYNC_BATCH_SIZE", "256"))  # 每批最多写入条数
+    LOG_ASYNC_FLUSH_INTERVAL = 0.5  # 队列空闲时的轮询间隔（秒）
+    # 每个商品一条的日志（带 SAMPLED 标记）每N条输出1条，1表示全部输出
+    LOG_SAMPLE_EVERY = int(_setting("LOG_SAMPLE_EVERY", "1"))
+    
+    # 阶段耗时追踪（utils.tracing），关闭时几乎没有开销
+    TRACE_ENABLED = _setting("TRACE_ENABLED", "False").lower() == "true"
+    # 追踪导出文件，.jsonl 为JSON Lines，其他扩展名为Chrome trace格式
+    TRACE_FILE = _setting("TRACE_FILE", "")
+    
+    # 运行指标（utils.metrics）
+    METRICS_PORT = int(_setting("METRICS_PORT", "0"))  # /metrics 端口，0表示不启动
+    METRICS_FILE = _setting("METRICS_FILE", "")  # 定时写入的指标文件，空表示不写
+    METRICS_PUSH_INTERVAL = float(_setting("METRICS_PUSH_INTERVAL", "15"))  # 写文件间隔（秒）
+    
     # ==================== 测试关键词配置 ====================
     
     # 默认测试关键词
@@ -153,32 +304,176 @@ class Config:
     ]
     
     # 关键词文件路径
-    KEYWORDS_FILE = "keywords.txt"
+    KEYWORDS_FILE = _setting("KEYWORDS_FILE", "keywords.txt")
     
     # ==================== 输出配置 ====================
     
     # 输出目录
-    OUTPUT_DIR = "output"
-    
-    # 输出文件格式
-    OUTPUT_FORMATS = ["json", "csv"]
+    OUTPUT_DIR = _setting("OUTPUT_DIR", "output")
+    
+    # 输出文件格式（json按JSON Lines写出，parquet需要pyarrow，utils.product_export）
+    OUTPUT_FORMATS = [f.strip() for f in _setting("OUTPUT_FORMATS", "json,csv").split(",") if f.strip()]
+    EXPORT_ROTATE_RECORDS = int(_setting("EXPORT_ROTATE_RECORDS", "0"))  # 每个文件最多条数，0表示不轮转
+    EXPORT_ROTATE_MB = float(_setting("EXPORT_ROTATE_MB", "0"))  # 每个文件最大MB（压缩后），0表示不轮转
+    EXPORT_COMPRESSION = _setting("EXPORT_COMPRESSION", "")  # gzip 或空
+    EXPORT_PARQUET_ROW_GROUP = int(_setting("EXPORT_PARQUET_ROW_GROUP", "10000"))  # Parquet每个行组的商品数
+    # 批量导出（utils.bulk_export）: 按 _id 区间并行读取的游标数、每批文档数、进度输出间隔（秒）
+    BULK_EXPORT_PARTITIONS = int(_setting("BULK_EXPORT_PARTITIONS", "4"))
+    BULK_EXPORT_BATCH_SIZE = int(_setting("BULK_EXPORT_BATCH_SIZE", "5000"))
+    BULK_EXPORT_PROGRESS_SECONDS = float(_setting("BULK_EXPORT_PROGRESS_SECONDS", "5"))
     
     # 每批次处理的关键词数量
-    BATCH_SIZE = 10
+    BATCH_SIZE = int(_setting("BATCH_SIZE", "10"))
     
     # 每个关键词最大采集页数
-    MAX_PAGES_PER_KEYWORD = 3
+    MAX_PAGES_PER_KEYWORD = int(_setting("MAX_PAGES_PER_KEYWORD", "3"))
     
     # 每页最大采集商品数
     MAX_PRODUCTS_PER_PAGE = 50
-    
+
+    # ==================== 断点续爬配置 ====================
+
+    # 记录每个关键词/每页的进度，任务重启后跳过已完成的部分（utils.checkpoint）
+    CHECKPOINT_ENABLED = _setting("CHECKPOINT_ENABLED", "True").lower() == "true"
+    CHECKPOINT_BACKEND = _setting("CHECKPOINT_BACKEND", "file")  # file / mongo
+    CHECKPOINT_DIR = _setting("CHECKPOINT_DIR", os.path.join("output", "checkpoints"))
+    CHECKPOINT_COLLECTION = _setting("CHECKPOINT_COLLECTION", "crawl_checkpoints")
+    # 批次ID，为空时由关键词列表和页数计算
+    CHECKPOINT_RUN_ID = _setting("CHECKPOINT_RUN_ID", "")
+    # 每条记录写入后fsync，防止机器掉电丢失最后几条记录
+    CHECKPOINT_FSYNC = _setting("CHECKPOINT_FSYNC", "False").lower() == "true"
+
+    # ==================== 分布式任务队列配置 ====================
+
+    # 多个任务从共享队列领取关键词（utils.work_queue），为空时按静态关键词列表采集
+    WORK_QUEUE_BACKEND = _setting("WORK_QUEUE_BACKEND", "")  # redis / mongo / memory
+    WORK_QUEUE_NAME = _setting("WORK_QUEUE_NAME", "keywords")
+    # 启动时把本任务的关键词加入队列（已在队列中的不会重复加入）
+    WORK_QUEUE_SEED = _setting("WORK_QUEUE_SEED", "False").lower() == "true"
+    WORK_QUEUE_VISIBILITY_TIMEOUT = float(_setting("WORK_QUEUE_VISIBILITY_TIMEOUT", "900"))  # 租约时长（秒）
+    WORK_QUEUE_MAX_RETRIES = int(_setting("WORK_QUEUE_MAX_RETRIES", "3"))  # 失败后最多重试次数
+    WORK_QUEUE_RETRY_DELAY = float(_setting("WORK_QUEUE_RETRY_DELAY", "60"))  # 失败后重试等待（秒）
+    WORK_QUEUE_POLL_INTERVAL = float(_setting("WORK_QUEUE_POLL_INTERVAL", "5"))  # 暂无任务时的轮询间隔（秒）
+    WORK_QUEUE_IDLE_TIMEOUT = float(_setting("WORK_QUEUE_IDLE_TIMEOUT", "300"))  # 最长空闲等待（秒）
+    WORK_QUEUE_COLLECTION = "keyword_queue"
+    REDIS_URL = _setting("REDIS_URL", "redis://localhost:6379/0")
+    WORK_QUEUE_REDIS_PREFIX = "crawler:queue"
+
+    # ==================== 增量重爬调度配置 ====================
+
+    # 按关键词结果的变化率安排重爬（utils.recrawl_scheduler），变化快的关键词先爬、变化慢的少爬
+    RECRAWL_ENABLED = _setting("RECRAWL_ENABLED", "False").lower() == "true"
+    RECRAWL_BACKEND = _setting("RECRAWL_BACKEND", "file")  # file / mongo
+    RECRAWL_STATE_FILE = _setting("RECRAWL_STATE_FILE", os.path.join("output", "recrawl", "state.json"))
+    RECRAWL_COLLECTION = _setting("RECRAWL_COLLECTION", "recrawl_state")
+    RECRAWL_MIN_INTERVAL_HOURS = float(_setting("RECRAWL_MIN_INTERVAL_HOURS", "1"))
+    RECRAWL_MAX_INTERVAL_HOURS = float(_setting("RECRAWL_MAX_INTERVAL_HOURS", "168"))
+    RECRAWL_DEFAULT_INTERVAL_HOURS = float(_setting("RECRAWL_DEFAULT_INTERVAL_HOURS", "24"))
+    # 希望重爬时平均有多少比例的商品发生了变化，间隔 = 目标比例 / 每小时变化率
+    RECRAWL_TARGET_CHANGE = float(_setting("RECRAWL_TARGET_CHANGE", "0.2"))
+    RECRAWL_PRICE_CHANGE_PCT = float(_setting("RECRAWL_PRICE_CHANGE_PCT", "0.01"))  # 价格相对变化超过该比例才算变化
+    RECRAWL_BUDGET = int(_setting("RECRAWL_BUDGET", "0"))  # 每次运行最多采集的关键词数，0表示不限
+    RECRAWL_MAX_TRACKED_PRODUCTS = 500  # 每个关键词最多记录的商品数
+
+    # ==================== 代理配置 ====================
+
+    # 单个代理（SliderHandler 下载验证码图片等场景使用）
+    PROXY_ENABLED = _setting("PROXY_ENABLED", "False").lower() == "true"
+    PROXY_HOST = _setting("PROXY_HOST", "127.0.0.1")
+    PROXY_PORT = _setting("PROXY_PORT", "10809")
+    # 代理池（utils.proxy_pool），逗号分隔的 host:port，为空且启用单个代理时只包含该代理
+    PROXY_POOL = [p.strip() for p in _setting("PROXY_POOL", "").split(",") if p.strip()] or \
+        ([f"{PROXY_HOST}:{PROXY_PORT}"] if PROXY_ENABLED else [])
+    PROXY_MAX_CONCURRENCY = int(_setting("PROXY_MAX_CONCURRENCY", "2"))  # 每个代理同时使用的浏览器/请求数
+    PROXY_FAILURE_THRESHOLD = int(_setting("PROXY_FAILURE_THRESHOLD", "3"))  # 连续失败多少次后冷却
+    PROXY_COOLDOWN_SECONDS = float(_setting("PROXY_COOLDOWN_SECONDS", "60"))  # 第一次冷却时间，之后翻倍
+    PROXY_ACQUIRE_TIMEOUT = float(_setting("PROXY_ACQUIRE_TIMEOUT", "300"))  # 等待空闲代理的最长时间
+    PROXY_CHECK_URL = _setting("PROXY_CHECK_URL", BASE_URL)
+    PROXY_CHECK_TIMEOUT = float(_setting("PROXY_CHECK_TIMEOUT", "10"))
+
+    # ==================== 浏览器会话池配置 ====================
+
+    # 按会话（UA/窗口大小/代理/用户数据目录/cookie）统计验证码比例，淘汰被标记的会话（utils.session_pool）
+    SESSION_POOL_ENABLED = _setting("SESSION_POOL_ENABLED", "False").lower() == "true"
+    SESSION_POOL_DIR = _setting("SESSION_POOL_DIR", os.path.join("output", "sessions"))
+    SESSION_POOL_SIZE = int(_setting("SESSION_POOL_SIZE", "3"))  # 保持的可用会话数
+    SESSION_MAX_CAPTCHA_RATE = float(_setting("SESSION_MAX_CAPTCHA_RATE", "0.3"))  # 最近验证码比例超过该值时淘汰
+    SESSION_MIN_PAGES = int(_setting("SESSION_MIN_PAGES", "5"))  # 访问页数达到该值后才按比例淘汰
+    SESSION_MAX_CONSECUTIVE_CAPTCHAS = int(_setting("SESSION_MAX_CONSECUTIVE_CAPTCHAS", "3"))
+    # 新会话可选的代理，逗号分隔，为空时不使用代理
+    SESSION_PROXIES = [p.strip() for p in _setting("SESSION_PROXIES", "").split(",") if p.strip()]
+
+    # ==================== 重试与熔断配置 ====================
+
+    # 按依赖（mongo/browser等）熔断，连续失败达到阈值后在恢复时间内直接拒绝调用（utils.retry_engine）
+    CIRCUIT_FAILURE_THRESHOLD = int(_setting("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_SECONDS = float(_setting("CIRCUIT_RECOVERY_SECONDS", "30"))
+
+    # ==================== CDP异步引擎配置 ====================
+
+    # asyncio 引擎直接通过调试端口驱动浏览器，多个标签页并发采集（utils.cdp_engine / run_cdp_crawler.py）
+    CDP_ENDPOINT = _setting("CDP_ENDPOINT", "")  # 已启动浏览器的调试地址，如 http://127.0.0.1:9222，为空时启动本地Chrome
+    CDP_CHROME_PATH = _setting("CDP_CHROME_PATH", "")  # 为空时在PATH中查找 google-chrome / chromium
+    CDP_CONCURRENCY = int(_setting("CDP_CONCURRENCY", "4"))  # 同时采集的标签页数
+    CDP_COMMAND_TIMEOUT = float(_setting("CDP_COMMAND_TIMEOUT", "30"))
+    CDP_NAVIGATION_TIMEOUT = float(_setting("CDP_NAVIGATION_TIMEOUT", "30"))
+
+    # ==================== 结果输出配置 ====================
+
+    # 采集结果按批写入单独的结果通道（utils.result_emitter）: crawlab / file / stdout，为空时不输出
+    # 在Crawlab任务中默认使用 SDK save_item（未安装 crawlab-sdk 时写本地结果文件）
+    RESULT_SINK = _setting("RESULT_SINK", "crawlab" if os.getenv("CRAWLAB_TASK_ID") else "")
+    RESULT_FILE = _setting("RESULT_FILE", "")  # 为空时为 output/results/<任务ID>.jsonl
+    RESULT_BATCH_SIZE = int(_setting("RESULT_BATCH_SIZE", "100"))
+    RESULT_BATCH_MAX_KB = float(_setting("RESULT_BATCH_MAX_KB", "256"))
+    RESULT_FLUSH_INTERVAL = float(_setting("RESULT_FLUSH_INTERVAL", "5"))  # 写出失败的批次也按该间隔重试
+    # 关闭时仍未写入结果通道的结果保存到该目录，待补交
+    UNSENT_RESULT_DIR = _setting("UNSENT_RESULT_DIR", os.path.join(OUTPUT_DIR, "results", "unsent"))
+
+    # ==================== 采集统计配置 ====================
+
+    # 采集统计逐条累加（utils.crawl_stats），去重数和分位数为估计值
+    STATS_HLL_PRECISION = int(_setting("STATS_HLL_PRECISION", "12"))  # 2^12个寄存器，去重数误差约1.6%
+    STATS_RELATIVE_ACCURACY = float(_setting("STATS_RELATIVE_ACCURACY", "0.01"))  # 价格/耗时分位数的相对误差
+
+    # ==================== 关键词来源配置 ====================
+
+    # 关键词逐个读取、去重并分片（utils.keyword_source）
+    # file:<路径> / mongo:<集合>[.<字段>] / queue / 逗号分隔的关键词，为空时使用 --keywords 或 CRAWLAB_KEYWORDS
+    KEYWORD_SOURCE = _setting("KEYWORD_SOURCE", "")
+    KEYWORD_MONGO_FIELD = _setting("KEYWORD_MONGO_FIELD", "keyword")
+    KEYWORD_BLOOM_CAPACITY = int(_setting("KEYWORD_BLOOM_CAPACITY", "1000000"))  # 去重过滤器容量（约1.8MB）
+    KEYWORD_BLOOM_ERROR_RATE = float(_setting("KEYWORD_BLOOM_ERROR_RATE", "0.001"))  # 误判为重复的概率
+    # 多个任务分摊同一批关键词: 每个任务设置相同的分片数和不同的分片序号（0开始）
+    KEYWORD_SHARD_COUNT = int(_setting("KEYWORD_SHARD_COUNT", "1"))
+    KEYWORD_SHARD_INDEX = int(_setting("KEYWORD_SHARD_INDEX", "0"))
+
+    # ==================== 流水线配置 ====================
+
+    # 多个关键词采集时浏览器取页、解析、入库三个阶段并行（utils.crawl_pipeline），关闭时逐个关键词顺序执行
+    PIPELINE_ENABLED = _setting("PIPELINE_ENABLED", "True").lower() == "true"
+    PIPELINE_QUEUE_SIZE = int(_setting("PIPELINE_QUEUE_SIZE", "8"))  # 待解析页面上限，满时浏览器等待（背压）
+    PIPELINE_PARSE_WORKERS = int(_setting("PIPELINE_PARSE_WORKERS", "2"))
+    PIPELINE_PERSIST_BATCH_SIZE = int(_setting("PIPELINE_PERSIST_BATCH_SIZE", "100"))  # 每批写库商品数
+    PIPELINE_PERSIST_INTERVAL = float(_setting("PIPELINE_PERSIST_INTERVAL", "2"))  # 不足一批时最长等待（秒）
+
+    # ==================== 商品详情补全配置 ====================
+
+    # 独立于搜索采集的后台任务（run_enrichment_worker.py）: 从队列领取商品ID，多个标签页并行打开详情页，
+    # 补全 desc_detail / latest_review_fmt / earliest_review_fmt / categories 后批量更新商品文档
+    ENRICH_QUEUE_BACKEND = _setting("ENRICH_QUEUE_BACKEND", "")  # 为空时同 WORK_QUEUE_BACKEND，都为空时为进程内队列
+    ENRICH_QUEUE_NAME = _setting("ENRICH_QUEUE_NAME", "product_details")
+    ENRICH_CONCURRENCY = int(_setting("ENRICH_CONCURRENCY", "4"))  # 同时打开的详情页标签页数
+    ENRICH_BATCH_SIZE = int(_setting("ENRICH_BATCH_SIZE", "50"))  # 每批领取、批量更新的商品数
+    ENRICH_REFRESH_HOURS = float(_setting("ENRICH_REFRESH_HOURS", "168"))  # 该时间内补全过的商品跳过
+
     # ==================== 调试配置 ====================
     
     # 调试模式
-    DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
+    DEBUG_MODE = _setting("DEBUG_MODE", "False").lower() == "true"
     
     # 显示浏览器界面（调试用）
-    HEADLESS_MODE = os.getenv("HEADLESS_MODE", "False").lower() == "true"
+    HEADLESS_MODE = _setting("HEADLESS_MODE", "False").lower() == "true"
     
     # 截图保存
     SAVE_SCREENSHOTS = DEBUG_MODE
@@ -187,10 +482,16 @@ class Config:
     # ==================== 性能配置 ====================
     
     # 并发配置
-    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "1"))  # MVP版本使用单线程
+    MAX_WORKERS = int(_setting("MAX_WORKERS", "1"))  # MVP版本使用单线程
+    
+    # 内存限制（浏览器进程树，utils.memory_governor），0表示不限制
+    MAX_MEMORY_MB = int(_setting("MAX_MEMORY_MB", "1024"))  # 超过时重启浏览器
+    MEMORY_TAB_RECYCLE_RATIO = float(_setting("MEMORY_TAB_RECYCLE_RATIO", "0.8"))  # 达到上限的该比例时回收标签页
+    MEMORY_CHECK_INTERVAL = float(_setting("MEMORY_CHECK_INTERVAL", "10"))  # 两次采样的最小间隔（秒）
+    MEMORY_TIMELINE_FILE = _setting("MEMORY_TIMELINE_FILE", "")  # 内存时间线（JSON Lines），为空时不导出
     
-    # 内存限制
-    MAX_MEMORY_MB = 1024  # 最大内存使用量（MB）
+    # 关键词文件按 (路径, 修改时间) 缓存，不在每次调用时重新读取
+    _keywords_cache: Dict[tuple, List[str]] = {}
     
     @classmethod
     def get_keywords(cls) -> List[str]:
@@ -200,9 +501,14 @@ class Config:
         """
         try:
             if os.path.exists(cls.KEYWORDS_FILE):
-                with open(cls.KEYWORDS_FILE, 'r', encoding='utf-8') as f:
-                    keywords = [line.strip() for line in f if line.strip()]
-                    return keywords if keywords else cls.DEFAULT_KEYWORDS
+                key = (cls.KEYWORDS_FILE, os.path.getmtime(cls.KEYWORDS_FILE))
+                keywords = cls._keywords_cache.get(key)
+                if keywords is None:
+                    with open(cls.KEYWORDS_FILE, 'r', encoding='utf-8') as f:
+                        keywords = [line.strip() for line in f if line.strip()]
+                    cls._keywords_cache.clear()
+                    cls._keywords_cache[key] = keywords
+                return list(keywords) if keywords else cls.DEFAULT_KEYWORDS
             else:
                 return cls.DEFAULT_KEYWORDS
         except Exception:
@@ -221,17 +527,10 @@ class Config:
             if cls.SAVE_SCREENSHOTS:
                 os.makedirs(cls.SCREENSHOT_DIR, exist_ok=True)
             
-            # 检查配置参数
-            assert cls.MIN_DELAY > 0, "MIN_DELAY必须大于0"
-            assert cls.MAX_DELAY >= cls.MIN_DELAY, "MAX_DELAY必须大于等于MIN_DELAY"
-            assert cls.MAX_RETRY > 0, "MAX_RETRY必须大于0"
-            assert cls.PAGE_LOAD_TIMEOUT > 0, "PAGE_LOAD_TIMEOUT必须大于0"
-            
-            # 验证URL格式
-            assert cls.BASE_URL.startswith("https://"), "BASE_URL必须是HTTPS"
-            assert cls.SEARCH_BASE_URL.startswith("https://"), "SEARCH_BASE_URL必须是HTTPS"
-            
-            return True
+            errors = get_settings().errors
+            for error in errors:
+                print(f"配置验证失败: {error}")
+            return not errors
             
         except Exception as e:
             print(f"配置验证失败: {e}")
@@ -241,6 +540,7 @@ class Config:
     def print_config(cls):
         """打印当前配置信息"""
         print("TikTok爬虫配置信息:")
+        print(f"  配置档案: {cls.PROFILE}")
         print(f"  基础URL: {cls.BASE_URL}")
         print(f"  搜索URL: {cls.SEARCH_BASE_URL}")
         print(f"  数据库: {cls.MONGO_URI}")
@@ -254,4 +554,152 @@ class Config:
         # 测试URL构建
         test_keyword = "cute clothes"
         test_url = cls.build_search_url(test_keyword)
-        print(f"  测试URL: {test_url}")
\ No newline at end of file
+        print(f"  测试URL: {test_url}")
+
+
+# ==================== 配置快照 ====================
+
+# 必须大于0的配置项后缀
+_POSITIVE_SUFFIXES = ("_TIMEOUT", "_CONCURRENCY", "BATCH_SIZE", "_PARTITIONS", "MAX_WORKERS", "MAX_RETRY",
+                      "_CAPACITY", "_SHARD_COUNT", "_QUEUE_SIZE", "_PARSE_WORKERS")
+# 取值在 (0, 1] 的配置项后缀
+_RATIO_SUFFIXES = ("_RATIO", "_BACKOFF", "_ACCURACY", "_CAPTCHA_RATE", "_JITTER")
+_CHOICES = {
+    "EXPORT_COMPRESSION": ("", "gzip"),
+    "RESULT_SINK": ("", "crawlab", "file", "stdout"),
+    "HISTORY_BACKEND": ("mongo", "file"),
+    "LOG_LEVEL": ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"),
+}
+_OUTPUT_FORMATS = ("json", "jsonl", "csv", "parquet")
+
+
+def validate_settings(values: Mapping[str, Any]) -> List[str]:
+    """
+    校验配置
+
+    Args:
+        values: 配置项
+
+    Returns:
+        List[str]: 错误信息，为空表示配置有效
+    """
+    errors = []
+    for name, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if name.endswith(_POSITIVE_SUFFIXES) and value <= 0:
+            errors.append(f"{name}必须大于0: {value}")
+        elif name.endswith(_RATIO_SUFFIXES) and not 0 < value <= 1:
+            errors.append(f"{name}必须在(0, 1]之间: {value}")
+        elif value < 0:
+            errors.append(f"{name}不能为负数: {value}")
+
+    if values.get("MIN_DELAY", 1) <= 0:
+        errors.append("MIN_DELAY必须大于0")
+    if values.get("MAX_DELAY", 0) < values.get("MIN_DELAY", 0):
+        errors.append("MAX_DELAY必须大于等于MIN_DELAY")
+    if not values.get("RATE_MIN_RPS", 0) <= values.get("RATE_INITIAL_RPS", 0) <= values.get("RATE_MAX_RPS", 0):
+        errors.append("必须满足 RATE_MIN_RPS <= RATE_INITIAL_RPS <= RATE_MAX_RPS")
+    if not 4 <= values.get("STATS_HLL_PRECISION", 12) <= 16:
+        errors.append("STATS_HLL_PRECISION必须在4~16之间")
+    if not 0 <= values.get("KEYWORD_SHARD_INDEX", 0) < values.get("KEYWORD_SHARD_COUNT", 1):
+        errors.append("KEYWORD_SHARD_INDEX必须在 0 ~ KEYWORD_SHARD_COUNT-1 之间")
+    if not 0 < values.get("KEYWORD_BLOOM_ERROR_RATE", 0.001) < 1:
+        errors.append("KEYWORD_BLOOM_ERROR_RATE必须在(0, 1)之间")
+
+    # 验证URL格式（本地替身服务允许HTTP）
+    local_prefixes = ("http://127.0.0.1", "http://localhost")
+    for name in ("BASE_URL", "SEARCH_BASE_URL"):
+        if name in values and not str(values[name]).startswith(("https://",) + local_prefixes):
+            errors.append(f"{name}必须是HTTPS")
+
+    for name, choices in _CHOICES.items():
+        if name in values and values[name] not in choices:
+            errors.append(f"{name}必须是 {'/'.join(c or '空' for c in choices)} 之一: {values[name]}")
+    unknown = [f for f in values.get("OUTPUT_FORMATS", ()) if f.lower() not in _OUTPUT_FORMATS]
+    if unknown:
+        errors.append(f"不支持的输出格式: {', '.join(unknown)}")
+
+    if not PROFILE_FILE and values.get("PROFILE") not in PROFILES:
+        errors.append(f"未知的配置档案: {values.get('PROFILE')}（可选 {'/'.join(PROFILES)}）")
+    typos = sorted(set(_PROFILE_VALUES) - set(SETTING_SOURCES))
+    if typos:
+        errors.append(f"配置档案中有未知的配置项: {', '.join(typos)}")
+    return errors
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+class Settings(Mapping):
+    """校验后的只读配置快照，支持 settings.NAME 和 settings["NAME"]"""
+
+    def __init__(self, values: Dict[str, Any], errors: List[str]):
+        object.__setattr__(self, "_values", MappingProxyType({k: _freeze(v) for k, v in values.items()}))
+        object.__setattr__(self, "errors", tuple(errors))
+
+    def __getitem__(self, name: str) -> Any:
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"配置只读: {name}")
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可以写成JSON/YAML的字典"""
+        def plain(value):
+            if isinstance(value, tuple):
+                return [plain(item) for item in value]
+            if isinstance(value, Mapping):
+                return {k: plain(v) for k, v in value.items()}
+            return value
+        return {name: plain(value) for name, value in sorted(self._values.items())}
+
+
+def load_settings(config: type = Config) -> Settings:
+    """
+    从 Config 生成配置快照并校验
+
+    Args:
+        config: 配置类
+
+    Returns:
+        Settings: 只读配置，校验错误记录在 errors 中
+    """
+    values = {name: getattr(config, name) for name in dir(config)
+              if name.isupper() and not callable(getattr(config, name))}
+    return Settings(values, validate_settings(values))
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """获取全局配置快照（首次调用时生成）"""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = load_settings()
+    return _settings
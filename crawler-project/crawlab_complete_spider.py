@@ -27,6 +27,9 @@ except ImportError as e:
     print(f"❌ 依赖导入失败: {e}")
     DEPENDENCIES_OK = False
 
+from config import Config
+from utils.result_emitter import open_result_emitter
+
 class CrawlabTikTokSpider:
     """
     Crawlab环境下的TikTok Shop完整爬虫
@@ -40,11 +43,14 @@ class CrawlabTikTokSpider:
         self.db = None
         self.collection = None
         self.is_running = True
+        # 采集结果按批写入结果通道，不与调试输出混在一起
+        self.result_emitter = open_result_emitter()
         
         # 配置信息
-        self.mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        self.database_name = os.getenv("DATABASE_NAME", "crawler_db")
-        self.collection_name = os.getenv("COLLECTION_NAME", "products")
+        self.mongo_uri = Config.MONGO_URI
+        self.database_name = Config.DATABASE_NAME
+        self.collection_name = Config.COLLECTION_NAME
+        self.base_url = Config.BASE_URL
         
         print("🚀 Crawlab TikTok Shop爬虫初始化")
         print(f"📊 数据库配置: {self.mongo_uri}")
@@ -293,7 +299,7 @@ class CrawlabTikTokSpider:
                 'origin_price': origin_price,
                 'shipping_fee': 0.0,
                 'product_image': product_image,
-                'product_url': f"https://www.tiktok.com/shop/product/{product_id}",
+                'product_url': f"{self.base_url}/shop/product/{product_id}",
                 'categories': "TikTok Shop",
                 'desc_detail': "",
                 'sold_count': sold_count,
@@ -328,15 +334,8 @@ class CrawlabTikTokSpider:
             if result.inserted_id:
                 print(f"💾 保存商品: {product_data['title'][:30]}... - ${product_data['current_price']}")
                 
-                # 输出Crawlab格式的结果
-                crawlab_result = {
-                    'product_id': product_data['product_id'],
-                    'title': product_data['title'],
-                    'price': product_data['current_price'],
-                    'shop_name': product_data['shop_name'],
-                    'scraped_at': product_data['scraped_at']
-                }
-                print(json.dumps(crawlab_result, ensure_ascii=False))
+                if self.result_emitter:
+                    self.result_emitter.emit(product_data)
                 
                 return True
             else:
@@ -353,7 +352,7 @@ class CrawlabTikTokSpider:
         try:
             # 构建搜索URL
             encoded_keyword = urllib.parse.quote(keyword)
-            search_url = f"https://www.tiktok.com/shop/s/{encoded_keyword}"
+            search_url = f"{self.base_url}/shop/s/{encoded_keyword}"
             
             print(f"🌐 访问TikTok搜索页面: {search_url}")
             
@@ -481,6 +480,8 @@ class CrawlabTikTokSpider:
     def close(self):
         """关闭资源"""
         try:
+            if self.result_emitter:
+                self.result_emitter.close()
             if self.page:
                 self.page.quit()
             if self.mongo_client:
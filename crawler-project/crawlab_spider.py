@@ -5,11 +5,10 @@ Crawlab电商爬虫脚本
 """
 import os
 import sys
-import json
 import time
 import argparse
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 
 # 路径修复 - 确保能找到项目模块
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,6 +22,22 @@ from handlers.extractor import DataExtractor
 from handlers.slider import SliderHandler
 from models.product import ProductData
 from utils.database import get_db_manager
+from utils.checkpoint import open_checkpoint, make_run_id
+from utils.work_queue import get_work_queue, iter_leases, make_worker_id
+from utils.recrawl_scheduler import open_recrawl_scheduler
+from utils.change_detection import CHANGE_UNCHANGED
+from utils.price_history import open_price_history
+from utils.product_export import open_product_exporter, export_products
+from utils.result_emitter import open_result_emitter
+from utils.keyword_source import open_keyword_source
+from utils.crawl_stats import CrawlStats, format_summary
+from utils.rate_controller import get_rate_controller, OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+from utils.session_pool import open_session_pool
+from utils.proxy_pool import get_proxy_pool
+from utils.metrics import (
+    PAGES_FETCHED, PRODUCTS_PARSED, PRODUCTS_SAVED, DEDUP_HITS, CAPTCHA_ENCOUNTERS, CAPTCHA_SOLVES,
+    CAPTCHA_SOLVE_SECONDS, start_metrics_export, stop_metrics_export
+)
 
 
 class CrawlabSpider:
@@ -33,6 +48,20 @@ class CrawlabSpider:
         self.logger = setup_logger('crawlab_spider')
         self.webdriver_manager = None
         self.db_manager = get_db_manager()
+        self.checkpoint = None
+        self.work_queue = None
+        self.current_lease = None
+        self.last_keyword_error = ""
+        self.recrawl_scheduler = None
+        self.price_history = None
+        self.exporter = None
+        self.result_emitter = None
+        self.rate_controller = get_rate_controller()
+        self.session_pool = open_session_pool()
+        self.session = None
+        self.session_retired = False
+        self.proxy_pool = get_proxy_pool()
+        self.proxy_lease = None
         self.stats = {
             'total_keywords': 0,
             'total_products': 0,
@@ -43,16 +72,20 @@ class CrawlabSpider:
             'start_time': None,
             'end_time': None
         }
+        # 去重数和价格/滑块耗时分位数逐条累加，统计时不遍历商品
+        self.crawl_stats = CrawlStats()
         
         self.logger.info("Crawlab电商爬虫初始化完成")
     
     def parse_arguments(self):
         """解析命令行参数"""
         parser = argparse.ArgumentParser(description='Crawlab电商爬虫')
-        parser.add_argument('--keywords', type=str, help='搜索关键词，多个关键词用逗号分隔')
+        parser.add_argument('--keywords', type=str,
+                            help='搜索关键词，多个关键词用逗号分隔；也可以是 file:<路径> / mongo:<集合>[.<字段>] / queue')
         parser.add_argument('--max-pages', type=int, default=1, help='每个关键词最大采集页数')
         parser.add_argument('--headless', action='store_true', help='使用无头模式')
-        parser.add_argument('--output', type=str, help='输出文件路径')
+        parser.add_argument('--output', type=str,
+                            help='输出文件路径（.jsonl/.csv/.parquet，可加.gz；不带扩展名时按 OUTPUT_FORMATS 输出多个格式）')
         
         args = parser.parse_args()
         
@@ -84,100 +117,214 @@ class CrawlabSpider:
             self.logger.error(f"设置Crawlab环境失败: {e}")
             self.is_crawlab_env = False
     
-    def crawl_keyword(self, keyword: str, max_pages: int = 1) -> List[ProductData]:
-        """爬取单个关键词的商品数据"""
+    def crawl_keyword(self, keyword: str, max_pages: int = 1, start_page: int = 1) -> List[ProductData]:
+        """
+        爬取单个关键词的商品数据，每页采集后立即保存并记录断点
+        
+        Args:
+            keyword: 关键词
+            max_pages: 最大页数
+            start_page: 起始页（断点续爬时跳过已完成的页）
+            
+        Returns:
+            List[ProductData]: 本次采集的商品
+        """
         products = []
         
         try:
             self.logger.info(f"开始爬取关键词: {keyword}")
             
+            # 上一个关键词的会话已被淘汰或代理进入冷却时，换会话/代理重新打开浏览器
+            if self.session_retired:
+                self.close_browser(save_cookies=False)
+            elif self.proxy_lease and not self.proxy_pool.healthy(self.proxy_lease.address):
+                self.close_browser()
+            
             # 创建WebDriver
             if not self.webdriver_manager:
-                self.webdriver_manager = WebDriverManager(headless=True)
-                driver = self.webdriver_manager.create_driver()
-                
-                if not driver:
-                    raise Exception("WebDriver创建失败")
+                self.open_browser()
             
-            # 搜索关键词
-            if self.webdriver_manager.search_products(keyword):
+            # 按目标域名当前允许的速率等待后搜索关键词
+            self.rate_controller.acquire(Config.BASE_URL)
+            search_start = time.perf_counter()
+            searched = self.webdriver_manager.search_products(keyword)
+            if self.proxy_lease:
+                self.proxy_pool.report(self.proxy_lease.address, searched, time.perf_counter() - search_start,
+                                       "" if searched else "搜索失败")
+            if searched:
                 self.logger.info(f"成功搜索关键词: {keyword}")
                 
                 # 检测和处理滑块
                 slider_handler = SliderHandler(self.webdriver_manager.get_driver())
                 
-                if slider_handler.detect_slider():
+                slider_detected = slider_handler.detect_slider()
+                self._record_outcome(OUTCOME_CAPTCHA if slider_detected else OUTCOME_OK)
+                if slider_detected:
                     self.stats['slider_encountered'] += 1
+                    CAPTCHA_ENCOUNTERS.labels(handler="SliderHandler").inc()
                     self.logger.warning("检测到滑块验证")
                     
-                    if slider_handler.handle_captcha_with_retry():
+                    captcha_start = time.perf_counter()
+                    solved = slider_handler.handle_captcha_with_retry()
+                    captcha_seconds = time.perf_counter() - captcha_start
+                    self.crawl_stats.record_captcha(solved, captcha_seconds)
+                    if solved:
                         self.stats['slider_solved'] += 1
+                        CAPTCHA_SOLVES.labels(handler="SliderHandler").inc()
+                        CAPTCHA_SOLVE_SECONDS.labels(handler="SliderHandler").observe(captcha_seconds)
                         self.logger.info("滑块验证处理成功")
                     else:
                         self.logger.error("滑块验证处理失败，跳过此关键词")
                         self.stats['failed_keywords'] += 1
+                        self._finish_keyword(keyword, failed=True, error="滑块验证处理失败")
                         return products
                 
                 # 提取商品数据
-                for page_num in range(1, max_pages + 1):
+                for page_num in range(start_page, max_pages + 1):
                     self.logger.info(f"提取第 {page_num} 页数据")
                     
                     page_products_data = self.webdriver_manager.extract_products_from_page(keyword, page_num)
+                    PAGES_FETCHED.labels(crawler="crawlab_spider").inc()
                     
+                    page_products = []
                     for product_data in page_products_data:
                         try:
-                            product = ProductData(
-                                keyword=keyword,
-                                title=product_data.get('title', ''),
-                                scraped_at=datetime.now(),
+                            product = ProductData.from_search_card(
+                                product_data, keyword,
                                 slider_encountered=self.stats['slider_encountered'] > 0,
                                 slider_solved=self.stats['slider_solved'] > 0
                             )
-                            products.append(product)
+                            page_products.append(product)
+                            PRODUCTS_PARSED.labels(crawler="crawlab_spider").inc()
                         except Exception as e:
                             self.logger.warning(f"创建商品对象失败: {e}")
                     
+                    if not page_products:
+                        if products:
+                            # 没有更多结果
+                            self.logger.info(f"第 {page_num} 页没有商品，停止翻页")
+                            break
+                        # 一个商品都没拿到时不能记为完成，否则断点续爬会跳过该关键词
+                        self.logger.error(f"关键词 '{keyword}' 第 {page_num} 页没有提取到商品")
+                        self.stats['failed_keywords'] += 1
+                        self._finish_keyword(keyword, failed=True, error="未提取到商品")
+                        return products
+                    
+                    # 逐页保存，进程中途退出时已采集的页不会丢失
+                    saved_count = self.save_products_to_database(page_products)
+                    products.extend(page_products)
+                    self.crawl_stats.record_products(page_products)
+                    if self.checkpoint:
+                        self.checkpoint.record_page(keyword, page_num, saved_count, cursor=page_num + 1)
+                    # 每页续约一次，避免采集时间超过租约后被其他节点重复领取
+                    if self.current_lease:
+                        self.work_queue.extend(self.current_lease)
+                    
                     # 翻页延时
                     if page_num < max_pages:
                         time.sleep(2)
                 
                 self.stats['successful_keywords'] += 1
                 self.logger.info(f"关键词 '{keyword}' 爬取完成，获得 {len(products)} 个商品")
+                self._finish_keyword(keyword)
+                if self.session and not self.session_retired:
+                    self.session_pool.save_cookies(self.session, self.webdriver_manager.get_cookies())
                 
             else:
+                self._record_outcome(OUTCOME_ERROR)
                 self.logger.error(f"搜索关键词 '{keyword}' 失败")
                 self.stats['failed_keywords'] += 1
+                self._finish_keyword(keyword, failed=True, error="搜索失败")
                 
         except Exception as e:
             self.logger.error(f"爬取关键词 '{keyword}' 时发生错误: {e}")
             self.stats['failed_keywords'] += 1
+            self._finish_keyword(keyword, failed=True, error=str(e))
         
         return products
     
+    def open_browser(self):
+        """创建WebDriver，启用会话池时使用分配的会话并恢复它保存的cookie"""
+        if self.session_pool:
+            self.session = self.session_pool.acquire()
+            self.session_retired = False
+        # 会话固定了代理时使用会话的代理，否则从代理池领取
+        if self.proxy_pool and not (self.session and self.session.proxy):
+            self.proxy_lease = self.proxy_pool.acquire(make_worker_id(), timeout=Config.PROXY_ACQUIRE_TIMEOUT)
+            if self.proxy_lease is None:
+                self.logger.warning("没有可用代理，直接连接")
+        self.webdriver_manager = WebDriverManager(
+            headless=True, session=self.session, proxy=self.proxy_lease.address if self.proxy_lease else None)
+        driver = self.webdriver_manager.create_driver()
+        if not driver:
+            raise Exception("WebDriver创建失败")
+        if self.session:
+            self.webdriver_manager.set_cookies(self.session_pool.load_cookies(self.session))
+    
+    def close_browser(self, save_cookies: bool = True):
+        """关闭WebDriver并归还会话"""
+        if self.webdriver_manager:
+            if self.session:
+                cookies = self.webdriver_manager.get_cookies() if save_cookies else None
+                self.session_pool.release(self.session, cookies)
+                self.session = None
+            if self.proxy_lease:
+                self.proxy_pool.release(self.proxy_lease)
+                self.proxy_lease = None
+            self.webdriver_manager.close_driver()
+            self.webdriver_manager = None
+    
+    def _record_outcome(self, outcome: str):
+        """记录页面结果到速率控制器和当前会话，会话被淘汰时下个关键词换会话"""
+        self.rate_controller.record(Config.BASE_URL, outcome)
+        if self.session and self.session_pool.record(self.session, outcome):
+            self.logger.warning(f"会话 {self.session.session_id} 验证码过多，下个关键词更换会话")
+            self.session_retired = True
+    
+    def _finish_keyword(self, keyword: str, failed: bool = False, error: str = ""):
+        """记录关键词结束到断点日志，失败原因供任务队列nack使用"""
+        self.last_keyword_error = error if failed else ""
+        if self.checkpoint:
+            self.checkpoint.finish_keyword(keyword, failed=failed, error=error)
+    
     def save_products_to_database(self, products: List[ProductData]) -> int:
         """保存商品数据到数据库"""
         saved_count = 0
         
+        if not products:
+            return saved_count
+        
         try:
-            if self.db_manager.connect():
+            # 连接在整个任务期间复用，任务结束时断开
+            if self.db_manager.collection is not None or self.db_manager.connect():
                 for product in products:
-                    if self.db_manager.insert_product(product):
+                    if Config.PRODUCT_DELTA_WRITES:
+                        # 按指纹判断，未变化的商品不重复写库
+                        result = self.db_manager.save_product_delta(product)
+                        if result is None:
+                            continue
+                        if result.status == CHANGE_UNCHANGED:
+                            DEDUP_HITS.labels(crawler="crawlab_spider").inc()
+                            continue
+                        # 只统计新增和有变化的商品，与 save_product_delta 的返回值一致
+                        saved_count += 1
+                    elif self.db_manager.insert_product(product):
                         saved_count += 1
-                        
-                        # 在Crawlab环境中输出结果
-                        if self.is_crawlab_env:
-                            # Crawlab会自动收集这种格式的输出
-                            result_data = {
-                                'keyword': product.keyword,
-                                'title': product.title,
-                                'scraped_at': product.scraped_at.isoformat(),
-                                'slider_encountered': product.slider_encountered,
-                                'slider_solved': product.slider_solved
-                            }
-                            print(json.dumps(result_data, ensure_ascii=False))
+                    else:
+                        continue
+                    PRODUCTS_SAVED.labels(crawler="crawlab_spider").inc()
+                    
+                    # 结果按批写入结果通道（Crawlab任务中为 SDK save_item）
+                    if self.result_emitter:
+                        self.result_emitter.emit(product)
                 
-                self.db_manager.disconnect()
+                if self.result_emitter:
+                    self.result_emitter.flush()
                 self.logger.info(f"成功保存 {saved_count} 个商品到数据库")
+                
+                # 每次采集到的价格和销量都记入历史，商品未变化也记录
+                if self.price_history:
+                    self.price_history.record_many(products)
             else:
                 self.logger.error("数据库连接失败")
                 
@@ -187,25 +334,20 @@ class CrawlabSpider:
         return saved_count
     
     def save_products_to_file(self, products: List[ProductData], output_file: str):
-        """保存商品数据到文件"""
-        try:
-            products_data = []
-            for product in products:
-                products_data.append({
-                    'keyword': product.keyword,
-                    'title': product.title,
-                    'scraped_at': product.scraped_at.isoformat(),
-                    'slider_encountered': product.slider_encountered,
-                    'slider_solved': product.slider_solved
-                })
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(products_data, f, ensure_ascii=False, indent=2)
-            
-            self.logger.info(f"商品数据已保存到文件: {output_file}")
-            
-        except Exception as e:
-            self.logger.error(f"保存数据到文件失败: {e}")
+        """保存商品数据到文件（格式见 utils.product_export）"""
+        files = export_products(products, output_file)
+        if files:
+            self.logger.info(f"商品数据已保存到文件: {', '.join(files)}")
+        else:
+            self.logger.error(f"保存数据到文件失败: {output_file}")
+    
+    def _export(self, products: List[ProductData]):
+        """指定了输出文件时，每个关键词的商品采集完立即写入导出文件"""
+        if self.exporter and products:
+            try:
+                self.exporter.write_many(products)
+            except Exception as e:
+                self.logger.error(f"写入导出文件失败: {e}")
     
     def print_statistics(self):
         """打印统计信息"""
@@ -231,6 +373,11 @@ class CrawlabSpider:
             success_rate = (self.stats['slider_solved'] / self.stats['slider_encountered']) * 100
             print(f"滑块成功率: {success_rate:.1f}%")
         
+        snapshot = self.crawl_stats.snapshot()
+        print(f"不同关键词: 约 {snapshot['distinct_keywords']} 个")
+        print(f"不同店铺: 约 {snapshot['distinct_shops']} 个")
+        print(f"价格分布: {format_summary(snapshot['price'])}")
+        print(f"滑块耗时: {format_summary(snapshot['captcha_seconds'], unit='s')}")
         print(f"执行时间: {duration_str}")
         print("=" * 60)
         
@@ -238,51 +385,171 @@ class CrawlabSpider:
         self.logger.info(f"爬取完成统计: 关键词{self.stats['successful_keywords']}/{self.stats['total_keywords']}, "
                         f"商品{self.stats['total_products']}个, 耗时{duration_str}")
     
+    def _observe_changes(self, keyword: str, products: List[ProductData]):
+        """把采集成功的关键词结果交给重爬调度器，更新变化率"""
+        if self.recrawl_scheduler and products and not self.last_keyword_error:
+            self.recrawl_scheduler.observe(keyword, products)
+    
+    def run_keyword_batch(self, keywords: List[str], max_pages: int, keep_products: bool = False,
+                          batch_keywords: Optional[List[str]] = None) -> List[ProductData]:
+        """
+        按静态关键词列表采集，支持断点续爬
+        
+        Args:
+            keywords: 关键词列表
+            max_pages: 每个关键词最大页数
+            keep_products: 是否在内存中保留商品（用于写输出文件）
+            batch_keywords: 计算批次ID的关键词，默认 keywords；重爬调度筛选、排序过的列表
+                在重启后会变化，应传入调度前的候选关键词，使重启后仍使用同一个断点日志
+            
+        Returns:
+            List[ProductData]: keep_products为True时返回本次采集的商品
+        """
+        # 打开断点日志，跳过上次中断前已完成的关键词
+        self.checkpoint = open_checkpoint(
+            make_run_id('crawlab_spider', sorted(batch_keywords) if batch_keywords is not None else keywords,
+                        max_pages), db=self.db_manager.db)
+        pending_keywords = self.checkpoint.pending(keywords) if self.checkpoint else keywords
+        if len(pending_keywords) < len(keywords):
+            self.logger.info(f"断点续爬: 跳过已完成的 {len(keywords) - len(pending_keywords)} 个关键词")
+        
+        # 只有指定输出文件时才在内存中保留全部商品
+        all_products = []
+        
+        # 逐个处理关键词
+        for i, keyword in enumerate(pending_keywords, 1):
+            self.logger.info(f"处理关键词 {i}/{len(pending_keywords)}: {keyword}")
+            
+            start_page = 1
+            if self.checkpoint:
+                start_page = self.checkpoint.get_progress(keyword).next_page()
+                if start_page > max_pages:
+                    # 所有页都已保存，只是没来得及记录关键词完成
+                    self.checkpoint.finish_keyword(keyword)
+                    continue
+                if start_page > 1:
+                    self.logger.info(f"关键词 '{keyword}' 从第 {start_page} 页继续")
+                self.checkpoint.start_keyword(keyword)
+            
+            products = self.crawl_keyword(keyword, max_pages, start_page)
+            self.stats['total_products'] += len(products)
+            self._observe_changes(keyword, products)
+            self._export(products)
+            if keep_products:
+                all_products.extend(products)
+            
+            # 关键词间延时
+            if i < len(pending_keywords):
+                delay = 3
+                self.logger.info(f"关键词间延时 {delay} 秒...")
+                time.sleep(delay)
+        
+        # 全部关键词完成后清空断点日志，有失败的关键词时保留，下次运行重试
+        if self.checkpoint and not self.checkpoint.pending(keywords):
+            self.checkpoint.complete()
+        
+        return all_products
+    
+    def run_queue_worker(self, keywords: Iterable[str], max_pages: int, keep_products: bool = False) -> List[ProductData]:
+        """
+        从共享任务队列领取关键词采集，多个节点上的任务可同时运行
+        
+        Args:
+            keywords: 本任务的关键词（可以是关键词流），WORK_QUEUE_SEED为True时加入队列
+            max_pages: 默认最大页数（入队时写入任务，领取时优先使用任务中的值）
+            keep_products: 是否在内存中保留商品（用于写输出文件）
+            
+        Returns:
+            List[ProductData]: keep_products为True时返回本次采集的商品
+        """
+        self.work_queue = get_work_queue(db=self.db_manager.db)
+        if self.work_queue is None:
+            raise Exception(f"任务队列初始化失败: {Config.WORK_QUEUE_BACKEND}")
+        
+        if Config.WORK_QUEUE_SEED:
+            added = self.work_queue.put_many(keywords, payload={'max_pages': max_pages})
+            self.logger.info(f"加入任务队列: {added} 个关键词")
+        
+        worker_id = make_worker_id()
+        self.stats['total_keywords'] = 0
+        self.logger.info(f"开始从任务队列领取关键词: {self.work_queue.backend}/{self.work_queue.name}, worker={worker_id}")
+        
+        all_products = []
+        try:
+            for lease in iter_leases(self.work_queue, worker_id):
+                self.current_lease = lease
+                self.stats['total_keywords'] += 1
+                self.logger.info(f"领取关键词: {lease.keyword} (第{lease.attempts}次, 优先级{lease.priority})")
+                
+                products = self.crawl_keyword(lease.keyword, lease.payload.get('max_pages', max_pages))
+                self.stats['total_products'] += len(products)
+                self._observe_changes(lease.keyword, products)
+                self._export(products)
+                if keep_products:
+                    all_products.extend(products)
+                
+                if self.last_keyword_error:
+                    held = self.work_queue.nack(lease, error=self.last_keyword_error)
+                else:
+                    held = self.work_queue.ack(lease)
+                if not held:
+                    self.logger.warning(f"关键词 '{lease.keyword}' 的租约已超时，结果可能被其他节点重复采集")
+                self.current_lease = None
+        finally:
+            self.logger.info(f"任务队列状态: {self.work_queue.stats()}")
+            self.work_queue.close()
+        
+        return all_products
+    
     def run(self):
         """运行爬虫"""
         try:
             self.stats['start_time'] = datetime.now()
+            start_metrics_export()
             
             # 解析参数
             args = self.parse_arguments()
             
             # 设置Crawlab环境
             self.setup_crawlab_environment()
+            self.result_emitter = open_result_emitter()
             
-            # 解析关键词
-            keywords = [kw.strip() for kw in args.keywords.split(',') if kw.strip()]
-            self.stats['total_keywords'] = len(keywords)
-            
-            self.logger.info(f"开始爬取任务，关键词: {keywords}")
             self.logger.info(f"最大页数: {args.max_pages}")
             self.logger.info(f"无头模式: {args.headless}")
             
-            all_products = []
+            self.db_manager.connect()
             
-            # 逐个处理关键词
-            for i, keyword in enumerate(keywords, 1):
-                self.logger.info(f"处理关键词 {i}/{len(keywords)}: {keyword}")
-                
-                products = self.crawl_keyword(keyword, args.max_pages)
-                all_products.extend(products)
-                
-                # 关键词间延时
-                if i < len(keywords):
-                    delay = 3
-                    self.logger.info(f"关键词间延时 {delay} 秒...")
-                    time.sleep(delay)
+            # 关键词从来源逐个读取、规范化去重，并只保留本任务负责的分片
+            keyword_source = open_keyword_source(Config.KEYWORD_SOURCE or args.keywords, db=self.db_manager.db)
+            if keyword_source is None:
+                raise Exception("关键词来源不可用")
+            keywords = keyword_source
             
-            self.stats['total_products'] = len(all_products)
+            # 按变化率筛选到期的关键词，变化快的排在前面
+            self.recrawl_scheduler = open_recrawl_scheduler(db=self.db_manager.db)
+            candidates = None
+            if self.recrawl_scheduler:
+                if not Config.WORK_QUEUE_BACKEND:
+                    # 断点续爬的批次ID按调度前的候选关键词计算
+                    keywords = candidates = list(keywords)
+                keywords = self.recrawl_scheduler.due_keywords(keywords)
+                if not keywords:
+                    self.logger.info("没有到期需要重爬的关键词")
+            self.price_history = open_price_history(db=self.db_manager.db)
             
-            # 保存数据
-            if all_products:
-                # 保存到数据库
-                saved_count = self.save_products_to_database(all_products)
-                self.logger.info(f"数据库保存: {saved_count}/{len(all_products)}")
-                
-                # 保存到文件（如果指定了输出文件）
-                if args.output:
-                    self.save_products_to_file(all_products, args.output)
+            # 指定了输出文件时商品边采集边写入，不在内存中保留
+            self.exporter = open_product_exporter(args.output)
+            if Config.WORK_QUEUE_BACKEND:
+                # 关键词边读取边加入队列，不需要先读完
+                self.run_queue_worker([] if keyword_source.from_queue else keywords, args.max_pages)
+            else:
+                # 断点续爬按完整关键词列表计算批次ID
+                keywords = list(keywords)
+                self.stats['total_keywords'] = len(keywords)
+                self.logger.info(f"开始爬取任务，共 {len(keywords)} 个关键词: {keywords[:10]}"
+                                 f"{' ...' if len(keywords) > 10 else ''}")
+                self.run_keyword_batch(keywords, args.max_pages, batch_keywords=candidates)
+            self.logger.info(f"关键词来源: {keyword_source.stats()}")
             
             # 打印统计信息
             self.print_statistics()
@@ -296,8 +563,24 @@ class CrawlabSpider:
         finally:
             # 清理资源
             if self.webdriver_manager:
-                self.webdriver_manager.close_driver()
+                self.close_browser(save_cookies=not self.session_retired)
                 self.logger.info("WebDriver资源已清理")
+            if self.session_pool:
+                self.session_pool.close()
+            if self.checkpoint:
+                self.checkpoint.close()
+            if self.price_history:
+                self.price_history.close()
+            if self.recrawl_scheduler:
+                self.recrawl_scheduler.close()
+            if self.result_emitter:
+                self.result_emitter.close()
+                self.logger.info(f"结果输出: {self.result_emitter.stats()}")
+            if self.exporter:
+                files = self.exporter.close()
+                self.logger.info(f"商品数据已导出 {self.exporter.records} 条: {', '.join(files)}")
+            self.db_manager.disconnect()
+            stop_metrics_export()
 
 
 def main():
@@ -23,6 +23,15 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongo:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "crawlab_test")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "products")
 
+# 断点续爬、分布式任务队列和 TIKTOK_BASE_URL（需要项目的config、utils模块，单独部署本脚本时不启用，访问线上地址）
+try:
+    from config import Config
+    from utils.checkpoint import open_checkpoint, make_run_id
+    from utils.work_queue import get_work_queue, iter_leases, make_worker_id
+except ImportError:
+    Config = None
+    open_checkpoint = None
+
 # 设置基础日志
 logging.basicConfig(
     level=logging.INFO,
@@ -145,6 +154,7 @@ class UltimateCrawlabCrawler:
         self.db = None
         self.collection = None
         self.page = None
+        self.checkpoint = None
         
         print("🚀 初始化终极修复版Crawlab爬虫...")
         self.logger.info("终极修复版Crawlab爬虫初始化")
@@ -219,8 +229,11 @@ class UltimateCrawlabCrawler:
         
         try:
             # 构建搜索URL
-            encoded_keyword = urllib.parse.quote(keyword)
-            search_url = f"https://www.tiktok.com/shop/s/{encoded_keyword}"
+            if Config is not None:
+                search_url = Config.build_search_url(keyword)
+            else:
+                encoded_keyword = urllib.parse.quote(keyword)
+                search_url = f"https://www.tiktok.com/shop/s/{encoded_keyword}"
             
             print(f"🌐 访问搜索页面: {search_url}")
             self.page.get(search_url)
@@ -254,6 +267,10 @@ class UltimateCrawlabCrawler:
             # 提取商品数据
             products_count = self.extract_products_robust(keyword)
             
+            # 商品在提取时已逐条入库，搜索页保存后立即记录断点
+            if self.checkpoint and products_count > 0:
+                self.checkpoint.record_page(keyword, 1, products_count, cursor=2)
+            
             print(f"✅ 关键词 '{keyword}' 采集完成，共采集 {products_count} 个商品")
             self.logger.info(f"关键词采集完成: {keyword}, 数量: {products_count}")
             
@@ -688,6 +705,38 @@ class UltimateCrawlabCrawler:
         except Exception as e:
             self.logger.error(f"清理资源失败: {e}")
     
+    def run_queue_worker(self, keyword_list: List[str], max_pages: int) -> int:
+        """从共享任务队列领取关键词采集，多个节点上的任务可同时运行"""
+        queue = get_work_queue(db=self.db)
+        if queue is None:
+            print(f"❌ 任务队列初始化失败: {Config.WORK_QUEUE_BACKEND}")
+            return 0
+        
+        if Config.WORK_QUEUE_SEED:
+            added = queue.put_many(keyword_list, payload={'max_pages': max_pages})
+            print(f"📥 加入任务队列: {added}/{len(keyword_list)} 个关键词")
+        
+        worker_id = make_worker_id()
+        print(f"🔁 从任务队列领取关键词: {queue.backend}/{queue.name}, worker={worker_id}")
+        total_products = 0
+        try:
+            for lease in iter_leases(queue, worker_id):
+                print(f"📦 领取关键词: {lease.keyword} (第{lease.attempts}次, 优先级{lease.priority})")
+                count = self.crawl_keyword(lease.keyword, lease.payload.get('max_pages', max_pages))
+                total_products += count
+                
+                held = queue.ack(lease) if count > 0 else queue.nack(lease, error="未采集到商品")
+                if not held:
+                    self.logger.warning(f"关键词租约已超时: {lease.keyword}")
+                
+                # 关键词间隔
+                time.sleep(3)
+        finally:
+            print(f"📊 任务队列状态: {queue.stats()}")
+            queue.close()
+        
+        return total_products
+    
     def run(self, keywords: str = "phone case", max_pages: int = 1):
         """运行爬虫"""
         print("🎉 终极修复版Crawlab爬虫开始运行")
@@ -703,16 +752,43 @@ class UltimateCrawlabCrawler:
         
         try:
             # 处理关键词列表
-            keyword_list = [k.strip() for k in keywords.split(',')]
+            keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
             total_products = 0
             
-            for keyword in keyword_list:
-                if keyword:
-                    count = self.crawl_keyword(keyword, max_pages)
-                    total_products += count
-                    
-                    # 关键词间隔
-                    time.sleep(3)
+            if Config and Config.WORK_QUEUE_BACKEND:
+                total_products = self.run_queue_worker(keyword_list, max_pages)
+                keyword_list = []
+            
+            # 打开断点日志，跳过上次中断前已完成的关键词
+            if open_checkpoint and keyword_list:
+                self.checkpoint = open_checkpoint(make_run_id('ultimate', keyword_list, max_pages), db=self.db)
+            pending_keywords = self.checkpoint.pending(keyword_list) if self.checkpoint else keyword_list
+            if len(pending_keywords) < len(keyword_list):
+                print(f"⏭️ 断点续爬: 跳过已完成的 {len(keyword_list) - len(pending_keywords)} 个关键词")
+            
+            for keyword in pending_keywords:
+                if self.checkpoint:
+                    if self.checkpoint.get_progress(keyword).next_page() > 1:
+                        # 搜索页已保存，只是没来得及记录关键词完成
+                        self.checkpoint.finish_keyword(keyword)
+                        continue
+                    self.checkpoint.start_keyword(keyword)
+                count = self.crawl_keyword(keyword, max_pages)
+                total_products += count
+                
+                # 每页的进度已在 crawl_keyword 中记录，这里只标记关键词完成
+                if self.checkpoint:
+                    if count > 0:
+                        self.checkpoint.finish_keyword(keyword)
+                    else:
+                        self.checkpoint.finish_keyword(keyword, failed=True, error="未采集到商品")
+                
+                # 关键词间隔
+                time.sleep(3)
+            
+            # 全部关键词完成后清空断点日志，有失败的关键词时保留，下次运行重试
+            if self.checkpoint and not self.checkpoint.pending(keyword_list):
+                self.checkpoint.complete()
             
             print("=" * 60)
             print(f"🎊 爬虫运行完成！")
@@ -725,6 +801,8 @@ class UltimateCrawlabCrawler:
             self.logger.error(f"爬虫运行失败: {e}")
         
         finally:
+            if self.checkpoint:
+                self.checkpoint.close()
             self.cleanup()
 
 def main():
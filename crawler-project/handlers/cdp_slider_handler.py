@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+CDP标签页的滑块处理器
+DrissionPageSliderHandler 的协程版本，供 utils.cdp_engine 使用:
+识别和缩放算法不变（ddddocr slide_match + 按340像素显示宽度缩放），
+验证码图片在页面内下载（与页面同一cookie和出口IP），ddddocr识别放到线程池执行，
+多个标签页同时处理验证码时互不阻塞
+"""
+import time
+import random
+import asyncio
+from typing import Tuple
+
+from utils.cdp_engine import CdpTab, run_blocking
+from utils.captcha_corpus import record_captcha_sample, DISPLAY_WIDTH, image_size
+from utils.metrics import CAPTCHA_ENCOUNTERS, CAPTCHA_SOLVES, CAPTCHA_SOLVE_SECONDS
+from utils.lazy_import import lazy_import
+
+ddddocr = lazy_import("ddddocr")
+
+HANDLER_NAME = "CdpSliderHandler"
+# 与 DrissionPageSliderHandler 的 xpath //*[@id='secsdk-captcha-drag-wrapper']/div[2] 相同
+SLIDER_SELECTOR = "#secsdk-captcha-drag-wrapper > div:nth-child(2)"
+# 页面中显示的、宽高都大于50像素的图片（背景图在前，滑块图在后）
+VISIBLE_IMAGES_JS = """Array.from(document.images).map(function (img) {
+  var r = img.getBoundingClientRect();
+  return {src: img.src, x: r.left, y: r.top, width: r.width, height: r.height,
+          visible: r.width > 0 && r.height > 0 && getComputedStyle(img).visibility !== 'hidden'};
+}).filter(function (i) { return i.visible && i.width > 50 && i.height > 50; })"""
+
+
+class CdpSliderHandler:
+    """CDP标签页的滑块处理器（多个标签页共享一个实例）"""
+
+    def __init__(self, det=None, max_attempts: int = 3, verify_timeout: float = 3.0):
+        """
+        Args:
+            det: ddddocr 滑块检测器，默认第一次遇到验证码时创建
+            max_attempts: 每个页面最多尝试次数
+            verify_timeout: 拖动后等待验证结果的秒数
+        """
+        self.det = det
+        self.max_attempts = max_attempts
+        self.verify_timeout = verify_timeout
+
+    def _detector(self):
+        if self.det is None:
+            self.det = ddddocr.DdddOcr(det=False, ocr=False)
+        return self.det
+
+    async def detect(self, tab: CdpTab) -> bool:
+        """页面是否为验证码页"""
+        html, title = await asyncio.gather(tab.html(), tab.title())
+        return '<div id="captcha_container">' in html or "Security Check" in title
+
+    async def handle_captcha(self, tab: CdpTab) -> Tuple[bool, bool]:
+        """
+        处理验证码（调用方不需要先 detect()，避免重复获取页面）
+
+        Returns:
+            Tuple[bool, bool]: (是否遇到验证码, 是否有验证码但处理失败)
+        """
+        if not await self.detect(tab):
+            return False, False
+        CAPTCHA_ENCOUNTERS.labels(handler=HANDLER_NAME).inc()
+        captcha_start = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            try:
+                if await self._solve_once(tab, captcha_start):
+                    return True, False
+            except Exception as e:
+                print(f"⚠️ 验证码处理异常: {e}")
+            if attempt < self.max_attempts - 1:
+                print(f"🔄 验证码处理重试 {attempt + 2}/{self.max_attempts}")
+                await asyncio.sleep(2)
+                await tab.reload()
+                if not await self.detect(tab):
+                    return True, False
+        print(f"❌ 验证码处理失败，已尝试{self.max_attempts}次")
+        return True, True
+
+    async def _solve_once(self, tab: CdpTab, captcha_start: float) -> bool:
+        """识别并拖动一次，返回是否通过"""
+        images = await tab.evaluate(VISIBLE_IMAGES_JS) or []
+        if len(images) < 2:
+            print("⚠️ 验证码图片不足")
+            return False
+        background, target = images[0], images[1]
+        background_bytes, target_bytes = await asyncio.gather(
+            tab.fetch_bytes(background["src"]), tab.fetch_bytes(target["src"]))
+        x_offset = target["x"] - background["x"]
+        target_x = None
+        try:
+            res = await run_blocking(self._detector().slide_match, target_bytes, background_bytes)
+            target_x = res["target"][0] if res and "target" in res else None
+        except Exception as e:
+            print(f"⚠️ 滑块识别异常: {e}")
+        if target_x is None:
+            # 识别失败时使用随机位移作为备选方案
+            distance = random.randint(100, 200)
+        else:
+            width, _ = await run_blocking(image_size, background_bytes)
+            distance = target_x * (DISPLAY_WIDTH / width) - x_offset if width else target_x - x_offset
+        print(f"🎯 拖拽参数: 水平={distance:.1f}, 垂直=10, 持续时间=0.2秒")
+        if not await tab.drag(SLIDER_SELECTOR, distance, 10, 0.2):
+            print("⚠️ 未找到滑块元素")
+            return False
+
+        deadline = time.monotonic() + self.verify_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            if "captcha-verify-image" not in await tab.html():
+                print("✅ 验证码处理成功")
+                CAPTCHA_SOLVES.labels(handler=HANDLER_NAME).inc()
+                CAPTCHA_SOLVE_SECONDS.labels(handler=HANDLER_NAME).observe(time.perf_counter() - captcha_start)
+                if target_x is not None:
+                    await run_blocking(record_captcha_sample, background_bytes, target_bytes, target_x,
+                                       x_offset=x_offset, handler=HANDLER_NAME)
+                return True
+        print("⚠️ 验证码未通过，准备重试")
+        return False
@@ -6,10 +6,20 @@
 """
 import time
 import random
-import requests
-import numpy as np
 from typing import Optional
-from DrissionPage import ChromiumPage, ChromiumOptions
+
+from utils.captcha_corpus import record_captcha_sample
+from utils.session_pool import to_cookie_params
+from utils.proxy_pool import normalize_proxy_url
+from utils.metrics import CAPTCHA_ENCOUNTERS, CAPTCHA_SOLVES, CAPTCHA_SOLVE_SECONDS
+from utils.lazy_import import lazy_import, module_available
+
+# 重量级依赖延迟到第一次使用时导入
+requests = lazy_import("requests")
+np = lazy_import("numpy")
+ddddocr = lazy_import("ddddocr")
+ChromiumPage = lazy_import("DrissionPage", "ChromiumPage")
+ChromiumOptions = lazy_import("DrissionPage", "ChromiumOptions")
 
 # 延迟导入OpenCV，避免系统依赖问题
 def get_cv2():
@@ -21,11 +31,7 @@ def get_cv2():
         print(f"Warning: OpenCV导入失败: {e}")
         return None
 
-try:
-    import ddddocr
-    DDDDOCR_AVAILABLE = True
-except ImportError:
-    DDDDOCR_AVAILABLE = False
+DDDDOCR_AVAILABLE = module_available("ddddocr")
 
 class DrissionPageSliderHandler:
     """
@@ -33,12 +39,24 @@ class DrissionPageSliderHandler:
     直接移植参考项目的成功实现
     """
     
-    def __init__(self, proxy_enabled=False, proxy_host="127.0.0.1", proxy_port="10809"):
+    def __init__(self, proxy_enabled=False, proxy_host="127.0.0.1", proxy_port="10809", session=None, proxy=None):
+        """
+        Args:
+            proxy_enabled / proxy_host / proxy_port: 代理配置
+            session: 会话池分配的 BrowserSession，传入时使用会话固定的UA、窗口大小、代理和用户数据目录
+            proxy: 代理池分配的代理地址（host:port），优先于会话和 proxy_host/proxy_port
+        """
         self.page = None
         self.det = None
+        self.captcha_seen = False  # 最近一次 handle_captcha 是否遇到验证码（供速率控制使用）
+        self.session = session
         self.proxy_enabled = proxy_enabled
         self.proxy_host = proxy_host
         self.proxy_port = proxy_port
+        if proxy or (session and session.proxy):
+            self.proxy_url = normalize_proxy_url(proxy or session.proxy)
+        else:
+            self.proxy_url = f"http://{proxy_host}:{proxy_port}" if proxy_enabled else None
         
         # 初始化浏览器和OCR
         self.init_browser()
@@ -58,16 +76,24 @@ class DrissionPageSliderHandler:
             co.set_argument('--allow-running-insecure-content')
             
             # 设置代理 - 参考项目的代理配置
-            if self.proxy_enabled:
-                proxy_address = f"http://{self.proxy_host}:{self.proxy_port}"
-                co.set_proxy(proxy_address)
-                print(f"🔗 已设置代理: {proxy_address}")
+            if self.proxy_url:
+                co.set_proxy(self.proxy_url)
+                print(f"🔗 已设置代理: {self.proxy_url}")
+            
+            # 会话的用户数据目录和窗口大小
+            if self.session:
+                if self.session.profile_dir:
+                    co.set_user_data_path(self.session.profile_dir)
+                width, height = self.session.window_size
+                co.set_argument(f'--window-size={width},{height}')
             
             # 创建页面实例 - 参考项目的配置
             self.page = ChromiumPage(co)
             
             # 设置用户代理和加载模式
-            self.page.set.user_agent("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0 Safari/537.36")
+            user_agent = self.session.user_agent if self.session else \
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0 Safari/537.36"
+            self.page.set.user_agent(user_agent)
             self.page.set.load_mode.eager()
             
             print("✅ 浏览器初始化完成")
@@ -110,7 +136,7 @@ class DrissionPageSliderHandler:
             return current_url, current_title
             
         except Exception as e:
-            raise Exception(f"页面导航失败: {e}")
+            raise Exception(f"页面导航失败: {e}") from e
     
     def handle_captcha(self, page=None) -> bool:
         """
@@ -120,7 +146,9 @@ class DrissionPageSliderHandler:
         if page is None:
             page = self.page
         
+        self.captcha_seen = False
         try:
+            captcha_start = time.perf_counter()
             # 多次检查验证码，增加成功率 - 参考项目的重试机制
             for attempt in range(3):
                 html_text = page.html
@@ -140,6 +168,8 @@ class DrissionPageSliderHandler:
                 
                 if attempt == 0:
                     print("🔐 检测到验证码，正在处理...")
+                    self.captcha_seen = True
+                    CAPTCHA_ENCOUNTERS.labels(handler="DrissionPageSliderHandler").inc()
                 else:
                     print(f"🔄 验证码处理重试 {attempt + 1}/3")
                 
@@ -230,6 +260,12 @@ class DrissionPageSliderHandler:
                                     new_html = page.html
                                     if "captcha-verify-image" not in new_html:
                                         print("✅ 验证码处理成功")
+                                        CAPTCHA_SOLVES.labels(handler="DrissionPageSliderHandler").inc()
+                                        CAPTCHA_SOLVE_SECONDS.labels(handler="DrissionPageSliderHandler").observe(
+                                            time.perf_counter() - captcha_start)
+                                        # 验证通过的样本录制到样本库，供离线回放基准测试
+                                        record_captcha_sample(background_bytes, target_bytes, target_x,
+                                                              x_offset=x_offset, handler="DrissionPageSliderHandler")
                                         return False  # 返回False表示无验证码
                                     else:
                                         print("⚠️ 验证码未通过，准备重试")
@@ -267,12 +303,11 @@ class DrissionPageSliderHandler:
             return True
     
     def get_proxies(self) -> Optional[dict]:
-        """获取代理设置 - 参考项目的代理配置"""
-        if self.proxy_enabled:
-            proxy_url = f"http://{self.proxy_host}:{self.proxy_port}"
+        """获取代理设置 - 与浏览器使用同一个代理，验证码图片从同一出口IP下载"""
+        if self.proxy_url:
             return {
-                'http': proxy_url,
-                'https': proxy_url
+                'http': self.proxy_url,
+                'https': self.proxy_url
             }
         return None
     
@@ -320,6 +355,47 @@ class DrissionPageSliderHandler:
             print(f"❌ 测试过程中发生错误: {e}")
             return False
     
+    def export_cookies(self) -> list:
+        """导出浏览器所有域名的cookie（保存到会话池），失败时返回空列表"""
+        try:
+            return list(self.page.cookies(all_domains=True, all_info=True)) if self.page else []
+        except Exception as e:
+            print(f"⚠️ 导出cookie失败: {e}")
+            return []
+    
+    def restore_cookies(self, cookies: list) -> bool:
+        """写入会话池保存的cookie"""
+        try:
+            if not self.page or not cookies:
+                return False
+            self.page.set.cookies(to_cookie_params(cookies))
+            print(f"🍪 已恢复 {len(cookies)} 个cookie")
+            return True
+        except Exception as e:
+            print(f"⚠️ 恢复cookie失败: {e}")
+            return False
+
+    def recycle_tabs(self) -> int:
+        """
+        回收标签页内存：关闭当前标签页以外的标签页，停止网络监听并清空缓存的数据包，当前页换成空白页
+
+        Returns:
+            int: 关闭的标签页数
+        """
+        if not self.page:
+            return 0
+        closed = 0
+        try:
+            closed = max(self.page.tabs_count - 1, 0)
+            if closed:
+                self.page.close_tabs(self.page.tab_id, others=True)
+            self.page.listen.stop()
+            self.page.get("about:blank")
+            print(f"♻️ 已回收标签页: 关闭 {closed} 个标签页")
+        except Exception as e:
+            print(f"⚠️ 回收标签页失败: {e}")
+        return closed
+
     def close(self):
         """关闭浏览器"""
         try:
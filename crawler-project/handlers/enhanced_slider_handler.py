@@ -5,17 +5,18 @@
 """
 import time
 import random
-import requests
-import cv2
-import numpy as np
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
 
-try:
-    import ddddocr
-    DDDDOCR_AVAILABLE = True
-except ImportError:
-    DDDDOCR_AVAILABLE = False
+from utils.lazy_import import lazy_import, module_available
+
+# 重量级依赖延迟到第一次使用时导入
+requests = lazy_import("requests")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+ddddocr = lazy_import("ddddocr")
+By = lazy_import("selenium.webdriver.common.by", "By")
+ActionChains = lazy_import("selenium.webdriver.common.action_chains", "ActionChains")
+
+DDDDOCR_AVAILABLE = module_available("ddddocr")
 
 class EnhancedSliderHandler:
     """基于参考项目成功算法的增强滑块处理器"""
@@ -2,85 +2,15 @@
 数据提取器
 基于TikTok项目经验，提供商品数据提取功能
 """
-import os
-import sys
 import time
 import random
 from typing import List, Dict, Any, Optional
-from datetime import datetime
-
-# 🔧 关键修复：多重路径修复策略
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-
-# 多重路径修复策略
-paths_to_add = [
-    project_root,              # 项目根目录
-    current_dir,               # 当前目录
-    os.getcwd(),               # 工作目录
-    '.',                       # 相对当前目录
-]
-
-# 将所有可能的路径都添加到sys.path的最前面
-for path in reversed(paths_to_add):
-    abs_path = os.path.abspath(path)
-    if abs_path not in sys.path:
-        sys.path.insert(0, abs_path)
-
-# 🔍 增强调试信息 - 始终显示以便Crawlab调试
-print("🔍 [DEBUG] handlers/extractor.py 路径调试信息")
-print(f"[DEBUG] 当前文件: {__file__}")
-print(f"[DEBUG] current_dir: {current_dir}")
-print(f"[DEBUG] project_root: {project_root}")
-print(f"[DEBUG] 工作目录: {os.getcwd()}")
-print(f"[DEBUG] sys.path前5个:")
-for i, path in enumerate(sys.path[:5]):
-    print(f"  {i}: {path}")
-
-# 检查关键文件是否存在
-key_files = ['utils/__init__.py', 'utils/logger.py', 'config.py', 'models/__init__.py']
-for file_path in key_files:
-    full_path = os.path.join(project_root, file_path)
-    exists = os.path.exists(full_path)
-    print(f"[DEBUG] {file_path}: 存在={exists} ({full_path})")
-
-# 尝试直接导入测试
-print(f"[DEBUG] handlers/extractor.py 导入测试:")
-try:
-    import utils
-    print(f"  ✅ import utils 成功")
-except Exception as e:
-    print(f"  ❌ import utils 失败: {e}")
-
-try:
-    from utils.logger import get_logger
-    print(f"  ✅ from utils.logger import get_logger 成功")
-except Exception as e:
-    print(f"  ❌ from utils.logger import get_logger 失败: {e}")
-
-try:
-    import config
-    print(f"  ✅ import config 成功")
-except Exception as e:
-    print(f"  ❌ import config 失败: {e}")
-
-try:
-    from models.product import ProductData
-    print(f"  ✅ from models.product import ProductData 成功")
-except Exception as e:
-    print(f"  ❌ from models.product import ProductData 失败: {e}")
-
-print("-" * 40)
-
-# 强制刷新模块缓存（防止缓存问题）
-modules_to_clear = ['utils', 'config', 'models']
-for module in modules_to_clear:
-    if module in sys.modules:
-        del sys.modules[module]
 
 from models.product import ProductData
 from config import Config
 from utils.logger import get_logger
+from utils.metrics import PRODUCTS_PARSED
+from utils.crawl_stats import CrawlStats
 
 logger = get_logger(__name__)
 
@@ -97,6 +27,7 @@ class DataExtractor:
         """
         self.webdriver_manager = webdriver_manager
         self.extracted_products = []
+        self.stats = CrawlStats()
         
         logger.info("数据提取器初始化完成")
     
@@ -149,6 +80,7 @@ class DataExtractor:
             
             logger.info(f"关键词 '{keyword}' 提取完成，共获得 {len(products)} 个商品")
             self.extracted_products.extend(products)
+            self.stats.record_products(products)
             
             return products
             
@@ -173,13 +105,12 @@ class DataExtractor:
                 return None
             
             # 创建ProductData对象
-            product = ProductData(
-                keyword=product_data.get('keyword', ''),
-                title=product_data.get('title', ''),
-                scraped_at=datetime.now(),
+            product = ProductData.from_search_card(
+                product_data,
                 slider_encountered=product_data.get('slider_encountered', False),
                 slider_solved=product_data.get('slider_solved', False)
             )
+            PRODUCTS_PARSED.labels(crawler="extractor").inc()
             
             return product
             
@@ -327,11 +258,14 @@ class DataExtractor:
         Returns:
             Dict: 统计信息
         """
+        snapshot = self.stats.snapshot()
         stats = {
-            'total_products': len(self.extracted_products),
-            'keywords_processed': len(set(p.keyword for p in self.extracted_products)),
-            'slider_encountered_count': sum(1 for p in self.extracted_products if p.slider_encountered),
-            'slider_solved_count': sum(1 for p in self.extracted_products if p.slider_solved),
+            'total_products': snapshot.get('products', 0),
+            'keywords_processed': snapshot['distinct_keywords'],
+            'distinct_shops': snapshot['distinct_shops'],
+            'slider_encountered_count': snapshot.get('products_slider_encountered', 0),
+            'slider_solved_count': snapshot.get('products_slider_solved', 0),
+            'price': snapshot['price'],
             'extraction_time': time.time()
         }
         
@@ -345,6 +279,7 @@ class DataExtractor:
     def clear_extracted_data(self):
         """清空已提取的数据"""
         self.extracted_products.clear()
+        self.stats.reset()
         logger.info("已清空提取的数据")
     
     def export_to_dict(self) -> List[Dict[str, Any]]:
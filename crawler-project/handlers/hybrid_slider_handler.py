@@ -6,19 +6,19 @@
 """
 import time
 import random
-import requests
-import cv2
-import numpy as np
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-try:
-    import ddddocr
-    DDDDOCR_AVAILABLE = True
-except ImportError:
-    DDDDOCR_AVAILABLE = False
+from utils.lazy_import import lazy_import, module_available
+
+# 重量级依赖延迟到第一次使用时导入
+requests = lazy_import("requests")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+ddddocr = lazy_import("ddddocr")
+By = lazy_import("selenium.webdriver.common.by", "By")
+ActionChains = lazy_import("selenium.webdriver.common.action_chains", "ActionChains")
+WebDriverWait = lazy_import("selenium.webdriver.support.ui", "WebDriverWait")
+
+DDDDOCR_AVAILABLE = module_available("ddddocr")
 
 class HybridSliderHandler:
     """
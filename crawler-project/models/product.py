@@ -138,6 +138,41 @@ class ProductData:
             slider_solved=data.get("slider_solved", False)
         )
     
+    @classmethod
+    def from_search_card(cls, data: dict, keyword: str = "", slider_encountered: bool = False,
+                         slider_solved: bool = False) -> 'ProductData':
+        """
+        从搜索页商品卡片提取的数据创建ProductData对象（utils.webdriver.WebDriverManager.extract_product_data 的输出）
+
+        Args:
+            data: 商品卡片数据（product_id、title、price、url、image_url、shop_name、rating、sales_count、scraped_at）
+            keyword: 搜索关键词，默认使用卡片数据中的 keyword
+            slider_encountered: 采集时是否遇到滑块
+            slider_solved: 滑块是否处理成功
+
+        Returns:
+            ProductData: 商品数据对象，卡片上没有原价时原价取现价
+        """
+        price = float(data.get("price") or 0.0)
+        scraped_at = data.get("scraped_at")
+        if isinstance(scraped_at, (int, float)):
+            scraped_at = datetime.fromtimestamp(scraped_at)
+        return cls(
+            product_id=str(data.get("product_id", "")),
+            title=data.get("title", ""),
+            search_keyword=keyword or data.get("keyword", ""),
+            current_price=price,
+            origin_price=float(data.get("origin_price") or price),
+            product_image=data.get("image_url") or "",
+            product_url=data.get("url") or "",
+            sold_count=int(data.get("sales_count") or 0),
+            product_rating=float(data.get("rating") or 0.0),
+            shop_name=data.get("shop_name") or "",
+            scraped_at=scraped_at if isinstance(scraped_at, datetime) else None,
+            slider_encountered=slider_encountered,
+            slider_solved=slider_solved
+        )
+    
     def __str__(self) -> str:
         """字符串表示"""
         return f"ProductData(id='{self.product_id}', title='{self.title[:30]}...', price=${self.current_price})"
\ No newline at end of file
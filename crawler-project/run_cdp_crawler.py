@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+TikTok Shop异步采集（CDP引擎）
+一个进程内多个标签页并发采集关键词:
+搜索 -> 滑块处理 -> 解析第一页 -> 点击View more并监听翻页接口 -> 保存商品
+商品解析和入库复用 CompleteTikTokCrawler（在线程池中执行）
+
+用法:
+    python run_cdp_crawler.py --keywords "phone case,data cable" --pages 2 --concurrency 4
+    CDP_ENDPOINT=http://127.0.0.1:9222 python run_cdp_crawler.py   # 连接已启动的浏览器
+"""
+import sys
+import os
+
+# 脚本所在目录优先，保证从任意目录运行都能导入项目模块
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+import json
+import time
+import asyncio
+import argparse
+import urllib.parse
+from typing import Dict, List, Optional
+
+from config import Config
+from handlers.cdp_slider_handler import CdpSliderHandler
+from run_complete_crawler import CompleteTikTokCrawler
+from utils.cdp_engine import CdpBrowser, CdpCrawlEngine, CdpTab, run_blocking
+from utils.retry_engine import RetryEngine
+from utils.rate_controller import OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+from utils.metrics import PAGES_FETCHED, start_metrics_export, stop_metrics_export
+from utils.keyword_source import open_keyword_source
+
+ROUTER_DATA_SELECTOR = "#__MODERN_ROUTER_DATA__"
+VIEW_MORE_SELECTORS = ["[data-e2e='load-more']", ".load-more", "[class*='load-more']"]
+
+
+class CdpTikTokCrawler:
+    """TikTok Shop关键词采集的协程实现"""
+
+    def __init__(self, crawler: CompleteTikTokCrawler, slider_handler: Optional[CdpSliderHandler] = None,
+                 response_timeout: float = 10.0):
+        """
+        Args:
+            crawler: 提供商品解析、入库和速率控制的 CompleteTikTokCrawler（不需要启动浏览器）
+            slider_handler: 滑块处理器
+            response_timeout: 等待翻页接口响应的秒数
+        """
+        self.crawler = crawler
+        self.slider_handler = slider_handler or CdpSliderHandler()
+        self.rate_controller = crawler.rate_controller
+        self.response_timeout = response_timeout
+
+    async def scrape_keyword(self, tab: CdpTab, keyword: str, page_count: int = 2) -> List[Dict]:
+        """
+        采集一个关键词
+
+        Args:
+            tab: 标签页
+            keyword: 搜索关键词
+            page_count: 采集页数
+
+        Returns:
+            List[Dict]: 采集到的商品
+        """
+        search_url = Config.build_search_url(keyword)
+        await self.rate_controller.acquire_async(search_url)
+        try:
+            await tab.navigate(search_url)
+        except Exception:
+            self.rate_controller.record(search_url, OUTCOME_ERROR)
+            raise
+        PAGES_FETCHED.labels(crawler="cdp_crawler").inc()
+
+        captcha_seen, blocked = await self.slider_handler.handle_captcha(tab)
+        self.rate_controller.record(search_url, OUTCOME_ERROR if blocked else
+                                    OUTCOME_CAPTCHA if captcha_seen else OUTCOME_OK)
+        if blocked:
+            print(f"❌ [{keyword}] 验证码无法跳过，停止采集")
+            return []
+        if captcha_seen:
+            # 验证通过后页面会刷新为搜索结果
+            await tab.wait_for_selector(ROUTER_DATA_SELECTOR, timeout=Config.CDP_NAVIGATION_TIMEOUT)
+
+        products = await run_blocking(self.save_products, await self.first_page_products(tab), keyword)
+        print(f"📦 [{keyword}] 第1页获取 {len(products)} 个商品")
+        for page in range(2, page_count + 1):
+            page_products = await self.next_page_products(tab)
+            if page_products is None:
+                break
+            saved = await run_blocking(self.save_products, page_products, keyword)
+            print(f"📦 [{keyword}] 第{page}页获取 {len(saved)} 个商品")
+            products.extend(saved)
+        return products
+
+    async def first_page_products(self, tab: CdpTab) -> List[Dict]:
+        """从 __MODERN_ROUTER_DATA__ 中取第一页商品"""
+        raw = await tab.inner_html(ROUTER_DATA_SELECTOR)
+        if not raw:
+            print("⚠️ 未找到页面数据元素")
+            return []
+        loader_data = json.loads(raw).get("loaderData", {})
+        for page_data in loader_data.values():
+            if isinstance(page_data, dict) and "components_map" in page_data.get("page_config", {}):
+                for component in page_data["page_config"]["components_map"]:
+                    if component.get("component_name") == "feed_list_search_word":
+                        return component.get("component_data", {}).get("products", [])
+        print("⚠️ 未找到匹配的页面结构")
+        return []
+
+    async def next_page_products(self, tab: CdpTab) -> Optional[List[Dict]]:
+        """
+        点击View more并等待翻页接口响应
+
+        Returns:
+            Optional[List[Dict]]: 下一页商品，没有翻页按钮时返回None
+        """
+        selector = None
+        for candidate in VIEW_MORE_SELECTORS:
+            if await tab.box(candidate):
+                selector = candidate
+                break
+        if selector is None:
+            print("⚠️ 未找到'View more'按钮，停止翻页")
+            return None
+
+        api_url = self.crawler.product_list_url
+        await self.rate_controller.acquire_async(api_url)
+        response_future = tab.expect_response(urllib.parse.urlsplit(api_url).path)
+        try:
+            await tab.click(selector)
+            response = await asyncio.wait_for(response_future, self.response_timeout)
+        except Exception:
+            response_future.cancel()
+            self.rate_controller.record(api_url, OUTCOME_ERROR)
+            raise
+        self.rate_controller.record(api_url, OUTCOME_OK)
+        PAGES_FETCHED.labels(crawler="cdp_crawler").inc()
+        return response.json().get("data", {}).get("products", [])
+
+    def save_products(self, products: List[Dict], keyword: str) -> List[Dict]:
+        """解析并保存一页商品（同步，在线程池中执行）"""
+        results = []
+        for product in products:
+            if not product.get("product_id"):
+                continue
+            product_data = self.crawler.parse_product_data(product, keyword)
+            if product_data:
+                self.crawler.save_product_to_db(product_data)
+                results.append(product_data)
+        return results
+
+
+async def crawl_keywords(crawler: CompleteTikTokCrawler, keywords: List[str], page_count: int,
+                         concurrency: Optional[int] = None, browser: Optional[CdpBrowser] = None,
+                         retry_engine: Optional[RetryEngine] = None) -> Dict[str, List]:
+    """
+    并发采集多个关键词
+
+    Args:
+        crawler: CompleteTikTokCrawler（不需要启动浏览器）
+        keywords: 关键词列表
+        page_count: 每个关键词的页数
+        concurrency: 标签页数，默认 CDP_CONCURRENCY
+        browser: 已连接的浏览器，默认按 CDP_ENDPOINT 连接或启动本地Chrome（结束后关闭）
+        retry_engine: 重试引擎，默认全局实例
+
+    Returns:
+        Dict[str, List]: 关键词 -> 商品列表（失败的关键词为空列表）
+    """
+    owns_browser = browser is None
+    if owns_browser:
+        browser = await (CdpBrowser.connect() if Config.CDP_ENDPOINT else CdpBrowser.launch())
+    scraper = CdpTikTokCrawler(crawler)
+    engine = CdpCrawlEngine(browser, concurrency, retry_engine=retry_engine)
+    try:
+        results = await engine.run(keywords, lambda tab, keyword: scraper.scrape_keyword(tab, keyword, page_count))
+    finally:
+        if owns_browser:
+            await browser.close()
+    return {keyword: result or [] for keyword, result in zip(keywords, results)}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='TikTok Shop异步采集（CDP引擎）')
+    parser.add_argument('--keywords', default=','.join(Config.DEFAULT_KEYWORDS), help='逗号分隔的关键词，或 file:<路径>')
+    parser.add_argument('--pages', type=int, default=2, help='每个关键词采集页数')
+    parser.add_argument('--concurrency', type=int, default=Config.CDP_CONCURRENCY, help='同时采集的标签页数')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    keyword_source = open_keyword_source(args.keywords)
+    if keyword_source is None:
+        print("❌ 关键词来源不可用")
+        return
+    keywords = list(keyword_source)
+    print("🎉 TikTok Shop异步采集（CDP引擎）")
+    print(f"  关键词: {keywords}")
+    print(f"  采集页数: {args.pages}，并发标签页: {args.concurrency}")
+
+    start_metrics_export()
+    crawler = CompleteTikTokCrawler(with_browser=False)
+    try:
+        start_time = time.time()
+        results = asyncio.run(crawl_keywords(crawler, keywords, args.pages, args.concurrency))
+        duration = time.time() - start_time
+        total = sum(len(products) for products in results.values())
+        print("\n📊 采集结果汇总:")
+        for keyword, products in results.items():
+            print(f"  {keyword}: {len(products)} 个商品")
+        print(f"  ✅ 共 {total} 个商品，耗时 {duration:.2f} 秒")
+    finally:
+        crawler.close()
+        stop_metrics_export()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,95 +25,48 @@ for path in reversed(paths_to_add):  # 反向添加，确保script_dir优先级
     if abs_path not in sys.path:
         sys.path.insert(0, abs_path)
 
-# 🔍 增强调试信息 - 始终显示以便Crawlab调试
-print("=" * 60)
-print("🔍 [DEBUG] run_complete_crawler.py 路径调试信息")
-print("=" * 60)
-print(f"[DEBUG] Python版本: {sys.version}")
-print(f"[DEBUG] 脚本文件: {__file__}")
-print(f"[DEBUG] 脚本目录: {script_dir}")
-print(f"[DEBUG] 当前工作目录: {os.getcwd()}")
-print(f"[DEBUG] 用户主目录: {os.path.expanduser('~')}")
-print(f"[DEBUG] 环境变量PATH: {os.getenv('PATH', 'N/A')[:200]}...")
-
-# 显示sys.path的前10个路径
-print(f"[DEBUG] sys.path前10个路径:")
-for i, path in enumerate(sys.path[:10]):
-    print(f"  {i}: {path}")
-
-# 验证关键目录是否存在
-print(f"[DEBUG] 关键目录检查:")
-key_dirs = ['handlers', 'utils', 'models', 'config.py']
-for item in key_dirs:
-    item_path = os.path.join(script_dir, item)
-    exists = os.path.exists(item_path)
-    is_dir = os.path.isdir(item_path) if exists else False
-    is_file = os.path.isfile(item_path) if exists else False
-    print(f"  {item}: 存在={exists}, 目录={is_dir}, 文件={is_file}")
-    print(f"    路径: {item_path}")
-
-# 检查utils目录的内容
-utils_dir = os.path.join(script_dir, 'utils')
-if os.path.exists(utils_dir):
-    print(f"[DEBUG] utils目录内容:")
-    try:
-        for item in os.listdir(utils_dir):
-            item_path = os.path.join(utils_dir, item)
-            print(f"  {item} ({'文件' if os.path.isfile(item_path) else '目录'})")
-    except Exception as e:
-        print(f"  读取utils目录失败: {e}")
-
-# 检查handlers目录的内容
-handlers_dir = os.path.join(script_dir, 'handlers')
-if os.path.exists(handlers_dir):
-    print(f"[DEBUG] handlers目录内容:")
-    try:
-        for item in os.listdir(handlers_dir):
-            item_path = os.path.join(handlers_dir, item)
-            print(f"  {item} ({'文件' if os.path.isfile(item_path) else '目录'})")
-    except Exception as e:
-        print(f"  读取handlers目录失败: {e}")
-
-# 尝试直接导入测试
-print(f"[DEBUG] 直接导入测试:")
-try:
-    import utils
-    print(f"  ✅ import utils 成功: {utils.__file__}")
-except Exception as e:
-    print(f"  ❌ import utils 失败: {e}")
-
-try:
-    import utils.logger
-    print(f"  ✅ import utils.logger 成功: {utils.logger.__file__}")
-except Exception as e:
-    print(f"  ❌ import utils.logger 失败: {e}")
-
-try:
-    import config
-    print(f"  ✅ import config 成功: {config.__file__}")
-except Exception as e:
-    print(f"  ❌ import config 失败: {e}")
-
-print("=" * 60)
-
-# 强制刷新模块缓存（防止缓存问题）
-modules_to_clear = ['handlers', 'utils', 'models']
-for module in modules_to_clear:
-    if module in sys.modules:
-        del sys.modules[module]
+# 路径调试信息（设置 CRAWLER_IMPORT_DEBUG=true 时输出，便于排查Crawlab上的导入问题）
+if os.getenv("CRAWLER_IMPORT_DEBUG", "false").lower() == "true":
+    import importlib.util
+    print("=" * 60)
+    print("🔍 [DEBUG] run_complete_crawler.py 路径调试信息")
+    print(f"[DEBUG] Python版本: {sys.version}")
+    print(f"[DEBUG] 脚本目录: {script_dir}")
+    print(f"[DEBUG] 当前工作目录: {os.getcwd()}")
+    print(f"[DEBUG] sys.path前10个路径:")
+    for i, path in enumerate(sys.path[:10]):
+        print(f"  {i}: {path}")
+    # 只查找模块位置，不执行导入
+    for name in ('config', 'utils', 'handlers', 'models'):
+        spec = importlib.util.find_spec(name)
+        print(f"  {name}: {spec.origin if spec else '未找到'}")
+    print("=" * 60)
 
 # 现在安全地导入其他模块
 import time
 import json
-import urllib.parse
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional
 
+from config import Config
 from handlers.drissionpage_slider_handler import DrissionPageSliderHandler
 from models.product import ProductData
 from utils.database import get_db_manager
-from utils.logger import setup_logger
+from utils.logger import setup_logger, Sampler, SAMPLED
 from utils.anti_detection import get_anti_detection_manager, random_delay
+from utils.rate_controller import get_rate_controller, OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+from utils.session_pool import open_session_pool
+from utils.proxy_pool import get_proxy_pool
+from utils.retry_engine import get_retry_engine, classify_error, ERROR_BROWSER, ERROR_TIMEOUT
+from utils.memory_governor import open_memory_governor, ACTION_NONE, ACTION_RECYCLE_TABS
+from utils.work_queue import make_worker_id
+from utils.tracing import get_tracer, export_trace
+from utils.change_detection import ChangeResult, CHANGE_NEW, CHANGE_UNCHANGED
+from utils.crawl_pipeline import CrawlPipeline, FetchedPage, open_crawl_pipeline, PAGE_ROUTER, PAGE_API
+from utils.metrics import (
+    PAGES_FETCHED, PRODUCTS_PARSED, PRODUCTS_SAVED, DEDUP_HITS,
+    update_browser_rss, start_metrics_export, stop_metrics_export
+)
 
 class CompleteTikTokCrawler:
     """
@@ -121,41 +74,196 @@ class CompleteTikTokCrawler:
     实现完整的采集流程
     """
     
-    def __init__(self, proxy_enabled=False):
-        self.slider_handler = DrissionPageSliderHandler(proxy_enabled=proxy_enabled)
-        self.db_manager = get_db_manager()
-        self.db_manager.connect()
+    def __init__(self, proxy_enabled=False, with_browser=True, db_manager=None):
+        """
+        Args:
+            proxy_enabled: 是否使用单个代理
+            with_browser: 是否启动DrissionPage浏览器（CDP引擎只复用解析和入库时不需要）
+            db_manager: 已连接的数据库管理器，默认连接全局的 get_db_manager()
+        """
+        self.proxy_enabled = proxy_enabled
+        # 启用会话池时浏览器使用分配的会话（固定指纹 + 保存的cookie），验证码过多时更换
+        self.session_pool = open_session_pool()
+        self.session = None
+        self.session_retired = False
+        # 配置了代理池时浏览器从代理池领取出口代理（同一worker优先沿用上次的代理）
+        self.proxy_pool = get_proxy_pool()
+        self.proxy_lease = None
+        self.worker_id = make_worker_id()
+        # 浏览器内存超过阈值时回收标签页或重启浏览器（MAX_MEMORY_MB 为0时不限制）
+        self.memory_governor = open_memory_governor("complete_crawler")
+        self.slider_handler = None
+        if with_browser:
+            self.open_browser()
+        if db_manager is None:
+            db_manager = get_db_manager()
+            db_manager.connect()
+        self.db_manager = db_manager
         self.is_running = True
         self.logger = setup_logger('complete_crawler')
         self.anti_detection = get_anti_detection_manager()
+        # 按目标域名自适应调整请求间隔，关闭时使用固定随机延时
+        self.rate_controller = get_rate_controller()
+        self.tracer = get_tracer()
+        # 逐商品的控制台输出按 LOG_SAMPLE_EVERY 抽样
+        self.print_sampler = Sampler(Config.LOG_SAMPLE_EVERY)
         
         # API URLs
-        self.product_list_url = "https://www.tiktok.com/api/shop/brandy_desktop/s/product_list"
+        self.product_list_url = Config.PRODUCT_LIST_API_URL
         
-    def scrape_keyword_products(self, keyword: str, page_count: int = 2) -> List[Dict]:
+    def open_browser(self):
+        """启动浏览器，启用会话池时使用分配的会话并恢复它保存的cookie"""
+        if self.session_pool:
+            self.session = self.session_pool.acquire()
+            self.session_retired = False
+        # 会话固定了代理时使用会话的代理
+        if self.proxy_pool and not (self.session and self.session.proxy):
+            self.proxy_lease = self.proxy_pool.acquire(self.worker_id, timeout=Config.PROXY_ACQUIRE_TIMEOUT)
+            if self.proxy_lease is None:
+                print("⚠️ 没有可用代理，直接连接")
+        self.slider_handler = DrissionPageSliderHandler(
+            proxy_enabled=self.proxy_enabled, session=self.session,
+            proxy=self.proxy_lease.address if self.proxy_lease else None)
+        if self.session:
+            self.slider_handler.restore_cookies(self.session_pool.load_cookies(self.session))
+    
+    def close_browser(self, save_cookies: bool = True):
+        """关闭浏览器并归还会话"""
+        if self.session:
+            cookies = self.slider_handler.export_cookies() if save_cookies else None
+            self.session_pool.release(self.session, cookies)
+            self.session = None
+        if self.proxy_lease:
+            self.proxy_pool.release(self.proxy_lease)
+            self.proxy_lease = None
+        self.slider_handler.close()
+    
+    def _report_proxy(self, ok: bool, latency: float = None, error: str = ""):
+        """记录页面结果到当前代理"""
+        if self.proxy_lease:
+            self.proxy_pool.report(self.proxy_lease.address, ok, latency, error)
+    
+    def _record_session(self, outcome: str):
+        """记录页面结果到当前会话，会话被淘汰时下个关键词更换会话"""
+        if self.session and self.session_pool.record(self.session, outcome):
+            print(f"🔁 会话 {self.session.session_id} 验证码过多，下个关键词更换会话")
+            self.session_retired = True
+    
+    def _navigate(self, url: str):
+        """访问页面，结果计入当前代理"""
+        navigate_start = time.perf_counter()
+        try:
+            self.slider_handler.navigate_to_url(url)
+        except Exception as e:
+            self._report_proxy(False, error=str(e))
+            raise
+        self._report_proxy(True, time.perf_counter() - navigate_start)
+    
+    def _restart_browser_on_crash(self, error: Exception, attempt: int):
+        """重试前回调：浏览器断开时重启浏览器"""
+        if classify_error(error) == ERROR_BROWSER:
+            print(f"🔁 浏览器连接断开，重启浏览器（第{attempt}次）")
+            self.close_browser(save_cookies=False)
+            self.open_browser()
+    
+    def _restart_browser_keep_cookies(self):
+        """重启浏览器并保留cookie（有会话时由会话池保存和恢复）"""
+        cookies = None if self.session else self.slider_handler.export_cookies()
+        self.close_browser(save_cookies=not self.session_retired)
+        self.open_browser()
+        if cookies:
+            self.slider_handler.restore_cookies(cookies)
+    
+    def _govern_memory(self):
+        """采样浏览器内存，超过阈值时回收标签页或重启浏览器"""
+        page = self.slider_handler.page
+        if not self.memory_governor:
+            update_browser_rss(page.process_id, "complete_crawler")
+            return
+        action = self.memory_governor.check(page.process_id, page.tabs_count)
+        if action == ACTION_NONE:
+            return
+        if action == ACTION_RECYCLE_TABS:
+            print("♻️ 浏览器内存接近上限，回收标签页")
+            self.slider_handler.recycle_tabs()
+        else:
+            print("♻️ 浏览器内存超过上限，重启浏览器")
+            self._restart_browser_keep_cookies()
+        page = self.slider_handler.page
+        self.memory_governor.recycled(action, page.process_id, page.tabs_count)
+    
+    def scrape_keyword_products(self, keyword: str, page_count: int = 2,
+                                pipeline: Optional[CrawlPipeline] = None) -> List[Dict]:
         """
         完整的商品采集流程
+        
+        Args:
+            keyword: 搜索关键词
+            page_count: 采集页数
+            pipeline: 采集流水线，传入时只取页并提交原始数据，解析和入库由流水线完成，返回空列表
         """
+        proxy_cooling = self.proxy_lease and not self.proxy_pool.healthy(self.proxy_lease.address)
+        if self.session_retired or proxy_cooling:
+            self.close_browser(save_cookies=not self.session_retired)
+            self.open_browser()
+        
+        with self.tracer.span("keyword", keyword=keyword, page_count=page_count) as span:
+            products = self._scrape_keyword_products(keyword, page_count, pipeline)
+            span.set_attribute("products", len(products))
+        
+        if self.slider_handler and self.slider_handler.page:
+            self._govern_memory()
+        if self.session and not self.session_retired and (products or pipeline is not None):
+            self.session_pool.save_cookies(self.session, self.slider_handler.export_cookies())
+        
+        if self.tracer.enabled:
+            # 流水线入库线程的 persist span 也是根span，roots[-1] 不一定是本关键词
+            self.logger.info(f"关键词耗时分布:\n{self.tracer.format_tree(span, min_ms=1.0)}")
+        return products
+    
+    def _scrape_keyword_products(self, keyword: str, page_count: int,
+                                 pipeline: Optional[CrawlPipeline] = None) -> List[Dict]:
+        """采集流程主体"""
         products = []
         
         try:
             # 构建搜索URL
-            encoded_keyword = urllib.parse.quote(keyword)
-            search_url = f"https://www.tiktok.com/shop/s/{encoded_keyword}"
+            search_url = Config.build_search_url(keyword)
             
             self.logger.info(f"访问TikTok搜索页面: {search_url}")
             print(f"🌐 访问TikTok搜索页面: {search_url}")
             
-            # 访问搜索页面
-            self.slider_handler.navigate_to_url(search_url)
+            # 按目标域名当前允许的速率等待
+            with self.tracer.span("delay"):
+                self.rate_controller.acquire(search_url)
             
-            # 随机延时，模拟人工操作
-            print("⏱️ 随机延时中...")
-            random_delay(2.0, 4.0)
+            # 访问搜索页面（超时重试，浏览器断开时重启浏览器后重试）
+            with self.tracer.span("navigate", url=search_url):
+                get_retry_engine().call(self._navigate, search_url, dependency="browser",
+                                        on_retry=self._restart_browser_on_crash,
+                                        retry_on=(ERROR_BROWSER, ERROR_TIMEOUT))
+            PAGES_FETCHED.labels(crawler="complete_crawler").inc()
+            
+            if not self.rate_controller.enabled:
+                # 随机延时，模拟人工操作
+                print("⏱️ 随机延时中...")
+                with self.tracer.span("delay"):
+                    random_delay(2.0, 4.0)
             
             # 处理验证码
             print("🧩 检测和处理滑块验证...")
-            if self.slider_handler.handle_captcha():
+            with self.tracer.span("captcha") as span:
+                captcha_blocked = self.slider_handler.handle_captcha()
+                span.set_attribute("blocked", captcha_blocked)
+            # 验证码出现的频率反馈给速率控制
+            if captcha_blocked:
+                outcome = OUTCOME_ERROR
+            else:
+                outcome = OUTCOME_CAPTCHA if self.slider_handler.captcha_seen else OUTCOME_OK
+            self.rate_controller.record(search_url, outcome)
+            # 对会话来说验证码未通过同样说明指纹已被标记
+            self._record_session(OUTCOME_CAPTCHA if captcha_blocked else outcome)
+            if captcha_blocked:
                 self.logger.error("验证码无法跳过，停止采集")
                 print("❌ 验证码无法跳过，停止采集")
                 return products
@@ -163,11 +271,27 @@ class CompleteTikTokCrawler:
             print("✅ 滑块验证处理完成，开始解析页面数据")
             
             # 验证码处理后的延时
-            random_delay(1.0, 3.0)
+            if not self.rate_controller.enabled:
+                with self.tracer.span("delay"):
+                    random_delay(1.0, 3.0)
+            
+            if pipeline is not None:
+                # 只取原始数据交给流水线，浏览器随即翻页或加载下一个关键词
+                with self.tracer.span("fetch") as span:
+                    router_data = self.fetch_router_data()
+                    span.set_attribute("bytes", len(router_data or ""))
+                if not router_data:
+                    return products
+                pipeline.submit(FetchedPage(keyword, 1, router_data, PAGE_ROUTER))
+                if self.is_running and page_count > 1:
+                    self.get_more_page_products(keyword, page_count - 1, pipeline)
+                return products
             
             # 获取页面组件数据
             print("📊 正在解析页面数据...")
-            components_map = self.get_components_map()
+            with self.tracer.span("parse") as span:
+                components_map = self.get_components_map()
+                span.set_attribute("components", len(components_map))
             
             if not components_map:
                 self.logger.warning("未能获取页面组件数据")
@@ -175,7 +299,9 @@ class CompleteTikTokCrawler:
                 return products
             
             # 提取第一页商品列表
-            first_page_products = self.extract_first_page_products(components_map, keyword)
+            with self.tracer.span("first_page") as span:
+                first_page_products = self.extract_first_page_products(components_map, keyword)
+                span.set_attribute("products", len(first_page_products))
             products.extend(first_page_products)
             
             print(f"📦 第1页获取 {len(first_page_products)} 个商品")
@@ -197,16 +323,32 @@ class CompleteTikTokCrawler:
     
     def get_components_map(self) -> List[Dict]:
         """获取页面组件映射"""
+        router_data = self.fetch_router_data()
+        if not router_data:
+            return []
+        return self.parse_components_map(router_data)
+    
+    def fetch_router_data(self) -> Optional[str]:
+        """读取页面数据元素的原始JSON文本（不解析）"""
         try:
             # 查找页面数据元素
             ele = self.slider_handler.page.ele("@id=__MODERN_ROUTER_DATA__", timeout=10)
             if not ele:
                 self.logger.warning("未找到页面数据元素")
                 print("⚠️ 未找到页面数据元素")
-                return []
+                return None
+            return ele.inner_html
             
+        except Exception as e:
+            self.logger.error(f"读取页面数据元素失败: {e}")
+            print(f"⚠️ 读取页面数据元素失败: {e}")
+            return None
+    
+    def parse_components_map(self, router_data: str) -> List[Dict]:
+        """从页面数据JSON文本中解析组件映射"""
+        try:
             # 解析JSON数据
-            loader_data = json.loads(ele.inner_html)
+            loader_data = json.loads(router_data)
             
             # 根据实际的页面结构获取组件映射
             loader_keys = list(loader_data.get("loaderData", {}).keys())
@@ -248,7 +390,8 @@ class CompleteTikTokCrawler:
                         
                         product_id = product.get("product_id")
                         if product_id:
-                            print(f"📦 正在处理商品 {i+1}/{len(component_products)}: {product_id}")
+                            if self.print_sampler.hit("process"):
+                                print(f"📦 正在处理商品 {i+1}/{len(component_products)}: {product_id}")
                             product_data = self.parse_product_data(product, keyword)
                             if product_data:
                                 products.append(product_data)
@@ -256,9 +399,10 @@ class CompleteTikTokCrawler:
                                 # 保存到数据库
                                 self.save_product_to_db(product_data)
                                 
-                                # 商品处理间隔
-                                if i < len(component_products) - 1:  # 不是最后一个商品
-                                    random_delay(0.5, 1.5)
+                                # 商品处理间隔（商品数据已随页面加载，启用速率控制时不再等待）
+                                if not self.rate_controller.enabled and i < len(component_products) - 1:
+                                    with self.tracer.span("delay"):
+                                        random_delay(0.5, 1.5)
                     break
             
             return products
@@ -314,7 +458,7 @@ class CompleteTikTokCrawler:
             shipping_fee = 0.0
             
             # 商品链接
-            product_url = f"https://www.tiktok.com/shop/product/{product_id}"
+            product_url = f"{Config.SHOP_BASE_URL}/product/{product_id}"
             
             # 创建商品数据
             product_data = {
@@ -340,16 +484,51 @@ class CompleteTikTokCrawler:
                 'slider_solved': True
             }
             
-            self.logger.debug(f"解析商品: {title} - ${current_price}")
+            self.logger.debug("解析商品: %s - $%s", title, current_price)
+            PRODUCTS_PARSED.labels(crawler="complete_crawler").inc()
             return product_data
             
         except Exception as e:
             self.logger.error(f"解析商品数据失败: {e}")
             return None
     
-    def get_more_page_products(self, keyword: str, additional_pages: int) -> List[Dict]:
+    def parse_fetched_page(self, page: FetchedPage) -> List[Dict]:
+        """
+        流水线解析阶段: 原始页面数据解析为商品（不入库）
+        
+        Args:
+            page: 取页阶段提交的页面
+            
+        Returns:
+            List[Dict]: 商品数据列表
+        """
+        if page.kind == PAGE_ROUTER:
+            raw_products = []
+            for component in self.parse_components_map(page.payload):
+                if component.get("component_name") == "feed_list_search_word":
+                    raw_products = component.get("component_data", {}).get("products", [])
+                    break
+        else:
+            raw_products = page.payload
+        
+        products = []
+        for product in raw_products:
+            if product.get("product_id"):
+                product_data = self.parse_product_data(product, page.keyword)
+                if product_data:
+                    products.append(product_data)
+        print(f"📦 [{page.keyword}] 第{page.page}页解析 {len(products)} 个商品")
+        return products
+    
+    def get_more_page_products(self, keyword: str, additional_pages: int,
+                               pipeline: Optional[CrawlPipeline] = None) -> List[Dict]:
         """
         获取更多页面商品
+        
+        Args:
+            keyword: 搜索关键词
+            additional_pages: 额外页数
+            pipeline: 采集流水线，传入时接口返回的商品列表直接提交，不在此解析入库
         """
         products = []
         
@@ -367,72 +546,82 @@ class CompleteTikTokCrawler:
                 current_page = page_num + 2  # 从第2页开始
                 print(f"📄 正在加载第 {current_page} 页...")
                 
-                try:
-                    # 查找并点击"View more"按钮
-                    view_more_selectors = [
-                        "text=View more",
-                        "text=查看更多",
-                        "[data-e2e='load-more']",
-                        ".load-more",
-                        "[class*='load-more']"
-                    ]
+                with self.tracer.span("paginate", page=current_page):
+                    try:
+                        # 查找并点击"View more"按钮
+                        view_more_selectors = [
+                            "text=View more",
+                            "text=查看更多",
+                            "[data-e2e='load-more']",
+                            ".load-more",
+                            "[class*='load-more']"
+                        ]
                     
-                    view_more_btn = None
-                    for selector in view_more_selectors:
-                        try:
-                            view_more_btn = self.slider_handler.page.ele(selector, timeout=3)
-                            if view_more_btn and view_more_btn.states.is_displayed:
-                                print(f"✅ 找到翻页按钮: {selector}")
-                                break
-                        except:
-                            continue
+                        view_more_btn = None
+                        for selector in view_more_selectors:
+                            try:
+                                view_more_btn = self.slider_handler.page.ele(selector, timeout=3)
+                                if view_more_btn and view_more_btn.states.is_displayed:
+                                    print(f"✅ 找到翻页按钮: {selector}")
+                                    break
+                            except:
+                                continue
                     
-                    if view_more_btn:
-                        # 滚动到按钮位置
-                        view_more_btn.scroll.to_see()
-                        time.sleep(1)
+                        if view_more_btn:
+                            # 滚动到按钮位置
+                            view_more_btn.scroll.to_see()
+                            time.sleep(1)
                         
-                        # 点击按钮
-                        view_more_btn.click()
-                        time.sleep(2)
+                            # 点击按钮（触发翻页接口请求）
+                            self.rate_controller.acquire(self.product_list_url)
+                            view_more_btn.click()
+                            if not self.rate_controller.enabled:
+                                time.sleep(2)
                         
-                        # 等待API响应
-                        try:
-                            res = self.slider_handler.page.listen.wait(timeout=10)
-                            if res and res.response.body:
-                                api_products = res.response.body.get("data", {}).get("products", [])
-                                self.logger.info(f"第 {current_page} 页获取 {len(api_products)} 个商品")
-                                print(f"📦 第 {current_page} 页获取 {len(api_products)} 个商品")
+                            # 等待API响应
+                            try:
+                                res = self.slider_handler.page.listen.wait(timeout=10)
+                                self.rate_controller.record(
+                                    self.product_list_url, OUTCOME_OK if res and res.response.body else OUTCOME_ERROR)
+                                if res and res.response.body:
+                                    api_products = res.response.body.get("data", {}).get("products", [])
+                                    PAGES_FETCHED.labels(crawler="complete_crawler").inc()
+                                    self.logger.info(f"第 {current_page} 页获取 {len(api_products)} 个商品")
+                                    print(f"📦 第 {current_page} 页获取 {len(api_products)} 个商品")
+                                    
+                                    if pipeline is not None:
+                                        pipeline.submit(FetchedPage(keyword, current_page, api_products, PAGE_API))
+                                        api_products = []
                                 
-                                # 解析API返回的商品数据
-                                for product in api_products:
-                                    if not self.is_running:
-                                        break
+                                    # 解析API返回的商品数据
+                                    for product in api_products:
+                                        if not self.is_running:
+                                            break
                                     
-                                    product_id = product.get("product_id")
-                                    if product_id:
-                                        product_data = self.parse_product_data(product, keyword)
-                                        if product_data:
-                                            products.append(product_data)
+                                        product_id = product.get("product_id")
+                                        if product_id:
+                                            product_data = self.parse_product_data(product, keyword)
+                                            if product_data:
+                                                products.append(product_data)
                                             
-                                            # 保存到数据库
-                                            self.save_product_to_db(product_data)
-                            else:
-                                self.logger.warning(f"第 {current_page} 页API响应为空")
-                                print(f"⚠️ 第 {current_page} 页API响应为空")
+                                                # 保存到数据库
+                                                self.save_product_to_db(product_data)
+                                else:
+                                    self.logger.warning(f"第 {current_page} 页API响应为空")
+                                    print(f"⚠️ 第 {current_page} 页API响应为空")
                                 
-                        except Exception as e:
-                            self.logger.warning(f"等待API响应失败: {e}")
-                            print(f"⚠️ 等待API响应失败: {e}")
-                    else:
-                        self.logger.warning("未找到'View more'按钮，停止翻页")
-                        print("⚠️ 未找到'View more'按钮，停止翻页")
-                        break
+                            except Exception as e:
+                                self.logger.warning(f"等待API响应失败: {e}")
+                                print(f"⚠️ 等待API响应失败: {e}")
+                        else:
+                            self.logger.warning("未找到'View more'按钮，停止翻页")
+                            print("⚠️ 未找到'View more'按钮，停止翻页")
+                            break
                         
-                except Exception as e:
-                    self.logger.warning(f"第 {current_page} 页加载失败: {e}")
-                    print(f"⚠️ 第 {current_page} 页加载失败: {e}")
-                    continue
+                    except Exception as e:
+                        self.logger.warning(f"第 {current_page} 页加载失败: {e}")
+                        print(f"⚠️ 第 {current_page} 页加载失败: {e}")
+                        continue
             
             return products
             
@@ -440,28 +629,130 @@ class CompleteTikTokCrawler:
             self.logger.error(f"获取更多页面数据失败: {e}")
             print(f"❌ 获取更多页面数据失败: {e}")
             return products
+        finally:
+            # 停止监听，未取走的数据包不再留在内存中
+            try:
+                self.slider_handler.page.listen.stop()
+            except Exception:
+                pass
     
     def save_product_to_db(self, product_data: Dict):
         """保存商品到数据库"""
         try:
             product = ProductData.from_dict(product_data)
             
+            if Config.PRODUCT_DELTA_WRITES:
+                self.save_product_delta(product)
+                return
+            
             # 检查是否已存在
-            existing = self.db_manager.find_products({"product_id": product.product_id})
+            with self.tracer.span("dedup_check"):
+                existing = self.db_manager.find_products({"product_id": product.product_id})
             if existing:
-                self.logger.debug(f"商品已存在，跳过: {product.product_id}")
+                DEDUP_HITS.labels(crawler="complete_crawler").inc()
+                self.logger.debug("商品已存在，跳过: %s", product.product_id)
                 return
             
             # 保存到数据库
-            if self.db_manager.save_product(product):
-                self.logger.info(f"保存商品成功: {product.title[:30]}... - ${product.current_price}")
-                print(f"💾 保存商品: {product.title[:30]}... - ${product.current_price}")
+            with self.tracer.span("persist", product_id=product.product_id):
+                saved = self.db_manager.save_product(product)
+            if saved:
+                PRODUCTS_SAVED.labels(crawler="complete_crawler").inc()
+                self.logger.info("保存商品成功: %.30s... - $%s", product.title, product.current_price, extra=SAMPLED)
+                if self.print_sampler.hit("save"):
+                    print(f"💾 保存商品: {product.title[:30]}... - ${product.current_price}")
             else:
-                self.logger.error(f"保存商品失败: {product.product_id}")
+                self.logger.error("保存商品失败: %s", product.product_id)
                 
         except Exception as e:
             self.logger.error(f"保存商品到数据库失败: {e}")
     
+    def save_products_to_db(self, products_data: List[Dict]) -> int:
+        """
+        批量保存商品（流水线入库阶段）: 一次查询去重，一次批量插入
+        
+        Args:
+            products_data: 商品数据列表
+            
+        Returns:
+            int: 保存成功的商品数（已在库中、未变化的商品也算成功），写库失败的不计入
+        """
+        products = list({p['product_id']: ProductData.from_dict(p) for p in products_data}.values())
+        if Config.PRODUCT_DELTA_WRITES:
+            # 变化检测逐个比较指纹，按商品写入变化的字段
+            failed = sum(1 for product in products if self.save_product_delta(product) is None)
+            return len(products_data) - failed
+        
+        with self.tracer.span("dedup_check", count=len(products)):
+            existing = self.db_manager.existing_product_ids(p.product_id for p in products)
+        if existing:
+            DEDUP_HITS.labels(crawler="complete_crawler").inc(len(existing))
+        new_products = [p for p in products if p.product_id not in existing]
+        with self.tracer.span("persist", count=len(new_products)):
+            saved = self.db_manager.insert_products(new_products)
+        if saved:
+            PRODUCTS_SAVED.labels(crawler="complete_crawler").inc(saved)
+        failed = len(new_products) - saved
+        if failed:
+            self.logger.error("批量保存商品失败: %d 个", failed)
+        print(f"💾 批量保存 {saved} 个商品（已存在 {len(existing)} 个）")
+        return len(products_data) - failed
+    
+    def scrape_keywords_pipelined(self, keywords: Iterable[str], page_count: int = 2) -> Dict[str, int]:
+        """
+        流水线采集多个关键词: 浏览器只负责取页，解析和入库在后台线程进行，
+        关键词N的商品解析、入库时浏览器已在加载关键词N+1。
+        商品入库后不在内存中保留，关键词再多内存也不随之增长
+        
+        Args:
+            keywords: 关键词
+            page_count: 每个关键词采集页数
+            
+        Returns:
+            Dict[str, int]: 关键词 -> 解析出的商品数
+        """
+        pipeline = open_crawl_pipeline(self.parse_fetched_page, self.save_products_to_db, keep_results=False)
+        if pipeline is None:
+            return {keyword: len(self.scrape_keyword_products(keyword, page_count)) for keyword in keywords}
+        
+        done = []
+        with pipeline:
+            for keyword in keywords:
+                if not self.is_running:
+                    break
+                done.append(keyword)
+                self.scrape_keyword_products(keyword, page_count, pipeline)
+        
+        stats = pipeline.stats()
+        self.logger.info(f"流水线统计: {stats}")
+        print(f"📈 流水线: {stats['pages']} 页，解析 {stats['parsed']} 个商品，入库 {stats['batches']} 批，"
+              f"取页等待 {stats['fetch_blocked_seconds']}s")
+        counts = pipeline.keyword_counts()
+        return {keyword: counts.get(keyword, 0) for keyword in done}
+    
+    def save_product_delta(self, product: ProductData) -> Optional[ChangeResult]:
+        """按指纹保存商品，只有新商品或价格、销量等字段变化时才写库，返回变化检测结果，写库失败返回None"""
+        with self.tracer.span("persist", product_id=product.product_id):
+            result = self.db_manager.save_product_delta(product)
+        if result is None:
+            self.logger.error("保存商品失败: %s", product.product_id)
+            return None
+        if result.status == CHANGE_UNCHANGED:
+            DEDUP_HITS.labels(crawler="complete_crawler").inc()
+            self.logger.debug("商品未变化，跳过: %s", product.product_id)
+            return result
+        
+        PRODUCTS_SAVED.labels(crawler="complete_crawler").inc()
+        if result.status == CHANGE_NEW:
+            self.logger.info("保存商品成功: %.30s... - $%s", product.title, product.current_price, extra=SAMPLED)
+            if self.print_sampler.hit("save"):
+                print(f"💾 保存商品: {product.title[:30]}... - ${product.current_price}")
+        else:
+            self.logger.info("商品已更新: %s %s", product.product_id, result.changes, extra=SAMPLED)
+            if self.print_sampler.hit("save"):
+                print(f"🔄 商品变化: {product.title[:30]}... {result.changes}")
+        return result
+    
     def get_total_products_count(self) -> int:
         """获取数据库中的商品总数"""
         try:
@@ -474,7 +765,11 @@ class CompleteTikTokCrawler:
         """关闭资源"""
         try:
             if self.slider_handler:
-                self.slider_handler.close()
+                self.close_browser(save_cookies=not self.session_retired)
+            if self.session_pool:
+                self.session_pool.close()
+            if self.memory_governor and self.memory_governor.export_timeline():
+                print(f"📈 浏览器内存时间线已导出: {Config.MEMORY_TIMELINE_FILE}")
             if self.db_manager:
                 self.db_manager.close()
         except Exception as e:
@@ -494,15 +789,16 @@ def main():
     print("=" * 60)
     
     # 测试配置
-    test_keyword = "phone case"
+    test_keywords = ["phone case", "mug", "desk lamp"]
     page_count = 2
     
     print(f"\n📋 演示配置:")
-    print(f"  搜索关键词: {test_keyword}")
+    print(f"  搜索关键词: {', '.join(test_keywords)}")
     print(f"  采集页数: {page_count}")
     print(f"  技术栈: DrissionPage + ddddocr")
     
     crawler = None
+    start_metrics_export()
     
     try:
         # 初始化爬虫
@@ -518,7 +814,7 @@ def main():
         print(f"\n🎯 开始完整采集流程...")
         start_time = time.time()
         
-        products = crawler.scrape_keyword_products(test_keyword, page_count)
+        counts = crawler.scrape_keywords_pipelined(test_keywords, page_count)
         
         end_time = time.time()
         duration = end_time - start_time
@@ -528,16 +824,24 @@ def main():
         new_products = total_after - total_before
         
         print(f"\n📊 采集结果汇总:")
-        print(f"  ✅ 采集关键词: {test_keyword}")
+        print(f"  ✅ 采集关键词: {len(counts)} 个")
         print(f"  ✅ 采集页数: {page_count}")
-        print(f"  ✅ 采集商品数: {len(products)}")
+        for keyword, count in counts.items():
+            print(f"     - {keyword}: {count} 个商品")
+        print(f"  ✅ 采集商品数: {sum(counts.values())}")
         print(f"  ✅ 新增商品数: {new_products}")
         print(f"  ✅ 数据库总商品: {total_after}")
         print(f"  ✅ 采集耗时: {duration:.2f} 秒")
         
-        if products:
+        # 商品已入库，样例从数据库读取
+        samples = []
+        for keyword, count in counts.items():
+            product = next(crawler.db_manager.iter_products({"search_keyword": keyword}, batch_size=1), None) if count else None
+            if product:
+                samples.append(product)
+        if samples:
             print(f"\n📋 采集商品样例:")
-            for i, product in enumerate(products[:5]):
+            for i, product in enumerate(samples):
                 print(f"  商品{i+1}:")
                 print(f"    ID: {product.get('product_id', 'N/A')}")
                 print(f"    标题: {product.get('title', 'N/A')[:50]}...")
@@ -564,6 +868,9 @@ def main():
         if crawler:
             crawler.close()
             print("✅ 爬虫资源已清理")
+        if export_trace():
+            print(f"📈 阶段耗时追踪已导出: {Config.TRACE_FILE}")
+        stop_metrics_export()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
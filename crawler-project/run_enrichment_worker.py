@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+商品详情补全任务（CDP引擎）
+独立于搜索采集运行: 从详情补全队列按批领取商品ID，跳过近期补全过的商品，
+多个标签页并行打开详情页，解析 desc_detail / 评价时间 / 分类后每批一次批量更新商品文档
+
+用法:
+    python run_enrichment_worker.py --seed                      # 把未补全/已过期的商品加入队列后开始补全
+    python run_enrichment_worker.py --concurrency 6 --batch-size 100
+    ENRICH_QUEUE_BACKEND=redis python run_enrichment_worker.py  # 多个节点共同消费同一个队列
+"""
+import sys
+import os
+
+# 脚本所在目录优先，保证从任意目录运行都能导入项目模块
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+from config import Config
+from handlers.cdp_slider_handler import CdpSliderHandler
+from utils.cdp_engine import CdpBrowser, CdpCrawlEngine, CdpTab, run_blocking
+from utils.database import DatabaseManager, get_db_manager
+from utils.logger import get_logger
+from utils.retry_engine import RetryEngine
+from utils.rate_controller import RateController, get_rate_controller, OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+from utils.metrics import PAGES_FETCHED, PRODUCTS_ENRICHED, start_metrics_export, stop_metrics_export
+from utils.work_queue import WorkItem, WorkQueue, iter_leases, make_worker_id
+from utils.product_enrichment import (
+    EnrichmentIndex, find_product_info, parse_detail_fields, open_enrichment_queue, seed_enrichment_queue
+)
+
+ROUTER_DATA_SELECTOR = "#__MODERN_ROUTER_DATA__"
+
+logger = get_logger(__name__)
+
+
+class CdpDetailEnricher:
+    """商品详情页解析的协程实现"""
+
+    def __init__(self, rate_controller: Optional[RateController] = None,
+                 slider_handler: Optional[CdpSliderHandler] = None):
+        """
+        Args:
+            rate_controller: 速率控制器，默认全局实例
+            slider_handler: 滑块处理器
+        """
+        self.rate_controller = rate_controller or get_rate_controller()
+        self.slider_handler = slider_handler or CdpSliderHandler()
+
+    async def fetch_detail(self, tab: CdpTab, product_id: str) -> Optional[Dict]:
+        """
+        打开详情页并解析补全字段
+
+        Args:
+            tab: 标签页
+            product_id: 商品ID
+
+        Returns:
+            Optional[Dict]: 补全字段，验证码未通过或页面结构不匹配时返回None
+        """
+        detail_url = Config.build_detail_url(product_id)
+        await self.rate_controller.acquire_async(detail_url)
+        try:
+            await tab.navigate(detail_url)
+        except Exception:
+            self.rate_controller.record(detail_url, OUTCOME_ERROR)
+            raise
+        PAGES_FETCHED.labels(crawler="enrichment").inc()
+
+        captcha_seen, blocked = await self.slider_handler.handle_captcha(tab)
+        self.rate_controller.record(detail_url, OUTCOME_ERROR if blocked else
+                                    OUTCOME_CAPTCHA if captcha_seen else OUTCOME_OK)
+        if blocked:
+            logger.warning(f"商品 {product_id} 详情页验证码无法跳过")
+            return None
+        if captcha_seen:
+            await tab.wait_for_selector(ROUTER_DATA_SELECTOR, timeout=Config.CDP_NAVIGATION_TIMEOUT)
+
+        raw = await tab.inner_html(ROUTER_DATA_SELECTOR)
+        product_info = await run_blocking(find_product_info, raw) if raw else None
+        if not product_info:
+            logger.warning(f"商品 {product_id} 详情页数据为空")
+            return None
+        return parse_detail_fields(product_info)
+
+
+def lease_batch(queue: WorkQueue, worker_id: str, size: int, idle_timeout: Optional[float] = None) -> List[WorkItem]:
+    """
+    领取一批任务: 第一个按 iter_leases 等待，其余只取当前可领取的
+
+    Returns:
+        List[WorkItem]: 队列已空或等待超时时为空列表
+    """
+    first = next(iter_leases(queue, worker_id, idle_timeout=idle_timeout), None)
+    if first is None:
+        return []
+    items = [first]
+    while len(items) < size:
+        item = queue.lease(worker_id)
+        if item is None:
+            break
+        items.append(item)
+    return items
+
+
+async def run_enrichment_worker(db_manager: DatabaseManager, queue: WorkQueue,
+                                index: Optional[EnrichmentIndex] = None, batch_size: Optional[int] = None,
+                                concurrency: Optional[int] = None, browser: Optional[CdpBrowser] = None,
+                                retry_engine: Optional[RetryEngine] = None, idle_timeout: Optional[float] = None,
+                                enricher: Optional[CdpDetailEnricher] = None) -> Dict[str, int]:
+    """
+    消费详情补全队列直到队列为空
+
+    Args:
+        db_manager: 已连接的数据库管理器
+        queue: 详情补全队列（任务为商品ID）
+        index: 补全索引，默认按商品集合创建
+        batch_size: 每批领取的商品数，默认 ENRICH_BATCH_SIZE
+        concurrency: 标签页数，默认 ENRICH_CONCURRENCY
+        browser: 已连接的浏览器，默认按 CDP_ENDPOINT 连接或启动本地Chrome（结束后关闭）
+        retry_engine: 重试引擎，默认全局实例
+        idle_timeout: 队列暂无任务时的最长等待（秒）
+        enricher: 详情页解析器，默认使用全局速率控制器
+
+    Returns:
+        Dict[str, int]: 领取、跳过、补全、失败的商品数和批数
+    """
+    index = index or EnrichmentIndex(db_manager.collection)
+    batch_size = max(1, batch_size or Config.ENRICH_BATCH_SIZE)
+    worker_id = make_worker_id()
+    stats = {"leased": 0, "skipped": 0, "enriched": 0, "failed": 0, "batches": 0}
+
+    owns_browser = browser is None
+    if owns_browser:
+        browser = await (CdpBrowser.connect() if Config.CDP_ENDPOINT else CdpBrowser.launch())
+    enricher = enricher or CdpDetailEnricher()
+    engine = CdpCrawlEngine(browser, concurrency or Config.ENRICH_CONCURRENCY, retry_engine=retry_engine)
+    try:
+        while True:
+            items = await run_blocking(lease_batch, queue, worker_id, batch_size, idle_timeout)
+            if not items:
+                break
+            stats["leased"] += len(items)
+            product_ids = await run_blocking(index.stale, [item.keyword for item in items])
+            results = await engine.run(product_ids, enricher.fetch_detail) if product_ids else []
+            updates = {product_id: index.enriched_fields(fields)
+                       for product_id, fields in zip(product_ids, results) if fields}
+            matched = await run_blocking(db_manager.update_products, updates) if updates else 0
+            if matched < len(updates):
+                # 批量写入失败（update_products 返回0）或部分未写入，无法区分哪些已写入: 整批放回队列，
+                # 已写入的商品重试时按 enriched_at 跳过
+                logger.error(f"批量更新只匹配 {matched}/{len(updates)} 个商品，本批放回队列重试")
+                updates = {}
+
+            pending = set(product_ids)
+            for item in items:
+                if item.keyword in updates or item.keyword not in pending:
+                    queue.ack(item)
+                else:
+                    queue.nack(item, error="详情页获取或写入失败")
+            skipped = len(items) - len(product_ids)
+            failed = len(product_ids) - len(updates)
+            stats["skipped"] += skipped
+            stats["enriched"] += len(updates)
+            stats["failed"] += failed
+            stats["batches"] += 1
+            PRODUCTS_ENRICHED.labels(result="enriched").inc(len(updates))
+            PRODUCTS_ENRICHED.labels(result="skipped").inc(skipped)
+            PRODUCTS_ENRICHED.labels(result="failed").inc(failed)
+            print(f"📦 第{stats['batches']}批: 补全 {len(updates)} 个，跳过 {skipped} 个，失败 {failed} 个")
+    finally:
+        if owns_browser:
+            await browser.close()
+    return stats
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='商品详情补全任务（CDP引擎）')
+    parser.add_argument('--seed', action='store_true', help='先把未补全或补全已过期的商品加入队列')
+    parser.add_argument('--limit', type=int, default=0, help='--seed 时最多加入的商品数，0为不限')
+    parser.add_argument('--batch-size', type=int, default=Config.ENRICH_BATCH_SIZE, help='每批领取的商品数')
+    parser.add_argument('--concurrency', type=int, default=Config.ENRICH_CONCURRENCY, help='同时打开的详情页数')
+    parser.add_argument('--refresh-hours', type=float, default=Config.ENRICH_REFRESH_HOURS,
+                        help='该时间内补全过的商品跳过')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    db_manager = get_db_manager()
+    if not db_manager.connect():
+        print("❌ 数据库连接失败")
+        return 1
+    queue = open_enrichment_queue(db_manager.db)
+    if queue is None:
+        print("❌ 详情补全队列不可用")
+        db_manager.close()
+        return 1
+
+    index = EnrichmentIndex(db_manager.collection, args.refresh_hours)
+    print("🎉 商品详情补全")
+    print(f"  队列: {queue.backend}:{queue.name}，每批 {args.batch_size} 个，并发标签页: {args.concurrency}")
+    # 进程内队列只有本进程能加入
+    if args.seed or queue.backend == "memory":
+        print(f"  加入队列: {seed_enrichment_queue(queue, index, args.limit)} 个商品")
+
+    start_metrics_export()
+    try:
+        start_time = time.time()
+        stats = asyncio.run(run_enrichment_worker(db_manager, queue, index, args.batch_size, args.concurrency))
+        print("\n📊 补全结果汇总:")
+        print(f"  ✅ 补全 {stats['enriched']} 个，跳过 {stats['skipped']} 个，失败 {stats['failed']} 个，"
+              f"共 {stats['batches']} 批，耗时 {time.time() - start_time:.2f} 秒")
+    finally:
+        queue.close()
+        db_manager.close()
+        stop_metrics_export()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+基准测试公共工具
+统一的延迟统计、报告格式和基线对比，保证各基准测试报告可相互比较
+报告格式:
+    {
+        "benchmark": 基准测试名称,
+        "generated_at": 生成时间,
+        "environment": 运行环境,
+        "params": 运行参数,
+        "results": [{"name": 结果名称, ...指标}]
+    }
+"""
+import os
+import sys
+import json
+import math
+import platform
+import time
+import functools
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+# 项目根目录（scripts/benchmark 的上两级）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MOCK_DIR = os.path.join(PROJECT_ROOT, "tests", "mock")
+
+
+def setup_paths():
+    """把项目根目录和 tests/mock 加入 sys.path，未指定配置档案时使用 benchmark 档案"""
+    os.environ.setdefault("CRAWLER_PROFILE", "benchmark")
+    for path in (MOCK_DIR, PROJECT_ROOT):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    计算百分位数（线性插值）
+
+    Args:
+        values: 数据
+        pct: 百分位（0-100）
+
+    Returns:
+        float: 百分位数，数据为空时返回0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return float(ordered[low])
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float], digits: int = 2) -> Dict[str, float]:
+    """
+    汇总一组延迟数据
+
+    Args:
+        values: 数据（通常为毫秒）
+        digits: 保留小数位
+
+    Returns:
+        Dict: count/mean/min/p50/p90/p99/max
+    """
+    if not values:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), digits),
+        "min": round(min(values), digits),
+        "p50": round(percentile(values, 50), digits),
+        "p90": round(percentile(values, 90), digits),
+        "p99": round(percentile(values, 99), digits),
+        "max": round(max(values), digits),
+    }
+
+
+class StageTimer:
+    """按阶段收集耗时（毫秒）"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, elapsed_ms: float):
+        self.samples.setdefault(stage, []).append(elapsed_ms)
+
+    @contextmanager
+    def stage(self, name: str):
+        """计时一个代码块"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def wrap(self, obj, method_name: str, stage: Optional[str] = None):
+        """
+        替换对象上的方法，使每次调用都计入阶段耗时
+
+        Args:
+            obj: 目标对象
+            method_name: 方法名
+            stage: 阶段名，默认与方法名相同
+        """
+        method = getattr(obj, method_name)
+        name = stage or method_name
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, timed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的延迟统计"""
+        return {name: summarize(values) for name, values in self.samples.items()}
+
+
+def get_environment() -> Dict[str, str]:
+    """采集运行环境信息"""
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+        "profile": os.getenv("CRAWLER_PROFILE", ""),
+    }
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        if commit:
+            env["git_commit"] = commit
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return env
+
+
+def build_report(benchmark: str, results: List[dict], params: Optional[dict] = None,
+                 environment: Optional[dict] = None) -> dict:
+    """
+    构建标准格式的基准测试报告
+
+    Args:
+        benchmark: 基准测试名称
+        results: 结果列表，每项必须包含 name
+        params: 运行参数
+        environment: 额外的环境信息
+
+    Returns:
+        dict: 报告
+    """
+    env = get_environment()
+    env.update(environment or {})
+    return {
+        "benchmark": benchmark,
+        "generated_at": datetime.now().isoformat(timespec='seconds'),
+        "environment": env,
+        "params": params or {},
+        "results": results,
+    }
+
+
+def write_report(report: dict, path: str):
+    """写入报告文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 报告已保存: {path}")
+
+
+def load_report(path: str) -> dict:
+    """读取报告文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _lookup(result: dict, metric: str):
+    """按 a.b.c 形式读取嵌套指标"""
+    value = result
+    for key in metric.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def print_table(results: List[dict], metrics: List[str]):
+    """
+    以表格形式打印结果
+
+    Args:
+        results: 结果列表
+        metrics: 要展示的指标（支持 a.b 嵌套写法）
+    """
+    headers = ["name"] + metrics
+    rows = [[str(r.get("name", ""))] + [_format(_lookup(r, m)) for m in metrics] for r in results]
+    widths = [max(len(h), *(len(row[i]) for row in rows)) if rows else len(h) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)))
+
+
+def compare_reports(current: dict, baseline: dict, metrics: List[str]) -> List[dict]:
+    """
+    对比当前报告与基线报告
+
+    Args:
+        current: 当前报告
+        baseline: 基线报告
+        metrics: 对比的指标
+
+    Returns:
+        List[dict]: 每个结果每个指标的 基线/当前/变化百分比
+    """
+    baseline_results = {r.get("name"): r for r in baseline.get("results", [])}
+    rows = []
+    for result in current.get("results", []):
+        base = baseline_results.get(result.get("name"))
+        if not base:
+            continue
+        for metric in metrics:
+            new_value, old_value = _lookup(result, metric), _lookup(base, metric)
+            if not isinstance(new_value, (int, float)) or not isinstance(old_value, (int, float)):
+                continue
+            change = ((new_value - old_value) / old_value * 100) if old_value else 0.0
+            rows.append({
+                "name": result.get("name"),
+                "metric": metric,
+                "baseline": old_value,
+                "current": new_value,
+                "change_pct": round(change, 1),
+            })
+    return rows
+
+
+def print_comparison(rows: List[dict]):
+    """打印基线对比结果"""
+    if not rows:
+        print("⚠️ 基线报告中没有可对比的结果")
+        return
+    print("\n📊 与基线对比:")
+    for row in rows:
+        print(f"  {row['name']:<28} {row['metric']:<28} "
+              f"{_format(row['baseline']):>10} -> {_format(row['current']):>10} ({row['change_pct']:+.1f}%)")
+
+
+def _format(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+滑块验证码离线回放基准测试
+使用样本库（录制样本或合成样本）离线评估各滑块处理器:
+  - 识别准确率: ddddocr识别的缺口位置与真实值的误差
+  - 识别延迟: slide_match + 滑动距离换算耗时
+  - 端到端拖拽耗时: 在本地验证码替身页面上完整执行处理器（需要本地Chrome，--e2e开启）
+
+用法:
+    python scripts/benchmark/captcha_replay_benchmark.py
+    python scripts/benchmark/captcha_replay_benchmark.py --corpus temp/captcha_corpus --e2e
+    python scripts/benchmark/captcha_replay_benchmark.py --baseline output/benchmarks/old.json
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+from bench_common import (
+    PROJECT_ROOT, setup_paths, summarize, build_report, write_report,
+    load_report, print_table, compare_reports, print_comparison
+)
+
+setup_paths()
+
+from utils.captcha_corpus import CaptchaCorpus, generate_synthetic_corpus, DISPLAY_WIDTH  # noqa: E402
+
+HANDLER_NAMES = [
+    "SliderHandler",
+    "EnhancedSliderHandler",
+    "HybridSliderHandler",
+    "DrissionPageSliderHandler",
+]
+
+REPORT_METRICS = [
+    "accuracy",
+    "mean_abs_error_px",
+    "distance_mean_abs_error",
+    "matcher_latency_ms.p50",
+    "matcher_latency_ms.p99",
+    "drag_time_ms.p50",
+    "e2e_success_rate",
+]
+
+
+class ReplayElement:
+    """离线回放用的图片元素替身，提供处理器读取的 location/size/rect 属性"""
+
+    def __init__(self, x: float, y: float, width: float, height: float):
+        self.location = {'x': x, 'y': y}
+        self.size = {'width': width, 'height': height}
+        self.rect = {'x': x, 'y': y, 'width': width, 'height': height}
+
+
+def create_offline_handler(name: str):
+    """
+    创建不依赖浏览器的处理器实例（只使用其识别和距离换算逻辑）
+
+    Args:
+        name: 处理器名称
+
+    Returns:
+        处理器实例
+    """
+    if name == "SliderHandler":
+        from handlers.slider import SliderHandler
+        return SliderHandler(None)
+    if name == "EnhancedSliderHandler":
+        from handlers.enhanced_slider_handler import EnhancedSliderHandler
+        return EnhancedSliderHandler(None)
+    if name == "HybridSliderHandler":
+        from handlers.hybrid_slider_handler import HybridSliderHandler
+        return HybridSliderHandler(None)
+    if name == "DrissionPageSliderHandler":
+        from handlers.drissionpage_slider_handler import DrissionPageSliderHandler
+        # 构造函数会启动浏览器，离线识别只需要ddddocr
+        handler = DrissionPageSliderHandler.__new__(DrissionPageSliderHandler)
+        handler.page = None
+        handler.proxy_enabled = False
+        handler.proxy_url = None
+        handler.init_ocr()
+        return handler
+    raise ValueError(f"未知的处理器: {name}")
+
+
+def reference_distance(target_x: float, image_width: int, x_offset: float) -> float:
+    """参考项目算法: actual_x = target_x * (340 / width) - x_offset"""
+    if image_width > 0:
+        return target_x * (DISPLAY_WIDTH / image_width) - x_offset
+    return target_x - x_offset
+
+
+def compute_distance(name: str, handler, target_x: float, sample, background_bytes: bytes) -> float:
+    """
+    按各处理器自身的代码路径换算滑动距离
+
+    Args:
+        name: 处理器名称
+        handler: 处理器实例
+        target_x: ddddocr识别的缺口位置
+        sample: 验证码样本
+        background_bytes: 背景图字节
+
+    Returns:
+        float: 滑动距离（页面像素）
+    """
+    scale = DISPLAY_WIDTH / sample.image_width if sample.image_width else 1
+    bg_el = ReplayElement(0, 0, DISPLAY_WIDTH, sample.image_height * scale)
+    target_el = ReplayElement(sample.x_offset, 0, sample.piece_width * scale, sample.piece_width * scale)
+
+    if name == "SliderHandler":
+        return handler.calculate_precise_distance(target_x, bg_el, target_el, background_bytes)
+    if name == "HybridSliderHandler":
+        return handler.calculate_actual_distance_reference_algorithm(target_x, bg_el, target_el, background_bytes)
+    # EnhancedSliderHandler / DrissionPageSliderHandler 在 handle_captcha 中内联了参考算法
+    return reference_distance(target_x, sample.image_width, sample.x_offset)
+
+
+def run_matcher_benchmark(name: str, samples: List, tolerance_px: float, repeat: int = 1) -> dict:
+    """
+    识别准确率与识别延迟测试
+
+    Args:
+        name: 处理器名称
+        samples: 样本列表
+        tolerance_px: 判定识别正确的误差（背景原图像素）
+        repeat: 每个样本重复次数（用于稳定延迟统计）
+
+    Returns:
+        dict: 测试结果
+    """
+    result = {"name": name, "samples": len(samples)}
+    try:
+        handler = create_offline_handler(name)
+    except Exception as e:
+        result["error"] = f"处理器初始化失败: {e}"
+        return result
+
+    if getattr(handler, "det", None) is None:
+        result["error"] = "ddddocr不可用"
+        return result
+
+    latencies, errors, distance_errors = [], [], []
+    matched = correct = 0
+
+    for sample in samples:
+        background_bytes = sample.read_background()
+        target_bytes = sample.read_target()
+
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            res = handler.det.slide_match(target_bytes, background_bytes)
+            target_x = res["target"][0] if res and "target" in res else None
+            distance = compute_distance(name, handler, target_x, sample, background_bytes) \
+                if target_x is not None else None
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        if target_x is None:
+            continue
+        matched += 1
+        error = abs(target_x - sample.target_x)
+        errors.append(error)
+        distance_errors.append(abs(distance - sample.expected_distance(DISPLAY_WIDTH)))
+        if error <= tolerance_px:
+            correct += 1
+
+    result.update({
+        "matched": matched,
+        "accuracy": round(correct / len(samples), 4) if samples else 0.0,
+        "mean_abs_error_px": round(sum(errors) / len(errors), 2) if errors else None,
+        "distance_mean_abs_error": round(sum(distance_errors) / len(distance_errors), 2) if distance_errors else None,
+        "matcher_latency_ms": summarize(latencies),
+    })
+    return result
+
+
+def create_selenium_driver(headless: bool = True):
+    """创建端到端测试用的Selenium Chrome"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from config import Config
+
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    for arg in Config.CHROME_OPTIONS:
+        options.add_argument(arg)
+    options.add_argument('--window-size=1280,900')
+    return webdriver.Chrome(options=options)
+
+
+def run_e2e_benchmark(name: str, samples: List, server, headless: bool = True) -> dict:
+    """
+    端到端拖拽测试：在本地替身页面上执行处理器的完整验证流程
+
+    Args:
+        name: 处理器名称
+        samples: 样本列表
+        server: CaptchaWidgetServer实例
+        headless: 是否无头模式
+
+    Returns:
+        dict: drag_time_ms / e2e_success_rate / drag_error_px
+    """
+    durations, solved = [], 0
+    driver = handler = None
+
+    try:
+        if name == "DrissionPageSliderHandler":
+            from handlers.drissionpage_slider_handler import DrissionPageSliderHandler
+            handler = DrissionPageSliderHandler()
+        else:
+            driver = create_selenium_driver(headless)
+            handler = create_offline_handler(name)
+            handler.driver = driver
+
+        for sample in samples:
+            url = server.url_for(sample.sample_id)
+            if driver:
+                driver.get(url)
+            else:
+                handler.page.get(url)
+
+            start = time.perf_counter()
+            if name == "SliderHandler":
+                ok = handler.solve_slider_captcha()
+            elif name == "DrissionPageSliderHandler":
+                ok = not handler.handle_captcha()
+            else:
+                # 返回False表示验证码已通过
+                ok = not handler.handle_captcha_reference_algorithm()
+            durations.append((time.perf_counter() - start) * 1000)
+
+            attempts = server.attempts.get(sample.sample_id, [])
+            if ok and attempts and attempts[-1]["passed"]:
+                solved += 1
+
+    except Exception as e:
+        return {"e2e_error": f"端到端测试失败: {e}"}
+    finally:
+        if driver:
+            driver.quit()
+        elif handler is not None and hasattr(handler, "close"):
+            handler.close()
+
+    drag_errors = [abs(a["error"]) for s in samples for a in server.attempts.get(s.sample_id, [])]
+    return {
+        "drag_time_ms": summarize(durations),
+        "e2e_success_rate": round(solved / len(samples), 4) if samples else 0.0,
+        "drag_error_px": round(sum(drag_errors) / len(drag_errors), 2) if drag_errors else None,
+    }
+
+
+def load_samples(corpus_dir: Optional[str], synthetic_count: int, seed: int) -> List:
+    """加载样本库，没有样本时生成合成样本库"""
+    if corpus_dir:
+        samples = CaptchaCorpus(corpus_dir).load()
+        if samples:
+            return samples
+        print(f"⚠️ 样本库为空: {corpus_dir}，改用合成样本")
+
+    synthetic_dir = os.path.join(PROJECT_ROOT, "temp", f"captcha_corpus_synthetic_{seed}")
+    samples = CaptchaCorpus(synthetic_dir).load()
+    if len(samples) < synthetic_count:
+        samples = generate_synthetic_corpus(synthetic_dir, count=synthetic_count, seed=seed)
+    return samples[:synthetic_count]
+
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='滑块验证码离线回放基准测试')
+    parser.add_argument('--corpus', type=str, default=os.getenv("CAPTCHA_CORPUS_DIR", ""),
+                        help='样本库目录（默认使用合成样本）')
+    parser.add_argument('--synthetic-count', type=int, default=20, help='合成样本数量')
+    parser.add_argument('--seed', type=int, default=42, help='合成样本随机种子')
+    parser.add_argument('--handlers', type=str, default=",".join(HANDLER_NAMES), help='参与测试的处理器，逗号分隔')
+    parser.add_argument('--tolerance', type=float, default=5.0, help='识别正确的误差阈值（原图像素）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个样本的识别重复次数')
+    parser.add_argument('--e2e', action='store_true', help='执行端到端拖拽测试（需要本地Chrome）')
+    parser.add_argument('--e2e-limit', type=int, default=5, help='端到端测试的样本数量')
+    parser.add_argument('--show-browser', action='store_true', help='端到端测试时显示浏览器')
+    parser.add_argument('--output', type=str, help='报告输出路径')
+    parser.add_argument('--baseline', type=str, help='用于对比的基线报告')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    samples = load_samples(args.corpus, args.synthetic_count, args.seed)
+    if not samples:
+        print("❌ 没有可用的验证码样本")
+        sys.exit(1)
+
+    handler_names = [h.strip() for h in args.handlers.split(',') if h.strip()]
+    print(f"🧩 验证码回放基准测试: {len(samples)} 个样本, 处理器: {handler_names}")
+
+    results = [run_matcher_benchmark(name, samples, args.tolerance, args.repeat) for name in handler_names]
+
+    if args.e2e:
+        from captcha_widget_server import CaptchaWidgetServer
+        e2e_samples = samples[:args.e2e_limit]
+        with CaptchaWidgetServer(e2e_samples) as server:
+            for result in results:
+                server.attempts.clear()
+                print(f"🖱️ 端到端测试: {result['name']}")
+                result.update(run_e2e_benchmark(result["name"], e2e_samples, server, not args.show_browser))
+
+    try:
+        import ddddocr
+        ddddocr_version = getattr(ddddocr, "__version__", "unknown")
+    except ImportError:
+        ddddocr_version = "not installed"
+
+    report = build_report(
+        "captcha_replay",
+        results,
+        params={
+            "samples": len(samples),
+            "sources": sorted({s.source for s in samples}),
+            "tolerance_px": args.tolerance,
+            "repeat": args.repeat,
+            "e2e": args.e2e,
+        },
+        environment={"ddddocr": ddddocr_version},
+    )
+
+    print()
+    print_table(results, REPORT_METRICS)
+    for result in results:
+        for key in ("error", "e2e_error"):
+            if result.get(key):
+                print(f"⚠️ {result['name']}: {result[key]}")
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "output", "benchmarks", f"captcha_replay_{datetime.now():%Y%m%d_%H%M%S}.json")
+    write_report(report, output)
+
+    if args.baseline:
+        print_comparison(compare_reports(report, load_report(args.baseline), REPORT_METRICS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+采集流程端到端吞吐基准测试
+在本地TikTok Shop替身服务上运行各个爬虫，统计 页面/秒、商品/秒 以及各阶段的 p50/p99 延迟，
+不访问线上TikTok，也不需要MongoDB（数据写入内存集合替身）
+
+运行器:
+    http            不启动浏览器，直接请求页面和翻页接口，复用 CompleteTikTokCrawler 的解析和入库逻辑
+    pipeline        同 http，取页、解析、入库三个阶段由 utils.crawl_pipeline 并行执行
+    complete        run_complete_crawler.CompleteTikTokCrawler（需要本地Chrome）
+    crawlab_complete crawlab_complete_spider.CrawlabTikTokSpider（需要本地Chrome）
+    ultimate        crawlab_ultimate_runner.UltimateCrawlabCrawler（需要本地Chrome）
+    cdp             run_cdp_crawler 异步CDP引擎，--concurrency 个标签页并发（需要本地Chrome或 CDP_ENDPOINT）
+
+用法:
+    python scripts/benchmark/crawl_throughput_benchmark.py --runners http --keywords "phone case,data cable"
+    python scripts/benchmark/crawl_throughput_benchmark.py --runners http,complete --captcha-rate 0.2 --latency-ms 50
+    python scripts/benchmark/crawl_throughput_benchmark.py --runners http --pacing adaptive --captcha-rps 1
+    python scripts/benchmark/crawl_throughput_benchmark.py --runners http,pipeline --latency-ms 100 --pages 5
+    python scripts/benchmark/crawl_throughput_benchmark.py --runners complete,cdp --concurrency 4 --latency-ms 200
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import http.cookiejar
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bench_common import (
+    PROJECT_ROOT, StageTimer, setup_paths, build_report, write_report, load_report,
+    print_table, compare_reports, print_comparison
+)
+
+setup_paths()
+
+from utils.captcha_corpus import CaptchaCorpus, generate_synthetic_corpus, DISPLAY_WIDTH, image_size  # noqa: E402
+from utils.rate_controller import RateController, OUTCOME_OK, OUTCOME_CAPTCHA  # noqa: E402
+from memory_collection import MemoryCollection  # noqa: E402
+from tiktok_shop_stub import TikTokShopStub, PRODUCT_LIST_PATH  # noqa: E402
+
+ALL_RUNNERS = ["http", "pipeline", "complete", "crawlab_complete", "ultimate", "cdp"]
+ROUTER_DATA_PATTERN = re.compile(
+    r'<script id="__MODERN_ROUTER_DATA__"[^>]*>(.*?)</script>', re.S)
+CAPTCHA_IMG_PATTERN = re.compile(r'<img[^>]*class="captcha-verify-image"[^>]*src="([^"]+)"')
+COMPARE_METRICS = ["pages_per_sec", "products_per_sec", "captcha_per_page", "stages.navigate.p50", "stages.navigate.p99"]
+
+
+class HttpStubCrawler:
+    """
+    不启动浏览器的采集器
+    页面和翻页接口用HTTP直接请求，商品解析和入库复用 CompleteTikTokCrawler，
+    作为浏览器运行器的吞吐上限参照
+    """
+
+    def __init__(self, crawler, timer: StageTimer, max_captcha_attempts: int = 3, pacing: str = "none",
+                 fixed_delay: tuple = (2.0, 4.0)):
+        self.crawler = crawler
+        self.timer = timer
+        self.max_captcha_attempts = max_captcha_attempts
+        self.pacing = pacing
+        self.fixed_delay = fixed_delay
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.matcher = None
+
+    def _get(self, url: str, data: Optional[bytes] = None, headers: Optional[dict] = None) -> bytes:
+        request = urllib.request.Request(url, data=data, headers=headers or {})
+        with self.opener.open(request, timeout=30) as response:
+            return response.read()
+
+    def pace(self, url: str):
+        """请求页面前等待: fixed 为固定区间随机延时，adaptive 使用速率控制器"""
+        if self.pacing == "fixed":
+            with self.timer.stage("pacing"):
+                time.sleep(random.uniform(*self.fixed_delay))
+        elif self.pacing == "adaptive":
+            with self.timer.stage("pacing"):
+                self.crawler.rate_controller.acquire(url)
+
+    def navigate_to_url(self, url: str) -> str:
+        """请求页面，遇到验证码时识别并提交后重新请求"""
+        for _ in range(self.max_captcha_attempts + 1):
+            self.pace(url)
+            with self.timer.stage("navigate"):
+                html = self._get(url).decode("utf-8")
+            if '<div id="captcha_container">' not in html:
+                self.crawler.rate_controller.record(url, OUTCOME_OK)
+                return html
+            self.crawler.rate_controller.record(url, OUTCOME_CAPTCHA)
+            with self.timer.stage("handle_captcha"):
+                self.solve_captcha(url, html)
+        raise RuntimeError("验证码多次未通过")
+
+    def solve_captcha(self, page_url: str, html: str) -> bool:
+        """用 DrissionPageSliderHandler 的识别逻辑计算距离并提交"""
+        if self.matcher is None:
+            from captcha_replay_benchmark import create_offline_handler
+            self.matcher = create_offline_handler("DrissionPageSliderHandler")
+        base = page_url.split("/shop/")[0]
+        images = CAPTCHA_IMG_PATTERN.findall(html)
+        background, target = (self._get(base + src) for src in images[:2])
+        result = self.matcher.det.slide_match(target, background)
+        width, _ = image_size(background)
+        distance = result["target"][0] * (DISPLAY_WIDTH / width) if width else result["target"][0]
+        verify_path = images[0].rsplit("/img/", 1)[0] + f"/verify?dx={distance:.2f}"
+        return json.loads(self._get(base + verify_path)).get("passed", False)
+
+    def get_components_map(self, html: str) -> List[Dict]:
+        match = ROUTER_DATA_PATTERN.search(html)
+        if not match:
+            return []
+        loader_data = json.loads(match.group(1)).get("loaderData", {})
+        for page_data in loader_data.values():
+            if isinstance(page_data, dict) and "components_map" in page_data.get("page_config", {}):
+                return page_data["page_config"]["components_map"]
+        return []
+
+    def handle_products(self, products: List[Dict], keyword: str) -> List[Dict]:
+        results = []
+        for product in products:
+            if not product.get("product_id"):
+                continue
+            product_data = self.crawler.parse_product_data(product, keyword)
+            if product_data:
+                self.crawler.save_product_to_db(product_data)
+                results.append(product_data)
+        return results
+
+    def scrape_keyword_products(self, keyword: str, page_count: int, base_url: str) -> List[Dict]:
+        html = self.navigate_to_url(f"{base_url}/shop/s/{urllib.parse.quote(keyword)}")
+        with self.timer.stage("get_components_map"):
+            components_map = self.get_components_map(html)
+        products = []
+        for component in components_map:
+            if component.get("component_name") == "feed_list_search_word":
+                products.extend(self.handle_products(component["component_data"].get("products", []), keyword))
+        for page in range(2, page_count + 1):
+            self.pace(base_url)
+            with self.timer.stage("get_more_page_products"):
+                body = json.dumps({"keyword": keyword, "page": page}).encode("utf-8")
+                payload = json.loads(self._get(base_url + PRODUCT_LIST_PATH, body,
+                                               {"Content-Type": "application/json"}))
+            self.crawler.rate_controller.record(base_url, OUTCOME_OK)
+            products.extend(self.handle_products(payload["data"]["products"], keyword))
+            if not payload["data"].get("has_more"):
+                break
+        return products
+
+    def fetch_keyword_pages(self, keyword: str, page_count: int, base_url: str, pipeline) -> int:
+        """只取页，原始数据提交给流水线解析入库，返回提交的页数"""
+        from utils.crawl_pipeline import FetchedPage, PAGE_API
+        html = self.navigate_to_url(f"{base_url}/shop/s/{urllib.parse.quote(keyword)}")
+        match = ROUTER_DATA_PATTERN.search(html)
+        if not match:
+            return 0
+        pipeline.submit(FetchedPage(keyword, 1, match.group(1)))
+        pages = 1
+        for page in range(2, page_count + 1):
+            self.pace(base_url)
+            with self.timer.stage("get_more_page_products"):
+                body = json.dumps({"keyword": keyword, "page": page}).encode("utf-8")
+                payload = json.loads(self._get(base_url + PRODUCT_LIST_PATH, body,
+                                               {"Content-Type": "application/json"}))
+            self.crawler.rate_controller.record(base_url, OUTCOME_OK)
+            pipeline.submit(FetchedPage(keyword, page, payload["data"]["products"], PAGE_API))
+            pages += 1
+            if not payload["data"].get("has_more"):
+                break
+        return pages
+
+
+def _memory_db_manager():
+    from utils.database import DatabaseManager
+    db_manager = DatabaseManager()
+    db_manager.collection = MemoryCollection()
+    db_manager.snapshot_collection = MemoryCollection("product_snapshots")
+    return db_manager
+
+
+def _new_complete_crawler(with_browser: bool, adaptive: bool = False):
+    """创建 CompleteTikTokCrawler，数据库替换为内存集合"""
+    import run_complete_crawler
+    crawler = run_complete_crawler.CompleteTikTokCrawler(with_browser=with_browser, db_manager=_memory_db_manager())
+    # 每次运行使用独立的速率控制器，避免多个运行器之间互相影响
+    crawler.rate_controller = RateController(enabled=adaptive)
+    return crawler
+
+
+def run_http(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    crawler = _new_complete_crawler(with_browser=False, adaptive=args.pacing == "adaptive")
+    timer.wrap(crawler, "parse_product_data")
+    timer.wrap(crawler, "save_product_to_db")
+    fixed_delay = tuple(float(v) for v in args.fixed_delay.split(','))
+    runner = HttpStubCrawler(crawler, timer, args.captcha_attempts, args.pacing, fixed_delay)
+    products = 0
+    for keyword in keywords:
+        try:
+            with crawler.tracer.span("keyword", keyword=keyword, page_count=page_count):
+                products += len(runner.scrape_keyword_products(keyword, page_count, stub.base_url))
+        except RuntimeError as e:
+            print(f"⚠️ [{keyword}] {e}")
+    return {"products": products, "stored": crawler.db_manager.collection.count_documents({}),
+            "rate_control": crawler.rate_controller.stats()}
+
+
+def run_pipeline(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    from utils.crawl_pipeline import CrawlPipeline
+    crawler = _new_complete_crawler(with_browser=False, adaptive=args.pacing == "adaptive")
+    timer.wrap(crawler, "parse_fetched_page")
+    timer.wrap(crawler, "save_products_to_db")
+    fixed_delay = tuple(float(v) for v in args.fixed_delay.split(','))
+    runner = HttpStubCrawler(crawler, timer, args.captcha_attempts, args.pacing, fixed_delay)
+    with CrawlPipeline(crawler.parse_fetched_page, crawler.save_products_to_db) as pipeline:
+        for keyword in keywords:
+            try:
+                runner.fetch_keyword_pages(keyword, page_count, stub.base_url, pipeline)
+            except RuntimeError as e:
+                print(f"⚠️ [{keyword}] {e}")
+    return {"products": sum(len(products) for products in pipeline.results().values()),
+            "stored": crawler.db_manager.collection.count_documents({}),
+            "rate_control": crawler.rate_controller.stats(), "pipeline": pipeline.stats()}
+
+
+def run_complete(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    import run_complete_crawler
+    if args.no_delay:
+        run_complete_crawler.random_delay = lambda *a, **k: None
+    # 未启用 adaptive 时沿用固定随机延时（--no-delay 去掉）
+    crawler = _new_complete_crawler(with_browser=True, adaptive=args.pacing == "adaptive")
+    for name in ("navigate_to_url", "handle_captcha"):
+        timer.wrap(crawler.slider_handler, name, "navigate" if name == "navigate_to_url" else name)
+    for name in ("get_components_map", "parse_product_data", "save_product_to_db", "get_more_page_products"):
+        timer.wrap(crawler, name)
+    products = 0
+    try:
+        for keyword in keywords:
+            products += len(crawler.scrape_keyword_products(keyword, page_count))
+    finally:
+        crawler.slider_handler.close()
+    return {"products": products, "stored": crawler.db_manager.collection.count_documents({})}
+
+
+def run_crawlab_complete(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    from crawlab_complete_spider import CrawlabTikTokSpider
+    spider = CrawlabTikTokSpider()
+    if not spider.init_browser() or not spider.init_ocr():
+        raise RuntimeError("浏览器或OCR初始化失败")
+    spider.collection = MemoryCollection()
+    timer.wrap(spider, "navigate_to_url", "navigate")
+    for name in ("handle_captcha", "get_components_map", "parse_product_data", "save_product_to_db"):
+        timer.wrap(spider, name)
+    products = 0
+    try:
+        for keyword in keywords:
+            products += len(spider.scrape_keyword_products(keyword, page_count))
+    finally:
+        spider.close()
+    return {"products": products, "stored": spider.collection.count_documents({})}
+
+
+def run_ultimate(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    from crawlab_ultimate_runner import UltimateCrawlabCrawler
+    crawler = UltimateCrawlabCrawler()
+    if not crawler.setup_browser():
+        raise RuntimeError("浏览器初始化失败")
+    crawler.collection = MemoryCollection()
+    for name in ("handle_advanced_captcha", "extract_products_robust", "save_product_data"):
+        timer.wrap(crawler, name)
+    products = 0
+    try:
+        for keyword in keywords:
+            with timer.stage("crawl_keyword"):
+                products += crawler.crawl_keyword(keyword, page_count)
+    finally:
+        crawler.cleanup()
+    return {"products": products, "stored": crawler.collection.count_documents({})}
+
+
+def run_cdp(keywords: List[str], page_count: int, stub: TikTokShopStub, timer: StageTimer, args) -> dict:
+    import asyncio
+    from run_cdp_crawler import crawl_keywords
+    crawler = _new_complete_crawler(with_browser=False, adaptive=args.pacing == "adaptive")
+    for name in ("parse_product_data", "save_product_to_db"):
+        timer.wrap(crawler, name)
+    results = asyncio.run(crawl_keywords(crawler, keywords, page_count, args.concurrency))
+    return {"products": sum(len(products) for products in results.values()),
+            "stored": crawler.db_manager.collection.count_documents({}),
+            "rate_control": crawler.rate_controller.stats()}
+
+
+RUNNERS = {
+    "http": run_http,
+    "pipeline": run_pipeline,
+    "complete": run_complete,
+    "crawlab_complete": run_crawlab_complete,
+    "ultimate": run_ultimate,
+    "cdp": run_cdp,
+}
+
+
+def run_benchmark(runner: str, keywords: List[str], page_count: int, samples: List, args) -> dict:
+    """
+    在独立的替身服务实例上运行一个运行器
+
+    Returns:
+        dict: 单个运行器的结果
+    """
+    stub = TikTokShopStub(
+        products_per_page=args.products_per_page, max_pages=max(page_count, 1),
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        captcha_rate=args.captcha_rate, captcha_samples=samples, seed=args.seed,
+        captcha_rps=args.captcha_rps,
+    )
+    timer = StageTimer()
+    with stub:
+        # 爬虫通过 TIKTOK_BASE_URL 指向替身服务
+        os.environ["TIKTOK_BASE_URL"] = stub.base_url
+        _point_runners_at(stub.base_url)
+        start = time.perf_counter()
+        error = None
+        try:
+            counts = RUNNERS[runner](keywords, page_count, stub, timer, args)
+        except Exception as e:
+            counts = {"products": 0, "stored": 0}
+            error = str(e)
+        elapsed = time.perf_counter() - start
+    # 页面数按服务端实际响应统计，验证码页也计入
+    pages = sum(stub.stats[k] for k in ("search_pages", "api_pages", "detail_pages", "captcha_served"))
+
+    result = {
+        "name": runner,
+        "keywords": len(keywords),
+        "elapsed_sec": round(elapsed, 3),
+        "pages": pages,
+        "products": counts["products"],
+        "stored": counts["stored"],
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed else 0.0,
+        "products_per_sec": round(counts["products"] / elapsed, 3) if elapsed else 0.0,
+        "captcha_per_page": round(stub.stats["captcha_served"] / pages, 3) if pages else 0.0,
+        "stages": timer.summary(),
+        "stub": dict(stub.stats),
+    }
+    if counts.get("rate_control"):
+        result["rate_control"] = counts["rate_control"]
+    if counts.get("pipeline"):
+        result["pipeline"] = counts["pipeline"]
+    if error:
+        result["error"] = error
+    return result
+
+
+def _point_runners_at(base_url: str):
+    """已导入的模块在导入时读取了URL，这里同步更新"""
+    from config import Config
+    Config.BASE_URL = base_url
+    Config.TARGET_URL = Config.SHOP_BASE_URL = f"{base_url}/shop"
+    Config.SEARCH_BASE_URL = f"{base_url}/shop/s"
+    Config.PRODUCT_LIST_API_URL = f"{base_url}{PRODUCT_LIST_PATH}"
+
+
+def load_captcha_samples(args) -> List:
+    if args.captcha_rate <= 0 and args.captcha_rps <= 0:
+        return []
+    if args.corpus:
+        return CaptchaCorpus(args.corpus).load()
+    corpus_dir = os.path.join(tempfile.gettempdir(), f"captcha_corpus_synthetic_{args.seed}")
+    return generate_synthetic_corpus(corpus_dir, count=10, seed=args.seed)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='采集流程端到端吞吐基准测试')
+    parser.add_argument('--runners', default='http', help=f'逗号分隔: {",".join(ALL_RUNNERS)}')
+    parser.add_argument('--keywords', default='phone case,data cable', help='逗号分隔的关键词')
+    parser.add_argument('--pages', type=int, default=3, help='每个关键词采集页数')
+    parser.add_argument('--products-per-page', type=int, default=30, help='替身服务每页商品数')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='替身服务固定响应延迟')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='替身服务响应延迟抖动上限')
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help='页面注入验证码的概率')
+    parser.add_argument('--captcha-rps', type=float, default=0.0,
+                        help='最近5秒页面请求速率超过该值（每秒）时必定注入验证码，模拟风控')
+    parser.add_argument('--captcha-attempts', type=int, default=3, help='http运行器每页最多验证次数')
+    parser.add_argument('--corpus', help='验证码样本库目录（默认生成合成样本）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--no-delay', action='store_true', help='去掉 complete 运行器的随机延时')
+    parser.add_argument('--concurrency', type=int, default=4, help='cdp 运行器并发标签页数')
+    parser.add_argument('--pacing', choices=['none', 'fixed', 'adaptive'], default='none',
+                        help='请求节奏: none 不等待，fixed 固定区间随机延时，adaptive 自适应速率控制')
+    parser.add_argument('--fixed-delay', default='2,4', help='fixed 节奏的延时区间（秒），逗号分隔')
+    parser.add_argument('--trace', help='启用阶段追踪并导出到该路径（.jsonl 或 Chrome trace .json）')
+    parser.add_argument('--output', help='报告输出路径')
+    parser.add_argument('--baseline', help='基线报告路径')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    runners = [r.strip() for r in args.runners.split(',') if r.strip()]
+    unknown = [r for r in runners if r not in RUNNERS]
+    if unknown:
+        print(f"❌ 未知的运行器: {unknown}")
+        return 1
+    keywords = [k.strip() for k in args.keywords.split(',') if k.strip()]
+    samples = load_captcha_samples(args)
+    if args.trace:
+        from utils.tracing import get_tracer
+        get_tracer().enabled = True
+
+    print("🚀 采集吞吐基准测试")
+    print(f"  运行器: {runners}")
+    print(f"  关键词: {keywords}  页数: {args.pages}  每页: {args.products_per_page}")
+    print(f"  延迟: {args.latency_ms}ms ±{args.jitter_ms}ms  验证码比例: {args.captcha_rate}"
+          f"  验证码速率阈值: {args.captcha_rps}  节奏: {args.pacing}")
+
+    results = []
+    for runner in runners:
+        print(f"\n▶️ 运行 {runner} ...")
+        result = run_benchmark(runner, keywords, args.pages, samples, args)
+        if result.get("error"):
+            print(f"❌ {runner} 运行失败: {result['error']}")
+        results.append(result)
+
+    print()
+    print_table(results, ["pages", "products", "elapsed_sec", "pages_per_sec", "products_per_sec",
+                          "captcha_per_page"])
+    print()
+    stage_rows = [dict(stats, name=f"{r['name']}/{stage}") for r in results for stage, stats in r["stages"].items()]
+    print_table(stage_rows, ["count", "p50", "p99", "max"])
+
+    report = build_report("crawl_throughput", results, params=vars(args))
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "output", "benchmarks", f"crawl_throughput_{datetime.now():%Y%m%d_%H%M%S}.json")
+    write_report(report, output)
+    if args.trace:
+        from utils.tracing import get_tracer
+        get_tracer().export(args.trace)
+
+    if args.baseline:
+        print_comparison(compare_reports(report, load_report(args.baseline), COMPARE_METRICS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
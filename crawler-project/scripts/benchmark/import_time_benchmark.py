@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+模块导入耗时基准测试
+每次在新的Python进程中导入目标模块，统计冷启动导入耗时、进程总耗时、
+导入期间的标准输出行数，以及是否连带加载了重量级依赖
+
+用法:
+    python scripts/benchmark/import_time_benchmark.py --repeat 5
+    python scripts/benchmark/import_time_benchmark.py --modules handlers,run_complete_crawler --top 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from typing import List
+
+from bench_common import (
+    PROJECT_ROOT, summarize, build_report, write_report, load_report,
+    print_table, compare_reports, print_comparison
+)
+
+DEFAULT_MODULES = [
+    "utils.logger",
+    "handlers",
+    "handlers.slider",
+    "handlers.extractor",
+    "handlers.drissionpage_slider_handler",
+    "run_complete_crawler",
+]
+
+HEAVY_MODULES = ["ddddocr", "onnxruntime", "cv2", "selenium", "DrissionPage", "pandas", "numpy", "pymongo"]
+
+COMPARE_METRICS = ["import_ms.p50", "process_ms.p50"]
+
+# 子进程中执行：导入目标模块并输出一行JSON结果
+CHILD_CODE = """
+import sys, time, json, importlib
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in sys.argv[2].split(',') if m in sys.modules]
+sys.stdout.write('\\n__IMPORT_RESULT__' + json.dumps({"import_ms": elapsed, "heavy": heavy}) + '\\n')
+"""
+
+
+def measure_once(module: str) -> dict:
+    """
+    在新进程中导入一次模块
+
+    Returns:
+        dict: import_ms, process_ms, stdout_lines, heavy
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, module, ",".join(HEAVY_MODULES)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+    stdout, _, result_line = proc.stdout.rpartition("__IMPORT_RESULT__")
+    if proc.returncode != 0 or not result_line:
+        raise RuntimeError(f"导入 {module} 失败: {proc.stderr.strip()[-500:]}")
+    result = json.loads(result_line)
+    result["process_ms"] = process_ms
+    result["stdout_lines"] = len([line for line in stdout.splitlines() if line.strip()])
+    return result
+
+
+def top_imports(module: str, top: int) -> List[tuple]:
+    """
+    用 -X importtime 找出耗时最多的顶层依赖
+
+    Returns:
+        List[tuple]: (模块名, 累计毫秒)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120
+    )
+    entries = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2].strip()
+        top_level = name.split(".")[0]
+        # 只保留每个顶层包的最大累计值
+        entries[top_level] = max(entries.get(top_level, 0), cumulative)
+    ranked = sorted(entries.items(), key=lambda item: item[1], reverse=True)
+    return [(name, round(us / 1000, 1)) for name, us in ranked[:top]]
+
+
+def run_module(module: str, repeat: int) -> dict:
+    """多次测量同一个模块"""
+    runs = [measure_once(module) for _ in range(repeat)]
+    return {
+        "name": module,
+        "import_ms": summarize([r["import_ms"] for r in runs]),
+        "process_ms": summarize([r["process_ms"] for r in runs]),
+        "stdout_lines": runs[-1]["stdout_lines"],
+        "heavy_loaded": ",".join(runs[-1]["heavy"]) or "-",
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='模块导入耗时基准测试')
+    parser.add_argument('--modules', default=",".join(DEFAULT_MODULES), help='逗号分隔的模块列表')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块的测量次数')
+    parser.add_argument('--top', type=int, default=0, help='额外列出每个模块耗时最多的N个依赖')
+    parser.add_argument('--output', help='报告输出路径')
+    parser.add_argument('--baseline', help='基线报告路径')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    print("🚀 模块导入耗时基准测试")
+    print(f"  模块: {len(modules)} 个，每个测量 {args.repeat} 次")
+
+    results = []
+    for module in modules:
+        try:
+            results.append(run_module(module, args.repeat))
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"❌ {e}")
+            continue
+        if args.top:
+            print(f"\n{module} 耗时最多的依赖:")
+            for name, ms in top_imports(module, args.top):
+                print(f"  {name:<30} {ms:>8.1f}ms")
+
+    print()
+    print_table(results, ["import_ms.p50", "import_ms.max", "process_ms.p50", "stdout_lines", "heavy_loaded"])
+
+    report = build_report("import_time", results, params=vars(args))
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "output", "benchmarks", f"import_time_{datetime.now():%Y%m%d_%H%M%S}.json")
+    write_report(report, output)
+
+    if args.baseline:
+        print_comparison(compare_reports(report, load_report(args.baseline), COMPARE_METRICS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
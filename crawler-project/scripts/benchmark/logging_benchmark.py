@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+日志写入基准测试
+对比同步写入、队列异步写入和抽样输出时，调用方每条日志的耗时，
+以及关闭级别时 f-string 与 %s 参数的开销
+
+用法:
+    python scripts/benchmark/logging_benchmark.py --messages 20000 --sample-every 10
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+from bench_common import (
+    PROJECT_ROOT, setup_paths, summarize, build_report, write_report, load_report,
+    print_table, compare_reports, print_comparison
+)
+
+setup_paths()
+
+from utils.logger import setup_logger, shutdown_logging, SAMPLED  # noqa: E402
+
+COMPARE_METRICS = ["call_us.p50", "call_us.p99", "total_ms"]
+
+
+def run_mode(name: str, messages: int, log_dir: str, async_mode: bool = False,
+             sample_every: int = 1, level: str = "INFO", lazy: bool = True) -> dict:
+    """
+    以一种配置写入若干条逐商品日志
+
+    Returns:
+        dict: 单个模式的结果
+    """
+    log_path = os.path.join(log_dir, f"{name}.log")
+    # 控制台处理器在创建时绑定 sys.stderr，基准测试期间丢弃控制台输出
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, 'w')
+    try:
+        logger = setup_logger(f"bench_{name}", level=level, log_file=log_path,
+                              async_mode=async_mode, sample_every=sample_every)
+        timings = []
+        start = time.perf_counter()
+        for i in range(messages):
+            title, price = f"Phone Case Item {i} with a fairly long product title", 9.99 + i % 50
+            t0 = time.perf_counter()
+            if lazy:
+                logger.info("保存商品成功: %.30s... - $%s", title, price, extra=SAMPLED)
+            else:
+                logger.info(f"保存商品成功: {title[:30]}... - ${price}")
+            timings.append((time.perf_counter() - t0) * 1e6)
+        caller_ms = (time.perf_counter() - start) * 1000
+        # 等待异步队列写完
+        shutdown_logging()
+        total_ms = (time.perf_counter() - start) * 1000
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    lines = 0
+    if os.path.exists(log_path):
+        with open(log_path, 'r', encoding='utf-8') as f:
+            lines = sum(1 for _ in f)
+    return {
+        "name": name,
+        "messages": messages,
+        "lines_written": lines,
+        "caller_ms": round(caller_ms, 2),
+        "total_ms": round(total_ms, 2),
+        "call_us": summarize(timings),
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='日志写入基准测试')
+    parser.add_argument('--messages', type=int, default=20000, help='每种模式写入的日志条数')
+    parser.add_argument('--sample-every', type=int, default=10, help='抽样模式每N条输出1条')
+    parser.add_argument('--output', help='报告输出路径')
+    parser.add_argument('--baseline', help='基线报告路径')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    print("🚀 日志写入基准测试")
+    print(f"  每种模式 {args.messages} 条，抽样 1/{args.sample_every}")
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        results = [
+            run_mode("sync", args.messages, log_dir),
+            run_mode("async", args.messages, log_dir, async_mode=True),
+            run_mode("async_sampled", args.messages, log_dir, async_mode=True, sample_every=args.sample_every),
+            run_mode("disabled_fstring", args.messages, log_dir, level="WARNING", lazy=False),
+            run_mode("disabled_lazy", args.messages, log_dir, level="WARNING", lazy=True),
+        ]
+
+    print()
+    print_table(results, ["lines_written", "caller_ms", "total_ms", "call_us.p50", "call_us.p99", "call_us.max"])
+
+    report = build_report("logging", results, params=vars(args))
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "output", "benchmarks", f"logging_{datetime.now():%Y%m%d_%H%M%S}.json")
+    write_report(report, output)
+
+    if args.baseline:
+        print_comparison(compare_reports(report, load_report(args.baseline), COMPARE_METRICS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
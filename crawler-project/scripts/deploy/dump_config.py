@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+输出生效的配置
+按 环境变量 > 配置档案 > 默认值 合并后的配置，校验失败时返回1（可在部署前检查）
+
+用法:
+    python scripts/deploy/dump_config.py                       # 当前档案，YAML
+    python scripts/deploy/dump_config.py --profile crawlab --format json
+    python scripts/deploy/dump_config.py --format env --sources  # 可覆盖的配置项及其来源
+    python scripts/deploy/dump_config.py --profile-file my.yaml --check
+"""
+import os
+import sys
+import json
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='输出生效的配置')
+    parser.add_argument('--profile', help='配置档案（dev/crawlab/benchmark），默认 CRAWLER_PROFILE')
+    parser.add_argument('--profile-file', help='配置档案文件（YAML或JSON）')
+    parser.add_argument('--format', choices=['yaml', 'json', 'env'], default='yaml',
+                        help='yaml/json 输出全部配置，env 输出可通过环境变量覆盖的配置项')
+    parser.add_argument('--sources', action='store_true', help='env 格式时注明每项的来源（env/profile/default）')
+    parser.add_argument('--check', action='store_true', help='只校验，不输出配置')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    # 配置在导入时计算，必须先设置档案再导入
+    if args.profile:
+        os.environ["CRAWLER_PROFILE"] = args.profile
+    if args.profile_file:
+        os.environ["CRAWLER_PROFILE_FILE"] = args.profile_file
+    from config import get_settings, SETTING_SOURCES
+    import yaml
+
+    settings = get_settings()
+    if not args.check:
+        if args.format == 'json':
+            print(json.dumps(settings.to_dict(), ensure_ascii=False, indent=2, default=str))
+        elif args.format == 'yaml':
+            print(yaml.safe_dump(settings.to_dict(), allow_unicode=True, sort_keys=True, default_flow_style=False),
+                  end="")
+        else:
+            for name in sorted(SETTING_SOURCES):
+                value, source = SETTING_SOURCES[name]
+                print(f"{name}={value}" + (f"  # {source}" if args.sources else ""))
+
+    for error in settings.errors:
+        print(f"❌ {error}", file=sys.stderr)
+    if settings.errors:
+        return 1
+    print(f"✅ 配置档案 {settings.PROFILE} 校验通过", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
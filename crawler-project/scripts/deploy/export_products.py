@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+从MongoDB导出商品
+游标逐批读取，流式写入 JSON Lines / CSV / Parquet，按条数或大小轮转文件；
+--partitions 大于1时按 _id 区间并行读取，每个区间写入自己的压缩文件（全量导出给分析使用）
+
+用法:
+    python scripts/deploy/export_products.py --output output/exports/products --formats jsonl,csv
+    EXPORT_ROTATE_RECORDS=100000 EXPORT_COMPRESSION=gzip python scripts/deploy/export_products.py --keyword "phone case"
+    python scripts/deploy/export_products.py --partitions 8 --output output/exports/full/products
+"""
+import os
+import sys
+import time
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import Config
+from utils.database import get_db_manager
+from utils.product_export import export_from_database
+from utils.bulk_export import bulk_export
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='从MongoDB导出商品')
+    parser.add_argument('--output', default=os.path.join(Config.OUTPUT_DIR, "exports", "products"),
+                        help='输出路径（带 .jsonl/.csv/.parquet 扩展名时只输出该格式）')
+    parser.add_argument('--formats', help='逗号分隔的格式，默认 OUTPUT_FORMATS（并行导出默认parquet）')
+    parser.add_argument('--keyword', help='只导出该搜索关键词的商品')
+    parser.add_argument('--batch-size', type=int, default=1000, help='游标每批读取的文档数')
+    parser.add_argument('--partitions', type=int, default=1, help='按 _id 区间并行读取的游标数')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    db_manager = get_db_manager()
+    if not db_manager.connect():
+        print("❌ 数据库连接失败")
+        return 1
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()] if args.formats else None
+    query = {"search_keyword": args.keyword} if args.keyword else None
+    start = time.time()
+    try:
+        if args.partitions > 1:
+            try:
+                report = bulk_export(db_manager.collection, args.output, args.partitions, query=query,
+                                     formats=formats, batch_size=args.batch_size)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            files = report.files if report.ok else []
+            for error in report.errors:
+                print(f"❌ {error}")
+            print(f"📊 {report.rows} 条，{report.rows_per_second:.0f} 条/秒")
+        else:
+            files = export_from_database(db_manager, args.output, query=query, formats=formats,
+                                         batch_size=args.batch_size)
+    finally:
+        db_manager.disconnect()
+    if not files:
+        print("❌ 导出失败")
+        return 1
+    for path in files:
+        print(f"  {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    print(f"✅ 导出完成，共 {len(files)} 个文件，耗时 {time.time() - start:.2f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
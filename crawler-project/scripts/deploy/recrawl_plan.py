@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+查看增量重爬计划
+读取重爬状态，按优先级列出关键词的重爬间隔、变化率和是否到期
+
+用法:
+    RECRAWL_ENABLED=true python scripts/deploy/recrawl_plan.py --keywords "phone case,laptop stand"
+    RECRAWL_ENABLED=true RECRAWL_BACKEND=mongo python scripts/deploy/recrawl_plan.py --json
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import Config
+from utils.database import get_db_manager
+from utils.recrawl_scheduler import open_recrawl_scheduler
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='查看增量重爬计划')
+    parser.add_argument('--keywords', help='逗号分隔的关键词，默认为已记录的全部关键词')
+    parser.add_argument('--json', action='store_true', help='以JSON输出')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    db = None
+    if Config.RECRAWL_BACKEND == "mongo":
+        db_manager = get_db_manager()
+        db = db_manager.db if db_manager.connect() else None
+    scheduler = open_recrawl_scheduler(db=db)
+    if scheduler is None:
+        print("❌ 重爬调度未启用（设置 RECRAWL_ENABLED=true）")
+        return 1
+
+    if args.keywords:
+        keywords = [k.strip() for k in args.keywords.split(',') if k.strip()]
+    else:
+        keywords = list(scheduler.states)
+    plan = scheduler.plan(keywords)
+
+    if args.json:
+        print(json.dumps([item.__dict__ for item in plan], ensure_ascii=False, indent=2, default=str))
+        return 0
+
+    print(f"{'关键词':<30} {'状态':<8} {'优先级':>8} {'间隔(h)':>8} {'变化率/h':>9}  下次重爬")
+    for item in plan:
+        due_at = datetime.fromtimestamp(item.due_at).strftime('%Y-%m-%d %H:%M') if item.due_at else "-"
+        priority = "∞" if item.priority == float("inf") else f"{item.priority:.2f}"
+        print(f"{item.keyword:<30} {item.reason:<8} {priority:>8} {item.interval_hours:>8.1f} "
+              f"{item.change_rate:>9.4f}  {due_at}")
+    print(f"\n到期 {sum(1 for item in plan if item.due)}/{len(plan)} 个关键词")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
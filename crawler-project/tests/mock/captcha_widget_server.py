@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+本地TikTok滑块验证码替身服务
+用样本库中的图片渲染与线上一致的 secsdk-captcha-drag-wrapper 结构，
+拖拽结果由服务端按真实缺口位置判定，供离线回放基准测试使用
+"""
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DISPLAY_WIDTH = 340
+
+CAPTCHA_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Security Check</title>
+<style>
+  body {{ font-family: sans-serif; margin: 40px; }}
+  .captcha_verify_img--wrapper {{ position: relative; width: {display_width}px; height: {display_height}px; }}
+  .captcha-verify-image {{ position: absolute; left: 0; top: 0; user-select: none; }}
+  #captcha-verify-image {{ width: {display_width}px; height: {display_height}px; }}
+  #captcha-verify-piece {{ width: {piece_display}px; height: {piece_display_height}px; top: {piece_top}px; }}
+  .secsdk-captcha-drag-wrapper {{ position: relative; width: {display_width}px; height: 40px; margin-top: 12px; background: #eee; }}
+  .secsdk-captcha-drag-track {{ position: absolute; left: 0; top: 0; width: 100%; height: 100%; }}
+  .secsdk-captcha-drag-icon {{ position: absolute; left: 0; top: 0; width: 64px; height: 40px; background: #fe2c55; cursor: grab; }}
+</style>
+</head>
+<body>
+<div id="captcha_container">
+  <div class="captcha_verify_img--wrapper">
+    <img id="captcha-verify-image" class="captcha-verify-image" src="{image_base}/bg.png" draggable="false">
+    <img id="captcha-verify-piece" class="captcha-verify-image" src="{image_base}/target.png" draggable="false">
+  </div>
+  <div id="secsdk-captcha-drag-wrapper" class="secsdk-captcha-drag-wrapper">
+    <div class="secsdk-captcha-drag-track"></div>
+    <div class="secsdk-captcha-drag-icon"></div>
+  </div>
+</div>
+<script>
+  var icon = document.querySelector('.secsdk-captcha-drag-icon');
+  var piece = document.getElementById('captcha-verify-piece');
+  var startX = null, dx = 0;
+  function move(value) {{
+    icon.style.left = value + 'px';
+    piece.style.left = value + 'px';
+  }}
+  icon.addEventListener('mousedown', function (e) {{ startX = e.clientX; dx = 0; }});
+  document.addEventListener('mousemove', function (e) {{
+    if (startX === null) return;
+    dx = e.clientX - startX;
+    move(dx);
+  }});
+  document.addEventListener('mouseup', function () {{
+    if (startX === null) return;
+    startX = null;
+    fetch('{verify_url}' + dx).then(function (r) {{ return r.json(); }}).then(function (res) {{
+      if (res.passed) {{
+        {on_pass}
+      }} else {{
+        move(0);
+      }}
+    }});
+  }});
+</script>
+</body>
+</html>
+"""
+
+# 验证通过后默认替换为结果页
+DEFAULT_ON_PASS = "document.title = 'TikTok Shop'; document.body.innerHTML = '<div id=\"search-result\">verified</div>';"
+
+
+def render_captcha_page(sample, image_base: str, verify_url: str, on_pass: str = DEFAULT_ON_PASS) -> str:
+    """
+    渲染验证码页面
+
+    Args:
+        sample: CaptchaSample
+        image_base: 图片URL前缀（其下提供 bg.png 和 target.png）
+        verify_url: 判定接口URL前缀，页面会在末尾拼接拖拽距离
+        on_pass: 验证通过后执行的JS
+
+    Returns:
+        str: 页面HTML
+    """
+    scale = DISPLAY_WIDTH / sample.image_width if sample.image_width else 1
+    piece_height = sample.extra.get("piece_height", sample.piece_width)
+    return CAPTCHA_PAGE_TEMPLATE.format(
+        image_base=image_base,
+        verify_url=verify_url,
+        on_pass=on_pass,
+        display_width=DISPLAY_WIDTH,
+        display_height=int(sample.image_height * scale),
+        piece_display=int(sample.piece_width * scale),
+        piece_display_height=int(piece_height * scale),
+        piece_top=int(sample.extra.get("target_y", 0) * scale),
+    )
+
+
+def judge_drag(sample, dx: float, tolerance: float) -> dict:
+    """
+    按真实缺口位置判定一次拖拽
+
+    Args:
+        sample: CaptchaSample
+        dx: 实际拖拽距离（页面像素）
+        tolerance: 允许误差（页面像素）
+
+    Returns:
+        dict: dx/expected/error/passed
+    """
+    expected = sample.expected_distance(DISPLAY_WIDTH)
+    return {
+        "dx": dx,
+        "expected": round(expected, 2),
+        "error": round(dx - expected, 2),
+        "passed": abs(dx - expected) <= tolerance,
+    }
+
+
+class CaptchaWidgetServer:
+    """本地验证码替身服务"""
+
+    def __init__(self, samples: List, host: str = "127.0.0.1", port: int = 0,
+                 tolerance: float = 6.0):
+        """
+        初始化替身服务
+
+        Args:
+            samples: CaptchaSample列表
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            tolerance: 判定通过的滑动距离误差（页面像素）
+        """
+        self.samples: Dict[str, object] = {s.sample_id: s for s in samples}
+        self.tolerance = tolerance
+        self.attempts: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, sample_id: str) -> str:
+        """获取样本对应的验证码页面URL"""
+        return f"{self.base_url}/captcha/{sample_id}"
+
+    def start(self) -> 'CaptchaWidgetServer':
+        """在后台线程启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def record_attempt(self, sample_id: str, dx: float) -> dict:
+        """
+        判定一次拖拽并记录
+
+        Args:
+            sample_id: 样本ID
+            dx: 实际拖拽距离（页面像素）
+
+        Returns:
+            dict: 判定结果
+        """
+        result = judge_drag(self.samples[sample_id], dx, self.tolerance)
+        with self._lock:
+            self.attempts.setdefault(sample_id, []).append(result)
+        return result
+
+    def render_page(self, sample_id: str) -> str:
+        """渲染验证码页面"""
+        return render_captcha_page(self.samples[sample_id], f"/img/{sample_id}", f"/verify/{sample_id}?dx=")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _build_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                parts = [p for p in parsed.path.split('/') if p]
+                try:
+                    if len(parts) == 2 and parts[0] == "captcha" and parts[1] in server.samples:
+                        self._send(200, server.render_page(parts[1]).encode('utf-8'), "text/html; charset=utf-8")
+                    elif len(parts) == 3 and parts[0] == "img" and parts[1] in server.samples:
+                        sample = server.samples[parts[1]]
+                        if parts[2] == "bg.png":
+                            self._send(200, sample.read_background(), "image/png")
+                        elif parts[2] == "target.png":
+                            self._send(200, sample.read_target(), "image/png")
+                        else:
+                            self._send(404, b"not found", "text/plain")
+                    elif len(parts) == 2 and parts[0] == "verify" and parts[1] in server.samples:
+                        query = urllib.parse.parse_qs(parsed.query)
+                        dx = float(query.get("dx", ["0"])[0])
+                        result = server.record_attempt(parts[1], dx)
+                        self._send(200, json.dumps(result).encode('utf-8'), "application/json")
+                    else:
+                        self._send(404, b"not found", "text/plain")
+                except (ValueError, OSError) as e:
+                    self._send(500, str(e).encode('utf-8'), "text/plain")
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 基准测试期间不输出访问日志
+                pass
+
+        return Handler
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+本地CDP浏览器替身
+代替Chrome供CDP引擎测试使用: 提供 /json/version 和调试websocket，实现引擎用到的CDP命令子集。
+页面内容通过HTTP从TikTok Shop替身服务获取（不执行JS），点击 View more 时按替身服务页面脚本的逻辑
+POST 翻页接口并发出对应的网络事件；可让标签页在若干次导航后崩溃，并统计同时进行的导航数
+"""
+import os
+import re
+import json
+import base64
+import struct
+import asyncio
+import hashlib
+import itertools
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Optional
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_DIRECT_OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+TAG_PATTERN = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*?(/?)>")
+VOID_TAGS = {"meta", "img", "br", "input", "link", "hr"}
+FIXED_BOX = [10.0, 10.0, 110.0, 10.0, 110.0, 50.0, 10.0, 50.0]
+
+
+def _fetch(url: str, body: Optional[bytes] = None) -> tuple:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    request = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with _DIRECT_OPENER.open(request, timeout=30) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def find_element(html: str, selector: str) -> Optional[str]:
+    """按 #id、.class 或 [attr='value'] 选择器查找元素，返回外部HTML"""
+    if selector.startswith("#"):
+        attr_pattern = rf'id="{re.escape(selector[1:])}"'
+    elif selector.startswith("."):
+        attr_pattern = rf'class="[^"]*\b{re.escape(selector[1:])}\b[^"]*"'
+    else:
+        match = re.fullmatch(r"\[([\w-]+)='([^']*)'\]", selector)
+        if not match:
+            return None
+        attr_pattern = rf'{re.escape(match.group(1))}="{re.escape(match.group(2))}"'
+    start = re.search(rf"<([a-zA-Z][a-zA-Z0-9]*)\b[^>]*{attr_pattern}[^>]*>", html)
+    if not start:
+        return None
+    tag = start.group(1).lower()
+    if tag in VOID_TAGS:
+        return start.group(0)
+    depth = 0
+    for match in TAG_PATTERN.finditer(html, start.start()):
+        if match.group(2).lower() != tag or match.group(3):
+            continue
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return html[start.start():match.end()]
+    return None
+
+
+class FakeTarget:
+    """一个标签页"""
+
+    def __init__(self, target_id: str, session_id: str):
+        self.target_id = target_id
+        self.session_id = session_id
+        self.url = "about:blank"
+        self.html = "<html><head></head><body></body></html>"
+        self.next_page = 2
+        self.has_more = False
+        self.navigations = 0
+        self.crashed = False
+
+
+class FakeCdpBrowser:
+    """本地CDP浏览器替身"""
+
+    def __init__(self, host: str = "127.0.0.1", crash_after: int = 0):
+        """
+        Args:
+            host: 监听地址
+            crash_after: 每个标签页导航多少次后崩溃（之后的命令返回会话不存在），0表示不崩溃
+        """
+        self.host = host
+        self.crash_after = crash_after
+        self.targets: Dict[str, FakeTarget] = {}
+        self.sessions: Dict[str, FakeTarget] = {}
+        self.stats = {"navigations": 0, "max_concurrent_navigations": 0, "targets_created": 0,
+                      "targets_closed": 0, "clicks": 0, "mouse_events": 0}
+        self._active = 0
+        self._ids = itertools.count(1)
+        self._nodes: Dict[int, str] = {}
+        self._request_bodies: Dict[str, bytes] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> 'FakeCdpBrowser':
+        self._server = await asyncio.start_server(self._handle, self.host, 0, limit=64 * 1024 * 1024)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._server.close()
+        await self._server.wait_closed()
+
+    # ==================== HTTP / websocket ====================
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            request_line, *lines = head.strip().split("\r\n")
+            headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines)}
+            path = request_line.split()[1]
+            if path == "/json/version":
+                body = json.dumps({"Browser": "FakeChrome/1.0",
+                                   "webSocketDebuggerUrl": self.endpoint.replace("http", "ws") + "/devtools/browser/fake"})
+                writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                              f"Connection: close\r\n\r\n{body}").encode("utf-8"))
+                await writer.drain()
+                return
+            accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+            writer.write((f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("ascii"))
+            await writer.drain()
+            await self._serve_websocket(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # 测试结束时事件循环取消仍在等待的连接
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+
+        async def send(message: dict):
+            payload = json.dumps(message).encode("utf-8")
+            length = len(payload)
+            if length < 126:
+                header = struct.pack("!BB", 0x81, length)
+            elif length < 65536:
+                header = struct.pack("!BBH", 0x81, 126, length)
+            else:
+                header = struct.pack("!BBQ", 0x81, 127, length)
+            async with lock:
+                writer.write(header + payload)
+                await writer.drain()
+
+        tasks = set()
+        while True:
+            first, second = await reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await reader.readexactly(8))[0]
+            key = await reader.readexactly(4)
+            payload = bytes(b ^ key[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+            if first & 0x0F == 0x8:
+                return
+            # 每条命令单独处理，慢的导航不阻塞其他标签页
+            task = asyncio.ensure_future(self._dispatch(json.loads(payload), send))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def _dispatch(self, message: dict, send):
+        session_id = message.get("sessionId")
+        reply = {"id": message["id"]}
+        if session_id:
+            reply["sessionId"] = session_id
+        try:
+            target = self.sessions.get(session_id) if session_id else None
+            if session_id and (target is None or target.crashed):
+                raise KeyError("Session with given id not found.")
+            reply["result"] = await self._command(message["method"], message.get("params", {}), target, send)
+        except KeyError as e:
+            reply["error"] = {"code": -32001, "message": e.args[0]}
+        except Exception as e:
+            reply["error"] = {"code": -32000, "message": str(e)}
+        await send(reply)
+
+    async def _emit(self, send, target: FakeTarget, method: str, params: dict):
+        await send({"method": method, "params": params, "sessionId": target.session_id})
+
+    # ==================== CDP命令 ====================
+
+    def _node(self, html: str) -> int:
+        node_id = next(self._ids) + 1
+        self._nodes[node_id] = html
+        return node_id
+
+    async def _command(self, method: str, params: dict, target: Optional[FakeTarget], send) -> dict:
+        if method == "Target.createTarget":
+            target_id = f"T{next(self._ids)}"
+            self.targets[target_id] = FakeTarget(target_id, f"S{target_id}")
+            self.stats["targets_created"] += 1
+            return {"targetId": target_id}
+        if method == "Target.attachToTarget":
+            target = self.targets[params["targetId"]]
+            self.sessions[target.session_id] = target
+            return {"sessionId": target.session_id}
+        if method == "Target.closeTarget":
+            target = self.targets.pop(params["targetId"], None)
+            if target:
+                self.sessions.pop(target.session_id, None)
+                self.stats["targets_closed"] += 1
+            return {"success": target is not None}
+        if method == "SystemInfo.getProcessInfo":
+            # 以测试进程充当浏览器主进程
+            return {"processInfo": [{"type": "browser", "id": os.getpid(), "cpuTime": 0.0}]}
+        if method in ("Page.enable", "Network.enable", "Network.setUserAgentOverride", "Network.setCookies",
+                      "Network.setBlockedURLs", "Browser.close"):
+            return {}
+        if method == "Network.getAllCookies":
+            return {"cookies": []}
+        if method in ("Page.navigate", "Page.reload"):
+            return await self._navigate(target, params.get("url", target.url), send)
+        if method == "Network.getResponseBody":
+            body = self._request_bodies.pop(params["requestId"])
+            return {"body": body.decode("utf-8"), "base64Encoded": False}
+        if method == "Runtime.evaluate":
+            expression = params["expression"]
+            if expression == "document.title":
+                match = re.search(r"<title>(.*?)</title>", target.html, re.S)
+                return {"result": {"type": "string", "value": match.group(1) if match else ""}}
+            if expression == "location.href":
+                return {"result": {"type": "string", "value": target.url}}
+            return {"result": {"type": "object"}, "exceptionDetails": {"text": "不支持的表达式"}}
+        if method == "DOM.getDocument":
+            return {"root": {"nodeId": self._node(target.html)}}
+        if method == "DOM.querySelector":
+            html = self._nodes.get(params["nodeId"], "")
+            selector = params["selector"]
+            if selector in ("[data-e2e='load-more']", ".load-more") and not target.has_more:
+                return {"nodeId": 0}
+            element = find_element(html, selector)
+            return {"nodeId": self._node(element) if element is not None else 0}
+        if method == "DOM.getOuterHTML":
+            return {"outerHTML": self._nodes[params["nodeId"]]}
+        if method == "DOM.getBoxModel":
+            return {"model": {"content": FIXED_BOX, "width": 100, "height": 40}}
+        if method == "DOM.resolveNode":
+            return {"object": {"objectId": f"obj-{params['nodeId']}"}}
+        if method == "Runtime.callFunctionOn":
+            node_html = self._nodes.get(int(params["objectId"].split("-")[1]), "")
+            if "load-more" in node_html:
+                self.stats["clicks"] += 1
+                asyncio.ensure_future(self._load_more(target, send))
+            return {"result": {"type": "undefined"}}
+        if method == "Input.dispatchMouseEvent":
+            self.stats["mouse_events"] += 1
+            return {}
+        raise ValueError(f"不支持的命令 {method}")
+
+    async def _navigate(self, target: FakeTarget, url: str, send) -> dict:
+        target.navigations += 1
+        if self.crash_after and target.navigations > self.crash_after:
+            target.crashed = True
+            raise KeyError("Session with given id not found.")
+        self.stats["navigations"] += 1
+        self._active += 1
+        self.stats["max_concurrent_navigations"] = max(self.stats["max_concurrent_navigations"], self._active)
+        try:
+            status, headers, body = await asyncio.get_running_loop().run_in_executor(None, _fetch, url)
+        except OSError as e:
+            return {"frameId": target.target_id, "errorText": f"net::ERR_CONNECTION_REFUSED ({e})"}
+        finally:
+            self._active -= 1
+        target.url = url
+        target.html = body.decode("utf-8", "replace")
+        target.next_page = 2
+        target.has_more = 'data-e2e="load-more"' in target.html
+        request_id = f"R{next(self._ids)}"
+        self._request_bodies[request_id] = body
+
+        async def events():
+            await self._emit(send, target, "Network.responseReceived", {
+                "requestId": request_id, "type": "Document",
+                "response": {"url": url, "status": status, "headers": headers}})
+            await self._emit(send, target, "Network.loadingFinished", {"requestId": request_id})
+            await self._emit(send, target, "Page.domContentEventFired", {"timestamp": 0})
+            await self._emit(send, target, "Page.loadEventFired", {"timestamp": 0})
+        asyncio.ensure_future(events())
+        return {"frameId": target.target_id, "loaderId": request_id}
+
+    async def _load_more(self, target: FakeTarget, send):
+        """替身服务页面脚本的翻页逻辑: POST 翻页接口"""
+        parts = urllib.parse.urlsplit(target.url)
+        keyword = urllib.parse.unquote(parts.path.rsplit("/", 1)[-1])
+        api_url = f"{parts.scheme}://{parts.netloc}/api/shop/brandy_desktop/s/product_list"
+        body = json.dumps({"keyword": keyword, "page": target.next_page}).encode("utf-8")
+        status, headers, payload = await asyncio.get_running_loop().run_in_executor(None, _fetch, api_url, body)
+        target.next_page += 1
+        target.has_more = bool(json.loads(payload).get("data", {}).get("has_more"))
+        request_id = f"R{next(self._ids)}"
+        self._request_bodies[request_id] = payload
+        await self._emit(send, target, "Network.responseReceived", {
+            "requestId": request_id, "type": "Fetch", "response": {"url": api_url, "status": status, "headers": headers}})
+        await self._emit(send, target, "Network.loadingFinished", {"requestId": request_id})
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+可手动推进的时钟替身
+作为 clock 参数传给速率控制、代理池、重试熔断、结果通道和内存管控，测试通过修改 now 推进时间，
+sleep 不真正等待而是直接推进时间
+"""
+from typing import List
+
+
+class FakeClock:
+    """可手动推进的时钟，sleep 直接推进时间"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.slept: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
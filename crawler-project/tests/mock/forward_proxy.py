@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+本地HTTP转发代理
+代替线上代理供代理池测试使用: 转发绝对地址的 GET/POST 请求，支持 CONNECT 隧道（HTTPS），
+可配置响应延迟和失败比例（返回502），并统计请求数和最大并发数
+"""
+import time
+import random
+import select
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# 转发时不再经过环境变量里的代理
+_DIRECT_OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "proxy-authorization", "transfer-encoding"}
+
+
+class LocalForwardProxy:
+    """本地转发代理"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 fail_rate: float = 0.0, seed: int = 42):
+        """
+        初始化代理
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            latency_ms: 每个请求额外的延迟（毫秒）
+            fail_rate: 直接返回502的请求比例
+            seed: 随机种子
+        """
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.stats = {"requests": 0, "failures": 0, "tunnels": 0, "max_concurrent": 0}
+        self._active = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """代理地址 host:port"""
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> 'LocalForwardProxy':
+        """在后台线程启动代理"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止代理，之后的连接会被拒绝"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _enter(self) -> bool:
+        """记录一个请求，返回本次是否注入失败"""
+        with self._lock:
+            self.stats["requests"] += 1
+            self._active += 1
+            self.stats["max_concurrent"] = max(self.stats["max_concurrent"], self._active)
+            failed = self.fail_rate > 0 and self._random.random() < self.fail_rate
+            if failed:
+                self.stats["failures"] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return failed
+
+    def _leave(self):
+        with self._lock:
+            self._active -= 1
+
+    def _build_handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._forward(None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._forward(self.rfile.read(length) if length else b"")
+
+            def do_CONNECT(self):
+                failed = proxy._enter()
+                try:
+                    if failed:
+                        self._send(502, b"proxy failure")
+                        return
+                    host, _, port = self.path.partition(":")
+                    try:
+                        upstream = socket.create_connection((host, int(port or 443)), timeout=10)
+                    except OSError as e:
+                        self._send(502, str(e).encode("utf-8"))
+                        return
+                    with proxy._lock:
+                        proxy.stats["tunnels"] += 1
+                    self.send_response(200, "Connection Established")
+                    self.end_headers()
+                    self._relay(self.connection, upstream)
+                    self.close_connection = True
+                finally:
+                    proxy._leave()
+
+            def _relay(self, client: socket.socket, upstream: socket.socket):
+                sockets = [client, upstream]
+                try:
+                    while True:
+                        readable, _, errored = select.select(sockets, [], sockets, 30)
+                        if errored or not readable:
+                            return
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            (upstream if sock is client else client).sendall(data)
+                finally:
+                    upstream.close()
+
+            def _forward(self, body: Optional[bytes]):
+                failed = proxy._enter()
+                try:
+                    if failed:
+                        self._send(502, b"proxy failure")
+                        return
+                    headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_HEADERS}
+                    request = urllib.request.Request(self.path, data=body, headers=headers, method=self.command)
+                    try:
+                        with _DIRECT_OPENER.open(request, timeout=30) as response:
+                            status, payload, response_headers = response.status, response.read(), response.headers
+                    except urllib.error.HTTPError as e:
+                        status, payload, response_headers = e.code, e.read(), e.headers
+                    except (urllib.error.URLError, OSError, ValueError) as e:
+                        self._send(502, str(e).encode("utf-8"))
+                        return
+                    self.send_response(status)
+                    for key, value in response_headers.items():
+                        if key.lower() not in _HOP_HEADERS | {"content-length"}:
+                            self.send_header(key, value)
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    proxy._leave()
+
+            def _send(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 测试期间不输出访问日志
+                pass
+
+        return Handler
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+内存版MongoDB集合替身
+只实现爬虫用到的 pymongo Collection 子集（相等查询、$in、$ne 和 $gt/$gte/$lt/$lte 范围查询，
+$set/$setOnInsert/$inc/$min/$max 更新），
+供基准测试和单元测试在没有MongoDB时使用
+"""
+import copy
+import random
+import itertools
+import operator
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+RANGE_OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le,
+                   "$in": lambda value, options: value in options, "$ne": operator.ne}
+
+
+class MemoryCursor:
+    """find() 返回的游标"""
+
+    def __init__(self, documents: List[dict]):
+        self._documents = documents
+
+    def limit(self, count: int) -> 'MemoryCursor':
+        if count:
+            self._documents = self._documents[:count]
+        return self
+
+    def sort(self, key: str, direction: int = 1) -> 'MemoryCursor':
+        self._documents = sorted(self._documents, key=lambda d: (d.get(key) is not None, d.get(key)),
+                                 reverse=direction < 0)
+        return self
+
+    def batch_size(self, size: int) -> 'MemoryCursor':
+        return self
+
+    def __iter__(self):
+        return iter(self._documents)
+
+
+class MemoryCollection:
+    """内存集合"""
+
+    def __init__(self, name: str = "products"):
+        self.name = name
+        self._documents: List[dict] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _match_value(value, condition) -> bool:
+        if isinstance(condition, dict) and condition and all(k in RANGE_OPERATORS for k in condition):
+            # 缺少的字段只满足 $ne
+            return all(RANGE_OPERATORS[k](value, v) if value is not None else k == "$ne"
+                       for k, v in condition.items())
+        return value == condition
+
+    @classmethod
+    def _match(cls, document: dict, query: Optional[Dict]) -> bool:
+        return all(cls._match_value(document.get(k), v) for k, v in (query or {}).items())
+
+    @staticmethod
+    def _project(document: dict, projection: Optional[Dict]) -> dict:
+        if not projection:
+            return document
+        if not any(projection.values()):
+            # 排除式投影，如 {"_id": 0}
+            return {k: v for k, v in document.items() if k not in projection}
+        return {k: v for k, v in document.items() if k == "_id" or projection.get(k)}
+
+    def insert_one(self, document: dict):
+        with self._lock:
+            if "_id" not in document:
+                document["_id"] = next(self._ids)
+            self._documents.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    def insert_many(self, documents: List[dict], ordered: bool = True):
+        ids = [self.insert_one(d).inserted_id for d in documents]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        with self._lock:
+            matched = [self._project(copy.deepcopy(d), projection) for d in self._documents if self._match(d, query)]
+        return MemoryCursor(matched)
+
+    def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[dict]:
+        return next(iter(self.find(query)), None)
+
+    def estimated_document_count(self) -> int:
+        return len(self._documents)
+
+    def count_documents(self, query: Optional[Dict] = None) -> int:
+        with self._lock:
+            return sum(1 for d in self._documents if self._match(d, query))
+
+    @staticmethod
+    def _apply(document: dict, update: Dict):
+        # 支持 $set / $inc / $min / $max（$setOnInsert 由 upsert 处理）
+        document.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        for field, value in update.get("$min", {}).items():
+            document[field] = value if document.get(field) is None else min(document[field], value)
+        for field, value in update.get("$max", {}).items():
+            document[field] = value if document.get(field) is None else max(document[field], value)
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        with self._lock:
+            for document in self._documents:
+                if self._match(document, query):
+                    self._apply(document, update)
+                    return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+            if upsert:
+                # 查找和插入在同一把锁内，并发 upsert 同一个文档时只插入一次
+                document = {k: v for k, v in query.items() if not isinstance(v, dict)}
+                self._apply(document, update)
+                document.update(update.get("$setOnInsert", {}))
+                document["_id"] = next(self._ids)
+                self._documents.append(copy.deepcopy(document))
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def find_one_and_update(self, query: Dict, update: Dict, projection: Optional[Dict] = None,
+                            return_document: bool = False) -> Optional[dict]:
+        # 只支持 $set，return_document=False（ReturnDocument.BEFORE）返回更新前的文档
+        with self._lock:
+            for document in self._documents:
+                if self._match(document, query):
+                    before = copy.deepcopy(document)
+                    document.update(update.get("$set", {}))
+                    return self._project(copy.deepcopy(document) if return_document else before, projection)
+        return None
+
+    def bulk_write(self, requests: List, ordered: bool = True):
+        # 只支持 UpdateOne
+        results = [self.update_one(r._filter, r._doc, upsert=bool(r._upsert)) for r in requests]
+        return SimpleNamespace(matched_count=sum(r.matched_count for r in results),
+                               modified_count=sum(r.modified_count for r in results),
+                               upserted_count=sum(1 for r in results if r.upserted_id is not None),
+                               acknowledged=True)
+
+    def delete_many(self, query: Optional[Dict] = None):
+        with self._lock:
+            before = len(self._documents)
+            self._documents = [d for d in self._documents if not self._match(d, query)]
+            return SimpleNamespace(deleted_count=before - len(self._documents))
+
+    def create_index(self, keys, **kwargs) -> str:
+        return f"{keys}_index"
+
+    def aggregate(self, pipeline: List[dict]) -> List[dict]:
+        # 只支持 $sample（导出分区取样），统计接口只在报表中使用，替身不做其他聚合
+        if pipeline and "$sample" in pipeline[0]:
+            with self._lock:
+                sample = random.sample(self._documents, min(pipeline[0]["$sample"]["size"], len(self._documents)))
+            return [{"_id": d["_id"]} for d in sample]
+        return []
+
+
+class MemoryDatabase:
+    """内存数据库: 按名称取集合，不存在时创建"""
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def create_collection(self, name: str, **options) -> MemoryCollection:
+        # 时间序列等选项忽略，按普通集合处理
+        return self[name]
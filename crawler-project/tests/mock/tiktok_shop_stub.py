@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+本地TikTok Shop替身服务
+提供与线上结构一致的页面和接口，供端到端吞吐基准测试使用:
+    /shop/s/{keyword}                           搜索页（__MODERN_ROUTER_DATA__ + View more按钮）
+    /api/shop/brandy_desktop/s/product_list     翻页接口（GET查询参数或POST JSON）
+    /view/product/{product_id}                  商品详情页
+    /shop/product/{product_id}                  同上（爬虫保存的商品链接）
+页面请求可按比例注入滑块验证码（使用验证码样本库渲染），也可在请求速率过高时注入，并可配置响应延迟和抖动
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+import urllib.parse
+from collections import deque
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from captcha_widget_server import render_captcha_page, judge_drag
+
+PRODUCT_LIST_PATH = "/api/shop/brandy_desktop/s/product_list"
+PASS_COOKIE = "stub_captcha_pass"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<div data-e2e="search-result">
+  <div id="product-list" data-e2e="search-product-list">{items}</div>
+  {more_button}
+</div>
+<script id="__MODERN_ROUTER_DATA__" type="application/json">{router_data}</script>
+{script}
+</body>
+</html>
+"""
+
+MORE_BUTTON = '<button id="view-more" data-e2e="load-more" class="load-more">View more</button>'
+
+MORE_SCRIPT = """<script>
+  var nextPage = 2;
+  document.getElementById('view-more').addEventListener('click', function () {{
+    var btn = this;
+    fetch('{api_path}', {{
+      method: 'POST',
+      headers: {{'Content-Type': 'application/json'}},
+      body: JSON.stringify({{keyword: {keyword}, page: nextPage}})
+    }}).then(function (r) {{ return r.json(); }}).then(function (res) {{
+      var list = document.getElementById('product-list');
+      res.data.products.forEach(function (p) {{
+        var a = document.createElement('a');
+        a.className = 'product-item';
+        a.href = '/shop/product/' + p.product_id;
+        a.textContent = p.title;
+        list.appendChild(a);
+      }});
+      nextPage += 1;
+      if (!res.data.has_more) {{ btn.style.display = 'none'; }}
+    }});
+  }});
+</script>"""
+
+# 验证通过后刷新页面，服务端凭一次性通行cookie放行
+ON_PASS_RELOAD = "location.reload();"
+
+
+class TikTokShopStub:
+    """本地TikTok Shop替身服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, products_per_page: int = 30,
+                 max_pages: int = 5, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 captcha_rate: float = 0.0, captcha_samples: Optional[List] = None,
+                 captcha_tolerance: float = 6.0, seed: int = 42, captcha_rps: float = 0.0,
+                 captcha_window: float = 5.0):
+        """
+        初始化替身服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            products_per_page: 每页商品数
+            max_pages: 每个关键词的总页数
+            latency_ms: 每个请求的固定延迟（毫秒）
+            jitter_ms: 在固定延迟上叠加的随机抖动上限（毫秒）
+            captcha_rate: 页面请求注入验证码的概率（0-1）
+            captcha_samples: 验证码样本（CaptchaSample列表），captcha_rate>0时必填
+            captcha_tolerance: 判定通过的滑动距离误差（页面像素）
+            seed: 随机种子，保证商品数据和验证码注入可复现
+            captcha_rps: 最近 captcha_window 秒内页面请求速率超过该值（每秒）时必定注入验证码，0表示不限
+            captcha_window: 统计页面请求速率的时间窗口（秒）
+        """
+        if (captcha_rate > 0 or captcha_rps > 0) and not captcha_samples:
+            raise ValueError("captcha_rate>0 或 captcha_rps>0 时必须提供验证码样本")
+        self.products_per_page = products_per_page
+        self.max_pages = max_pages
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.captcha_rate = captcha_rate
+        self.captcha_samples = list(captcha_samples or [])
+        self.captcha_tolerance = captcha_tolerance
+        self.captcha_rps = captcha_rps
+        self.captcha_window = captcha_window
+        self._page_times = deque()
+        self.seed = seed
+
+        self.stats: Dict[str, int] = {
+            "search_pages": 0, "api_pages": 0, "detail_pages": 0,
+            "captcha_served": 0, "captcha_passed": 0, "captcha_failed": 0,
+        }
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._challenges: Dict[str, object] = {}
+        self._pass_tokens = set()
+        # 详情页按ID反查商品位置，在搜索页/翻页接口返回时登记
+        self._product_index: Dict[str, tuple] = {}
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search_url(self, keyword: str) -> str:
+        """获取关键词搜索页URL"""
+        return f"{self.base_url}/shop/s/{urllib.parse.quote(keyword)}"
+
+    def start(self) -> 'TikTokShopStub':
+        """在后台线程启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ==================== 数据生成 ====================
+
+    def _rng(self, *parts) -> random.Random:
+        digest = hashlib.md5("|".join(str(p) for p in (self.seed,) + parts).encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def product_id(self, keyword: str, page: int, index: int) -> str:
+        """确定性的19位商品ID"""
+        return str(1729000000000000000 + self._rng(keyword, page, index).randrange(10 ** 15))
+
+    def make_product(self, keyword: str, page: int, index: int) -> dict:
+        """生成搜索结果中的单个商品"""
+        rng = self._rng(keyword, page, index)
+        product_id = self.product_id(keyword, page, index)
+        sale_price = round(rng.uniform(3, 80), 2)
+        origin_price = round(sale_price * rng.uniform(1.0, 1.6), 2)
+        review_count = rng.randint(0, 5000)
+        return {
+            "product_id": product_id,
+            "title": f"{keyword.title()} Item {page}-{index + 1}",
+            "product_price_info": {
+                "sale_price_format": f"${sale_price:,.2f}",
+                "origin_price_format": f"${origin_price:,.2f}",
+            },
+            "images": [{"url_list": [f"{self.base_url}/img/product/{product_id}.jpg"]}],
+            "sold_count": rng.randint(0, 20000),
+            "seller": {"name": f"Shop {rng.randint(1, 200)}"},
+            "product_rating": round(rng.uniform(3.0, 5.0), 1),
+            "review_count": review_count,
+        }
+
+    def make_page(self, keyword: str, page: int) -> List[dict]:
+        """生成某一页商品"""
+        if page < 1 or page > self.max_pages:
+            return []
+        return [self.make_product(keyword, page, i) for i in range(self.products_per_page)]
+
+    def find_product(self, product_id: str) -> Optional[dict]:
+        """按ID还原商品所属关键词页并返回详情数据"""
+        location = self._product_index.get(product_id)
+        return self.make_detail(*location) if location else None
+
+    def make_detail(self, keyword: str, page: int, index: int) -> dict:
+        """生成商品详情（product_info组件数据）"""
+        product = self.make_product(keyword, page, index)
+        rng = self._rng(keyword, page, index, "detail")
+        latest = int(time.time() * 1000) - rng.randint(0, 30) * 86400000
+        return {
+            "product_id": product["product_id"],
+            "product_base": {
+                "title": product["title"],
+                "sold_count": product["sold_count"],
+                "images": product["images"],
+                "price": product["product_price_info"],
+                "desc_detail": json.dumps([
+                    {"type": "text", "text": f"{product['title']} for {keyword}."},
+                    {"type": "ul", "content": ["Durable", "Lightweight", "Fast shipping"]},
+                ]),
+            },
+            "seller": product["seller"],
+            "categories": [{"category_id": "601450", "category_name": "Home Supplies"},
+                           {"category_id": str(600000 + rng.randint(1, 999)), "category_name": keyword.title()}],
+            "logistic": {"shipping_fee": {"price_val": round(rng.choice([0, 0, 2.99, 4.99]), 2)}},
+            "product_detail_review": {
+                "product_rating": product["product_rating"],
+                "review_count_str": str(product["review_count"]),
+                "review_time_info": {
+                    "latest_review_time": str(latest),
+                    "earliest_review_time": str(latest - rng.randint(30, 700) * 86400000),
+                },
+            },
+        }
+
+    # ==================== 页面渲染 ====================
+
+    def _register(self, keyword: str, page: int, products: List[dict]):
+        with self._lock:
+            for index, product in enumerate(products):
+                self._product_index.setdefault(product["product_id"], (keyword, page, index))
+
+    def render_search_page(self, keyword: str) -> str:
+        """渲染搜索页"""
+        products = self.make_page(keyword, 1)
+        self._register(keyword, 1, products)
+        router_data = {
+            "loaderData": {
+                "shop/s/(keyword)/page": {
+                    "page_config": {
+                        "components_map": [
+                            {"component_name": "search_header", "component_data": {"keyword": keyword}},
+                            {"component_name": "feed_list_search_word",
+                             "component_data": {"products": products, "has_more": self.max_pages > 1}},
+                        ]
+                    }
+                }
+            }
+        }
+        items = "".join(f'<a class="product-item" href="/shop/product/{p["product_id"]}">{p["title"]}</a>'
+                        for p in products)
+        has_more = self.max_pages > 1
+        return PAGE_TEMPLATE.format(
+            title=f"{keyword} - TikTok Shop",
+            items=items,
+            more_button=MORE_BUTTON if has_more else "",
+            router_data=json.dumps(router_data),
+            script=MORE_SCRIPT.format(api_path=PRODUCT_LIST_PATH, keyword=json.dumps(keyword)) if has_more else "",
+        )
+
+    def render_detail_page(self, detail: dict) -> str:
+        """渲染商品详情页"""
+        router_data = {
+            "loaderData": {
+                "view/product/(product_id)/page": {
+                    "page_config": {
+                        "components_map": [
+                            {"component_type": "product_info", "component_data": {"product_info": detail}},
+                        ]
+                    }
+                }
+            }
+        }
+        return PAGE_TEMPLATE.format(
+            title=f"{detail['product_base']['title']} - TikTok Shop",
+            items="", more_button="", script="",
+            router_data=json.dumps(router_data),
+        )
+
+    def product_list(self, keyword: str, page: int) -> dict:
+        """翻页接口响应"""
+        products = self.make_page(keyword, page)
+        self._register(keyword, page, products)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {"products": products, "page": page, "has_more": page < self.max_pages},
+        }
+
+    # ==================== 验证码 ====================
+
+    def note_request(self) -> float:
+        """记录一次页面或接口请求，返回最近 captcha_window 秒内的请求速率（每秒）"""
+        with self._lock:
+            now = time.monotonic()
+            self._page_times.append(now)
+            while self._page_times[0] < now - self.captcha_window:
+                self._page_times.popleft()
+            return len(self._page_times) / self.captcha_window
+
+    def should_challenge(self, pass_token: Optional[str]) -> bool:
+        """判断本次页面请求是否注入验证码，通行cookie只放行一次"""
+        request_rate = self.note_request()
+        with self._lock:
+            if pass_token and pass_token in self._pass_tokens:
+                self._pass_tokens.discard(pass_token)
+                return False
+            if self.captcha_rps > 0 and request_rate > self.captcha_rps:
+                return True
+            return self.captcha_rate > 0 and self._random.random() < self.captcha_rate
+
+    def new_challenge(self) -> str:
+        """创建一次验证码挑战，返回挑战ID"""
+        with self._lock:
+            challenge_id = f"c{self.stats['captcha_served']}"
+            self._challenges[challenge_id] = self._random.choice(self.captcha_samples)
+            self.stats["captcha_served"] += 1
+        return challenge_id
+
+    def verify_challenge(self, challenge_id: str, dx: float) -> dict:
+        """判定拖拽，通过时签发通行token"""
+        sample = self._challenges.get(challenge_id)
+        if sample is None:
+            return {"passed": False, "error": None}
+        result = judge_drag(sample, dx, self.captcha_tolerance)
+        with self._lock:
+            if result["passed"]:
+                self.stats["captcha_passed"] += 1
+                result["token"] = challenge_id
+                self._pass_tokens.add(challenge_id)
+                self._challenges.pop(challenge_id, None)
+            else:
+                self.stats["captcha_failed"] += 1
+        return result
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _build_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                self._route(parsed, urllib.parse.parse_qs(parsed.query), None)
+
+            def do_POST(self):
+                parsed = urllib.parse.urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    body = {}
+                self._route(parsed, urllib.parse.parse_qs(parsed.query), body)
+
+            def _route(self, parsed, query: dict, body: Optional[dict]):
+                stub._delay()
+                parts = [urllib.parse.unquote(p) for p in parsed.path.split('/') if p]
+                try:
+                    if parsed.path == PRODUCT_LIST_PATH:
+                        params = body if body is not None else {k: v[0] for k, v in query.items()}
+                        stub._count("api_pages")
+                        stub.note_request()
+                        payload = stub.product_list(str(params.get("keyword", "")), int(params.get("page", 2)))
+                        self._send_json(payload)
+                    elif len(parts) == 3 and parts[:2] == ["shop", "s"]:
+                        if self._challenge():
+                            return
+                        stub._count("search_pages")
+                        self._send(200, stub.render_search_page(parts[2]).encode("utf-8"))
+                    elif len(parts) == 3 and parts[:2] in (["view", "product"], ["shop", "product"]):
+                        detail = stub.find_product(parts[2])
+                        if detail is None:
+                            self._send(404, b"product not found", "text/plain")
+                            return
+                        if self._challenge():
+                            return
+                        stub._count("detail_pages")
+                        self._send(200, stub.render_detail_page(detail).encode("utf-8"))
+                    elif len(parts) == 4 and parts[0] == "captcha" and parts[1] in stub._challenges:
+                        sample = stub._challenges[parts[1]]
+                        if parts[3] == "bg.png":
+                            self._send(200, sample.read_background(), "image/png")
+                        else:
+                            self._send(200, sample.read_target(), "image/png")
+                    elif len(parts) == 3 and parts[0] == "captcha" and parts[2] == "verify":
+                        result = stub.verify_challenge(parts[1], float(query.get("dx", ["0"])[0]))
+                        headers = {}
+                        if result.get("token"):
+                            headers["Set-Cookie"] = f"{PASS_COOKIE}={result['token']}; Path=/"
+                        self._send_json(result, headers)
+                    else:
+                        self._send(404, b"not found", "text/plain")
+                except (ValueError, OSError) as e:
+                    self._send(500, str(e).encode("utf-8"), "text/plain")
+
+            def _challenge(self) -> bool:
+                """需要验证时返回验证码页面"""
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                token = cookie[PASS_COOKIE].value if PASS_COOKIE in cookie else None
+                if not stub.should_challenge(token):
+                    return False
+                challenge_id = stub.new_challenge()
+                html = render_captcha_page(
+                    stub._challenges[challenge_id],
+                    f"/captcha/{challenge_id}/img",
+                    f"/captcha/{challenge_id}/verify?dx=",
+                    on_pass=ON_PASS_RELOAD,
+                )
+                self._send(200, html.encode("utf-8"))
+                return True
+
+            def _send_json(self, payload: dict, headers: Optional[dict] = None):
+                self._send(200, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+            def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8",
+                      headers: Optional[dict] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 基准测试期间不输出访问日志
+                pass
+
+        return Handler
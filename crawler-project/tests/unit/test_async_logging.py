@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+异步日志测试
+验证队列异步写入、批量flush、逐商品日志抽样（包括数据库管理器的日志）和关闭级别时的快速路径
+"""
+import os
+import sys
+import logging
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.logger import (
+    setup_logger, shutdown_logging, is_async_logging, Sampler, SamplingFilter,
+    LocalQueueHandler, SAMPLED
+)
+
+
+def _close(logger: logging.Logger):
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
+
+
+def _read_lines(path: str):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_sampler():
+    """测试每N次放行一次，不同key独立计数"""
+    sampler = Sampler(3)
+    assert [sampler.hit("a") for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert sampler.hit("b")
+    assert all(Sampler(1).hit() for _ in range(5))
+
+
+def test_async_writes_all_records():
+    """测试异步模式在关闭后写出全部日志"""
+    print("🔍 测试异步日志")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "async.log")
+        logger = setup_logger("test_async_all", level="INFO", log_file=path,
+                              async_mode=True, sample_every=1)
+        assert is_async_logging("test_async_all")
+        assert isinstance(logger.handlers[0], LocalQueueHandler)
+        for i in range(500):
+            logger.info("商品 %d", i)
+        shutdown_logging()
+        assert not is_async_logging("test_async_all")
+        lines = _read_lines(path)
+        _close(logger)
+    # 1条初始化日志 + 500条商品日志，且顺序不变
+    assert len(lines) == 501
+    assert lines[1].endswith("商品 0") and lines[-1].endswith("商品 499")
+    print("✅ 异步日志测试通过")
+
+
+def test_sampling_only_applies_to_marked_records():
+    """测试只对带 SAMPLED 标记的日志抽样"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "sampled.log")
+        logger = setup_logger("test_async_sampled", level="INFO", log_file=path,
+                              async_mode=True, sample_every=10)
+        for i in range(100):
+            logger.info("保存商品成功: %s", i, extra=SAMPLED)
+            logger.info("解析商品: %s", i, extra=SAMPLED)
+        logger.warning("关键词完成")
+        shutdown_logging()
+        lines = _read_lines(path)
+        _close(logger)
+    assert sum("保存商品成功" in line for line in lines) == 10
+    assert sum("解析商品" in line for line in lines) == 10
+    assert any("关键词完成" in line for line in lines)
+
+
+def test_sync_mode_and_disabled_level():
+    """测试同步模式立即写入，低于级别的日志不进入处理器"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "sync.log")
+        logger = setup_logger("test_sync_logger", level="WARNING", log_file=path,
+                              async_mode=False, sample_every=2)
+        assert not is_async_logging("test_sync_logger")
+        assert any(isinstance(f, SamplingFilter) for f in logger.handlers[0].filters)
+
+        class Exploding:
+            def __str__(self):
+                raise AssertionError("关闭的级别不应格式化参数")
+
+        logger.info("不会输出 %s", Exploding())
+        logger.warning("警告 %s", 1)
+        lines = _read_lines(path)
+        _close(logger)
+    assert len(lines) == 1 and lines[0].endswith("警告 1")
+
+
+def test_queue_handler_defers_formatting():
+    """测试入队时不格式化消息"""
+    import queue
+    handler = LocalQueueHandler(queue.Queue())
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "价格 %s", (9.99,), None)
+    handler.emit(record)
+    queued = handler.queue.get_nowait()
+    assert queued is record and queued.args == (9.99,) and queued.msg == "价格 %s"
+
+
+def test_database_logger_samples_marked_records():
+    """测试数据库管理器的日志经过抽样过滤器（逐商品的入库日志带 SAMPLED 标记）"""
+    from utils.database import DatabaseManager
+    logger = DatabaseManager().logger
+    assert logger.name == "utils.database"
+    assert any(isinstance(f, SamplingFilter) for handler in logger.handlers for f in handler.filters)
+
+
+def main():
+    """主函数"""
+    print("异步日志测试")
+    print("=" * 50)
+    test_sampler()
+    test_async_writes_all_records()
+    test_sampling_only_applies_to_marked_records()
+    test_sync_mode_and_disabled_level()
+    test_queue_handler_defers_formatting()
+    test_database_logger_samples_marked_records()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+批量导出测试
+验证按 _id 取样切分的区间不重不漏、多个游标并行导出到压缩文件、投影和查询条件、
+进度回调、每个区间写一个Parquet文件（需要 pyarrow，未安装时跳过），以及单个区间失败时其他区间照常完成
+"""
+import os
+import sys
+import gzip
+import json
+import tempfile
+
+import pytest
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from models.product import ProductData
+from utils.lazy_import import module_available
+from utils.bulk_export import bulk_export, default_bulk_formats, split_id_ranges
+from memory_collection import MemoryCollection
+
+
+def make_collection(count: int) -> MemoryCollection:
+    collection = MemoryCollection()
+    for i in range(count):
+        document = ProductData(product_id=f"p{i}", title=f"商品 {i}", search_keyword="mug" if i % 4 == 0 else "phone case",
+                               current_price=1.0 + i, origin_price=2.0 + i, sold_count=i).to_dict()
+        document["internal_note"] = "不导出"
+        collection.insert_one(document)
+    return collection
+
+
+def read_rows(files):
+    rows = []
+    for path in files:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+
+def test_split_id_ranges():
+    """测试区间覆盖全部文档且互不重叠"""
+    print("🔍 测试_id区间切分")
+    collection = make_collection(1000)
+    ranges = split_id_ranges(collection, 4)
+    assert len(ranges) == 4
+    counts = [collection.count_documents(r) for r in ranges]
+    assert sum(counts) == 1000 and min(counts) > 100, counts
+    assert split_id_ranges(collection, 1) == [{}]
+    assert split_id_ranges(MemoryCollection(), 4) == [{}]
+
+
+def test_parallel_export():
+    """测试并行导出、投影、查询条件和进度回调"""
+    print("🔍 测试并行导出")
+    collection = make_collection(2000)
+    progress = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report = bulk_export(collection, os.path.join(temp_dir, "full", "products"), partitions=4,
+                             formats=["jsonl"], batch_size=100, progress_interval=0.01,
+                             on_progress=lambda rows, rate: progress.append(rows))
+        assert report.ok and report.rows == 2000 and report.partitions == 4
+        assert [os.path.basename(f) for f in report.files] == [
+            f"products-part00{i}.jsonl.gz" for i in range(1, 5)]
+        rows = read_rows(report.files)
+        assert sorted(int(row["product_id"][1:]) for row in rows) == list(range(2000))
+        assert "internal_note" not in rows[0] and "_id" not in rows[0]
+        assert progress and progress[-1] == 2000
+        assert report.rows_per_second > 0
+
+        report = bulk_export(collection, os.path.join(temp_dir, "mug"), partitions=3, query={"search_keyword": "mug"},
+                             formats=["csv"], progress_interval=0)
+        assert report.rows == 500 and all(f.endswith(".csv.gz") for f in report.files)
+
+
+def test_parquet_partitions():
+    """测试默认格式下每个区间写一个Parquet文件；没有 pyarrow 时指定Parquet直接失败"""
+    print("🔍 测试Parquet分区导出")
+    collection = make_collection(600)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not module_available("pyarrow"):
+            assert default_bulk_formats() == ["jsonl"]
+            try:
+                bulk_export(collection, os.path.join(temp_dir, "products.parquet"), partitions=2, progress_interval=0)
+                raise AssertionError("没有pyarrow时指定Parquet应失败")
+            except ValueError:
+                pass
+        pq = pytest.importorskip("pyarrow.parquet")
+        assert default_bulk_formats() == ["parquet"]
+        report = bulk_export(collection, os.path.join(temp_dir, "products"), partitions=3, progress_interval=0)
+        assert report.ok and report.rows == 600
+        assert [os.path.basename(f) for f in report.files] == [
+            f"products-part00{i}.parquet" for i in range(1, 4)]
+        tables = [pq.read_table(path) for path in report.files]
+        assert all(table.num_rows > 0 for table in tables)
+        assert "internal_note" not in tables[0].column_names
+        ids = sorted(int(pid[1:]) for table in tables for pid in table.column("product_id").to_pylist())
+        assert ids == list(range(600))
+        assert tables[0].schema.field("sold_count").type.bit_width == 64
+
+
+class FailingCollection(MemoryCollection):
+    """第一个区间（只有上界）的游标读取失败"""
+
+    def find(self, query=None, projection=None):
+        if query and set(query.get("_id", {})) == {"$lt"}:
+            raise ConnectionError("connection reset")
+        return super().find(query, projection)
+
+
+def test_failed_partition():
+    """测试单个区间失败"""
+    print("🔍 测试区间失败")
+    collection = FailingCollection()
+    for document in make_collection(400).find():
+        collection.insert_one(document)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report = bulk_export(collection, os.path.join(temp_dir, "products"), partitions=4,
+                             formats=["jsonl"], progress_interval=0)
+        assert not report.ok and len(report.errors) == 1 and report.errors[0].startswith("part001")
+        assert len(report.files) == 3 and 0 < len(read_rows(report.files)) < 400
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".part")]
+
+
+def main():
+    """主函数"""
+    print("批量导出测试")
+    print("=" * 50)
+    test_split_id_ranges()
+    test_parallel_export()
+    test_parquet_partitions()
+    test_failed_partition()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+验证码样本库与本地验证码替身服务测试
+不依赖线上TikTok，验证样本读写、真实滑动距离计算和替身服务的判定逻辑
+"""
+import os
+import sys
+import json
+import tempfile
+import urllib.request
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from utils.captcha_corpus import CaptchaCorpus, CaptchaSample, generate_synthetic_corpus
+from captcha_widget_server import CaptchaWidgetServer
+from bench_common import percentile, summarize, compare_reports
+
+
+def test_synthetic_corpus_roundtrip():
+    """测试合成样本生成和manifest回读"""
+    print("🔍 测试合成样本库")
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        samples = generate_synthetic_corpus(corpus_dir, count=3, seed=7)
+        assert len(samples) == 3
+
+        loaded = CaptchaCorpus(corpus_dir).load()
+        assert [s.sample_id for s in loaded] == [s.sample_id for s in samples]
+        for sample in loaded:
+            assert sample.image_width == 552 and sample.image_height == 344
+            assert sample.piece_width == 110
+            assert sample.read_background().startswith(b"\x89PNG")
+            assert os.path.exists(sample.target_path)
+
+        # 相同种子生成相同的缺口位置
+        with tempfile.TemporaryDirectory() as other_dir:
+            again = generate_synthetic_corpus(other_dir, count=3, seed=7)
+            assert [s.target_x for s in again] == [s.target_x for s in samples]
+    print("✅ 合成样本库测试通过")
+
+
+def test_corrupt_manifest_lines_are_skipped():
+    """测试损坏的manifest行被跳过"""
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        with open(os.path.join(corpus_dir, "manifest.jsonl"), "w", encoding="utf-8") as f:
+            f.write("not json\n\n")
+            f.write(json.dumps({
+                "sample_id": "a", "background_file": "a_bg.png", "target_file": "a_target.png",
+                "target_x": 100, "image_width": 552, "image_height": 344, "unknown_field": 1
+            }) + "\n")
+        samples = CaptchaCorpus(corpus_dir).load()
+        assert len(samples) == 1
+        assert samples[0].base_dir == corpus_dir
+
+
+def test_expected_distance():
+    """测试参考算法的真实滑动距离"""
+    sample = CaptchaSample("s", "bg.png", "t.png", target_x=276, image_width=552,
+                           image_height=344, x_offset=10.0)
+    assert abs(sample.expected_distance() - (276 * 340 / 552 - 10.0)) < 1e-9
+
+
+def test_widget_server_verify():
+    """测试替身服务的页面结构和拖拽判定"""
+    print("🔍 测试验证码替身服务")
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        sample = generate_synthetic_corpus(corpus_dir, count=1, seed=1)[0]
+        with CaptchaWidgetServer([sample], tolerance=5) as server:
+            html = urllib.request.urlopen(server.url_for(sample.sample_id), timeout=5).read().decode()
+            assert '<div id="captcha_container">' in html
+            assert 'id="secsdk-captcha-drag-wrapper"' in html
+            assert "<title>Security Check</title>" in html
+
+            image = urllib.request.urlopen(f"{server.base_url}/img/{sample.sample_id}/bg.png", timeout=5).read()
+            assert image == sample.read_background()
+
+            expected = sample.expected_distance()
+            ok = json.loads(urllib.request.urlopen(
+                f"{server.base_url}/verify/{sample.sample_id}?dx={expected + 2}", timeout=5).read())
+            bad = json.loads(urllib.request.urlopen(
+                f"{server.base_url}/verify/{sample.sample_id}?dx={expected + 30}", timeout=5).read())
+            assert ok["passed"] and not bad["passed"]
+            assert len(server.attempts[sample.sample_id]) == 2
+    print("✅ 替身服务测试通过")
+
+
+def test_bench_common_statistics():
+    """测试基准测试统计与报告对比"""
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([], 99) == 0.0
+    stats = summarize([10.0, 20.0, 30.0])
+    assert stats["count"] == 3 and stats["p50"] == 20.0 and stats["max"] == 30.0
+
+    baseline = {"results": [{"name": "A", "lat": {"p50": 10.0}}]}
+    current = {"results": [{"name": "A", "lat": {"p50": 15.0}}, {"name": "B", "lat": {"p50": 1.0}}]}
+    rows = compare_reports(current, baseline, ["lat.p50"])
+    assert rows == [{"name": "A", "metric": "lat.p50", "baseline": 10.0, "current": 15.0, "change_pct": 50.0}]
+
+
+def main():
+    """主函数"""
+    print("验证码样本库测试")
+    print("=" * 50)
+    test_synthetic_corpus_roundtrip()
+    test_corrupt_manifest_lines_are_skipped()
+    test_expected_distance()
+    test_widget_server_verify()
+    test_bench_common_statistics()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
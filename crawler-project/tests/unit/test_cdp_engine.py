@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+CDP异步引擎测试
+使用本地CDP浏览器替身和TikTok Shop替身服务，验证websocket通信、导航/网络响应/DOM查询、
+多个标签页并发采集和翻页，以及标签页崩溃后自动换新标签页重试
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from config import Config
+from utils.cdp_engine import CdpBrowser, CdpCrawlEngine, CdpError, run_blocking
+from utils.retry_engine import RetryEngine, RetryPolicy, ERROR_BROWSER, ERROR_TIMEOUT
+from utils.captcha_corpus import generate_synthetic_corpus
+from handlers.cdp_slider_handler import CdpSliderHandler
+from run_cdp_crawler import crawl_keywords
+from crawl_throughput_benchmark import _new_complete_crawler, _point_runners_at
+from fake_cdp_browser import FakeCdpBrowser
+from tiktok_shop_stub import TikTokShopStub, PRODUCT_LIST_PATH
+
+URL_SETTINGS = ("BASE_URL", "TARGET_URL", "SHOP_BASE_URL", "SEARCH_BASE_URL", "PRODUCT_LIST_API_URL")
+
+
+def _fast_retry() -> RetryEngine:
+    return RetryEngine({ERROR_BROWSER: RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0),
+                        ERROR_TIMEOUT: RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0)},
+                       failure_threshold=10)
+
+
+def test_navigation_network_and_dom():
+    """测试导航、等待网络响应、DOM查询，以及超过64KB的消息"""
+    print("🔍 测试导航和DOM查询")
+
+    async def run(stub: TikTokShopStub):
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                tab = await browser.new_tab()
+                await tab.navigate(stub.search_url("phone case"))
+                assert await tab.title() == "phone case - TikTok Shop"
+                assert await tab.url() == stub.search_url("phone case")
+                html = await tab.html()
+                assert len(html) > 65536 and "__MODERN_ROUTER_DATA__" in html
+                router_data = await tab.inner_html("#__MODERN_ROUTER_DATA__")
+                assert router_data.startswith("{") and "feed_list_search_word" in router_data
+                assert await tab.query("#missing") is None
+                assert await tab.box("[data-e2e='load-more']") is not None
+
+                # 先登记再触发，响应体随事件一起取回
+                waiter = tab.expect_response(PRODUCT_LIST_PATH)
+                await tab.navigate(f"{stub.base_url}{PRODUCT_LIST_PATH}?keyword=mug&page=2")
+                response = await asyncio.wait_for(waiter, 5)
+                assert response.status == 200 and len(response.json()["data"]["products"]) == 150
+
+                try:
+                    await tab.navigate("http://127.0.0.1:9/unreachable")
+                    raise AssertionError("无法连接的地址应导航失败")
+                except CdpError as e:
+                    assert "net::ERR" in str(e)
+            assert fake.stats["targets_closed"] == fake.stats["targets_created"] == 1
+
+    with TikTokShopStub(products_per_page=150, max_pages=2) as stub:
+        asyncio.run(run(stub))
+
+
+def test_concurrent_keywords_with_pagination():
+    """测试多个标签页并发采集关键词（含点击View more翻页），商品解析和入库复用 CompleteTikTokCrawler"""
+    print("🔍 测试并发采集")
+    keywords = [f"keyword {i}" for i in range(6)]
+    saved_urls = {name: getattr(Config, name) for name in URL_SETTINGS}
+
+    async def run(stub: TikTokShopStub, crawler):
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                start = time.perf_counter()
+                results = await crawl_keywords(crawler, keywords, 3, concurrency=3, browser=browser,
+                                               retry_engine=_fast_retry())
+                elapsed = time.perf_counter() - start
+            return results, elapsed, fake.stats
+
+    try:
+        with TikTokShopStub(products_per_page=4, max_pages=3, latency_ms=100) as stub:
+            _point_runners_at(stub.base_url)
+            crawler = _new_complete_crawler(with_browser=False)
+            results, elapsed, stats = asyncio.run(run(stub, crawler))
+            assert stub.stats["search_pages"] == 6 and stub.stats["api_pages"] == 12
+    finally:
+        for name, value in saved_urls.items():
+            setattr(Config, name, value)
+
+    assert all(len(results[keyword]) == 12 for keyword in keywords), {k: len(v) for k, v in results.items()}
+    assert crawler.db_manager.collection.count_documents({}) == 72
+    assert stats["max_concurrent_navigations"] == 3 and stats["clicks"] == 12
+    assert stats["targets_created"] == stats["targets_closed"] == 3
+    # 顺序执行需要 18 次 × 100ms
+    assert elapsed < 1.5, elapsed
+
+
+def test_crashed_tab_is_replaced():
+    """测试标签页崩溃时新建标签页并重试任务"""
+    print("🔍 测试标签页崩溃重试")
+
+    async def run(stub: TikTokShopStub):
+        async with FakeCdpBrowser(crash_after=1) as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                engine = CdpCrawlEngine(browser, concurrency=1, retry_engine=_fast_retry())
+
+                async def handler(tab, keyword):
+                    await tab.navigate(stub.search_url(keyword))
+                    return await tab.inner_html("#__MODERN_ROUTER_DATA__")
+
+                results = await engine.run(["a", "b", "c"], handler)
+            return results, fake.stats
+
+    with TikTokShopStub(products_per_page=1, max_pages=1) as stub:
+        results, stats = asyncio.run(run(stub))
+    assert all(result and "loaderData" in result for result in results)
+    assert stats["targets_created"] == 3 and stats["navigations"] == 3
+
+
+def test_captcha_detection_and_run_blocking():
+    """测试协程版滑块处理器识别验证码页、返回是否遇到验证码和是否处理失败，以及同步函数放到线程池执行"""
+    print("🔍 测试验证码识别")
+
+    class MissDetector:
+        def slide_match(self, target_bytes, background_bytes):
+            return {"target": [0, 0]}
+
+    async def run(stub: TikTokShopStub):
+        handler = CdpSliderHandler(det=MissDetector(), max_attempts=1, verify_timeout=0.5)
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                tab = await browser.new_tab()
+                await tab.navigate(stub.search_url("mug"))
+                assert await handler.detect(tab)
+                # 滑块拖到最左侧不会通过: 遇到验证码且处理失败
+                assert await handler.handle_captcha(tab) == (True, True)
+                await tab.navigate(f"{stub.base_url}{PRODUCT_LIST_PATH}?keyword=mug&page=2")
+                assert not await handler.detect(tab)
+                assert await handler.handle_captcha(tab) == (False, False)
+        assert await run_blocking(sum, [1, 2, 3]) == 6
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        samples = generate_synthetic_corpus(corpus_dir, count=1, seed=3)
+        with TikTokShopStub(products_per_page=1, max_pages=1, captcha_rate=1.0, captcha_samples=samples) as stub:
+            asyncio.run(run(stub))
+
+
+def main():
+    """主函数"""
+    print("CDP异步引擎测试")
+    print("=" * 50)
+    test_navigation_network_and_dom()
+    test_concurrent_keywords_with_pagination()
+    test_crashed_tab_is_replaced()
+    test_captcha_detection_and_run_blocking()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
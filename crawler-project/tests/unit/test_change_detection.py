@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+商品变化检测测试
+验证指纹规范化、未变化商品不写库、变化时只更新变化字段并记录快照，
+以及多个worker共享商品集合时按库中指纹判断变化（其他worker的修改不会因本地缓存被跳过）
+"""
+import os
+import sys
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from models.product import ProductData
+from utils.database import DatabaseManager
+from utils.change_detection import (
+    ChangeDetector, compute_fingerprint, tracked_values, CHANGE_NEW, CHANGE_UPDATED, CHANGE_UNCHANGED
+)
+from memory_collection import MemoryCollection
+
+FIELDS = ["title", "current_price", "sold_count", "review_count"]
+
+
+class CountingCollection(MemoryCollection):
+    """记录实际修改或插入文档的写操作次数（条件不匹配的更新不计）"""
+
+    def __init__(self, name: str = "products"):
+        super().__init__(name)
+        self.writes = 0
+
+    def insert_one(self, document: dict):
+        self.writes += 1
+        return super().insert_one(document)
+
+    def update_one(self, query, update, upsert=False):
+        result = super().update_one(query, update, upsert)
+        # 已存在时 $setOnInsert 不修改文档
+        self.writes += bool(result.matched_count and update.get("$set") or result.upserted_id is not None)
+        return result
+
+    def find_one_and_update(self, query, update, projection=None, return_document=False):
+        before = super().find_one_and_update(query, update, projection, return_document)
+        self.writes += before is not None
+        return before
+
+
+def _product(price: float = 19.99, sold: int = 100, title: str = "Phone Case") -> ProductData:
+    return ProductData(product_id="1001", title=title, search_keyword="phone case",
+                       current_price=price, origin_price=29.99, sold_count=sold, review_count=5)
+
+
+def test_fingerprint_normalization():
+    """测试数值和空白的规范化"""
+    print("🔍 测试指纹规范化")
+    a = tracked_values({"title": "Case ", "current_price": 10, "sold_count": 3.0}, FIELDS)
+    b = tracked_values({"title": "Case", "current_price": 10.0, "sold_count": 3}, FIELDS)
+    assert compute_fingerprint(a) == compute_fingerprint(b)
+    c = tracked_values({"title": "Case", "current_price": 10.5, "sold_count": 3}, FIELDS)
+    assert compute_fingerprint(a) != compute_fingerprint(c)
+
+
+def test_delta_writes_and_snapshots():
+    """测试新商品、未变化、变化三种情况的写入"""
+    print("🔍 测试增量写入和快照")
+    products = CountingCollection()
+    snapshots = MemoryCollection("product_snapshots")
+    detector = ChangeDetector(products, snapshots, fields=FIELDS)
+
+    assert detector.save(_product()).status == CHANGE_NEW
+    assert detector.save(_product()).status == CHANGE_UNCHANGED
+    assert products.writes == 1
+
+    result = detector.save(_product(price=17.99, sold=120))
+    assert result.status == CHANGE_UPDATED
+    assert result.changes == {"current_price": [19.99, 17.99], "sold_count": [100, 120]}
+    assert products.writes == 2
+
+    doc = products.find_one({"product_id": "1001"})
+    assert doc["current_price"] == 17.99 and doc["sold_count"] == 120
+    assert doc["fingerprint"] == result.fingerprint
+    assert detector.stats == {CHANGE_NEW: 1, CHANGE_UPDATED: 1, CHANGE_UNCHANGED: 1}
+
+    history = list(snapshots.find({"product_id": "1001"}))
+    assert len(history) == 2
+    assert history[0]["values"]["current_price"] == 19.99
+    assert history[1]["changes"] == result.changes
+    assert history[1]["previous_fingerprint"] == history[0]["fingerprint"]
+
+
+def test_cache_miss_reads_existing_documents():
+    """测试缓存未命中时按库中文档比较，兼容没有指纹字段的旧文档"""
+    print("🔍 测试旧文档兼容")
+    products = CountingCollection()
+    products.insert_one(_product().to_dict())
+    products.writes = 0
+
+    detector = ChangeDetector(products, None, fields=FIELDS, cache_size=1)
+    # 旧文档第一次比较时补写指纹，字段未变
+    assert detector.save(_product()).status == CHANGE_UNCHANGED
+    assert products.find_one({"product_id": "1001"})["fingerprint"]
+    assert detector.save(_product()).status == CHANGE_UNCHANGED
+    assert detector.save(_product(title="Phone Case v2")).status == CHANGE_UPDATED
+    assert products.writes == 2 and products.count_documents({}) == 1
+
+
+def test_shared_collection_across_workers():
+    """测试两个worker（各自的缓存）交替写同一商品: 不丢失更新，不重复插入"""
+    print("🔍 测试多worker共享商品集合")
+    products = CountingCollection()
+    snapshots = MemoryCollection("product_snapshots")
+    worker_a = ChangeDetector(products, snapshots, fields=FIELDS)
+    worker_b = ChangeDetector(products, snapshots, fields=FIELDS)
+
+    assert worker_a.save(_product()).status == CHANGE_NEW
+    # b 没见过该商品，插入时发现已存在，按库中指纹比较
+    assert worker_b.save(_product()).status == CHANGE_UNCHANGED
+    assert worker_b.save(_product(price=17.99)).status == CHANGE_UPDATED
+    # a 缓存中仍是19.99，库中已是17.99: 写回19.99是一次变化，而不是按缓存判断为未变化
+    result = worker_a.save(_product())
+    assert result.status == CHANGE_UPDATED and result.changes == {"current_price": [17.99, 19.99]}
+    assert products.find_one({"product_id": "1001"})["current_price"] == 19.99
+    # 库中已是b要写的值时不再写入
+    assert worker_b.save(_product()).status == CHANGE_UNCHANGED
+    assert products.count_documents({}) == 1 and products.writes == 3
+    assert snapshots.count_documents({}) == 3
+
+
+def test_database_manager_delta():
+    """测试 DatabaseManager.save_product_delta"""
+    print("🔍 测试数据库管理器增量写入")
+    db_manager = DatabaseManager()
+    db_manager.collection = MemoryCollection()
+    db_manager.snapshot_collection = MemoryCollection("product_snapshots")
+    assert db_manager.save_product_delta(_product()).status == CHANGE_NEW
+    assert db_manager.save_product_delta(_product()).status == CHANGE_UNCHANGED
+    assert db_manager.collection.count_documents({}) == 1
+    assert db_manager.snapshot_collection.count_documents({}) == 1
+
+
+def main():
+    """主函数"""
+    print("商品变化检测测试")
+    print("=" * 50)
+    test_fingerprint_normalization()
+    test_delta_writes_and_snapshots()
+    test_cache_miss_reads_existing_documents()
+    test_shared_collection_across_workers()
+    test_database_manager_delta()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
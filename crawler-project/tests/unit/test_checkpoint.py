@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+断点续爬日志测试
+验证进度记录、重启恢复、写了一半的行、批次完成清理、Mongo后端，
+以及重爬调度改变关键词顺序后重启仍使用同一个断点日志
+"""
+import os
+import sys
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from config import Config
+from utils.checkpoint import (
+    CrawlCheckpoint, FileJournalStore, MongoJournalStore, make_run_id,
+    STATUS_DONE, STATUS_FAILED, STATUS_IN_PROGRESS
+)
+from memory_collection import MemoryCollection
+
+KEYWORDS = ["phone case", "wireless charger", "laptop stand"]
+
+
+def _simulate_crash(checkpoint: CrawlCheckpoint):
+    """第一个关键词完成，第二个采集到第2页时中断"""
+    checkpoint.start_keyword("phone case")
+    checkpoint.record_page("phone case", 1, 30, cursor=2)
+    checkpoint.record_page("phone case", 2, 28, cursor=3)
+    checkpoint.finish_keyword("phone case")
+    checkpoint.start_keyword("wireless charger")
+    checkpoint.record_page("wireless charger", 1, 30, cursor=2)
+    checkpoint.record_page("wireless charger", 2, 30, cursor={"offset": 60})
+    checkpoint.close()
+
+
+def test_file_journal_resume():
+    """测试文件后端重启后恢复进度"""
+    print("🔍 测试断点恢复")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "run.jsonl")
+        _simulate_crash(CrawlCheckpoint("run-1", FileJournalStore(path)))
+
+        # 模拟进程在写最后一行时被杀
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"run_id": "run-1", "seq": 99, "event": "pa')
+
+        resumed = CrawlCheckpoint("run-1", FileJournalStore(path))
+        assert resumed.resumed
+        assert resumed.pending(KEYWORDS) == ["wireless charger", "laptop stand"]
+        progress = resumed.get_progress("wireless charger")
+        assert progress.status == STATUS_IN_PROGRESS
+        assert progress.pages_done == [1, 2] and progress.next_page() == 3
+        assert progress.cursor == {"offset": 60} and progress.products == 60
+        assert resumed.get_progress("laptop stand").next_page() == 1
+        assert resumed.summary()["products"] == 118
+
+        # 重启后继续写入，序号接着之前的记录
+        resumed.start_keyword("wireless charger")
+        resumed.record_page("wireless charger", 3, 10)
+        resumed.finish_keyword("wireless charger")
+        resumed.start_keyword("laptop stand")
+        resumed.finish_keyword("laptop stand", failed=True, error="滑块验证处理失败")
+        resumed.close()
+
+        again = CrawlCheckpoint("run-1", FileJournalStore(path))
+        assert again.get_progress("wireless charger").attempts == 2
+        assert again.get_progress("laptop stand").status == STATUS_FAILED
+        assert again.pending(KEYWORDS) == ["laptop stand"]
+
+        # 其他批次的记录互不影响
+        assert not CrawlCheckpoint("run-2", FileJournalStore(path)).resumed
+
+        again.complete()
+        assert not os.path.exists(path)
+        assert not CrawlCheckpoint("run-1", FileJournalStore(path)).resumed
+    print("✅ 断点恢复测试通过")
+
+
+def test_duplicate_page_not_double_counted():
+    """测试同一页重复记录时商品数不重复累计"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint = CrawlCheckpoint("run", FileJournalStore(os.path.join(tmp_dir, "run.jsonl")))
+        checkpoint.record_page("kw", 1, 30)
+        checkpoint.record_page("kw", 1, 30)
+        assert checkpoint.get_progress("kw").products == 30
+        checkpoint.close()
+
+
+def test_mongo_journal_resume():
+    """测试Mongo后端"""
+    collection = MemoryCollection("crawl_checkpoints")
+    _simulate_crash(CrawlCheckpoint("run-1", MongoJournalStore(collection)))
+    resumed = CrawlCheckpoint("run-1", MongoJournalStore(collection))
+    assert resumed.is_done("phone case")
+    assert resumed.get_progress("phone case").status == STATUS_DONE
+    assert resumed.get_progress("wireless charger").next_page() == 3
+    resumed.complete()
+    assert collection.count_documents({"run_id": "run-1"}) == 0
+
+
+def test_make_run_id_is_stable():
+    """测试同一批关键词得到相同的批次ID"""
+    assert make_run_id("spider", KEYWORDS, 2) == make_run_id("spider", list(KEYWORDS), 2)
+    assert make_run_id("spider", KEYWORDS, 2) != make_run_id("spider", KEYWORDS, 3)
+    assert make_run_id("spider", KEYWORDS, 2).startswith("spider-")
+
+
+class CrashingSpider:
+    """CrawlabSpider 的关键词采集替身: 记录每个关键词的起始页，指定关键词采集完第1页后中断"""
+
+    def __init__(self, spider, crash_keyword: str = ""):
+        self.spider = spider
+        self.crash_keyword = crash_keyword
+        self.calls = []
+
+    def crawl_keyword(self, keyword: str, max_pages: int, start_page: int = 1):
+        self.calls.append((keyword, start_page))
+        for page in range(start_page, max_pages + 1):
+            self.spider.checkpoint.record_page(keyword, page, 10, cursor=page + 1)
+            if keyword == self.crash_keyword:
+                raise KeyboardInterrupt("进程被终止")
+        self.spider.checkpoint.finish_keyword(keyword)
+        return []
+
+
+def test_scheduled_batch_resumes_same_journal():
+    """测试批次ID按调度前的候选关键词计算: 重启后到期列表顺序变化，仍从中断的页继续"""
+    print("🔍 测试重爬调度下的断点续爬")
+    from crawlab_spider import CrawlabSpider
+
+    saved = (Config.CHECKPOINT_DIR, Config.CHECKPOINT_BACKEND, Config.CHECKPOINT_RUN_ID)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            Config.CHECKPOINT_DIR, Config.CHECKPOINT_BACKEND, Config.CHECKPOINT_RUN_ID = tmp_dir, "file", ""
+            spider = CrawlabSpider()
+            stub = CrashingSpider(spider, crash_keyword="wireless charger")
+            spider.crawl_keyword = stub.crawl_keyword
+            try:
+                spider.run_keyword_batch(["phone case", "wireless charger"], 3, batch_keywords=KEYWORDS)
+                raise AssertionError("应在第二个关键词中断")
+            except KeyboardInterrupt:
+                spider.checkpoint.close()
+
+            # 重启后调度器给出的到期列表不同（已完成的关键词不再到期，顺序也变了）
+            spider = CrawlabSpider()
+            stub = CrashingSpider(spider)
+            spider.crawl_keyword = stub.crawl_keyword
+            spider.run_keyword_batch(["laptop stand", "wireless charger"], 3, batch_keywords=list(reversed(KEYWORDS)))
+            assert stub.calls == [("laptop stand", 1), ("wireless charger", 2)]
+            assert not os.listdir(tmp_dir), "全部完成后应清空断点日志"
+        finally:
+            Config.CHECKPOINT_DIR, Config.CHECKPOINT_BACKEND, Config.CHECKPOINT_RUN_ID = saved
+
+
+def main():
+    """主函数"""
+    print("断点续爬日志测试")
+    print("=" * 50)
+    test_file_journal_resume()
+    test_duplicate_page_not_double_counted()
+    test_mongo_journal_resume()
+    test_make_run_id_is_stable()
+    test_scheduled_batch_resumes_same_journal()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
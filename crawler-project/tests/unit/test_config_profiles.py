@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+配置档案测试
+验证 环境变量 > 配置档案 > 默认值 的优先级、只读配置快照与校验、
+关键词文件缓存，以及 dump_config 命令行输出
+配置在导入时计算，涉及档案选择的用例在子进程中运行
+"""
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import Config, PROFILES, get_settings, load_settings, validate_settings
+
+DUMP_CONFIG = os.path.join(project_root, "scripts", "deploy", "dump_config.py")
+
+
+def run_python(args, env: dict) -> subprocess.CompletedProcess:
+    full_env = {k: v for k, v in os.environ.items() if not k.startswith("CRAWLER_PROFILE")}
+    full_env.update(env)
+    return subprocess.run([sys.executable] + args, cwd=project_root, env=full_env,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_profile_precedence():
+    """测试环境变量覆盖档案，档案覆盖默认值"""
+    print("🔍 测试配置优先级")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "custom.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("MAX_DELAY: 7\nPAGE_LOAD_TIMEOUT: 12\nHEADLESS_MODE: true\nOUTPUT_FORMATS: [jsonl, csv]\n")
+        code = ("from config import Config, SETTING_SOURCES, get_settings; import json; "
+                "print(json.dumps([Config.MAX_DELAY, Config.PAGE_LOAD_TIMEOUT, Config.HEADLESS_MODE, "
+                "Config.OUTPUT_FORMATS, SETTING_SOURCES['PAGE_LOAD_TIMEOUT'][1], "
+                "SETTING_SOURCES['MAX_DELAY'][1], SETTING_SOURCES['MAX_RETRY'][1], list(get_settings().errors)]))")
+        result = run_python(["-c", code], {"CRAWLER_PROFILE_FILE": path, "PAGE_LOAD_TIMEOUT": "15"})
+        assert result.returncode == 0, result.stderr
+        values = json.loads(result.stdout.strip().splitlines()[-1])
+        assert values == [7.0, 15, True, ["jsonl", "csv"], "env", "profile", "default", []]
+
+
+def test_settings_snapshot_and_validation():
+    """测试配置快照只读、全局只生成一次，以及校验错误"""
+    print("🔍 测试配置快照与校验")
+    settings = get_settings()
+    assert settings is get_settings() and settings.ok and Config.validate_config()
+    assert settings.PROFILE in PROFILES and settings["MAX_RETRY"] == Config.MAX_RETRY
+    assert isinstance(settings.OUTPUT_FORMATS, tuple) and "build_search_url" not in settings
+    for assign in (lambda: setattr(settings, "MAX_RETRY", 9), lambda: settings._values.__setitem__("X", 1)):
+        try:
+            assign()
+            assert False, "配置应为只读"
+        except (AttributeError, TypeError):
+            pass
+    assert json.dumps(settings.to_dict())
+
+    values = dict(load_settings())
+    values.update(MIN_DELAY=3, MAX_DELAY=1, CDP_CONCURRENCY=0, MEMORY_TAB_RECYCLE_RATIO=1.5,
+                  RESULT_SINK="kafka", OUTPUT_FORMATS=("xml",), BASE_URL="http://example.com", RETRY_DELAY=-1)
+    errors = "\n".join(validate_settings(values))
+    for expected in ("MAX_DELAY必须大于等于MIN_DELAY", "CDP_CONCURRENCY必须大于0", "MEMORY_TAB_RECYCLE_RATIO",
+                     "RESULT_SINK", "xml", "BASE_URL必须是HTTPS", "RETRY_DELAY不能为负数"):
+        assert expected in errors, expected
+
+
+def test_keywords_file_cached():
+    """测试关键词文件只在修改后重新读取"""
+    print("🔍 测试关键词缓存")
+    saved = Config.KEYWORDS_FILE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "keywords.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("mug\n\nphone case\n")
+        try:
+            Config.KEYWORDS_FILE = path
+            assert Config.get_keywords() == ["mug", "phone case"]
+            cached = Config._keywords_cache[(path, os.path.getmtime(path))]
+            Config.get_keywords().append("被调用方修改")
+            assert Config.get_keywords() == ["mug", "phone case"] and cached == ["mug", "phone case"]
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("lamp\n")
+            os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+            assert Config.get_keywords() == ["lamp"] and len(Config._keywords_cache) == 1
+        finally:
+            Config.KEYWORDS_FILE = saved
+    assert Config.get_keywords()
+
+
+def test_dump_config_cli():
+    """测试输出生效配置和校验失败时的返回码"""
+    print("🔍 测试dump_config")
+    result = run_python([DUMP_CONFIG, "--profile", "benchmark", "--format", "json"], {})
+    assert result.returncode == 0, result.stderr
+    dumped = json.loads(result.stdout)
+    assert dumped["PROFILE"] == "benchmark" and dumped["LOG_LEVEL"] == "WARNING"
+
+    result = run_python([DUMP_CONFIG, "--profile", "crawlab", "--format", "env", "--sources"], {"LOG_LEVEL": "ERROR"})
+    lines = result.stdout.splitlines()
+    assert "LOG_LEVEL=ERROR  # env" in lines and "DATABASE_NAME=crawlab_test  # profile" in lines
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "bad.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"CDP_CONCURENCY": 3, "MIN_DELAY": 0}, f)
+        result = run_python([DUMP_CONFIG, "--profile-file", path, "--check"], {})
+        assert result.returncode == 1 and "CDP_CONCURENCY" in result.stderr and "MIN_DELAY" in result.stderr
+
+
+def main():
+    """主函数"""
+    print("配置档案测试")
+    print("=" * 50)
+    test_profile_precedence()
+    test_settings_snapshot_and_validation()
+    test_keywords_file_cached()
+    test_dump_config_cli()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
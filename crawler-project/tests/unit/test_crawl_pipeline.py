@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+采集流水线测试
+验证取页与解析/入库重叠执行、队列满时取页阻塞（背压）、结果按页顺序、按批和按超时入库、
+单页解析或单批入库失败不影响其他页面，CompleteTikTokCrawler 的解析和批量入库阶段（写库失败计入 persist_errors），
+以及多个关键词流水线采集时商品入库后不在内存中保留
+"""
+import os
+import sys
+import time
+import threading
+
+from pymongo.errors import OperationFailure
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from config import Config
+from utils.crawl_pipeline import CrawlPipeline, FetchedPage, open_crawl_pipeline, PAGE_API
+from bench_common import StageTimer
+from crawl_throughput_benchmark import HttpStubCrawler, _new_complete_crawler, _point_runners_at
+from tiktok_shop_stub import TikTokShopStub
+from memory_collection import MemoryCollection
+
+URL_SETTINGS = ("BASE_URL", "TARGET_URL", "SHOP_BASE_URL", "SEARCH_BASE_URL", "PRODUCT_LIST_API_URL")
+
+
+class BrokenCollection(MemoryCollection):
+    """所有写入都失败的集合"""
+
+    def _fail(self, *args, **kwargs):
+        raise OperationFailure("not primary")
+
+    update_one = bulk_write = find_one_and_update = _fail
+
+
+def fake_products(page: FetchedPage):
+    return [{"product_id": f"{page.keyword}-{page.page}-{i}"} for i in range(page.payload)]
+
+
+def test_fetch_overlaps_parse_with_backpressure():
+    """测试解析进行中取页继续，队列满时取页阻塞"""
+    print("🔍 测试阶段重叠和背压")
+    release = threading.Event()
+    parsing = []
+
+    def slow_parse(page):
+        parsing.append(page.keyword)
+        release.wait(5)
+        return fake_products(page)
+
+    persisted = []
+    with CrawlPipeline(slow_parse, persisted.extend, parse_workers=1, queue_size=2,
+                       persist_batch_size=100, persist_interval=0.05) as pipeline:
+        # 关键词a在解析时，b、c的页面仍可提交（队列容量2）
+        pipeline.submit(FetchedPage("a", 1, 3))
+        while not parsing:
+            time.sleep(0.01)
+        pipeline.submit(FetchedPage("b", 1, 3))
+        pipeline.submit(FetchedPage("c", 1, 3))
+        assert pipeline.stats()["pending_pages"] == 2 and persisted == []
+
+        # 队列已满，下一页阻塞到解析腾出空位
+        threading.Timer(0.3, release.set).start()
+        start = time.perf_counter()
+        pipeline.submit(FetchedPage("d", 1, 3))
+        assert time.perf_counter() - start >= 0.25
+    stats = pipeline.stats()
+    assert stats["pages"] == 4 and stats["parsed"] == stats["persisted"] == 12
+    assert stats["fetch_blocked_seconds"] >= 0.25
+    assert sorted(p["product_id"] for p in persisted) == sorted(
+        f"{k}-1-{i}" for k in "abcd" for i in range(3))
+
+
+def test_results_ordered_and_batched():
+    """测试乱序解析完成后结果仍按页顺序，整批立即写入、不足一批等到超时"""
+    print("🔍 测试结果顺序和批量入库")
+
+    def parse(page):
+        # 靠前的页解析更慢，完成顺序与提交顺序相反
+        time.sleep(0.05 * (5 - page.page))
+        return fake_products(page)
+
+    batches = []
+    with CrawlPipeline(parse, lambda batch: batches.append(len(batch)), parse_workers=4,
+                       persist_batch_size=10, persist_interval=60) as pipeline:
+        for page in range(1, 5):
+            pipeline.submit(FetchedPage("mug", page, 4, PAGE_API))
+    assert [p["product_id"] for p in pipeline.results()["mug"]] == [f"mug-{p}-{i}" for p in range(1, 5) for i in range(4)]
+    # 16个商品: 满10条写一批，剩余6条在关闭时写入
+    assert batches == [10, 6] and pipeline.stats()["batches"] == 2
+
+    batches = []
+    pipeline = CrawlPipeline(fake_products, lambda batch: batches.append(len(batch)),
+                             persist_batch_size=100, persist_interval=0.1).start()
+    pipeline.submit(FetchedPage("lamp", 1, 5))
+    time.sleep(0.5)
+    assert batches == [5], "不足一批的商品应在超时后写入"
+    pipeline.close()
+    pipeline.close()
+    try:
+        pipeline.submit(FetchedPage("lamp", 2, 1))
+        assert False, "关闭后不能再提交"
+    except RuntimeError:
+        pass
+
+
+def test_stage_errors_isolated():
+    """测试单页解析失败、单批入库失败不影响其他页面"""
+    print("🔍 测试阶段错误隔离")
+
+    def parse(page):
+        if page.page == 2:
+            raise ValueError("坏数据")
+        return fake_products(page)
+
+    calls = []
+
+    def persist(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise ConnectionError("写库失败")
+        return len(batch) - 1
+
+    with CrawlPipeline(parse, persist, parse_workers=1, persist_batch_size=3, persist_interval=60) as pipeline:
+        for page in range(1, 4):
+            pipeline.submit(FetchedPage("cup", page, 3))
+    stats = pipeline.stats()
+    assert stats["parse_errors"] == 1 and stats["parsed"] == 6
+    # 第一批整批失败，第二批只保存成功两个
+    assert stats["persist_errors"] == 4 and stats["persisted"] == 2 and stats["batches"] == 1
+    assert len(pipeline.results()["cup"]) == 6
+
+    saved = Config.PIPELINE_ENABLED
+    try:
+        Config.PIPELINE_ENABLED = False
+        assert open_crawl_pipeline(parse, persist) is None
+    finally:
+        Config.PIPELINE_ENABLED = saved
+
+
+def test_crawler_pipeline_stages():
+    """测试 CompleteTikTokCrawler 解析原始页面数据，批量入库时一次查询去重"""
+    print("🔍 测试爬虫解析和批量入库阶段")
+    saved = {name: getattr(Config, name) for name in URL_SETTINGS + ("PRODUCT_DELTA_WRITES",)}
+    try:
+        with TikTokShopStub(products_per_page=20, max_pages=3) as stub:
+            _point_runners_at(stub.base_url)
+            for delta in (False, True):
+                Config.PRODUCT_DELTA_WRITES = delta
+                crawler = _new_complete_crawler(with_browser=False)
+                runner = HttpStubCrawler(crawler, StageTimer())
+                with CrawlPipeline(crawler.parse_fetched_page, crawler.save_products_to_db,
+                                   persist_batch_size=25) as pipeline:
+                    for keyword in ("phone case", "mug"):
+                        assert runner.fetch_keyword_pages(keyword, 3, stub.base_url, pipeline) == 3
+                results = pipeline.results()
+                assert [len(results[k]) for k in ("phone case", "mug")] == [60, 60]
+                assert results["mug"][0]["search_keyword"] == "mug"
+                collection = crawler.db_manager.collection
+                assert collection.count_documents({}) == pipeline.stats()["persisted"] == 120
+
+                # 重复的一批: 已入库的不再写入，算作保存成功
+                assert crawler.save_products_to_db(results["mug"][:10] + results["mug"][:5]) == 15
+                assert collection.count_documents({}) == 120
+
+                # 写库失败的商品不算保存成功，流水线计入 persist_errors
+                crawler.db_manager.collection = BrokenCollection()
+                with CrawlPipeline(lambda page: page.payload, crawler.save_products_to_db) as pipeline:
+                    pipeline.submit(FetchedPage("mug", 1, results["mug"][:10], PAGE_API))
+                assert pipeline.stats()["persisted"] == 0 and pipeline.stats()["persist_errors"] == 10
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def test_pipelined_keywords_not_retained():
+    """测试多个关键词经 scrape_keywords_pipelined 采集: 商品全部入库、按关键词返回数量，流水线不保留商品"""
+    print("🔍 测试多关键词流水线采集")
+    saved = {name: getattr(Config, name) for name in URL_SETTINGS + ("PIPELINE_ENABLED", "PRODUCT_DELTA_WRITES")}
+    keywords = ["phone case", "mug", "desk lamp", "yoga mat"]
+    try:
+        with TikTokShopStub(products_per_page=10, max_pages=3) as stub:
+            _point_runners_at(stub.base_url)
+            Config.PRODUCT_DELTA_WRITES = False
+            for enabled in (True, False):
+                Config.PIPELINE_ENABLED = enabled
+                crawler = _new_complete_crawler(with_browser=False)
+                runner = HttpStubCrawler(crawler, StageTimer())
+                pipelines = []
+
+                def scrape(keyword, page_count, pipeline=None):
+                    # 浏览器取页换成直接请求桩服务
+                    if pipeline is None:
+                        return runner.scrape_keyword_products(keyword, page_count, stub.base_url)
+                    pipelines.append(pipeline)
+                    runner.fetch_keyword_pages(keyword, page_count, stub.base_url, pipeline)
+                    return []
+                crawler.scrape_keyword_products = scrape
+
+                counts = crawler.scrape_keywords_pipelined(keywords, 3)
+                assert counts == {keyword: 30 for keyword in keywords}, counts
+                assert crawler.db_manager.collection.count_documents({}) == 120
+                assert crawler.db_manager.collection.count_documents({"search_keyword": "yoga mat"}) == 30
+                if enabled:
+                    assert pipelines and not pipelines[0].keep_results and pipelines[0].results() == {}
+                    assert pipelines[0].stats()["persisted"] == 120
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def main():
+    """主函数"""
+    print("采集流水线测试")
+    print("=" * 50)
+    test_fetch_overlaps_parse_with_backpressure()
+    test_results_ordered_and_batched()
+    test_stage_errors_isolated()
+    test_crawler_pipeline_stages()
+    test_pipelined_keywords_not_retained()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+采集统计累加器测试
+验证 HyperLogLog 去重数误差、流式分位数相对误差、多线程更新时随时查询，
+以及数据提取器统计不再遍历已提取的商品
+"""
+import os
+import sys
+import random
+import threading
+from types import SimpleNamespace
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from models.product import ProductData
+import handlers.extractor as extractor_module
+from handlers.extractor import DataExtractor
+from utils.crawl_stats import CrawlStats, HyperLogLog, QuantileSketch, format_summary
+
+
+def make_product(index: int, keyword: str = "mug", shop: str = "") -> ProductData:
+    return ProductData(product_id=f"p{index}", title=f"商品 {index}", search_keyword=keyword,
+                       current_price=1.0 + index % 100, origin_price=200.0, shop_name=shop or f"shop{index % 50}",
+                       slider_encountered=index % 2 == 0, slider_solved=index % 4 == 0)
+
+
+def test_hyperloglog():
+    """测试去重计数: 数量少时精确，大量时误差在标准误差的3倍以内"""
+    print("🔍 测试HyperLogLog")
+    hll = HyperLogLog(precision=12)
+    for i in range(300):
+        hll.add(f"keyword-{i % 100}")
+    hll.add("")
+    assert hll.count() == 100
+
+    for i in range(200000):
+        hll.add(f"shop-{i}")
+    error = abs(hll.count() - 200100) / 200100
+    assert error < 3 * 1.04 / (4096 ** 0.5), error
+
+
+def test_quantile_sketch():
+    """测试流式分位数相对误差和空样本"""
+    print("🔍 测试流式分位数")
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    assert sketch.quantile(0.5) is None and format_summary(sketch.summary()) == "无"
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1) for _ in range(50000)] + [0.0] * 10
+    for value in values:
+        sketch.add(value)
+    values.sort()
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.011, (q, sketch.quantile(q), exact)
+    assert sketch.quantile(0) == 0.0 and sketch.quantile(1) == values[-1]
+    # 桶数只与数值范围有关
+    assert len(sketch._buckets) < 1000
+
+
+def test_concurrent_updates_and_snapshots():
+    """测试多线程更新时持续查询"""
+    print("🔍 测试并发更新")
+    stats = CrawlStats()
+    snapshots = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            snapshots.append(stats.snapshot())
+
+    def writer(worker: int):
+        for i in range(2000):
+            stats.record_product(make_product(worker * 2000 + i, keyword=f"kw{i % 20}"))
+            if i % 100 == 0:
+                stats.record_captcha(i % 200 == 0, seconds=2.5)
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    writers = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    reader_thread.join()
+
+    snapshot = stats.snapshot()
+    assert snapshot["products"] == 8000 and snapshot["distinct_keywords"] == 20
+    assert snapshot["distinct_shops"] == 50 and snapshot["products_slider_encountered"] == 4000
+    assert snapshot["captcha_encountered"] == 80 and snapshot["captcha_solved"] == 40
+    assert snapshot["captcha_success_rate"] == 50 and abs(snapshot["captcha_seconds"]["p50"] - 2.5) < 0.03
+    assert snapshot["price"]["min"] == 1.0 and snapshot["price"]["max"] == 100.0
+    assert all(s.get("products", 0) <= 8000 for s in snapshots)
+    assert "p50=" in format_summary(snapshot["captcha_seconds"], unit="s")
+
+
+class CardWebDriverManager:
+    """WebDriverManager 替身: 每个关键词一页商品卡片"""
+
+    def search_products(self, keyword: str) -> bool:
+        return True
+
+    def extract_products_from_page(self, keyword: str, page_num: int = 1):
+        index = int(keyword[2:])
+        return [{"keyword": keyword, "title": f"商品 {i}", "price": 1.0 + i, "shop_name": f"shop{i % 2}",
+                 "sales_count": i, "product_id": f"p{i}", "slider_encountered": i % 2 == 0,
+                 "slider_solved": i % 4 == 0} for i in range(index, 8, 3)]
+
+
+def test_extractor_statistics_from_accumulator():
+    """测试提取器把商品卡片转换为商品并计入统计，统计来自累加器，清空数据时一起清空"""
+    print("🔍 测试提取器统计")
+    saved_time = extractor_module.time
+    extractor_module.time = SimpleNamespace(sleep=lambda seconds: None, time=saved_time.time)
+    try:
+        extractor = DataExtractor(CardWebDriverManager())
+        products = [p for i in range(3) for p in extractor.extract_products_by_keyword(f"kw{i}")]
+    finally:
+        extractor_module.time = saved_time
+    assert len(products) == 8 and products[1].search_keyword == "kw0" and products[1].current_price == 4.0
+    assert extractor.create_product_from_data({"keyword": "kw0", "product_id": "p9"}) is None
+    stats = extractor.get_extraction_statistics()
+    assert stats["total_products"] == 8 and stats["keywords_processed"] == 3 and stats["distinct_shops"] == 2
+    assert stats["slider_encountered_count"] == 4 and stats["slider_solved_count"] == 2
+    assert stats["slider_success_rate"] == 50 and stats["price"]["count"] == 8 and stats["price"]["max"] == 8.0
+    extractor.clear_extracted_data()
+    assert extractor.get_extraction_statistics()["total_products"] == 0
+
+
+def main():
+    """主函数"""
+    print("采集统计累加器测试")
+    print("=" * 50)
+    test_hyperloglog()
+    test_quantile_sketch()
+    test_concurrent_updates_and_snapshots()
+    test_extractor_statistics_from_accumulator()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
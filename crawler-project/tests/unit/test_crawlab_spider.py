@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Crawlab电商爬虫关键词采集测试
+用桩替换浏览器，验证搜索页商品卡片转换为商品后逐页入库、记录断点、写入结果通道和统计，
+以及没有提取到商品的关键词记为失败、断点续爬时不会被跳过
+"""
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+import crawlab_spider
+from config import Config
+from crawlab_spider import CrawlabSpider
+from utils.checkpoint import CrawlCheckpoint, FileJournalStore, STATUS_DONE, STATUS_FAILED
+from utils.rate_controller import RateController
+from utils.result_emitter import ResultEmitter
+from crawl_throughput_benchmark import _memory_db_manager
+
+
+class StubWebDriverManager:
+    """WebDriverManager 替身: 搜索总是成功，每页返回 extract_product_data 格式的商品卡片"""
+
+    def __init__(self, cards_per_page: int):
+        self.cards_per_page = cards_per_page
+
+    def search_products(self, keyword: str) -> bool:
+        return True
+
+    def get_driver(self):
+        return None
+
+    def extract_products_from_page(self, keyword: str, page_num: int = 1):
+        return [{"keyword": keyword, "scraped_at": 1714550400.0, "title": f"{keyword} {page_num}-{i}",
+                 "price": 9.5 + i, "url": f"https://shop.example/p/{page_num}-{i}", "image_url": "",
+                 "shop_name": f"shop{i % 2}", "rating": 4.5, "sales_count": 100 + i,
+                 "product_id": f"{keyword[:3]}-{page_num}-{i}"}
+                for i in range(self.cards_per_page)]
+
+
+class NoSlider:
+    def __init__(self, driver):
+        pass
+
+    def detect_slider(self) -> bool:
+        return False
+
+
+class ListSink:
+    name = "list"
+
+    def __init__(self):
+        self.records = []
+
+    def write_batch(self, lines, records):
+        self.records.extend(json.loads(line) for line in lines)
+
+    def close(self):
+        pass
+
+
+def _spider(cards_per_page: int, checkpoint: CrawlCheckpoint, sink: ListSink) -> CrawlabSpider:
+    spider = CrawlabSpider()
+    spider.db_manager = _memory_db_manager()
+    spider.rate_controller = RateController(enabled=False)
+    spider.session_pool = None
+    spider.proxy_pool = None
+    spider.webdriver_manager = StubWebDriverManager(cards_per_page)
+    spider.checkpoint = checkpoint
+    spider.result_emitter = ResultEmitter(sink, batch_size=100, max_batch_kb=1000, flush_interval=60)
+    return spider
+
+
+def test_page_saved_checkpointed_and_emitted():
+    """测试一页商品卡片转换为商品后入库、记录断点、写入结果通道和统计"""
+    print("🔍 测试关键词采集一页")
+    saved = (Config.PRODUCT_DELTA_WRITES, crawlab_spider.SliderHandler)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            Config.PRODUCT_DELTA_WRITES = True
+            crawlab_spider.SliderHandler = NoSlider
+            checkpoint = CrawlCheckpoint("spider-test", FileJournalStore(os.path.join(tmp_dir, "journal.jsonl")))
+            sink = ListSink()
+            spider = _spider(3, checkpoint, sink)
+            checkpoint.start_keyword("mug")
+            products = spider.crawl_keyword("mug", max_pages=1)
+
+            assert [p.product_id for p in products] == ["mug-1-0", "mug-1-1", "mug-1-2"]
+            assert products[1].search_keyword == "mug" and products[1].current_price == 10.5
+            assert products[1].origin_price == 10.5 and products[1].sold_count == 101
+            assert products[1].product_url == "https://shop.example/p/1-1"
+            document = spider.db_manager.collection.find_one({"product_id": "mug-1-2"})
+            assert document["title"] == "mug 1-2" and document["shop_name"] == "shop0"
+            assert spider.db_manager.collection.count_documents({}) == 3
+
+            progress = checkpoint.get_progress("mug")
+            assert progress.status == STATUS_DONE and progress.products == 3 and progress.next_page() == 2
+            assert [r["product_id"] for r in sink.records] == ["mug-1-0", "mug-1-1", "mug-1-2"]
+            snapshot = spider.crawl_stats.snapshot()
+            assert snapshot["products"] == 3 and snapshot["distinct_shops"] == 2
+
+            # 同一页再采一次: 商品未变化，不再入库和输出，但断点照常推进
+            checkpoint.start_keyword("mug")
+            spider.crawl_keyword("mug", max_pages=1)
+            assert spider.db_manager.collection.count_documents({}) == 3 and len(sink.records) == 3
+            checkpoint.close()
+        finally:
+            Config.PRODUCT_DELTA_WRITES, crawlab_spider.SliderHandler = saved
+
+
+def test_empty_keyword_not_marked_done():
+    """测试没有提取到商品的关键词记为失败，断点续爬时仍在待采集列表中"""
+    print("🔍 测试没有商品的关键词")
+    saved = crawlab_spider.SliderHandler
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            crawlab_spider.SliderHandler = NoSlider
+            checkpoint = CrawlCheckpoint("spider-empty", FileJournalStore(os.path.join(tmp_dir, "journal.jsonl")))
+            spider = _spider(0, checkpoint, ListSink())
+            checkpoint.start_keyword("lamp")
+            assert spider.crawl_keyword("lamp", max_pages=2) == []
+            assert checkpoint.get_progress("lamp").status == STATUS_FAILED
+            assert checkpoint.pending(["lamp"]) == ["lamp"]
+            assert spider.last_keyword_error == "未提取到商品" and spider.stats["failed_keywords"] == 1
+            checkpoint.close()
+        finally:
+            crawlab_spider.SliderHandler = saved
+
+
+def main():
+    """主函数"""
+    print("Crawlab电商爬虫关键词采集测试")
+    print("=" * 50)
+    test_page_saved_checkpointed_and_emitted()
+    test_empty_keyword_not_marked_done()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+关键词来源测试
+验证关键词规范化与去重、布隆过滤器的误判率和固定内存、按哈希分片不重不漏，
+以及从大文件 / Mongo集合流式读取（不需要先读完整个文件）
+"""
+import os
+import sys
+import gzip
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from utils.keyword_source import (
+    BloomFilter, KeywordSource, normalize_keyword, shard_of, parse_source_spec, open_keyword_source,
+    SOURCE_FILE, SOURCE_MONGO, SOURCE_QUEUE, SOURCE_LIST
+)
+from memory_collection import MemoryCollection
+
+
+def test_normalize_and_dedupe():
+    """测试规范化和去重: 大小写、全角、多余空白视为同一关键词"""
+    print("🔍 测试规范化去重")
+    assert normalize_keyword("  ｐｈｏｎｅ　 case \n") == "phone case"
+    source = KeywordSource(["Phone Case", "phone  case", "ＰＨＯＮＥ case", "", "  ", "mug", "x" * 300, "Mug"])
+    assert list(source) == ["Phone Case", "mug"]
+    assert source.stats() == {"source": SOURCE_LIST, "shard": "0/1", "read": 8, "invalid": 3,
+                              "duplicate": 3, "other_shard": 0, "emitted": 2}
+    assert list(KeywordSource(["a", "a"], dedupe=False)) == ["a", "a"]
+
+
+def test_bloom_filter_bounded():
+    """测试布隆过滤器在容量内的误判率和固定内存"""
+    print("🔍 测试布隆过滤器")
+    bloom = BloomFilter(capacity=20000, error_rate=0.01)
+    size = bloom.memory_bytes
+    added = sum(1 for i in range(20000) if bloom.add(f"keyword {i}"))
+    assert added > 19800 and bloom.count == added
+    false_positives = sum(1 for i in range(20000) if f"other {i}" in bloom)
+    assert false_positives / 20000 < 0.02, false_positives
+    assert "keyword 123" in bloom and bloom.memory_bytes == size < 30000
+
+
+def test_sharding_is_deterministic_and_complete():
+    """测试各分片不重不漏，且分片只与关键词有关"""
+    print("🔍 测试分片")
+    keywords = [f"keyword {i}" for i in range(3000)]
+    shards = [list(KeywordSource(keywords + keywords[:100], shard_index=i, shard_count=4)) for i in range(4)]
+    assert sorted(k for shard in shards for k in shard) == sorted(keywords)
+    assert all(500 < len(shard) < 1000 for shard in shards)
+    assert all(shard_of(k, 4) == i for i, shard in enumerate(shards) for k in shard)
+    # 规范化后相同的关键词落在同一分片
+    assert shard_of("Phone  Case", 7) == shard_of("phone case", 7)
+    try:
+        KeywordSource([], shard_index=4, shard_count=4)
+        assert False, "分片序号越界应报错"
+    except ValueError:
+        pass
+
+
+def test_file_mongo_and_queue_sources():
+    """测试文件、gzip文件、Mongo集合和任务队列来源"""
+    print("🔍 测试关键词来源")
+    assert parse_source_spec("file:data/k.txt") == (SOURCE_FILE, "data/k.txt")
+    assert parse_source_spec("mongo:campaign.term") == (SOURCE_MONGO, "campaign.term")
+    assert parse_source_spec("queue") == (SOURCE_QUEUE, "")
+    assert parse_source_spec("mug, lamp") == (SOURCE_LIST, "mug, lamp")
+    assert list(open_keyword_source("mug, lamp,,Mug")) == ["mug", "lamp"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "keywords.txt.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write("# 十万个关键词\n")
+            for i in range(100000):
+                f.write(f"keyword {i % 60000}\n")
+        source = open_keyword_source(f"file:{path}", shard_index=1, shard_count=2)
+        # 流式读取: 取到第一个关键词时只读了文件开头
+        stream = iter(source)
+        next(stream)
+        assert source.counts["read"] < 10
+        rest = list(stream)
+        assert len(rest) + 1 == source.counts["emitted"] and 25000 < source.counts["emitted"] < 35000
+        assert source.counts["duplicate"] > 15000
+        assert open_keyword_source(f"file:{os.path.join(temp_dir, 'missing.txt')}") is None
+
+    db = {"campaign": MemoryCollection()}
+    for term in ["mug", "Lamp", "mug", None]:
+        db["campaign"].insert_one({"term": term, "budget": 1})
+    assert list(open_keyword_source("mongo:campaign.term", db=db)) == ["mug", "Lamp"]
+    assert open_keyword_source("mongo:campaign.term") is None
+
+    source = open_keyword_source("queue")
+    assert source.from_queue and list(source) == []
+
+
+def main():
+    """主函数"""
+    print("关键词来源测试")
+    print("=" * 50)
+    test_normalize_and_dedupe()
+    test_bloom_filter_bounded()
+    test_sharding_is_deterministic_and_complete()
+    test_file_mongo_and_queue_sources()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+延迟导入测试
+验证导入 handlers 包没有副作用、不加载重量级依赖，以及代理对象按需导入
+"""
+import os
+import sys
+import json
+import subprocess
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.lazy_import import lazy_import, module_available, LazyModule
+
+HEAVY_MODULES = ["ddddocr", "onnxruntime", "cv2", "selenium", "DrissionPage", "pandas"]
+
+
+def _import_in_subprocess(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], cwd=project_root,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_handlers_import_is_side_effect_free():
+    """测试导入处理器模块不打印、不改动sys.path、不加载重量级依赖"""
+    print("🔍 测试处理器导入")
+    code = (
+        "import sys, json\n"
+        "before = list(sys.path)\n"
+        "import handlers, handlers.slider, handlers.extractor, handlers.drissionpage_slider_handler\n"
+        "import handlers.enhanced_slider_handler, handlers.hybrid_slider_handler\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'heavy': heavy, 'path_changed': sys.path != before}))\n"
+    )
+    proc = _import_in_subprocess(code)
+    assert proc.returncode == 0, proc.stderr
+    lines = [line for line in proc.stdout.splitlines() if line.strip()]
+    assert len(lines) == 1, f"导入时不应有输出: {lines[:-1]}"
+    result = json.loads(lines[0])
+    assert result == {"heavy": [], "path_changed": False}
+    print("✅ 处理器导入测试通过")
+
+
+def test_package_exports_resolve_on_access():
+    """测试包的导出对象在访问时导入"""
+    import handlers
+    import utils
+    from handlers import DataExtractor
+    assert DataExtractor.__module__ == "handlers.extractor"
+    assert utils.get_logger.__module__ == "utils.logger"
+    try:
+        handlers.NotAHandler
+        assert False, "未知名称应抛出AttributeError"
+    except AttributeError:
+        pass
+
+
+def test_lazy_module_and_attribute():
+    """测试模块代理和属性代理"""
+    module = lazy_import("json")
+    assert isinstance(module, LazyModule) and not module.is_loaded
+    assert module.loads("[1]") == [1] and module.is_loaded
+
+    decoder = lazy_import("json", "JSONDecoder")
+    assert decoder().decode('{"a": 1}') == {"a": 1}
+    exceptions = lazy_import("json")
+    try:
+        exceptions.loads("{")
+    except exceptions.JSONDecodeError:
+        pass
+
+    assert module_available("json")
+    assert not module_available("module_that_does_not_exist")
+    assert not module_available("json.not_a_submodule")
+
+
+def main():
+    """主函数"""
+    print("延迟导入测试")
+    print("=" * 50)
+    test_handlers_import_is_side_effect_free()
+    test_package_exports_resolve_on_access()
+    test_lazy_module_and_attribute()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
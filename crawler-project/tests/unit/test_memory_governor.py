@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+浏览器内存管理测试
+用可替换的RSS读取函数模拟内存增长，验证回收阈值和升级为重启、采样间隔、时间线导出，
+以及 CompleteTikTokCrawler 和 CDP引擎按管理器的决定回收标签页/重启浏览器
+"""
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from config import Config
+from utils.memory_governor import (
+    MemoryGovernor, open_memory_governor, MB,
+    ACTION_NONE, ACTION_RECYCLE_TABS, ACTION_RESTART_BROWSER
+)
+from utils.metrics import read_process_rss
+from utils.cdp_engine import CdpBrowser, CdpCrawlEngine
+from crawl_throughput_benchmark import _new_complete_crawler
+from fake_cdp_browser import FakeCdpBrowser
+from fake_clock import FakeClock
+
+
+class FakeRss:
+    """按进程返回设定的内存，子进程内存另算"""
+
+    def __init__(self, browser_mb: float = 100, children_mb: float = 0):
+        self.browser_mb = browser_mb
+        self.children_mb = children_mb
+
+    def __call__(self, pid: int, include_children: bool = True) -> int:
+        total = self.browser_mb + (self.children_mb if include_children else 0)
+        return int(total * MB)
+
+
+def test_thresholds_and_escalation():
+    """测试回收阈值、回收无效时升级为重启，以及采样间隔"""
+    print("🔍 测试回收阈值")
+    rss = FakeRss(browser_mb=100, children_mb=300)
+    clock = FakeClock(0.0)
+    governor = MemoryGovernor(max_memory_mb=1000, tab_recycle_ratio=0.8, check_interval=10,
+                              name="test", rss_reader=rss, clock=clock)
+
+    assert governor.check(1, tabs=2) == ACTION_NONE
+    # 间隔内不采样
+    rss.children_mb = 2000
+    clock.now = 5
+    assert governor.check(1, tabs=2) == ACTION_NONE
+    assert len(governor.timeline) == 1
+
+    clock.now = 10
+    assert governor.check(1, tabs=2) == ACTION_RESTART_BROWSER
+    governor.recycled(ACTION_RESTART_BROWSER, 2, tabs=1)
+
+    # 接近上限先回收标签页，回收后仍超过回收阈值则重启
+    rss.children_mb = 750
+    clock.now = 20
+    assert governor.check(2, tabs=5) == ACTION_RECYCLE_TABS
+    governor.recycled(ACTION_RECYCLE_TABS, 2, tabs=1)
+    clock.now = 30
+    assert governor.check(2, tabs=1) == ACTION_RESTART_BROWSER
+
+    # 回收有效时恢复正常
+    rss.children_mb = 100
+    clock.now = 40
+    assert governor.check(3, tabs=1) == ACTION_NONE
+
+    stats = governor.stats()
+    assert stats["recycles"] == {ACTION_RESTART_BROWSER: 1, ACTION_RECYCLE_TABS: 1}
+    assert stats["peak_rss_mb"] == 2100.0 and stats["last_rss_mb"] == 200.0
+    events = [(s["event"], s["action"]) for s in governor.timeline_dicts()]
+    assert events[1] == ("sample", ACTION_RESTART_BROWSER) and events[2] == ("after_restart_browser", ACTION_NONE)
+    first = governor.timeline_dicts()[0]
+    assert first["browser_rss"] == 100 * MB and first["children_rss"] == 300 * MB and first["total_rss"] == 400 * MB
+
+
+def test_timeline_export_and_factory():
+    """测试时间线导出、真实进程采样，以及 MAX_MEMORY_MB=0 时不创建管理器"""
+    print("🔍 测试时间线导出")
+    governor = MemoryGovernor(max_memory_mb=1 << 20, check_interval=0, name="export")
+    sample = governor.sample(os.getpid(), tabs=1)
+    assert 0 < sample.browser_rss <= read_process_rss(os.getpid()) * 2
+    assert governor.sample(None).total_rss == 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "memory", "timeline.jsonl")
+        assert governor.export_timeline(path)
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert len(rows) == 2 and rows[0]["crawler"] == "export" and rows[0]["tabs"] == 1
+
+    saved = Config.MAX_MEMORY_MB
+    try:
+        Config.MAX_MEMORY_MB = 0
+        assert open_memory_governor() is None
+        Config.MAX_MEMORY_MB = 512
+        assert open_memory_governor().max_bytes == 512 * MB
+    finally:
+        Config.MAX_MEMORY_MB = saved
+
+
+class FakePage:
+    def __init__(self, pid: int, tabs: int):
+        self.process_id = pid
+        self.tabs_count = tabs
+
+
+class FakeSliderHandler:
+    """只提供内存回收用到的接口"""
+
+    def __init__(self, pid: int, tabs: int = 4, cookies=None):
+        self.page = FakePage(pid, tabs)
+        self.cookies = list(cookies or [])
+        self.closed = False
+
+    def recycle_tabs(self) -> int:
+        closed, self.page.tabs_count = self.page.tabs_count - 1, 1
+        return closed
+
+    def export_cookies(self) -> list:
+        return list(self.cookies)
+
+    def restore_cookies(self, cookies: list) -> bool:
+        self.cookies = list(cookies)
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def test_complete_crawler_recycles_browser():
+    """测试 CompleteTikTokCrawler 回收标签页，以及重启浏览器后恢复cookie"""
+    print("🔍 测试爬虫内存回收")
+    rss = FakeRss(browser_mb=100, children_mb=750)
+    crawler = _new_complete_crawler(with_browser=False)
+    crawler.memory_governor = MemoryGovernor(max_memory_mb=1000, check_interval=0, name="complete_test",
+                                             rss_reader=rss)
+    crawler.slider_handler = FakeSliderHandler(pid=10, tabs=4, cookies=[{"name": "sid", "value": "1"}])
+    old_handler = crawler.slider_handler
+    opened = []
+
+    def open_browser():
+        crawler.slider_handler = FakeSliderHandler(pid=20 + len(opened), tabs=1)
+        opened.append(crawler.slider_handler)
+
+    crawler.open_browser = open_browser
+
+    crawler._govern_memory()
+    assert crawler.slider_handler is old_handler and old_handler.page.tabs_count == 1 and not opened
+
+    # 回收标签页后仍然偏高 -> 重启浏览器，cookie带到新浏览器
+    crawler._govern_memory()
+    assert old_handler.closed and len(opened) == 1
+    assert crawler.slider_handler.cookies == [{"name": "sid", "value": "1"}]
+    assert crawler.memory_governor.timeline[-1].event == "after_restart_browser"
+
+    rss.children_mb = 100
+    crawler._govern_memory()
+    assert len(opened) == 1
+
+
+def test_cdp_engine_recycles_tabs():
+    """测试CDP引擎在内存超限时让每个worker换新标签页"""
+    print("🔍 测试CDP引擎标签页回收")
+    rss = FakeRss(browser_mb=100, children_mb=900)
+
+    async def run():
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                governor = MemoryGovernor(max_memory_mb=1000, check_interval=0, name="cdp_test", rss_reader=rss)
+                engine = CdpCrawlEngine(browser, concurrency=2, memory_governor=governor)
+
+                async def handler(tab, item):
+                    if item == 3:
+                        # 回收后内存降下来
+                        rss.children_mb = 100
+                    return item * 2
+
+                results = await engine.run(list(range(6)), handler)
+                assert engine._browser_pid == os.getpid()
+            return results, fake.stats, governor
+
+    results, stats, governor = asyncio.run(run())
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert stats["targets_created"] > 2 and stats["targets_created"] == stats["targets_closed"]
+    assert governor.recycles[ACTION_RECYCLE_TABS] == stats["targets_created"] - 2
+
+
+def test_cdp_engine_restarts_owned_browser():
+    """测试回收标签页不够时CDP引擎重启它启动的浏览器，进行中的任务结束后各worker在新浏览器上继续"""
+    print("🔍 测试CDP引擎重启浏览器")
+
+    async def run(tmp_dir):
+        async with FakeCdpBrowser() as fake:
+            # 假Chrome: 输出替身的调试地址后退出前保持片刻
+            chrome = os.path.join(tmp_dir, "fake-chrome")
+            ws_url = fake.endpoint.replace("http", "ws") + "/devtools/browser/fake"
+            with open(chrome, "w") as f:
+                f.write(f"#!/bin/sh\necho 'DevTools listening on {ws_url}' >&2\nsleep 1\n")
+            os.chmod(chrome, 0o755)
+
+            async with await CdpBrowser.launch(binary=chrome, timeout=10) as browser:
+                first_pid = browser.process.pid
+                # 只有最初的浏览器进程内存超限
+                governor = MemoryGovernor(max_memory_mb=1000, check_interval=0, name="cdp_restart_test",
+                                          rss_reader=lambda pid, include_children=True:
+                                          (1000 if pid == first_pid else 100) * MB)
+                engine = CdpCrawlEngine(browser, concurrency=2, memory_governor=governor)
+
+                async def handler(tab, item):
+                    assert tab.connection is browser.connection, "使用了重启前的标签页"
+                    await asyncio.sleep(0.01 * (item % 3))
+                    return item * 2
+
+                results = await engine.run(list(range(6)), handler)
+                restarted_pid = browser.process.pid
+                assert engine._browser_pid == restarted_pid != first_pid
+            return results, governor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results, governor = asyncio.run(run(tmp_dir))
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert governor.recycles[ACTION_RESTART_BROWSER] == 1 and governor.recycles[ACTION_RECYCLE_TABS] == 0
+
+
+def main():
+    """主函数"""
+    print("浏览器内存管理测试")
+    print("=" * 50)
+    test_thresholds_and_escalation()
+    test_timeline_export_and_factory()
+    test_complete_crawler_recycles_browser()
+    test_cdp_engine_recycles_tabs()
+    test_cdp_engine_restarts_owned_browser()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+运行指标测试
+验证计数器/仪表/直方图、文本格式输出、HTTP端点和写文件模式
+"""
+import os
+import sys
+import time
+import tempfile
+import urllib.request
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.metrics import MetricsRegistry, read_process_rss
+
+
+def test_counter_gauge_histogram():
+    """测试三种指标和文本格式"""
+    print("🔍 测试指标类型")
+    registry = MetricsRegistry()
+    pages = registry.counter("pages_total", "页面数", ["crawler"])
+    pages.labels(crawler="a").inc()
+    pages.labels("a").inc(2)
+    pages.labels(crawler="b").inc()
+    assert pages.labels(crawler="a").get() == 3
+
+    rss = registry.gauge("rss_bytes", "内存")
+    rss.set(100)
+    rss.dec(30)
+    assert rss.get() == 70
+
+    latency = registry.histogram("flush_seconds", "耗时", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert '# TYPE pages_total counter' in text
+    assert 'pages_total{crawler="a"} 3' in text
+    assert 'rss_bytes 70' in text
+    assert 'flush_seconds_bucket{le="0.1"} 1' in text
+    assert 'flush_seconds_bucket{le="1"} 2' in text
+    assert 'flush_seconds_bucket{le="+Inf"} 3' in text
+    assert 'flush_seconds_count 3' in text
+
+    # 重复注册返回同一个指标，类型不同则报错
+    assert registry.counter("pages_total", "页面数", ["crawler"]) is pages
+    try:
+        registry.gauge("pages_total", "页面数", ["crawler"])
+        assert False, "类型冲突应报错"
+    except ValueError:
+        pass
+    try:
+        pages.inc()
+        assert False, "带标签的指标必须先调用labels()"
+    except ValueError:
+        pass
+    print("✅ 指标类型测试通过")
+
+
+def test_histogram_timer():
+    """测试直方图计时"""
+    registry = MetricsRegistry()
+    latency = registry.histogram("solve_seconds", "耗时", ["handler"])
+    with latency.labels(handler="x").time():
+        time.sleep(0.01)
+    counts, total, count = latency.labels(handler="x").snapshot()
+    assert count == 1 and total >= 0.01
+
+
+def test_http_endpoint_and_file_pusher():
+    """测试HTTP端点和写文件模式"""
+    print("🔍 测试指标导出")
+    registry = MetricsRegistry()
+    registry.counter("solves_total", "通过次数").inc()
+    port = registry.start_http_server(0, host="127.0.0.1")
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    assert "solves_total 1" in body
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "metrics.prom")
+        registry.start_file_pusher(path, interval=60)
+        registry.counter("solves_total", "通过次数").inc()
+        registry.shutdown()
+        with open(path, encoding="utf-8") as f:
+            assert "solves_total 2" in f.read()
+        assert not [name for name in os.listdir(tmp_dir) if name.endswith(".tmp")]
+    print("✅ 指标导出测试通过")
+
+
+def test_read_process_rss():
+    """测试读取本进程内存"""
+    if os.path.exists("/proc/self/status"):
+        assert read_process_rss(os.getpid()) > 0
+    assert read_process_rss(999999999, include_children=False) == 0
+
+
+def main():
+    """主函数"""
+    print("运行指标测试")
+    print("=" * 50)
+    test_counter_gauge_histogram()
+    test_histogram_timer()
+    test_http_endpoint_and_file_pusher()
+    test_read_process_rss()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
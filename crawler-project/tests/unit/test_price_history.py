@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+价格/销量历史测试
+验证小时/天汇总的增量更新、价格走势查询、销量增长排行、文件后端重新加载、原始观测按天分文件和过期删除，
+以及Mongo后端乱序到达的观测
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from models.product import ProductData
+from utils.price_history import PriceHistory, FileHistoryStore, MongoHistoryStore, GRANULARITY_HOUR, GRANULARITY_RAW
+from memory_collection import MemoryDatabase
+
+T0 = datetime(2024, 5, 1, 8, 0, 0)
+
+
+def _product(product_id: str, price: float, sold: int, ts: datetime) -> ProductData:
+    return ProductData(product_id=product_id, title=f"商品{product_id}", search_keyword="phone case",
+                       current_price=price, origin_price=price + 5, sold_count=sold, scraped_at=ts)
+
+
+def _record_two_days(history: PriceHistory):
+    """商品A每6小时采集一次，两天内降价；商品B销量增长更快；商品C属于其他关键词"""
+    for step in range(8):
+        ts = T0 + timedelta(hours=6 * step)
+        history.record_many([
+            _product("A", 20.0 - step, 100 + 10 * step, ts),
+            _product("B", 9.99, 50 + 40 * step, ts + timedelta(minutes=10)),
+        ])
+    history.record(_product("C", 5.0, 0, T0), keyword="laptop stand")
+    history.record(_product("C", 5.0, 1000, T0 + timedelta(hours=20)), keyword="laptop stand")
+
+
+def test_trajectory_rollups():
+    """测试天/小时汇总和原始观测的价格走势"""
+    print("🔍 测试价格走势")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        history = PriceHistory(FileHistoryStore(tmp_dir))
+        _record_two_days(history)
+        end = T0 + timedelta(days=3)
+
+        daily = history.price_trajectory("A", start=T0 - timedelta(days=1), end=end)
+        assert [p["bucket"].day for p in daily] == [1, 2, 3]
+        # 5月1日: 08/14/20点 三次，价格 20/19/18
+        assert daily[0]["count"] == 3 and daily[0]["price_min"] == 18.0 and daily[0]["price_max"] == 20.0
+        assert daily[0]["price_avg"] == 19.0 and daily[0]["price_last"] == 18.0 and daily[0]["sold_last"] == 120
+
+        hourly = history.price_trajectory("A", GRANULARITY_HOUR, start=T0, end=end)
+        assert len(hourly) == 8 and hourly[-1]["price_last"] == 13.0
+
+        raw = history.price_trajectory("A", GRANULARITY_RAW, start=T0, end=end)
+        assert len(raw) == 8 and raw[0]["price"] == 20.0 and raw[0]["keyword"] == "phone case"
+        history.close()
+
+
+def test_top_sales_velocity():
+    """测试关键词下销量增长排行"""
+    print("🔍 测试销量增长排行")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        history = PriceHistory(FileHistoryStore(tmp_dir))
+        _record_two_days(history)
+        end = T0 + timedelta(days=3)
+
+        top = history.top_sales_velocity("phone case", days=7, end=end)
+        assert [r["product_id"] for r in top] == ["B", "A"]
+        # B: 42小时卖出280件
+        assert top[0]["sold_delta"] == 280 and top[0]["hours"] == 42.0
+        assert top[0]["sales_per_day"] == 160.0
+
+        hourly_top = history.top_sales_velocity("phone case", days=7, limit=1,
+                                                granularity=GRANULARITY_HOUR, end=end)
+        assert [r["product_id"] for r in hourly_top] == ["B"]
+        assert history.top_sales_velocity("laptop stand", days=7, end=end)[0]["sold_delta"] == 1000
+        history.close()
+
+
+def test_file_store_reload():
+    """测试汇总保存后重新加载并继续增量更新"""
+    print("🔍 测试文件后端重新加载")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        history = PriceHistory(FileHistoryStore(tmp_dir))
+        history.record(_product("A", 10.0, 1, T0))
+        history.close()
+
+        reloaded = PriceHistory(FileHistoryStore(tmp_dir))
+        reloaded.record(_product("A", 8.0, 3, T0 + timedelta(minutes=30)))
+        point = reloaded.price_trajectory("A", GRANULARITY_HOUR, start=T0, end=T0 + timedelta(hours=1))[0]
+        assert point["count"] == 2 and point["price_min"] == 8.0 and point["price_last"] == 8.0
+        assert len(reloaded.price_trajectory("A", GRANULARITY_RAW, start=T0, end=T0 + timedelta(hours=1))) == 2
+        reloaded.close()
+
+
+def test_file_store_raw_partitions():
+    """测试原始观测按天写入单独文件，查询只读区间内的日期，超过保留天数的日期文件在打开时删除"""
+    print("🔍 测试原始观测按天分文件")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = FileHistoryStore(tmp_dir)
+        history = PriceHistory(store)
+        _record_two_days(history)
+        history.close()
+        assert sorted(os.listdir(store.raw_dir)) == ["2024-05-01.jsonl", "2024-05-02.jsonl", "2024-05-03.jsonl"]
+        assert [os.path.basename(p) for p in store._raw_days(T0 + timedelta(days=1), T0 + timedelta(days=1, hours=1))] \
+            == ["2024-05-02.jsonl"]
+        raw = history.price_trajectory("A", GRANULARITY_RAW, start=T0 + timedelta(days=1), end=T0 + timedelta(days=2))
+        assert [p["ts"] for p in raw] == [T0 + timedelta(hours=h) for h in (24, 30, 36, 42)]
+
+        # 今天之前的日期文件都已超过1天保留期
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        history = PriceHistory(FileHistoryStore(tmp_dir))
+        history.record(_product("A", 10.0, 1, today))
+        history.close()
+        FileHistoryStore(tmp_dir, retention_days=1)
+        assert os.listdir(store.raw_dir) == [f"{today:%Y-%m-%d}.jsonl"]
+
+
+def test_mongo_store_out_of_order():
+    """测试Mongo后端乱序到达的观测: 更早的观测覆盖 *_first，不覆盖 *_last"""
+    print("🔍 测试Mongo后端乱序观测")
+    history = PriceHistory(MongoHistoryStore(MemoryDatabase(), "price_history"))
+    history.record(_product("A", 10.0, 150, T0 + timedelta(minutes=30)))
+    history.record(_product("A", 12.0, 100, T0 + timedelta(minutes=10)))
+    history.record(_product("A", 11.0, 120, T0 + timedelta(minutes=20)))
+
+    rollup = history.store.rollups_for(GRANULARITY_HOUR, T0, T0 + timedelta(hours=1), product_id="A")[0]
+    assert rollup["first_ts"] == T0 + timedelta(minutes=10) and rollup["sold_first"] == 100
+    assert rollup["last_ts"] == T0 + timedelta(minutes=30) and rollup["sold_last"] == 150
+    assert rollup["price_last"] == 10.0 and rollup["count"] == 3
+    assert rollup["price_min"] == 10.0 and rollup["price_max"] == 12.0 and rollup["price_sum"] == 33.0
+    point = history.price_trajectory("A", GRANULARITY_HOUR, start=T0, end=T0 + timedelta(hours=1))[0]
+    assert point["price_avg"] == 11.0
+    history.close()
+
+
+def main():
+    """主函数"""
+    print("价格/销量历史测试")
+    print("=" * 50)
+    test_trajectory_rollups()
+    test_top_sales_velocity()
+    test_file_store_reload()
+    test_file_store_raw_partitions()
+    test_mongo_store_out_of_order()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+商品详情补全测试
+验证详情页字段解析（描述、评价时间、分类）、按补全时间跳过近期补全过的商品、批量更新，
+以及补全任务从队列领取商品ID、多个标签页并行打开详情页并确认/失败重试，批量写入失败时整批放回队列
+"""
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from config import Config
+from utils.cdp_engine import CdpBrowser
+from utils.rate_controller import RateController
+from utils.retry_engine import RetryEngine, RetryPolicy, ERROR_BROWSER, ERROR_TIMEOUT
+from utils.work_queue import MemoryWorkQueue, STATE_DONE, STATE_DEAD
+from utils.product_enrichment import EnrichmentIndex, find_product_info, parse_detail_fields, seed_enrichment_queue
+from run_enrichment_worker import CdpDetailEnricher, run_enrichment_worker
+from pymongo.errors import OperationFailure
+from crawl_throughput_benchmark import _memory_db_manager, _point_runners_at
+from fake_cdp_browser import FakeCdpBrowser
+from memory_collection import MemoryCollection
+from tiktok_shop_stub import TikTokShopStub
+
+URL_SETTINGS = ("BASE_URL", "TARGET_URL", "SHOP_BASE_URL", "SEARCH_BASE_URL", "PRODUCT_LIST_API_URL")
+
+
+def _fast_retry() -> RetryEngine:
+    return RetryEngine({ERROR_BROWSER: RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0),
+                        ERROR_TIMEOUT: RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0)},
+                       failure_threshold=10)
+
+
+def test_parse_detail_fields():
+    """测试描述、评价时间（毫秒时间戳/评价列表）和分类的解析"""
+    print("🔍 测试详情字段解析")
+    with TikTokShopStub(products_per_page=2, max_pages=1) as stub:
+        product_id = stub.product_list("desk lamp", 1)["data"]["products"][0]["product_id"]
+        html = stub.render_detail_page(stub.find_product(product_id))
+    router_data = html.split('id="__MODERN_ROUTER_DATA__"', 1)[1].split(">", 1)[1].split("</script>", 1)[0]
+    fields = parse_detail_fields(find_product_info(router_data))
+    assert fields["desc_detail"].startswith("Desk Lamp Item 1-1 for desk lamp.") and "Durable" in fields["desc_detail"]
+    assert fields["categories"].startswith("Home Supplies > Desk Lamp")
+    assert fields["earliest_review_fmt"] < fields["latest_review_fmt"] <= datetime.now().strftime("%Y-%m-%d")
+
+    # 没有汇总时间时从评价列表取最早和最新，没有分类时不覆盖原值
+    fields = parse_detail_fields({"product_base": {"desc_detail": "[]"}, "product_detail_review": {
+        "reviews": [{"create_time": "1700000000000"}, {"review_time": 1600000000}],
+        "review_items": [{"review": {"create_time": "2024-02-03T10:00:00Z"}}]}})
+    assert fields == {"desc_detail": "", "earliest_review_fmt": datetime.fromtimestamp(1600000000).strftime("%Y-%m-%d"),
+                      "latest_review_fmt": "2024-02-03"}
+    assert find_product_info("not json") is None and find_product_info('{"loaderData": {}}') is None
+
+
+def test_index_skips_recent_and_bulk_update():
+    """测试近期补全过的商品跳过，过期和未补全的商品进入队列，批量更新只改补全字段"""
+    print("🔍 测试补全索引和批量更新")
+    db_manager = _memory_db_manager()
+    collection = db_manager.collection
+    old = (datetime.now() - timedelta(hours=200)).isoformat()
+    for product_id, enriched_at in (("p1", None), ("p2", datetime.now().isoformat()), ("p3", old), ("p4", None)):
+        document = {"product_id": product_id, "categories": "TikTok Shop", "current_price": 9.9}
+        if enriched_at:
+            document["enriched_at"] = enriched_at
+        collection.insert_one(document)
+
+    index = EnrichmentIndex(collection, refresh_hours=168)
+    assert index.stale(["p2", "p1", "p3", "p1", "p9"]) == ["p1", "p3", "p9"]
+    assert sorted(index.iter_stale_ids()) == ["p1", "p3", "p4"] and len(list(index.iter_stale_ids(limit=2))) == 2
+
+    queue = MemoryWorkQueue(name="enrich_test")
+    assert seed_enrichment_queue(queue, index) == 3 and seed_enrichment_queue(queue, index) == 0
+
+    updates = {"p1": index.enriched_fields({"desc_detail": "d1", "categories": "Home"}),
+               "p3": index.enriched_fields({"desc_detail": "d3"}), "p9": {"desc_detail": "x"}}
+    assert db_manager.update_products(updates) == 2 and collection.count_documents({}) == 4
+    p1 = collection.find_one({"product_id": "p1"})
+    assert p1["categories"] == "Home" and p1["current_price"] == 9.9 and p1["enriched_at"]
+    assert collection.find_one({"product_id": "p3"})["categories"] == "TikTok Shop"
+    assert index.stale(["p1", "p3", "p4"]) == ["p4"]
+
+
+def test_worker_enriches_in_parallel_tabs():
+    """测试补全任务按批领取、并行打开详情页、跳过近期补全的商品，失败的商品重试后进入dead"""
+    print("🔍 测试详情补全任务")
+    saved = {name: getattr(Config, name) for name in URL_SETTINGS}
+    db_manager = _memory_db_manager()
+    collection = db_manager.collection
+
+    async def run(stub: TikTokShopStub, queue):
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                stats = await run_enrichment_worker(
+                    db_manager, queue, batch_size=5, concurrency=3, browser=browser, idle_timeout=1,
+                    retry_engine=_fast_retry(), enricher=CdpDetailEnricher(RateController(enabled=False)))
+            return stats, fake.stats
+
+    try:
+        with TikTokShopStub(products_per_page=6, max_pages=2, latency_ms=50) as stub:
+            _point_runners_at(stub.base_url)
+            product_ids = [p["product_id"] for page in (1, 2) for p in stub.product_list("mug", page)["data"]["products"]]
+            for product_id in product_ids:
+                collection.insert_one({"product_id": product_id, "categories": "TikTok Shop", "desc_detail": ""})
+            collection.update_one({"product_id": product_ids[0]},
+                                  {"$set": {"enriched_at": datetime.now().isoformat(), "desc_detail": "已补全"}})
+
+            queue = MemoryWorkQueue(name="enrich_worker_test", max_retries=1, retry_delay=0)
+            queue.put_many(product_ids + ["1000000000000000000"])
+            stats, fake_stats = asyncio.run(run(stub, queue))
+            detail_pages = stub.stats["detail_pages"]
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+    assert stats["enriched"] == 11 and stats["skipped"] == 1 and stats["leased"] == 14, stats
+    # 不存在的商品失败一次后重试一次，仍失败进入dead
+    assert stats["failed"] == 2 and queue.stats()[STATE_DEAD] == 1 and queue.stats()[STATE_DONE] == 12
+    assert detail_pages == 11 and fake_stats["max_concurrent_navigations"] == 3
+    assert collection.find_one({"product_id": product_ids[0]})["desc_detail"] == "已补全"
+    for product_id in product_ids[1:]:
+        document = collection.find_one({"product_id": product_id})
+        assert document["desc_detail"] and document["latest_review_fmt"] and document["enriched_at"]
+        assert document["categories"].startswith("Home Supplies > Mug")
+
+
+class FailingBulkCollection(MemoryCollection):
+    """前 failures 次 bulk_write 抛出不可重试的写入错误"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def bulk_write(self, requests, ordered: bool = True):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OperationFailure("write concern error")
+        return super().bulk_write(requests, ordered)
+
+
+class StaticEnricher:
+    """不打开页面，直接返回固定补全字段"""
+
+    async def fetch_detail(self, tab, product_id: str):
+        return {"desc_detail": f"desc {product_id}", "latest_review_fmt": "2024-01-01", "earliest_review_fmt": ""}
+
+
+def test_failed_bulk_write_requeues_batch():
+    """测试批量写入失败时本批商品放回队列，重试后写入，不计为已补全"""
+    print("🔍 测试批量写入失败重试")
+    db_manager = _memory_db_manager()
+    db_manager.collection = FailingBulkCollection(failures=1)
+    for product_id in ("p1", "p2", "p3"):
+        db_manager.collection.insert_one({"product_id": product_id, "desc_detail": ""})
+    queue = MemoryWorkQueue(name="enrich_write_test", max_retries=2, retry_delay=0)
+    queue.put_many(["p1", "p2", "p3"])
+
+    async def run():
+        async with FakeCdpBrowser() as fake:
+            async with await CdpBrowser.connect(fake.endpoint) as browser:
+                return await run_enrichment_worker(db_manager, queue, batch_size=3, concurrency=2, browser=browser,
+                                                   idle_timeout=1, retry_engine=_fast_retry(),
+                                                   enricher=StaticEnricher())
+
+    stats = asyncio.run(run())
+    assert stats["batches"] == 2 and stats["failed"] == 3 and stats["enriched"] == 3, stats
+    assert queue.stats()[STATE_DONE] == 3 and queue.stats()[STATE_DEAD] == 0
+    for product_id in ("p1", "p2", "p3"):
+        assert db_manager.collection.find_one({"product_id": product_id})["desc_detail"] == f"desc {product_id}"
+
+
+def main():
+    """主函数"""
+    print("商品详情补全测试")
+    print("=" * 50)
+    test_parse_detail_fields()
+    test_index_skips_recent_and_bulk_update()
+    test_worker_enriches_in_parallel_tabs()
+    test_failed_bulk_write_requeues_batch()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+商品流式导出测试
+验证 JSON Lines / CSV / gzip 写出、按条数和大小轮转、.part 临时文件与原子落盘、
+Parquet 的列类型和行组（需要 pyarrow，未安装时跳过）、从数据库游标导出，以及大批量导出时内存占用不随商品数增长
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import tempfile
+import tracemalloc
+
+import pytest
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from models.product import ProductData
+from utils.database import DatabaseManager
+from utils.lazy_import import module_available
+from utils.product_export import (
+    ProductExporter, ParquetWriter, open_product_exporter, export_from_database, parse_output_path, product_record,
+    EXPORT_FIELDS
+)
+from memory_collection import MemoryCollection
+
+
+def make_product(index: int) -> ProductData:
+    return ProductData(product_id=f"p{index}", title=f"商品 {index}, \"特价\"", search_keyword="phone case",
+                       current_price=9.99 + index, origin_price=19.99, sold_count=index)
+
+
+def test_jsonl_and_csv_with_rotation():
+    """测试多个格式同时写出、按条数轮转，写入中的文件只以 .part 存在"""
+    print("🔍 测试JSONL/CSV轮转")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base = os.path.join(temp_dir, "exports", "products")
+        exporter = ProductExporter(base, ["json", "csv"], rotate_records=4, rotate_mb=0, compression="")
+        exporter.write_many(make_product(i) for i in range(6))
+        # 第一个文件已落盘，第二个仍在写入
+        assert os.path.exists(base + "-00001.jsonl") and os.path.exists(base + "-00002.jsonl.part")
+        assert not os.path.exists(base + "-00002.jsonl")
+        files = exporter.close()
+        assert sorted(os.path.basename(f) for f in files) == [
+            "products-00001.csv", "products-00001.jsonl", "products-00002.csv", "products-00002.jsonl"]
+        assert not [name for name in os.listdir(os.path.dirname(base)) if name.endswith(".part")]
+
+        with open(base + "-00002.jsonl", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert [row["product_id"] for row in rows] == ["p4", "p5"]
+        assert list(rows[0]) == EXPORT_FIELDS and isinstance(rows[0]["scraped_at"], str)
+
+        with open(base + "-00001.csv", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 4 and rows[1]["title"] == '商品 1, "特价"' and rows[3]["sold_count"] == "3"
+        assert exporter.stats() == {"records": 6, "formats": ["jsonl", "csv"], "files": 4}
+
+
+def test_gzip_size_rotation_and_abort():
+    """测试gzip压缩、按大小轮转，以及出错时删除写入中的文件"""
+    print("🔍 测试gzip和大小轮转")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base = os.path.join(temp_dir, "products")
+        with ProductExporter(base, ["jsonl"], rotate_records=0, rotate_mb=0.01, compression="gzip") as exporter:
+            # 标题不可压缩，保证写满10KB
+            for i in range(300):
+                product = make_product(i)
+                product.title = os.urandom(48).hex()
+                exporter.write(product)
+        assert len(exporter.files) > 1 and all(f.endswith(".jsonl.gz") for f in exporter.files)
+        total = 0
+        for path in exporter.files:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                total += sum(1 for _ in f)
+        assert total == 300
+
+        try:
+            with ProductExporter(os.path.join(temp_dir, "broken"), ["csv"], rotate_records=0, rotate_mb=0) as exporter:
+                exporter.write(make_product(1))
+                raise RuntimeError("采集中断")
+        except RuntimeError:
+            pass
+        assert not [name for name in os.listdir(temp_dir) if name.startswith("broken")]
+
+
+def test_output_path_and_format_fallback():
+    """测试按扩展名选择格式；没有 pyarrow 时去掉Parquet、只写其他格式"""
+    print("🔍 测试输出路径")
+    assert parse_output_path("out/products.jsonl.gz") == ("out/products", ["jsonl"], "gzip")
+    assert parse_output_path("out/products.json") == ("out/products", ["jsonl"], "")
+    assert parse_output_path("out/products") == ("out/products", [], "")
+    assert open_product_exporter(None) is None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        exporter = ProductExporter(os.path.join(temp_dir, "products"), ["parquet", "csv"],
+                                   rotate_records=0, rotate_mb=0, compression="")
+        exporter.write_many(make_product(i) for i in range(3))
+        files = exporter.close()
+        if module_available("pyarrow"):
+            assert exporter.formats == ["parquet", "csv"] and len(files) == 2
+        else:
+            assert exporter.formats == ["csv"] and len(files) == 1
+            assert open_product_exporter(os.path.join(temp_dir, "only.parquet")) is None
+
+
+def test_parquet_schema_and_row_groups():
+    """测试Parquet按 ProductData 字段类型建列、每 row_group_size 个商品一个行组、按条数轮转和gzip压缩"""
+    print("🔍 测试Parquet导出")
+    pq = pytest.importorskip("pyarrow.parquet")
+    import pyarrow as pa
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        exporter = ProductExporter(os.path.join(temp_dir, "products"), ["parquet"],
+                                   rotate_records=5, rotate_mb=0, compression="gzip")
+        assert exporter.formats == ["parquet"]
+        products = [make_product(i) for i in range(7)]
+        products[3].shop_name = None
+        exporter.write_many(products)
+        files = exporter.close()
+        assert [os.path.basename(f) for f in files] == ["products-00001.parquet", "products-00002.parquet"]
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".part")]
+
+        first = pq.ParquetFile(files[0])
+        schema = first.schema_arrow
+        assert schema.field("sold_count").type == pa.int64() and schema.field("current_price").type == pa.float64()
+        assert schema.field("product_id").type == pa.string() and schema.field("scraped_at").type == pa.string()
+        assert first.metadata.num_rows == 5 and first.metadata.row_group(0).column(0).compression == "GZIP"
+        table = pq.read_table(files[0])
+        assert table.column("sold_count").to_pylist() == [0, 1, 2, 3, 4]
+        assert table.column("shop_name").to_pylist()[3] is None
+        assert pq.read_table(files[1]).column("product_id").to_pylist() == ["p5", "p6"]
+
+        # 每 row_group_size 个商品写一个行组，内存中最多缓存一个行组
+        writer = ParquetWriter(os.path.join(temp_dir, "grouped.parquet"), EXPORT_FIELDS, row_group_size=2)
+        for i in range(5):
+            writer.write(product_record(make_product(i)))
+            assert len(writer._rows) < 2
+        path = writer.finalize()
+        metadata = pq.ParquetFile(path).metadata
+        assert metadata.num_row_groups == 3 and [metadata.row_group(i).num_rows for i in range(3)] == [2, 2, 1]
+
+
+def test_database_export_runs_in_constant_memory():
+    """测试从数据库游标导出，导出量增加10倍时内存峰值基本不变"""
+    print("🔍 测试数据库流式导出")
+
+    def peak_for(count: int, temp_dir: str) -> int:
+        def products():
+            for i in range(count):
+                yield make_product(i)
+
+        tracemalloc.start()
+        exporter = ProductExporter(os.path.join(temp_dir, f"bulk{count}"), ["jsonl", "csv"],
+                                   rotate_records=0, rotate_mb=0, compression="gzip")
+        exporter.write_many(products())
+        exporter.close()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        small, large = peak_for(1000, temp_dir), peak_for(10000, temp_dir)
+        assert large < small * 2, (small, large)
+
+        db_manager = DatabaseManager()
+        db_manager.collection = MemoryCollection()
+        for i in range(5):
+            db_manager.collection.insert_one(make_product(i).to_dict())
+        db_manager.collection.insert_one({**make_product(9).to_dict(), "search_keyword": "mug"})
+        files = export_from_database(db_manager, os.path.join(temp_dir, "db.jsonl"),
+                                     query={"search_keyword": "phone case"})
+        with open(files[0], encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert len(rows) == 5 and "_id" not in rows[0]
+
+
+def main():
+    """主函数"""
+    print("商品流式导出测试")
+    print("=" * 50)
+    test_jsonl_and_csv_with_rotation()
+    test_gzip_size_rotation_and_abort()
+    test_output_path_and_format_fallback()
+    test_parquet_schema_and_row_groups()
+    test_database_export_runs_in_constant_memory()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
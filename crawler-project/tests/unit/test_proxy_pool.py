@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+代理池测试
+使用本地转发代理和TikTok Shop替身服务，验证健康检测打分、失败冷却、每个代理的并发上限和粘性分配
+"""
+import os
+import sys
+import threading
+import urllib.request
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from utils.proxy_pool import ProxyPool, normalize_proxy_url
+from forward_proxy import LocalForwardProxy
+from tiktok_shop_stub import TikTokShopStub
+from fake_clock import FakeClock
+
+
+def test_health_check_scoring():
+    """测试通过代理检测时按延迟打分，失败的代理进入冷却"""
+    print("🔍 测试代理健康检测")
+    with TikTokShopStub(products_per_page=2) as stub, \
+            LocalForwardProxy() as fast, LocalForwardProxy(latency_ms=150) as slow, \
+            LocalForwardProxy(fail_rate=1.0) as broken:
+        pool = ProxyPool([fast.address, slow.address, broken.address], max_concurrency=1,
+                         failure_threshold=1, cooldown_seconds=60)
+        results = pool.check_all(stub.search_url("phone case"), timeout=5)
+        assert results == {fast.address: True, slow.address: True, broken.address: False}
+        assert stub.stats["search_pages"] == 2 and fast.stats["requests"] == 1
+
+        stats = pool.stats()
+        assert stats[fast.address]["score"] > stats[slow.address]["score"]
+        assert stats[broken.address]["cooling"] and "502" in stats[broken.address]["last_error"]
+        assert not pool.healthy(broken.address)
+
+        lease = pool.acquire(timeout=0)
+        assert lease.address == fast.address and lease.url == f"http://{fast.address}"
+        pool.release(lease)
+
+
+def test_concurrency_limit_and_cooldown():
+    """测试每个代理的并发上限、全部占用时超时，以及冷却时间翻倍和恢复"""
+    print("🔍 测试并发上限和冷却")
+    clock = FakeClock()
+    pool = ProxyPool(["p1:1", "p2:2"], max_concurrency=1, failure_threshold=2, cooldown_seconds=10, clock=clock)
+    first, second = pool.acquire(timeout=0), pool.acquire(timeout=0)
+    assert {first.address, second.address} == {"p1:1", "p2:2"}
+    assert pool.acquire(timeout=0) is None
+    pool.release(first, ok=True, latency=0.2)
+    third = pool.acquire(timeout=0)
+    assert third.address == first.address
+    pool.release(third)
+    pool.release(second)
+
+    pool.report("p1:1", False, error="timeout")
+    assert pool.healthy("p1:1")
+    pool.report("p1:1", False, error="timeout")
+    assert pool.proxies["p1:1"].cooldown_until == clock.now + 10
+    pool.report("p1:1", False, error="timeout")
+    assert pool.proxies["p1:1"].cooldown_until == clock.now + 20
+    assert pool.acquire(timeout=0).address == "p2:2"
+
+    clock.now += 21
+    assert pool.healthy("p1:1")
+    pool.report("p1:1", True, latency=0.1)
+    assert pool.proxies["p1:1"].consecutive_failures == 0
+    assert normalize_proxy_url("socks5://h:1") == "socks5://h:1"
+
+
+def test_sticky_assignment():
+    """测试同一worker沿用上次的代理，代理冷却后改派其他代理"""
+    print("🔍 测试粘性分配")
+    clock = FakeClock()
+    pool = ProxyPool(["p1:1", "p2:2"], max_concurrency=2, failure_threshold=1, cooldown_seconds=30, clock=clock)
+    lease = pool.acquire("worker-a", timeout=0)
+    pool.release(lease, ok=False, error="reset")
+    pool.proxies[lease.address].cooldown_until = 0.0
+    # 另一个代理分数更高，但worker-a仍沿用原来的代理
+    pool.report("p2:2" if lease.address == "p1:1" else "p1:1", True, latency=0.05)
+    again = pool.acquire("worker-a", timeout=0)
+    assert again.address == lease.address
+    pool.release(again, ok=False, error="reset")
+
+    moved = pool.acquire("worker-a", timeout=0)
+    assert moved.address != lease.address and pool.sticky["worker-a"] == moved.address
+    pool.release(moved)
+
+
+def test_lease_through_local_proxy():
+    """测试多线程经本地代理请求时，每个代理的并发不超过上限"""
+    print("🔍 测试经本地代理并发请求")
+    with TikTokShopStub(products_per_page=2, latency_ms=30) as stub, \
+            LocalForwardProxy() as proxy_a, LocalForwardProxy() as proxy_b:
+        pool = ProxyPool([proxy_a.address, proxy_b.address], max_concurrency=1)
+        errors = []
+
+        def fetch(index: int):
+            try:
+                with pool.lease(f"worker-{index}", timeout=10) as lease:
+                    handler = urllib.request.ProxyHandler({"http": lease.url})
+                    with urllib.request.build_opener(handler).open(stub.search_url(f"kw{index}"), timeout=10) as r:
+                        assert r.status == 200
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, errors
+        assert stub.stats["search_pages"] == 6
+        assert proxy_a.stats["max_concurrent"] == 1 and proxy_b.stats["max_concurrent"] == 1
+        stats = pool.stats()
+        assert sum(s["successes"] for s in stats.values()) == 6
+        assert all(s["in_flight"] == 0 for s in stats.values())
+
+
+def main():
+    """主函数"""
+    print("代理池测试")
+    print("=" * 50)
+    test_health_check_scoring()
+    test_concurrency_limit_and_cooldown()
+    test_sticky_assignment()
+    test_lease_through_local_proxy()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
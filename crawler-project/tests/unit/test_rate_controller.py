@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+自适应速率控制测试
+验证令牌桶等待时间、正常页面逐步提速、验证码降速和冷却期，以及关闭时不等待
+"""
+import os
+import sys
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from utils.rate_controller import (
+    HostRateController, RateController, OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+)
+from fake_clock import FakeClock
+
+
+def _controller(clock: FakeClock, **overrides) -> HostRateController:
+    params = dict(initial_rps=0.5, min_rps=0.1, max_rps=1.0, increase_step=0.1, captcha_backoff=0.5,
+                  error_backoff=0.75, burst=1, target_captcha_rate=0.05, cooldown_seconds=30, jitter=0)
+    params.update(overrides)
+    return HostRateController("shop.test", clock=clock, sleep=clock.sleep, **params)
+
+
+def test_token_bucket_waits():
+    """测试第一个请求不等待，之后按速率间隔等待"""
+    print("🔍 测试令牌桶等待时间")
+    clock = FakeClock()
+    controller = _controller(clock)
+
+    assert controller.acquire() == 0.0
+    assert abs(controller.acquire() - 2.0) < 1e-9
+    assert abs(controller.acquire() - 2.0) < 1e-9
+    assert clock.slept == [2.0, 2.0]
+
+    # 空闲期间令牌最多累积 burst 个
+    clock.now += 100
+    assert controller.acquire() == 0.0
+    assert controller.acquire() > 0
+    assert abs(controller.snapshot()["waited_seconds"] - 6.0) < 1e-6
+
+
+def test_aimd_adjustment():
+    """测试正常页面加速、验证码减半并进入冷却期、速率不超出上下限"""
+    print("🔍 测试速率调整")
+    clock = FakeClock()
+    controller = _controller(clock)
+
+    for _ in range(10):
+        controller.record(OUTCOME_OK)
+    assert controller.rate == 1.0
+
+    controller.record(OUTCOME_CAPTCHA)
+    assert controller.rate == 0.5
+    # 冷却期内正常页面不提速
+    controller.record(OUTCOME_OK)
+    assert controller.rate == 0.5
+
+    clock.now += 31
+    controller.record(OUTCOME_ERROR)
+    assert controller.rate == 0.375
+    for _ in range(10):
+        controller.record(OUTCOME_CAPTCHA)
+    assert controller.rate == 0.1
+
+    snapshot = controller.snapshot()
+    assert snapshot[OUTCOME_OK] == 11 and snapshot[OUTCOME_CAPTCHA] == 11 and snapshot[OUTCOME_ERROR] == 1
+
+
+def test_no_increase_while_captcha_ratio_high():
+    """测试冷却期过后，最近验证码比例仍高于目标值时保持速率"""
+    print("🔍 测试验证码比例过高时不提速")
+    clock = FakeClock()
+    controller = _controller(clock, cooldown_seconds=0)
+
+    controller.record(OUTCOME_CAPTCHA)
+    assert controller.captcha_ratio > controller.target_captcha_rate
+    rate = controller.rate
+    controller.record(OUTCOME_OK)
+    assert controller.rate == rate
+
+    # 连续正常页面让验证码比例回落后恢复提速
+    for _ in range(30):
+        controller.record(OUTCOME_OK)
+    assert controller.captcha_ratio <= controller.target_captcha_rate
+    assert controller.rate > rate
+
+
+def test_rate_controller_per_host():
+    """测试按域名分别控制，以及关闭时不等待、不记录"""
+    print("🔍 测试按域名控制")
+    clock = FakeClock()
+    controller = RateController(enabled=True, initial_rps=0.5, jitter=0, clock=clock, sleep=clock.sleep)
+    controller.acquire("https://www.tiktok.com/shop/s/phone")
+    assert controller.acquire("https://www.tiktok.com/api/shop/list") == 2.0
+    assert controller.acquire("https://other.test/") == 0.0
+    controller.record("https://www.tiktok.com/shop", OUTCOME_CAPTCHA)
+    stats = controller.stats()
+    assert set(stats) == {"www.tiktok.com", "other.test"}
+    assert stats["www.tiktok.com"]["rate"] == 0.25
+
+    disabled = RateController(enabled=False, clock=clock, sleep=clock.sleep)
+    assert disabled.acquire("https://www.tiktok.com/") == 0.0
+    disabled.record("https://www.tiktok.com/", OUTCOME_CAPTCHA)
+    assert disabled.stats() == {}
+
+
+def main():
+    """主函数"""
+    print("自适应速率控制测试")
+    print("=" * 50)
+    test_token_bucket_waits()
+    test_aimd_adjustment()
+    test_no_increase_while_captcha_ratio_high()
+    test_rate_controller_per_host()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
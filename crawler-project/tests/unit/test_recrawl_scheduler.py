@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+增量重爬调度测试
+验证变化检测、自适应重爬间隔、采集计划排序以及状态持久化
+"""
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from models.product import ProductData
+from utils.recrawl_scheduler import (
+    RecrawlScheduler, FileStateStore, MongoStateStore, REASON_NEW, REASON_DUE, REASON_NOT_DUE
+)
+from memory_collection import MemoryCollection
+
+HOUR = 3600
+T0 = 1_700_000_000.0
+
+
+def _product(product_id: str, price: float = 10.0, sold: int = 100, reviews: int = 10) -> ProductData:
+    return ProductData(product_id=product_id, title=f"商品{product_id}", search_keyword="kw",
+                       current_price=price, origin_price=price, sold_count=sold, review_count=reviews)
+
+
+def _scheduler(store) -> RecrawlScheduler:
+    return RecrawlScheduler(store, min_interval_hours=1, max_interval_hours=168,
+                            default_interval_hours=24, target_change=0.2, alpha=0.5)
+
+
+def test_change_detection_and_interval():
+    """测试价格/销量/新商品变化统计，以及变化越快重爬间隔越短"""
+    print("🔍 测试变化检测和自适应间隔")
+    scheduler = _scheduler(MongoStateStore(MemoryCollection("recrawl_state")))
+    baseline = [_product(str(i)) for i in range(10)]
+
+    first = scheduler.observe("volatile", baseline, crawled_at=T0)
+    assert first.new_products == 0 and first.change_ratio == 0
+    assert scheduler.get_state("volatile").interval_hours == 24
+
+    # 10小时后：2个价格变化、1个销量增长、1个新商品，价格微小波动不算变化
+    second_batch = [_product(str(i)) for i in range(4, 10)] + [
+        _product("0", price=8.0), _product("1", price=12.0),
+        _product("2", sold=150), _product("3", price=10.0001), _product("new"),
+    ]
+    change = scheduler.observe("volatile", second_batch, crawled_at=T0 + 10 * HOUR)
+    assert change.new_products == 1
+    assert change.price_changes == 2 and change.changed_products == 3
+    assert change.sold_delta == 50 and change.elapsed_hours == 10
+    assert abs(change.change_ratio - 4 / 11) < 1e-9
+    # 每小时变化率 4/11/10，间隔 = 0.2 / 0.0364 = 5.5小时
+    assert abs(scheduler.get_state("volatile").interval_hours - 5.5) < 1e-6
+
+    # 完全不变的关键词间隔取最大值
+    scheduler.observe("stable", baseline, crawled_at=T0)
+    scheduler.observe("stable", baseline, crawled_at=T0 + 10 * HOUR)
+    assert scheduler.get_state("stable").interval_hours == 168
+
+
+def test_plan_prioritizes_volatile_keywords():
+    """测试采集计划：新关键词最先，到期的按到期程度排序，未到期的不采集"""
+    print("🔍 测试采集计划")
+    scheduler = _scheduler(MongoStateStore(MemoryCollection("recrawl_state")))
+    products = [_product(str(i)) for i in range(10)]
+    changed = [_product(str(i), sold=200) for i in range(10)]
+    for keyword, second in (("volatile", changed), ("stable", products)):
+        scheduler.observe(keyword, products, crawled_at=T0)
+        scheduler.observe(keyword, second, crawled_at=T0 + HOUR)
+
+    now = T0 + 3 * HOUR
+    plan = scheduler.plan(["stable", "volatile", "fresh"], now=now)
+    assert [item.keyword for item in plan] == ["fresh", "volatile", "stable"]
+    assert [item.reason for item in plan] == [REASON_NEW, REASON_DUE, REASON_NOT_DUE]
+    assert scheduler.due_keywords(["stable", "volatile", "fresh"], now=now, budget=1) == ["fresh"]
+    assert scheduler.due_keywords(["stable", "volatile"], now=now, budget=0) == ["volatile"]
+
+
+def test_file_state_persists():
+    """测试文件后端保存后重新加载"""
+    print("🔍 测试状态持久化")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "recrawl", "state.json")
+        scheduler = _scheduler(FileStateStore(path))
+        scheduler.observe("kw", [_product("a.b"), {"product_id": "c", "current_price": "5.5"}], crawled_at=T0)
+
+        reloaded = _scheduler(FileStateStore(path))
+        state = reloaded.get_state("kw")
+        assert state.crawls == 1 and state.last_crawled_at == T0
+        assert state.products["a.b"] == [10.0, 100.0, 10.0]
+        assert state.products["c"] == [5.5, 0.0, 0.0]
+        assert not os.path.exists(path + ".tmp")
+
+
+def test_file_state_appends_changed_keyword_only():
+    """测试每次采集只追加该关键词的变更，日志超过关键词数时合并进快照，写了一半的行被跳过"""
+    print("🔍 测试增量保存")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "state.json")
+        store = FileStateStore(path, compact_min_entries=5)
+        scheduler = _scheduler(store)
+        for i in range(4):
+            scheduler.observe(f"kw{i}", [_product(f"p{i}")], crawled_at=T0)
+        # 只有变更日志，每个关键词一行
+        assert not os.path.exists(path)
+        with open(store.log_path, encoding="utf-8") as f:
+            assert [json.loads(line)["keyword"] for line in f] == ["kw0", "kw1", "kw2", "kw3"]
+
+        # 模拟进程在写日志时被杀，重启后忽略该行并继续追加
+        with open(store.log_path, "a", encoding="utf-8") as f:
+            f.write('{"keyword": "kw0", "cra')
+        scheduler = _scheduler(FileStateStore(path, compact_min_entries=5))
+        assert len(scheduler.states) == 4
+        scheduler.observe("kw0", [_product("p0", price=20.0)], crawled_at=T0 + 3600)
+        assert scheduler.get_state("kw0").crawls == 2
+
+        # 第6行超过 max(5, 关键词数) 时合并
+        scheduler.observe("kw4", [_product("p4")], crawled_at=T0)
+        assert os.path.exists(path) and not os.path.exists(scheduler.store.log_path)
+        scheduler.observe("kw1", [_product("p1")], crawled_at=T0 + 3600)
+        scheduler.close()
+        assert not os.path.exists(scheduler.store.log_path)
+        with open(path, encoding="utf-8") as f:
+            assert len(json.load(f)["keywords"]) == 5
+        reloaded = _scheduler(FileStateStore(path))
+        assert reloaded.get_state("kw0").crawls == 2 and reloaded.get_state("kw1").crawls == 2
+
+
+def main():
+    """主函数"""
+    print("增量重爬调度测试")
+    print("=" * 50)
+    test_change_detection_and_interval()
+    test_plan_prioritizes_volatile_keywords()
+    test_file_state_persists()
+    test_file_state_appends_changed_keyword_only()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Crawlab结果输出测试
+验证按条数/大小/时间分批写出、结果文件通道、标准输出通道中调试输出改写到标准错误、
+Crawlab SDK 通道（本地替身函数）、未安装SDK时写本地结果文件，
+以及写出失败的批次保留重试、关闭时仍写不出的结果保存到待补交文件
+"""
+import io
+import os
+import sys
+import json
+import tempfile
+import contextlib
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from config import Config
+from models.product import ProductData
+from utils.lazy_import import module_available
+from utils.result_emitter import (
+    ResultEmitter, ResultEmitError, FileResultSink, StdoutResultSink, CrawlabResultSink, open_result_emitter
+)
+from fake_clock import FakeClock
+
+
+class ListSink:
+    name = "list"
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write_batch(self, lines, records):
+        self.batches.append(list(lines))
+
+    def close(self):
+        self.closed = True
+
+
+def make_product(index: int, title: str = "") -> ProductData:
+    return ProductData(product_id=f"p{index}", title=title or f"商品 {index}", search_keyword="mug",
+                       current_price=1.5, origin_price=2.0)
+
+
+def test_batching_by_count_size_and_time():
+    """测试按条数、大小和时间分批"""
+    print("🔍 测试分批写出")
+    sink, clock = ListSink(), FakeClock(0.0)
+    emitter = ResultEmitter(sink, batch_size=3, max_batch_kb=1000, flush_interval=10, clock=clock)
+    emitter.emit_many(make_product(i) for i in range(7))
+    assert [len(b) for b in sink.batches] == [3, 3] and emitter.stats()["pending"] == 1
+    clock.now = 11
+    emitter.emit(make_product(7))
+    assert [len(b) for b in sink.batches] == [3, 3, 2]
+
+    # 每批不超过2KB，单条超过上限的结果单独成批
+    sink = ListSink()
+    emitter = ResultEmitter(sink, batch_size=100, max_batch_kb=2, flush_interval=60, clock=clock)
+    for i in range(10):
+        emitter.emit(make_product(i, title="x" * 300))
+    emitter.emit(make_product(99, title="y" * 5000))
+    emitter.close()
+    sizes = [sum(len(line.encode()) + 1 for line in batch) for batch in sink.batches]
+    assert all(size <= 2048 for size in sizes[:-1]) and len(sink.batches[-1]) == 1
+    assert sum(len(b) for b in sink.batches) == 11 and sink.closed
+    record = json.loads(sink.batches[0][0])
+    assert record["product_id"] == "p0" and isinstance(record["scraped_at"], str)
+
+
+def test_file_and_crawlab_sinks():
+    """测试结果文件通道、SDK通道和未安装SDK时的本地替代"""
+    print("🔍 测试结果文件和SDK通道")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "results", "task.jsonl")
+        emitter = ResultEmitter(FileResultSink(path), batch_size=2, max_batch_kb=100, flush_interval=60)
+        emitter.emit_many(make_product(i) for i in range(3))
+        with open(path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2
+        emitter.close()
+        with open(path, encoding="utf-8") as f:
+            assert [json.loads(line)["product_id"] for line in f] == ["p0", "p1", "p2"]
+
+        saved = []
+        emitter = ResultEmitter(CrawlabResultSink(save_item=lambda *items: saved.append(items)),
+                                batch_size=2, max_batch_kb=100, flush_interval=60)
+        emitter.emit_many(make_product(i) for i in range(3))
+        emitter.close()
+        assert [len(items) for items in saved] == [2, 1] and saved[0][0]["product_id"] == "p0"
+        assert emitter.stats() == {"sink": "crawlab", "emitted": 3, "batches": 2, "pending": 0, "failures": 0}
+
+        saved_file = Config.RESULT_FILE
+        try:
+            Config.RESULT_FILE = os.path.join(temp_dir, "local.jsonl")
+            emitter = open_result_emitter("crawlab")
+            if not module_available("crawlab"):
+                assert isinstance(emitter.sink, FileResultSink) and emitter.sink.path == Config.RESULT_FILE
+            emitter.close()
+            assert open_result_emitter("") is None and open_result_emitter("kafka") is None
+        finally:
+            Config.RESULT_FILE = saved_file
+
+
+class FlakySink(ListSink):
+    """前 failures 次写出失败"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def write_batch(self, lines, records):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("save_item 失败")
+        super().write_batch(lines, records)
+
+
+def test_failed_batches_retried_not_dropped():
+    """测试写出失败的批次保留并按顺序重试，关闭时仍写不出的结果写入待补交文件"""
+    print("🔍 测试写出失败重试")
+    sink, clock = FlakySink(failures=1), FakeClock(0.0)
+    emitter = ResultEmitter(sink, batch_size=2, max_batch_kb=100, flush_interval=10, clock=clock)
+    emitter.emit_many(make_product(i) for i in range(4))
+    # 第一批失败后在重试间隔内不再尝试，第二批排在后面
+    assert sink.batches == [] and emitter.stats()["pending"] == 4 and emitter.stats()["failures"] == 1
+    clock.now = 11
+    emitter.emit(make_product(4))
+    assert [[json.loads(line)["product_id"] for line in batch] for batch in sink.batches] \
+        == [["p0", "p1"], ["p2", "p3"], ["p4"]]
+    emitter.close()
+    assert sum(len(b) for b in sink.batches) == 5 and emitter.stats()["pending"] == 0
+
+    saved_dir = Config.UNSENT_RESULT_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            Config.UNSENT_RESULT_DIR = os.path.join(temp_dir, "unsent")
+            sink = FlakySink(failures=100)
+            emitter = ResultEmitter(sink, batch_size=2, max_batch_kb=100, flush_interval=10, clock=clock)
+            emitter.emit_many(make_product(i) for i in range(3))
+            assert not emitter.flush()
+            emitter.close()
+            with open(emitter.unsent_file, encoding="utf-8") as f:
+                assert [json.loads(line)["product_id"] for line in f] == ["p0", "p1", "p2"]
+            assert sink.closed and emitter.stats()["pending"] == 0
+
+            # 待补交文件也写不了时抛出异常
+            Config.UNSENT_RESULT_DIR = os.path.join(emitter.unsent_file, "not_a_dir")
+            emitter = ResultEmitter(FlakySink(failures=100), batch_size=10, max_batch_kb=100, flush_interval=10)
+            emitter.emit(make_product(1))
+            try:
+                emitter.close()
+                raise AssertionError("结果无处写入时应抛出异常")
+            except ResultEmitError:
+                pass
+        finally:
+            Config.UNSENT_RESULT_DIR = saved_dir
+
+
+def test_stdout_sink_keeps_debug_output_out():
+    """测试标准输出通道中只有结果，print() 的调试信息改写到标准错误"""
+    print("🔍 测试标准输出通道")
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        emitter = ResultEmitter(StdoutResultSink(), batch_size=2, max_batch_kb=100, flush_interval=60)
+        print("🌐 访问页面")
+        emitter.emit(make_product(1))
+        print("💾 保存商品")
+        emitter.emit(make_product(2))
+        emitter.close()
+        print("✅ 完成")
+    lines = stdout.getvalue().splitlines()
+    assert [json.loads(line)["product_id"] for line in lines[:2]] == ["p1", "p2"]
+    assert lines[2:] == ["✅ 完成"]
+    assert "访问页面" in stderr.getvalue() and "保存商品" in stderr.getvalue()
+
+
+def main():
+    """主函数"""
+    print("Crawlab结果输出测试")
+    print("=" * 50)
+    test_batching_by_count_size_and_time()
+    test_file_and_crawlab_sinks()
+    test_failed_batches_retried_not_dropped()
+    test_stdout_sink_keeps_debug_output_out()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+重试与熔断测试
+验证错误分类、按错误类型的重试次数、依赖熔断的打开/半开/恢复，以及异步重试不阻塞其他任务
+"""
+import os
+import sys
+import asyncio
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+from utils.retry_engine import (
+    RetryEngine, RetryPolicy, CaptchaBlockedError, CircuitOpenError, classify_error, retryable,
+    ERROR_CAPTCHA, ERROR_TIMEOUT, ERROR_MONGO, ERROR_BROWSER, ERROR_OTHER,
+    CIRCUIT_OPEN, CIRCUIT_HALF_OPEN, CIRCUIT_CLOSED,
+)
+from utils.database import DatabaseManager
+from models.product import ProductData
+from memory_collection import MemoryCollection
+from fake_clock import FakeClock
+
+
+class PageDisconnectedError(Exception):
+    """与DrissionPage同名的异常"""
+
+
+def _engine(clock=None, sleeps=None, **overrides) -> RetryEngine:
+    policies = {
+        ERROR_CAPTCHA: RetryPolicy(max_attempts=2, base_delay=10.0, jitter=0, trips_breaker=False),
+        ERROR_TIMEOUT: RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0),
+        ERROR_MONGO: RetryPolicy(max_attempts=4, base_delay=0.5, jitter=0),
+        ERROR_OTHER: RetryPolicy(max_attempts=1, base_delay=1.0, jitter=0),
+    }
+    params = dict(failure_threshold=3, recovery_timeout=30, clock=clock or FakeClock(),
+                  sleep=(sleeps.append if sleeps is not None else lambda s: None))
+    params.update(overrides)
+    return RetryEngine(policies, **params)
+
+
+def _failing(errors):
+    """依次抛出 errors 中的异常，之后返回 ok"""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    func.calls = calls
+    return func
+
+
+def test_classify_error():
+    """测试错误分类，包括包装过的异常"""
+    print("🔍 测试错误分类")
+    assert classify_error(AutoReconnect("connection reset")) == ERROR_MONGO
+    assert classify_error(DuplicateKeyError("E11000")) == ERROR_OTHER
+    assert classify_error(CaptchaBlockedError("slider")) == ERROR_CAPTCHA
+    assert classify_error(TimeoutError()) == ERROR_TIMEOUT
+    assert classify_error(Exception("page load timed out")) == ERROR_TIMEOUT
+    assert classify_error(Exception("chrome not reachable")) == ERROR_BROWSER
+    assert classify_error(PageDisconnectedError("与页面的连接已断开")) == ERROR_BROWSER
+    try:
+        try:
+            raise PageDisconnectedError("page gone")
+        except Exception as e:
+            raise Exception(f"页面导航失败: {e}") from e
+    except Exception as wrapped:
+        assert classify_error(wrapped) == ERROR_BROWSER
+    assert classify_error(ValueError("bad value")) == ERROR_OTHER
+
+
+def test_policy_per_error_class():
+    """测试各类错误按自己的策略重试和退避，retry_on 之外的错误不重试"""
+    print("🔍 测试按错误类型重试")
+    sleeps = []
+    engine = _engine(sleeps=sleeps)
+    func = _failing([AutoReconnect("x"), AutoReconnect("x"), AutoReconnect("x")])
+    assert engine.call(func, dependency="mongo") == "ok"
+    assert len(func.calls) == 4 and sleeps == [0.5, 1.0, 2.0]
+
+    sleeps.clear()
+    func = _failing([TimeoutError()] * 3)
+    try:
+        engine.call(func, dependency="browser")
+        raise AssertionError("超过重试次数应抛出异常")
+    except TimeoutError:
+        pass
+    assert len(func.calls) == 3 and sleeps == [1.0, 2.0]
+
+    retried = []
+    func = _failing([AutoReconnect("x"), ValueError("bad")])
+    try:
+        engine.call(func, dependency="mongo", retry_on=(ERROR_MONGO,),
+                    on_retry=lambda e, attempt: retried.append((type(e).__name__, attempt)))
+        raise AssertionError("retry_on之外的错误应直接抛出")
+    except ValueError:
+        pass
+    assert len(func.calls) == 2 and retried == [("AutoReconnect", 1)]
+
+    # 兼容 RetryManager 接口
+    assert engine.execute_with_retry(_failing([AutoReconnect("x")]), dependency="mongo") == "ok"
+
+
+def test_circuit_breaker_transitions():
+    """测试连续失败后熔断、恢复时间后半开放行一次试探、试探成功后恢复，验证码不计入熔断"""
+    print("🔍 测试熔断器")
+    clock = FakeClock()
+    engine = _engine(clock=clock)
+    for _ in range(3):
+        try:
+            engine.call(_failing([ValueError("down")]), dependency="api")
+        except ValueError:
+            pass
+    breaker = engine.breaker("api")
+    assert breaker.state == CIRCUIT_OPEN
+
+    func = _failing([])
+    try:
+        engine.call(func, dependency="api")
+        raise AssertionError("熔断中应直接拒绝")
+    except CircuitOpenError as e:
+        assert e.dependency == "api" and e.retry_after == 30
+    assert not func.calls
+    # 其他依赖不受影响
+    assert engine.call(_failing([]), dependency="mongo") == "ok"
+
+    # 半开状态试探失败，重新熔断
+    clock.now += 31
+    try:
+        engine.call(_failing([ValueError("still down")]), dependency="api")
+    except ValueError:
+        pass
+    assert breaker.state == CIRCUIT_OPEN
+
+    clock.now += 31
+    breaker.before_call()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    try:
+        breaker.before_call()
+        raise AssertionError("半开状态只放行一次试探")
+    except CircuitOpenError:
+        pass
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED and engine.stats()["api"]["failures"] == 0
+
+    for _ in range(5):
+        try:
+            engine.call(_failing([CaptchaBlockedError("x")] * 2), dependency="site")
+        except CaptchaBlockedError:
+            pass
+    assert engine.breaker("site").state == CIRCUIT_CLOSED
+
+
+def test_client_errors_leave_breaker_closed():
+    """测试 retry_on 之外的错误（重复键、解析失败）和默认策略下的其他错误不计入熔断"""
+    print("🔍 测试调用方错误不触发熔断")
+    engine = _engine()
+    for _ in range(10):
+        try:
+            engine.call(_failing([DuplicateKeyError("E11000")]), dependency="mongo", retry_on=(ERROR_MONGO,))
+        except DuplicateKeyError:
+            pass
+    assert engine.breaker("mongo").state == CIRCUIT_CLOSED and engine.breaker("mongo").failures == 0
+    assert engine.call(_failing([]), dependency="mongo", retry_on=(ERROR_MONGO,)) == "ok"
+
+    async def parse_error():
+        raise ValueError("页面结构不匹配")
+
+    async def run():
+        for _ in range(10):
+            try:
+                await engine.call_async(parse_error, dependency="browser", retry_on=(ERROR_BROWSER, ERROR_TIMEOUT))
+            except ValueError:
+                pass
+    asyncio.run(run())
+    assert engine.breaker("browser").state == CIRCUIT_CLOSED
+
+    # 默认策略中其他错误不计入熔断
+    default_engine = RetryEngine(failure_threshold=2, sleep=lambda s: None)
+    default_engine.policies[ERROR_OTHER].max_attempts = 1
+    for _ in range(5):
+        try:
+            default_engine.call(_failing([ValueError("bad")]), dependency="api")
+        except ValueError:
+            pass
+    assert default_engine.breaker("api").state == CIRCUIT_CLOSED
+
+
+def test_async_retry_does_not_block():
+    """测试异步重试等待期间其他任务继续执行，以及装饰器"""
+    print("🔍 测试异步重试")
+    engine = _engine()
+    engine.policies[ERROR_TIMEOUT] = RetryPolicy(max_attempts=3, base_delay=0.05, jitter=0)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    attempts = []
+
+    @retryable("browser", engine=engine)
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(flaky(), ticker())
+
+    result, _ = asyncio.run(run())
+    assert result == "ok" and len(attempts) == 3
+    assert len(ticks) == 5
+
+    @retryable("mongo", engine=engine)
+    def sync_write():
+        return "written"
+    assert sync_write() == "written" and sync_write.__name__ == "sync_write"
+
+
+class FlakyCollection(MemoryCollection):
+    """前 failures 次写入抛出 AutoReconnect；applied=True 时写入已经执行、只是确认丢失（bulk_write 逐条经过 update_one）"""
+
+    def __init__(self, failures: int, applied: bool = False):
+        super().__init__()
+        self.failures = failures
+        self.applied = applied
+
+    def _flaky(self, write, *args, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            if self.applied:
+                write(*args, **kwargs)
+            raise AutoReconnect("primary stepped down")
+        return write(*args, **kwargs)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        return self._flaky(super().update_one, query, update, upsert)
+
+
+def _product(product_id: str) -> ProductData:
+    return ProductData(product_id=product_id, title="Phone Case", search_keyword="phone case",
+                       current_price=19.99, origin_price=29.99)
+
+
+def test_database_writes_retry_transient_errors():
+    """测试数据库写入遇到Mongo网络抖动时重试成功"""
+    print("🔍 测试数据库写入重试")
+    db_manager = DatabaseManager()
+    db_manager.collection = FlakyCollection(failures=1)
+    assert db_manager.insert_product(_product("p1"))
+    assert db_manager.collection.count_documents({}) == 1
+
+
+def test_retried_inserts_do_not_duplicate():
+    """测试写入已执行但确认丢失时，重试不会重复插入商品"""
+    print("🔍 测试重试不重复插入")
+    db_manager = DatabaseManager()
+    db_manager.collection = FlakyCollection(failures=1, applied=True)
+    db_manager.insert_product(_product("p1"))
+    assert db_manager.collection.count_documents({"product_id": "p1"}) == 1
+
+    db_manager.collection.failures = 1
+    db_manager.insert_products([_product(f"p{i}") for i in range(1, 5)])
+    assert db_manager.collection.count_documents({}) == 4
+    assert db_manager.insert_products([_product("p4"), _product("p5")]) == 1
+    assert db_manager.collection.count_documents({}) == 5
+
+
+def main():
+    """主函数"""
+    print("重试与熔断测试")
+    print("=" * 50)
+    test_classify_error()
+    test_policy_per_error_class()
+    test_circuit_breaker_transitions()
+    test_client_errors_leave_breaker_closed()
+    test_async_retry_does_not_block()
+    test_database_writes_retry_transient_errors()
+    test_retried_inserts_do_not_duplicate()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
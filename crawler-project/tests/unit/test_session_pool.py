@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+浏览器会话池测试
+验证会话分配优先级、按验证码比例淘汰会话、会话状态和cookie的持久化，以及每个进程独占一个会话池目录
+"""
+import os
+import sys
+import tempfile
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import Config
+from utils.session_pool import SessionPool, open_session_pool, lock_pool_dir, to_cookie_params
+from utils.rate_controller import OUTCOME_OK, OUTCOME_CAPTCHA, OUTCOME_ERROR
+
+USER_AGENTS = ["UA-1", "UA-2"]
+WINDOW_SIZES = [(1920, 1080), (1366, 768)]
+
+
+def _pool(pool_dir: str, **overrides) -> SessionPool:
+    params = dict(size=3, max_captcha_rate=0.3, min_pages=5, max_consecutive_captchas=3,
+                  user_agents=USER_AGENTS, window_sizes=WINDOW_SIZES, proxies=[])
+    params.update(overrides)
+    return SessionPool(pool_dir, **params)
+
+
+def test_acquire_prefers_healthy_sessions():
+    """测试补足会话数、指纹不重复，以及优先分配验证码少的会话"""
+    print("🔍 测试会话分配")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pool = _pool(tmp_dir)
+        first = pool.acquire()
+        assert len(pool.sessions) == 3
+        assert len({s.fingerprint for s in pool.sessions.values()}) == 3
+        assert first.proxy == "" and first.profile_dir.startswith(os.path.join(tmp_dir, "profiles"))
+
+        # 已分配的会话不会被重复分配
+        second = pool.acquire()
+        third = pool.acquire()
+        assert len({first.session_id, second.session_id, third.session_id}) == 3
+
+        pool.record(first, OUTCOME_CAPTCHA)
+        pool.record(second, OUTCOME_OK)
+        pool.record(third, OUTCOME_OK)
+        pool.record(third, OUTCOME_OK)
+        for session in (first, second, third):
+            pool.release(session)
+        assert pool.acquire().session_id == third.session_id
+        assert pool.acquire().session_id == second.session_id
+
+
+def test_burned_sessions_are_retired():
+    """测试连续验证码和验证码比例过高时淘汰会话，并删除cookie和用户数据目录"""
+    print("🔍 测试会话淘汰")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pool = _pool(tmp_dir, size=1)
+        session = pool.acquire()
+        os.makedirs(session.profile_dir)
+        assert pool.save_cookies(session, [{"name": "sid", "value": "1"}])
+
+        assert not pool.record(session, OUTCOME_CAPTCHA)
+        assert not pool.record(session, OUTCOME_ERROR)  # 出错不计入验证码
+        assert not pool.record(session, OUTCOME_CAPTCHA)
+        assert pool.record(session, OUTCOME_CAPTCHA)
+        assert session.session_id not in pool.sessions and pool.retired_total == 1
+        assert not os.path.exists(pool.cookie_path(session))
+        assert not os.path.exists(session.profile_dir)
+        assert not pool.save_cookies(session, [{"name": "sid", "value": "2"}])
+
+        # 新会话: 前 min_pages 页不按比例淘汰，之后验证码比例超过阈值时淘汰
+        replacement = pool.acquire()
+        assert replacement.session_id != session.session_id
+        outcomes = [OUTCOME_CAPTCHA, OUTCOME_CAPTCHA, OUTCOME_OK, OUTCOME_CAPTCHA]
+        assert not any(pool.record(replacement, outcome) for outcome in outcomes)
+        assert replacement.captcha_ratio > 0.3
+        assert pool.record(replacement, OUTCOME_OK)
+        assert pool.stats()["retired_total"] == 2
+
+
+def test_state_and_cookies_persist():
+    """测试会话统计和cookie在重新打开会话池后保留"""
+    print("🔍 测试会话持久化")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pool = _pool(tmp_dir, size=2)
+        session = pool.acquire()
+        pool.record(session, OUTCOME_OK)
+        cookies = [
+            {"name": "sid", "value": "abc", "domain": ".tiktok.com", "path": "/", "expires": -1,
+             "size": 6, "session": True, "priority": "Medium"},
+            {"name": "tt", "value": "x", "domain": ".tiktok.com", "expires": 1900000000.0},
+        ]
+        pool.release(session, cookies)
+
+        reloaded = _pool(tmp_dir, size=2)
+        assert set(reloaded.sessions) == set(pool.sessions)
+        restored = reloaded.sessions[session.session_id]
+        assert restored.pages == 1 and restored.window_size == session.window_size
+        assert reloaded.load_cookies(restored) == cookies
+        assert reloaded.acquire().session_id == session.session_id
+
+        params = to_cookie_params(cookies)
+        assert params[0] == {"name": "sid", "value": "abc", "domain": ".tiktok.com", "path": "/"}
+        assert params[1]["expires"] == 1900000000.0
+
+
+def test_worker_dirs_not_shared():
+    """测试同时打开的会话池领取不同的 worker 目录，关闭后目录可以被重新领取并沿用原有会话"""
+    print("🔍 测试会话池目录独占")
+    saved = Config.SESSION_POOL_ENABLED
+    Config.SESSION_POOL_ENABLED = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = open_session_pool(tmp_dir)
+            second = open_session_pool(tmp_dir)
+            assert first.pool_dir == os.path.join(tmp_dir, "worker-0")
+            assert second.pool_dir == os.path.join(tmp_dir, "worker-1")
+            assert lock_pool_dir(first.pool_dir) is None
+            session = first.acquire()
+            second.acquire()
+            assert not set(first.sessions) & set(second.sessions)
+
+            first.close()
+            reopened = open_session_pool(tmp_dir)
+            assert reopened.pool_dir == first.pool_dir and session.session_id in reopened.sessions
+            reopened.close()
+            second.close()
+    finally:
+        Config.SESSION_POOL_ENABLED = saved
+
+
+def main():
+    """主函数"""
+    print("浏览器会话池测试")
+    print("=" * 50)
+    test_acquire_prefers_healthy_sessions()
+    test_burned_sessions_are_retired()
+    test_state_and_cookies_persist()
+    test_worker_dirs_not_shared()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
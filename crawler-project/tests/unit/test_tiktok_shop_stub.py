@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+本地TikTok Shop替身服务测试
+验证搜索页数据结构、翻页接口、详情页、验证码注入和内存集合替身
+"""
+import os
+import re
+import sys
+import json
+import tempfile
+import http.cookiejar
+import urllib.error
+import urllib.request
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "tests", "mock"))
+sys.path.insert(0, os.path.join(project_root, "scripts", "benchmark"))
+
+from utils.captcha_corpus import generate_synthetic_corpus
+from tiktok_shop_stub import TikTokShopStub, PRODUCT_LIST_PATH
+from memory_collection import MemoryCollection
+from bench_common import StageTimer
+
+
+def _router_data(html: str) -> dict:
+    match = re.search(r'<script id="__MODERN_ROUTER_DATA__"[^>]*>(.*?)</script>', html, re.S)
+    assert match, "页面缺少 __MODERN_ROUTER_DATA__"
+    return json.loads(match.group(1))
+
+
+def test_search_page_and_pagination():
+    """测试搜索页组件数据和翻页接口"""
+    print("🔍 测试搜索页和翻页接口")
+    with TikTokShopStub(products_per_page=5, max_pages=2) as stub:
+        html = urllib.request.urlopen(stub.search_url("phone case"), timeout=5).read().decode()
+        assert "View more" in html
+        components = _router_data(html)["loaderData"]["shop/s/(keyword)/page"]["page_config"]["components_map"]
+        feed = [c for c in components if c["component_name"] == "feed_list_search_word"][0]
+        products = feed["component_data"]["products"]
+        assert len(products) == 5
+        assert products[0]["product_price_info"]["sale_price_format"].startswith("$")
+
+        request = urllib.request.Request(
+            stub.base_url + PRODUCT_LIST_PATH, data=json.dumps({"keyword": "phone case", "page": 2}).encode(),
+            headers={"Content-Type": "application/json"})
+        page2 = json.loads(urllib.request.urlopen(request, timeout=5).read())
+        assert len(page2["data"]["products"]) == 5 and page2["data"]["has_more"] is False
+        assert not {p["product_id"] for p in products} & {p["product_id"] for p in page2["data"]["products"]}
+
+        # GET 查询参数与 POST 返回一致，数据可复现
+        again = json.loads(urllib.request.urlopen(
+            f"{stub.base_url}{PRODUCT_LIST_PATH}?keyword=phone%20case&page=2", timeout=5).read())
+        assert again == page2
+        assert stub.stats["search_pages"] == 1 and stub.stats["api_pages"] == 2
+    print("✅ 搜索页和翻页接口测试通过")
+
+
+def test_detail_page():
+    """测试详情页product_info组件"""
+    with TikTokShopStub(products_per_page=2, max_pages=1) as stub:
+        html = urllib.request.urlopen(stub.search_url("mug"), timeout=5).read().decode()
+        product_id = _router_data(html)["loaderData"]["shop/s/(keyword)/page"]["page_config"][
+            "components_map"][1]["component_data"]["products"][0]["product_id"]
+
+        detail_html = urllib.request.urlopen(f"{stub.base_url}/view/product/{product_id}", timeout=5).read().decode()
+        component = _router_data(detail_html)["loaderData"]["view/product/(product_id)/page"][
+            "page_config"]["components_map"][0]
+        assert component["component_type"] == "product_info"
+        info = component["component_data"]["product_info"]
+        assert info["product_id"] == product_id
+        assert json.loads(info["product_base"]["desc_detail"])[0]["type"] == "text"
+
+        try:
+            urllib.request.urlopen(f"{stub.base_url}/view/product/123", timeout=5)
+            assert False, "未知商品应返回404"
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+
+
+def test_captcha_injection_and_pass_cookie():
+    """测试验证码注入和一次性通行cookie"""
+    print("🔍 测试验证码注入")
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        samples = generate_synthetic_corpus(corpus_dir, count=2, seed=3)
+        with TikTokShopStub(products_per_page=1, max_pages=1, captcha_rate=1.0, captcha_samples=samples) as stub:
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            html = opener.open(stub.search_url("lamp"), timeout=5).read().decode()
+            assert '<div id="captcha_container">' in html
+            challenge_id = re.search(r'src="/captcha/(\w+)/img/bg.png"', html).group(1)
+            assert opener.open(f"{stub.base_url}/captcha/{challenge_id}/img/bg.png", timeout=5).read()[:4] == b"\x89PNG"
+
+            sample = stub._challenges[challenge_id]
+            bad = json.loads(opener.open(
+                f"{stub.base_url}/captcha/{challenge_id}/verify?dx={sample.expected_distance() + 40}", timeout=5).read())
+            ok = json.loads(opener.open(
+                f"{stub.base_url}/captcha/{challenge_id}/verify?dx={sample.expected_distance()}", timeout=5).read())
+            assert not bad["passed"] and ok["passed"]
+
+            # 通过后放行一次，下一次请求重新按比例注入
+            assert "__MODERN_ROUTER_DATA__" in opener.open(stub.search_url("lamp"), timeout=5).read().decode()
+            assert "captcha_container" in opener.open(stub.search_url("lamp"), timeout=5).read().decode()
+            assert stub.stats["captcha_passed"] == 1 and stub.stats["captcha_failed"] == 1
+            assert stub.stats["captcha_served"] == 2
+
+    try:
+        TikTokShopStub(captcha_rate=0.5)
+        assert False, "缺少验证码样本时应报错"
+    except ValueError:
+        pass
+    print("✅ 验证码注入测试通过")
+
+
+def test_memory_collection():
+    """测试内存集合替身"""
+    collection = MemoryCollection()
+    collection.insert_one({"product_id": "1", "price": 2.0})
+    collection.insert_many([{"product_id": "2", "price": 1.0}, {"product_id": "3"}])
+    assert collection.count_documents({}) == 3
+    assert collection.find_one({"product_id": "2"})["price"] == 1.0
+    assert [d["product_id"] for d in collection.find().sort("price").limit(2)] == ["3", "2"]
+
+    collection.update_one({"product_id": "4"}, {"$set": {"price": 5.0}}, upsert=True)
+    assert collection.count_documents({"product_id": "4"}) == 1
+    assert collection.delete_many({"product_id": "1"}).deleted_count == 1
+    assert collection.count_documents({}) == 3
+
+
+def test_stage_timer():
+    """测试阶段计时"""
+    class Worker:
+        def work(self, value):
+            return value * 2
+
+    timer = StageTimer()
+    worker = Worker()
+    timer.wrap(worker, "work", "double")
+    assert worker.work(3) == 6 and worker.work(4) == 8
+    with timer.stage("block"):
+        pass
+    summary = timer.summary()
+    assert summary["double"]["count"] == 2 and summary["block"]["count"] == 1
+
+
+def main():
+    """主函数"""
+    print("TikTok Shop替身服务测试")
+    print("=" * 50)
+    test_search_page_and_pagination()
+    test_detail_page()
+    test_captcha_injection_and_pass_cookie()
+    test_memory_collection()
+    test_stage_timer()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+阶段耗时追踪测试
+验证span嵌套、属性、关闭时的空实现以及JSON Lines/Chrome trace导出
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.tracing import Tracer
+
+
+def test_nested_spans():
+    """测试span嵌套和属性"""
+    print("🔍 测试span嵌套")
+    tracer = Tracer(enabled=True)
+    with tracer.span("keyword", keyword="phone case") as root:
+        with tracer.span("navigate"):
+            pass
+        with tracer.span("captcha") as span:
+            span.set_attribute("blocked", False)
+        with tracer.span("paginate", page=2):
+            with tracer.span("persist"):
+                assert tracer.current_span().name == "persist"
+        root.set_attribute("products", 3)
+
+    assert len(tracer.roots) == 1
+    tree = tracer.roots[0].to_dict()
+    assert [c["name"] for c in tree["children"]] == ["navigate", "captcha", "paginate"]
+    assert tree["attributes"] == {"keyword": "phone case", "products": 3}
+    assert tree["children"][1]["attributes"] == {"blocked": False}
+    assert tree["children"][2]["children"][0]["name"] == "persist"
+    assert "paginate" in tracer.format_tree(tracer.roots[0])
+    print("✅ span嵌套测试通过")
+
+
+def test_exception_recorded():
+    """测试异常记录到span属性并继续抛出"""
+    tracer = Tracer(enabled=True)
+    try:
+        with tracer.span("navigate"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert tracer.roots[0].attributes["error"] == "ValueError: boom"
+
+
+def test_disabled_tracer_is_noop():
+    """测试关闭时不记录任何数据"""
+    tracer = Tracer(enabled=False)
+    first = tracer.span("a", x=1)
+    with first as span:
+        span.set_attribute("y", 2)
+    assert first is tracer.span("b")
+    assert tracer.roots == []
+
+    @tracer.traced()
+    def work():
+        return 42
+
+    assert work() == 42 and tracer.roots == []
+
+
+def test_threads_have_separate_stacks():
+    """测试各线程的span互不嵌套"""
+    tracer = Tracer(enabled=True)
+
+    def worker(index):
+        with tracer.span("worker", index=index):
+            with tracer.span("step"):
+                pass
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(tracer.roots) == 4
+    assert all(len(root.children) == 1 for root in tracer.roots)
+
+
+def test_export_formats():
+    """测试JSON Lines和Chrome trace导出"""
+    tracer = Tracer(enabled=True)
+
+    @tracer.traced("parse")
+    def parse():
+        with tracer.span("component"):
+            pass
+
+    with tracer.span("keyword"):
+        parse()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jsonl_path = os.path.join(tmp_dir, "trace.jsonl")
+        assert tracer.export(jsonl_path)
+        with open(jsonl_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [r["name"] for r in records] == ["keyword", "parse", "component"]
+        assert records[2]["parent_id"] == records[1]["span_id"] and records[2]["depth"] == 2
+
+        chrome_path = os.path.join(tmp_dir, "trace.json")
+        assert tracer.export(chrome_path)
+        with open(chrome_path, encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+        assert len(events) == 3 and all(e["ph"] == "X" for e in events)
+        assert events[0]["ts"] <= events[1]["ts"] and events[0]["dur"] >= events[1]["dur"]
+
+
+def main():
+    """主函数"""
+    print("阶段耗时追踪测试")
+    print("=" * 50)
+    test_nested_spans()
+    test_exception_recorded()
+    test_disabled_tracer_is_noop()
+    test_threads_have_separate_stacks()
+    test_export_formats()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
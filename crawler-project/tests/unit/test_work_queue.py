@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+分布式关键词任务队列测试
+验证优先级顺序、去重、租约超时回收、失败重试、续约以及多worker并发领取
+"""
+import os
+import sys
+import time
+import threading
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.work_queue import (
+    MemoryWorkQueue, iter_leases,
+    STATE_READY, STATE_LEASED, STATE_DONE, STATE_DEAD
+)
+
+
+def _queue(**kwargs) -> MemoryWorkQueue:
+    params = dict(name="test", visibility_timeout=60, max_retries=1, retry_delay=0)
+    params.update(kwargs)
+    return MemoryWorkQueue(**params)
+
+
+def test_priority_and_dedupe():
+    """测试优先级高的先领取，同优先级先入先出，队列中的关键词不重复加入"""
+    print("🔍 测试优先级和去重")
+    queue = _queue()
+    assert queue.put_many(["a", "b", "", "a"]) == 2
+    assert queue.put("urgent", priority=5, payload={"max_pages": 3})
+
+    order = []
+    for _ in range(3):
+        item = queue.lease("w1")
+        order.append(item.keyword)
+        if item.keyword == "urgent":
+            assert item.payload == {"max_pages": 3} and item.attempts == 1
+    assert order == ["urgent", "a", "b"]
+    assert queue.lease("w1") is None
+    # 已领取的不重复加入
+    assert not queue.put("a")
+    assert queue.stats()[STATE_LEASED] == 3
+
+
+def test_lease_expiry_and_retries():
+    """测试租约超时回收、过期租约确认失败、重试次数用完后进入dead"""
+    print("🔍 测试租约超时和重试")
+    queue = _queue(visibility_timeout=0.05)
+    queue.put("kw")
+
+    first = queue.lease("w1")
+    time.sleep(0.1)
+    second = queue.lease("w2")
+    assert second.keyword == "kw" and second.attempts == 2
+    # w1 的租约已超时，确认无效
+    assert not queue.ack(first)
+    assert queue.extend(second, visibility_timeout=60)
+
+    assert queue.nack(second, error="timeout")
+    assert queue.stats()[STATE_DEAD] == 1
+    assert queue.lease("w1") is None
+    # 完成或dead的关键词可以重新加入
+    assert queue.put("kw")
+    assert queue.lease("w1").attempts == 1
+
+
+def test_nack_requeues_then_ack():
+    """测试失败后重新入队，成功后标记完成"""
+    print("🔍 测试失败重试")
+    queue = _queue(retry_delay=0)
+    queue.put("kw")
+    item = queue.lease("w1")
+    assert queue.nack(item, error="未采集到商品")
+    assert queue.stats()[STATE_READY] == 1
+
+    item = queue.lease("w1")
+    assert item.attempts == 2
+    assert queue.ack(item)
+    assert not queue.ack(item)
+    assert queue.stats() == {STATE_READY: 0, STATE_LEASED: 0, STATE_DONE: 1, STATE_DEAD: 0}
+
+    delayed = _queue(retry_delay=60)
+    delayed.put("kw")
+    delayed.nack(delayed.lease("w1"))
+    assert delayed.lease("w1") is None
+
+
+def test_workers_share_queue():
+    """测试多个worker并发消费，每个关键词只被处理一次，队列空后退出"""
+    print("🔍 测试多worker并发领取")
+    queue = _queue()
+    keywords = [f"keyword {i}" for i in range(50)]
+    queue.put_many(keywords)
+    processed = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        for item in iter_leases(queue, worker_id, poll_interval=0.01, idle_timeout=1):
+            with lock:
+                processed.append(item.keyword)
+            queue.ack(item)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert sorted(processed) == sorted(keywords)
+    assert queue.stats()[STATE_DONE] == 50
+
+
+def main():
+    """主函数"""
+    print("分布式关键词任务队列测试")
+    print("=" * 50)
+    test_priority_and_dedupe()
+    test_lease_expiry_and_retries()
+    test_nack_requeues_then_ack()
+    test_workers_share_queue()
+    print("\n✅ 全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
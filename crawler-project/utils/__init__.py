@@ -1,6 +1,14 @@
 # 工具类包
-from .database import DatabaseManager, get_db_manager
-from .logger import setup_logger, get_logger, CrawlerLogger
-from .webdriver import WebDriverManager
+# 导出对象按需导入：import utils.logger 不会连带加载 pymongo、selenium
+from .lazy_import import lazy_package_getattr
 
-__all__ = ['DatabaseManager', 'get_db_manager', 'setup_logger', 'get_logger', 'CrawlerLogger', 'WebDriverManager']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'get_db_manager', 'setup_logger', 'get_logger', 'CrawlerLogger', 'WebDriverManager']
+
+__getattr__ = lazy_package_getattr(__name__, {
+    'DatabaseManager': '.database',
+    'get_db_manager': '.database',
+    'setup_logger': '.logger',
+    'get_logger': '.logger',
+    'CrawlerLogger': '.logger',
+    'WebDriverManager': '.webdriver',
+})
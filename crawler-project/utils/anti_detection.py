@@ -7,6 +7,7 @@ import random
 import logging
 from typing import Optional, List
 from utils.logger import get_logger
+from utils.metrics import REQUESTS_TOTAL
 
 logger = get_logger(__name__)
 
@@ -82,6 +83,7 @@ class AntiDetectionManager:
         
         self.last_request_time = time.time()
         self.request_count += 1
+        REQUESTS_TOTAL.inc()
     
     def adaptive_delay(self, base_delay: float = 2.0, error_count: int = 0):
         """
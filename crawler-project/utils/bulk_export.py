@@ -0,0 +1,204 @@
+"""
+商品集合批量导出
+全量导出百万级商品时，单个游标逐条读取并创建 ProductData 太慢:
+    按 _id 把集合切成多个区间（$sample 取样后取分位点，不扫描全表），
+    每个区间一个线程、一个带投影的游标，文档直接写入该区间自己的压缩文件（默认Parquet，没有pyarrow时为jsonl.gz），
+    后台线程按 BULK_EXPORT_PROGRESS_SECONDS 输出进度、吞吐和预计剩余时间。
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.lazy_import import module_available
+from utils.product_export import (
+    ProductExporter, parse_output_path, EXPORT_FIELDS, COMPRESSION_GZIP, FORMAT_ALIASES, FORMAT_PARQUET
+)
+
+logger = get_logger(__name__)
+
+# 每个分区的取样数，取样越多区间越均匀
+SAMPLES_PER_PARTITION = 20
+
+
+@dataclass
+class BulkExportReport:
+    """批量导出结果"""
+    rows: int = 0
+    seconds: float = 0.0
+    partitions: int = 0
+    files: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def split_id_ranges(collection, partitions: int) -> List[Dict]:
+    """
+    按 _id 把集合切成若干区间
+
+    Args:
+        collection: pymongo 集合
+        partitions: 区间数
+
+    Returns:
+        List[Dict]: 每个区间的 _id 查询条件，取样失败或数据太少时只有一个覆盖全集合的区间
+    """
+    if partitions <= 1:
+        return [{}]
+    try:
+        sample = collection.aggregate([{"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+                                       {"$project": {"_id": 1}}])
+        ids = sorted({doc["_id"] for doc in sample})
+    except Exception as e:
+        # _id 类型混杂无法比较，或服务端不支持 $sample
+        logger.warning(f"_id 取样失败，使用单个游标导出: {e}")
+        return [{}]
+    bounds = sorted({ids[len(ids) * i // partitions] for i in range(1, partitions)} if ids else set())
+    if not bounds:
+        return [{}]
+    ranges = [{"_id": {"$lt": bounds[0]}}]
+    ranges += [{"_id": {"$gte": low, "$lt": high}} for low, high in zip(bounds, bounds[1:])]
+    ranges.append({"_id": {"$gte": bounds[-1]}})
+    return ranges
+
+
+class _Progress:
+    """各分区共享的进度计数，后台线程定期输出"""
+
+    def __init__(self, total: Optional[int], interval: float, callback: Optional[Callable[[int, float], None]]):
+        self.total = total
+        self.interval = interval
+        self.callback = callback
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bulk-export-progress", daemon=True)
+
+    def add(self, rows: int):
+        with self._lock:
+            self.rows += rows
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            eta = (self.total - self.rows) / rate if rate > 0 else 0.0
+            message = (f"已导出 {self.rows}/{self.total} ({self.rows / self.total:.1%})，"
+                       f"{rate:.0f} 条/秒，预计剩余 {eta:.0f} 秒")
+        else:
+            message = f"已导出 {self.rows} 条，{rate:.0f} 条/秒"
+        logger.info(message)
+        print(f"📤 {message}")
+        if self.callback:
+            self.callback(self.rows, rate)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def __enter__(self) -> '_Progress':
+        if self.interval > 0:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self.report()
+
+
+def default_bulk_formats() -> List[str]:
+    """批量导出默认写Parquet，没有安装 pyarrow 时写 jsonl.gz（输出警告）"""
+    if module_available("pyarrow"):
+        return [FORMAT_PARQUET]
+    logger.warning("未安装 pyarrow，批量导出改为 jsonl.gz（列式导出需要 pip install pyarrow）")
+    return ["jsonl"]
+
+
+def bulk_export(collection, output_path: str, partitions: int = None, query: Dict = None,
+                formats: List[str] = None, batch_size: int = None, field_names: List[str] = None,
+                progress_interval: float = None,
+                on_progress: Optional[Callable[[int, float], None]] = None) -> BulkExportReport:
+    """
+    按 _id 区间并行导出商品集合
+
+    Args:
+        collection: pymongo 集合（如 DatabaseManager.collection）
+        output_path: 输出路径前缀，每个区间写入 <前缀>-partNNN（按 EXPORT_ROTATE_* 继续轮转）
+        partitions: 区间数（同时读取的游标数），默认 BULK_EXPORT_PARTITIONS
+        query: 额外的查询条件（不能包含 _id）
+        formats: 导出格式，默认 default_bulk_formats()
+        batch_size: 游标每批读取的文档数，默认 BULK_EXPORT_BATCH_SIZE
+        field_names: 导出字段（同时作为游标投影），默认 ProductData 全部字段
+        progress_interval: 进度输出间隔（秒），0表示不输出，默认 BULK_EXPORT_PROGRESS_SECONDS
+        on_progress: 每次输出进度时回调 on_progress(已导出条数, 每秒条数)
+
+    Returns:
+        BulkExportReport: 导出结果，某个区间失败时记录在 errors 中，其他区间照常完成
+
+    Raises:
+        ValueError: 指定了Parquet但没有安装 pyarrow
+    """
+    partitions = max(1, partitions or Config.BULK_EXPORT_PARTITIONS)
+    batch_size = batch_size or Config.BULK_EXPORT_BATCH_SIZE
+    field_names = field_names or EXPORT_FIELDS
+    base, path_formats, _ = parse_output_path(output_path)
+    formats = formats or path_formats or default_bulk_formats()
+    if FORMAT_PARQUET in (FORMAT_ALIASES.get(f.strip().lower()) for f in formats) and not module_available("pyarrow"):
+        # 不在每个区间里静默去掉Parquet，导出开始前就失败
+        raise ValueError("导出Parquet需要安装 pyarrow")
+    projection = {name: 1 for name in field_names}
+    interval = Config.BULK_EXPORT_PROGRESS_SECONDS if progress_interval is None else progress_interval
+
+    ranges = split_id_ranges(collection, partitions)
+    total = None if query else collection.estimated_document_count()
+    report = BulkExportReport(partitions=len(ranges))
+    lock = threading.Lock()
+    logger.info(f"开始批量导出: {len(ranges)} 个区间，格式 {formats}，预计 {total if total is not None else '未知'} 条")
+
+    def export_range(index: int, id_range: Dict, progress: _Progress):
+        exporter = ProductExporter(f"{base}-part{index:03d}", formats, compression=COMPRESSION_GZIP,
+                                   field_names=field_names)
+        pending = 0
+        try:
+            for document in collection.find({**(query or {}), **id_range}, projection).batch_size(batch_size):
+                exporter.write(document)
+                pending += 1
+                if pending >= batch_size:
+                    progress.add(pending)
+                    pending = 0
+            files = exporter.close()
+        except Exception as e:
+            exporter.abort()
+            logger.error(f"区间 {index} 导出失败: {e}")
+            with lock:
+                report.errors.append(f"part{index:03d}: {e}")
+            return
+        finally:
+            progress.add(pending)
+        with lock:
+            report.files.extend(files)
+
+    start = time.perf_counter()
+    with _Progress(total, interval, on_progress) as progress:
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="bulk-export") as executor:
+            for future in [executor.submit(export_range, i, r, progress) for i, r in enumerate(ranges, 1)]:
+                future.result()
+    report.rows = progress.rows
+    report.seconds = time.perf_counter() - start
+    report.files.sort()
+    logger.info(f"批量导出完成: {report.rows} 条，{report.seconds:.1f} 秒，{report.rows_per_second:.0f} 条/秒，"
+                f"{len(report.files)} 个文件")
+    return report
@@ -0,0 +1,297 @@
+"""
+验证码样本库
+保存/加载录制的滑块验证码图片对及其真实缺口位置，供离线回放基准测试使用
+样本库目录结构:
+    <corpus_dir>/manifest.jsonl        每行一个样本的元数据
+    <corpus_dir>/<sample_id>_bg.png     背景图
+    <corpus_dir>/<sample_id>_target.png 滑块图
+"""
+import os
+import json
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from typing import List, Optional, Iterator
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "manifest.jsonl"
+
+# TikTok验证码在页面中的标准显示宽度（与各滑块处理器中的340一致）
+DISPLAY_WIDTH = 340
+
+
+def get_cv2():
+    """延迟导入cv2，避免在模块加载时就失败"""
+    try:
+        import cv2
+        return cv2
+    except ImportError as e:
+        logger.warning(f"OpenCV导入失败: {e}")
+        return None
+
+
+@dataclass
+class CaptchaSample:
+    """单个验证码样本"""
+    sample_id: str
+    background_file: str
+    target_file: str
+    target_x: int                  # 缺口左边缘在背景原图中的X坐标（真实值）
+    image_width: int               # 背景原图宽度
+    image_height: int              # 背景原图高度
+    piece_width: int = 0           # 滑块图宽度
+    x_offset: float = 0.0          # 页面中滑块图相对背景图的水平偏移
+    source: str = "recorded"       # recorded / synthetic
+    recorded_at: str = ""
+    extra: dict = field(default_factory=dict)
+
+    # 样本所在目录，不写入manifest
+    base_dir: str = field(default="", repr=False, compare=False)
+
+    @property
+    def background_path(self) -> str:
+        return os.path.join(self.base_dir, self.background_file)
+
+    @property
+    def target_path(self) -> str:
+        return os.path.join(self.base_dir, self.target_file)
+
+    def read_background(self) -> bytes:
+        """读取背景图字节"""
+        with open(self.background_path, 'rb') as f:
+            return f.read()
+
+    def read_target(self) -> bytes:
+        """读取滑块图字节"""
+        with open(self.target_path, 'rb') as f:
+            return f.read()
+
+    def expected_distance(self, display_width: int = DISPLAY_WIDTH) -> float:
+        """
+        按各处理器使用的参考算法计算真实滑动距离
+        actual_x = target_x * (340 / width) - x_offset
+
+        Args:
+            display_width: 验证码显示宽度
+
+        Returns:
+            float: 期望滑动距离（页面像素）
+        """
+        if self.image_width <= 0:
+            return self.target_x - self.x_offset
+        return self.target_x * (display_width / self.image_width) - self.x_offset
+
+    def to_dict(self) -> dict:
+        """转换为manifest记录"""
+        data = asdict(self)
+        data.pop("base_dir", None)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict, base_dir: str = "") -> 'CaptchaSample':
+        """从manifest记录创建样本"""
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__ and k != "base_dir"}
+        return cls(base_dir=base_dir, **known)
+
+
+class CaptchaCorpus:
+    """验证码样本库"""
+
+    def __init__(self, corpus_dir: str):
+        """
+        初始化样本库
+
+        Args:
+            corpus_dir: 样本库目录
+        """
+        self.corpus_dir = corpus_dir
+        self.manifest_path = os.path.join(corpus_dir, MANIFEST_FILE)
+
+    def load(self) -> List[CaptchaSample]:
+        """
+        加载全部样本
+
+        Returns:
+            List[CaptchaSample]: 样本列表，manifest不存在时返回空列表
+        """
+        return list(self.iter_samples())
+
+    def iter_samples(self) -> Iterator[CaptchaSample]:
+        """逐个读取样本，跳过损坏的记录"""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield CaptchaSample.from_dict(json.loads(line), base_dir=self.corpus_dir)
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"跳过损坏的样本记录 {self.manifest_path}:{line_no}: {e}")
+
+    def add_sample(self, background_bytes: bytes, target_bytes: bytes, target_x: int,
+                   x_offset: float = 0.0, source: str = "recorded",
+                   sample_id: Optional[str] = None, extra: Optional[dict] = None) -> Optional[CaptchaSample]:
+        """
+        写入一个样本（图片文件 + manifest追加一行）
+
+        Args:
+            background_bytes: 背景图字节
+            target_bytes: 滑块图字节
+            target_x: 缺口左边缘X坐标（背景原图像素）
+            x_offset: 页面中滑块图相对背景图的水平偏移
+            source: 样本来源
+            sample_id: 样本ID，默认自动生成
+            extra: 附加信息
+
+        Returns:
+            CaptchaSample: 写入的样本，失败返回None
+        """
+        try:
+            os.makedirs(self.corpus_dir, exist_ok=True)
+            sample_id = sample_id or f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+            width, height = image_size(background_bytes)
+            piece_width, _ = image_size(target_bytes)
+
+            sample = CaptchaSample(
+                sample_id=sample_id,
+                background_file=f"{sample_id}_bg.png",
+                target_file=f"{sample_id}_target.png",
+                target_x=int(target_x),
+                image_width=width,
+                image_height=height,
+                piece_width=piece_width,
+                x_offset=float(x_offset),
+                source=source,
+                recorded_at=time.strftime('%Y-%m-%d %H:%M:%S'),
+                extra=extra or {},
+                base_dir=self.corpus_dir,
+            )
+
+            with open(sample.background_path, 'wb') as f:
+                f.write(background_bytes)
+            with open(sample.target_path, 'wb') as f:
+                f.write(target_bytes)
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(sample.to_dict(), ensure_ascii=False) + "\n")
+
+            return sample
+
+        except Exception as e:
+            logger.error(f"写入验证码样本失败: {e}")
+            return None
+
+
+def image_size(image_bytes: bytes):
+    """解析图片宽高，失败返回(0, 0)"""
+    cv2 = get_cv2()
+    if cv2 is None:
+        return 0, 0
+    import numpy as np
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return 0, 0
+    height, width = img.shape[:2]
+    return width, height
+
+
+def record_captcha_sample(background_bytes: bytes, target_bytes: bytes, target_x: int,
+                          x_offset: float = 0.0, handler: str = "") -> Optional[CaptchaSample]:
+    """
+    录制线上验证通过的验证码样本
+    仅在配置了 Config.CAPTCHA_CORPUS_DIR 时生效，验证通过的识别结果作为真实值
+
+    Args:
+        background_bytes: 背景图字节
+        target_bytes: 滑块图字节
+        target_x: 识别出的缺口X坐标
+        x_offset: 页面中滑块图相对背景图的水平偏移
+        handler: 录制样本的处理器名称
+
+    Returns:
+        CaptchaSample: 写入的样本，未启用录制时返回None
+    """
+    if not Config.CAPTCHA_CORPUS_DIR:
+        return None
+    sample = CaptchaCorpus(Config.CAPTCHA_CORPUS_DIR).add_sample(
+        background_bytes, target_bytes, target_x,
+        x_offset=x_offset, source="recorded", extra={"handler": handler}
+    )
+    if sample:
+        logger.info(f"已录制验证码样本: {sample.sample_id}")
+    return sample
+
+
+def generate_synthetic_corpus(corpus_dir: str, count: int = 20, seed: int = 42,
+                              width: int = 552, height: int = 344,
+                              piece_size: int = 110) -> List[CaptchaSample]:
+    """
+    生成合成验证码样本库（与TikTok验证码尺寸一致的拼图缺口）
+    用于没有录制样本时的离线回放基准测试
+
+    Args:
+        corpus_dir: 输出目录
+        count: 样本数量
+        seed: 随机种子，相同种子生成相同样本库
+        width: 背景图宽度
+        height: 背景图高度
+        piece_size: 滑块边长
+
+    Returns:
+        List[CaptchaSample]: 生成的样本列表
+    """
+    cv2 = get_cv2()
+    if cv2 is None:
+        raise RuntimeError("生成合成样本需要OpenCV")
+    import numpy as np
+
+    corpus = CaptchaCorpus(corpus_dir)
+    rng = np.random.default_rng(seed)
+    samples = []
+
+    # 拼图形状：圆角方块 + 上方和右侧两个凸起
+    mask = np.zeros((piece_size, piece_size), np.uint8)
+    inset = piece_size // 9
+    cv2.rectangle(mask, (inset, inset), (piece_size - inset, piece_size - inset), 255, -1)
+    cv2.circle(mask, (piece_size // 2, inset), inset + 2, 255, -1)
+    cv2.circle(mask, (piece_size - inset, piece_size // 2), inset + 2, 255, -1)
+    edge = cv2.morphologyEx(mask, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8)) > 0
+    inside = mask > 0
+
+    for index in range(count):
+        # 平滑纹理背景 + 噪声
+        coarse = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+        background = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+        background = cv2.add(background, rng.integers(0, 40, (height, width, 3), dtype=np.uint8))
+
+        target_x = int(rng.integers(piece_size + 20, width - piece_size - 10))
+        target_y = int(rng.integers(10, height - piece_size - 10))
+
+        piece = np.zeros((piece_size, piece_size, 4), np.uint8)
+        piece[..., :3] = background[target_y:target_y + piece_size, target_x:target_x + piece_size]
+        piece[..., 3] = mask
+
+        # 背景上挖出缺口：变暗 + 高亮描边
+        region = background[target_y:target_y + piece_size, target_x:target_x + piece_size]
+        region[inside] = (region[inside] * 0.45).astype(np.uint8)
+        region[edge] = 255
+
+        sample = corpus.add_sample(
+            cv2.imencode('.png', background)[1].tobytes(),
+            cv2.imencode('.png', piece)[1].tobytes(),
+            target_x,
+            source="synthetic",
+            sample_id=f"synthetic_{seed}_{index:04d}",
+            extra={"target_y": target_y},
+        )
+        if sample:
+            samples.append(sample)
+
+    logger.info(f"已生成合成验证码样本 {len(samples)} 个: {corpus_dir}")
+    return samples
@@ -0,0 +1,841 @@
+"""
+基于 Chrome DevTools Protocol 的 asyncio 采集引擎
+直接通过浏览器调试端口的 websocket 发送 CDP 命令，不经过 DrissionPage/Selenium，
+一个进程内同时驱动多个标签页:
+    CdpBrowser      连接已启动的浏览器（CDP_ENDPOINT）或启动本地Chrome
+    CdpTab          一个标签页，提供可等待的导航、网络响应、DOM查询和鼠标操作
+    CdpCrawlEngine  按 CDP_CONCURRENCY 个标签页并发处理任务，超时和浏览器断开按重试引擎重试，
+                    内存超限时换新标签页，自己启动的浏览器需要时重启
+验证码处理、商品解析等同步代码用 run_blocking() 放到线程池执行，不阻塞事件循环。
+"""
+import os
+import re
+import json
+import base64
+import shutil
+import struct
+import asyncio
+import hashlib
+import tempfile
+import functools
+import itertools
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from utils.logger import get_logger
+from utils.retry_engine import RetryEngine, get_retry_engine, ERROR_BROWSER, ERROR_TIMEOUT, classify_error
+from utils.session_pool import to_cookie_params
+from utils.memory_governor import (
+    MemoryGovernor, open_memory_governor, ACTION_NONE, ACTION_RECYCLE_TABS, ACTION_RESTART_BROWSER
+)
+
+logger = get_logger(__name__)
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+# CDP 单条消息可能很大（整页HTML、接口响应体）
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+DEVTOOLS_LISTENING = re.compile(r"DevTools listening on (ws://\S+)")
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+# 导航完成的判断事件
+LOAD_EVENTS = {"load": "Page.loadEventFired", "domcontentloaded": "Page.domContentEventFired"}
+
+
+class CdpError(Exception):
+    """CDP 命令返回错误或连接断开"""
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """
+    在线程池中执行同步函数（ddddocr识别、商品解析、数据库写入等），返回其结果
+
+    Args:
+        func: 同步函数
+        *args / **kwargs: 函数参数
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    """websocket 客户端帧掩码"""
+    if not data:
+        return data
+    repeated = (key * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(data), "big")
+
+
+class WebSocketClient:
+    """最小的 websocket 客户端（RFC 6455，文本消息），只用于连接浏览器调试端口"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, url: str, timeout: float = 10.0) -> 'WebSocketClient':
+        """
+        建立连接并完成握手
+
+        Args:
+            url: ws://host:port/path
+            timeout: 超时秒数
+
+        Raises:
+            CdpError: 握手失败
+        """
+        parts = urllib.parse.urlsplit(url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port or 80, limit=MAX_MESSAGE_BYTES), timeout)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        writer.write((
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("ascii"))
+        await writer.drain()
+        head = (await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)).decode("latin-1")
+        status_line, *header_lines = head.strip().split("\r\n")
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in header_lines)}
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        if status_line.split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != expected:
+            writer.close()
+            raise CdpError(f"websocket握手失败: {status_line}")
+        return cls(reader, writer)
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+        key = os.urandom(4)
+        self._writer.write(header + key + _mask(payload, key))
+        await self._writer.drain()
+
+    async def send(self, text: str):
+        if self.closed:
+            raise CdpError("websocket连接已断开")
+        await self._send_frame(OP_TEXT, text.encode("utf-8"))
+
+    async def recv(self) -> Optional[str]:
+        """
+        读取一条文本消息，自动回复ping
+
+        Returns:
+            Optional[str]: 消息内容，连接关闭时返回None
+        """
+        fragments = []
+        while True:
+            try:
+                first, second = await self._reader.readexactly(2)
+                length = second & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await self._reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await self._reader.readexactly(8))[0]
+                key = await self._reader.readexactly(4) if second & 0x80 else None
+                payload = await self._reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+            if key:
+                payload = _mask(payload, key)
+            opcode = first & 0x0F
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                await self.close()
+                return None
+            fragments.append(payload)
+            if first & 0x80:
+                return b"".join(fragments).decode("utf-8")
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self._send_frame(OP_CLOSE, struct.pack("!H", 1000))
+        except (ConnectionError, RuntimeError):
+            pass
+        self._writer.close()
+
+
+class CdpConnection:
+    """一个CDP websocket连接，按 sessionId 区分各标签页的命令和事件"""
+
+    def __init__(self, ws: WebSocketClient, timeout: float = None):
+        self._ws = ws
+        self.timeout = timeout or Config.CDP_COMMAND_TIMEOUT
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._listeners: Dict[Tuple[str, Optional[str]], List[Callable[[dict], None]]] = {}
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def open(cls, ws_url: str, timeout: float = None) -> 'CdpConnection':
+        ws = await WebSocketClient.connect(ws_url, timeout or Config.CDP_COMMAND_TIMEOUT)
+        return cls(ws, timeout)
+
+    @property
+    def closed(self) -> bool:
+        return self._ws.closed
+
+    async def send(self, method: str, params: Optional[dict] = None, session_id: Optional[str] = None,
+                   timeout: Optional[float] = None) -> dict:
+        """
+        发送命令并等待结果
+
+        Args:
+            method: CDP方法名，如 Page.navigate
+            params: 参数
+            session_id: 目标标签页的会话ID，None表示发给浏览器
+            timeout: 超时秒数，默认 CDP_COMMAND_TIMEOUT
+
+        Returns:
+            dict: 命令结果
+
+        Raises:
+            CdpError: 命令返回错误或连接断开
+            asyncio.TimeoutError: 超时
+        """
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def on(self, method: str, callback: Callable[[dict], None], session_id: Optional[str] = None) -> Callable[[], None]:
+        """
+        订阅事件
+
+        Args:
+            method: 事件名，如 Network.responseReceived
+            callback: 回调，参数为事件的 params
+            session_id: 只接收该标签页的事件
+
+        Returns:
+            Callable: 取消订阅的函数
+        """
+        key = (method, session_id)
+        self._listeners.setdefault(key, []).append(callback)
+
+        def remove():
+            callbacks = self._listeners.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+        return remove
+
+    def wait_event(self, method: str, session_id: Optional[str] = None,
+                   predicate: Optional[Callable[[dict], bool]] = None) -> asyncio.Future:
+        """
+        等待下一个满足条件的事件（需在触发动作之前调用）
+
+        Returns:
+            asyncio.Future: 结果为事件的 params
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        def callback(params: dict):
+            if not future.done() and (predicate is None or predicate(params)):
+                future.set_result(params)
+        remove = self.on(method, callback, session_id)
+        future.add_done_callback(lambda _: remove())
+        return future
+
+    async def _read_loop(self):
+        while True:
+            text = await self._ws.recv()
+            if text is None:
+                break
+            message = json.loads(text)
+            if "id" in message:
+                future = self._pending.get(message["id"])
+                if future and not future.done():
+                    if "error" in message:
+                        error = message["error"]
+                        future.set_exception(CdpError(f"{error.get('message')} ({error.get('code')})"))
+                    else:
+                        future.set_result(message.get("result", {}))
+                continue
+            for callback in list(self._listeners.get((message.get("method"), message.get("sessionId")), [])):
+                try:
+                    callback(message.get("params", {}))
+                except Exception as e:
+                    logger.warning(f"CDP事件回调异常 {message.get('method')}: {e}")
+        # 连接断开时所有未完成的命令失败（按浏览器断开重试）
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(CdpError("浏览器连接已断开"))
+
+    async def close(self):
+        await self._ws.close()
+        self._reader_task.cancel()
+
+
+@dataclass
+class CdpResponse:
+    """网络响应"""
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: str = ""
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class CdpTab:
+    """一个标签页（flatten 模式的目标会话）"""
+
+    def __init__(self, browser: 'CdpBrowser', target_id: str, session_id: str):
+        self.browser = browser
+        self.connection = browser.connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.closed = False
+
+    async def send(self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    def on(self, method: str, callback: Callable[[dict], None]) -> Callable[[], None]:
+        return self.connection.on(method, callback, self.session_id)
+
+    def wait_event(self, method: str, predicate: Optional[Callable[[dict], bool]] = None) -> asyncio.Future:
+        return self.connection.wait_event(method, self.session_id, predicate)
+
+    async def enable(self, user_agent: Optional[str] = None):
+        """启用页面和网络事件，按 BLOCKED_URL_PATTERNS 拦截请求"""
+        await asyncio.gather(self.send("Page.enable"), self.send("Network.enable"))
+        if Config.BLOCKED_URL_PATTERNS:
+            await self.send("Network.setBlockedURLs", {"urls": list(Config.BLOCKED_URL_PATTERNS)})
+        if user_agent:
+            await self.send("Network.setUserAgentOverride", {"userAgent": user_agent})
+
+    async def navigate(self, url: str, wait_until: str = "domcontentloaded", timeout: Optional[float] = None) -> str:
+        """
+        打开页面并等待加载
+
+        Args:
+            url: 页面地址
+            wait_until: domcontentloaded（与DrissionPage的eager模式一致）或 load
+            timeout: 超时秒数，默认 CDP_NAVIGATION_TIMEOUT
+
+        Returns:
+            str: 页面的 frameId
+
+        Raises:
+            CdpError: 导航失败（如 net::ERR_PROXY_CONNECTION_FAILED）
+            asyncio.TimeoutError: 加载超时
+        """
+        loaded = self.wait_event(LOAD_EVENTS[wait_until])
+        try:
+            result = await self.send("Page.navigate", {"url": url})
+            if result.get("errorText"):
+                raise CdpError(f"页面导航失败: {result['errorText']}")
+            await asyncio.wait_for(loaded, timeout or Config.CDP_NAVIGATION_TIMEOUT)
+            return result.get("frameId", "")
+        finally:
+            loaded.cancel()
+
+    async def reload(self, ignore_cache: bool = True, wait_until: str = "domcontentloaded",
+                     timeout: Optional[float] = None):
+        """刷新页面并等待加载"""
+        loaded = self.wait_event(LOAD_EVENTS[wait_until])
+        try:
+            await self.send("Page.reload", {"ignoreCache": ignore_cache})
+            await asyncio.wait_for(loaded, timeout or Config.CDP_NAVIGATION_TIMEOUT)
+        finally:
+            loaded.cancel()
+
+    def expect_response(self, url_part: str) -> asyncio.Future:
+        """
+        等待URL包含 url_part 的下一个网络响应（需在触发请求之前调用）
+
+        Returns:
+            asyncio.Future: 结果为 CdpResponse（含响应体）
+        """
+        future = asyncio.get_running_loop().create_future()
+        responses: Dict[str, dict] = {}
+
+        def on_response(params: dict):
+            response = params.get("response", {})
+            if url_part in response.get("url", "") and not responses:
+                responses[params["requestId"]] = response
+
+        def on_finished(params: dict):
+            response = responses.get(params.get("requestId"))
+            if response is not None and not future.done():
+                asyncio.ensure_future(self._fill_body(future, params["requestId"], response))
+
+        removers = [self.on("Network.responseReceived", on_response),
+                    self.on("Network.loadingFinished", on_finished)]
+        future.add_done_callback(lambda _: [remove() for remove in removers])
+        return future
+
+    async def _fill_body(self, future: asyncio.Future, request_id: str, response: dict):
+        try:
+            result = await self.send("Network.getResponseBody", {"requestId": request_id})
+            body = base64.b64decode(result["body"]).decode("utf-8", "replace") \
+                if result.get("base64Encoded") else result.get("body", "")
+            if not future.done():
+                future.set_result(CdpResponse(response.get("url", ""), int(response.get("status", 0)),
+                                              response.get("headers", {}), body))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def evaluate(self, expression: str, await_promise: bool = False) -> Any:
+        """
+        在页面中执行JS表达式
+
+        Returns:
+            表达式的值（按值返回）
+
+        Raises:
+            CdpError: 执行抛出异常
+        """
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": await_promise})
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CdpError(f"JS执行异常: {details.get('exception', {}).get('description') or details.get('text')}")
+        return result.get("result", {}).get("value")
+
+    async def title(self) -> str:
+        return await self.evaluate("document.title") or ""
+
+    async def url(self) -> str:
+        return await self.evaluate("location.href") or ""
+
+    async def _document(self) -> int:
+        return (await self.send("DOM.getDocument", {"depth": 0}))["root"]["nodeId"]
+
+    async def query(self, selector: str) -> Optional[int]:
+        """
+        查找第一个匹配CSS选择器的元素
+
+        Returns:
+            Optional[int]: 元素的 nodeId，未找到返回None
+        """
+        result = await self.send("DOM.querySelector", {"nodeId": await self._document(), "selector": selector})
+        return result.get("nodeId") or None
+
+    async def wait_for_selector(self, selector: str, timeout: float = 10.0, interval: float = 0.2) -> Optional[int]:
+        """等待元素出现，超时返回None"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            node_id = await self.query(selector)
+            if node_id or asyncio.get_running_loop().time() >= deadline:
+                return node_id
+            await asyncio.sleep(interval)
+
+    async def html(self) -> str:
+        """整个页面的HTML"""
+        return (await self.send("DOM.getOuterHTML", {"nodeId": await self._document()}))["outerHTML"]
+
+    async def outer_html(self, selector: str) -> Optional[str]:
+        node_id = await self.query(selector)
+        if not node_id:
+            return None
+        return (await self.send("DOM.getOuterHTML", {"nodeId": node_id}))["outerHTML"]
+
+    async def inner_html(self, selector: str) -> Optional[str]:
+        """元素内部的HTML（如 script 标签中的JSON），未找到返回None"""
+        outer = await self.outer_html(selector)
+        if outer is None:
+            return None
+        match = re.match(r"^<[^>]*>(.*)</[^>]+>\s*$", outer, re.S)
+        return match.group(1) if match else ""
+
+    async def box(self, selector: str) -> Optional[Tuple[float, float, float, float]]:
+        """
+        元素在页面中的位置
+
+        Returns:
+            Optional[Tuple]: (x, y, width, height)，未找到或不可见返回None
+        """
+        node_id = await self.query(selector)
+        if not node_id:
+            return None
+        try:
+            quad = (await self.send("DOM.getBoxModel", {"nodeId": node_id}))["model"]["content"]
+        except CdpError:
+            return None
+        xs, ys = quad[0::2], quad[1::2]
+        return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+    async def click(self, selector: str) -> bool:
+        """滚动到元素并点击，未找到返回False"""
+        node_id = await self.query(selector)
+        if not node_id:
+            return False
+        object_id = (await self.send("DOM.resolveNode", {"nodeId": node_id}))["object"]["objectId"]
+        await self.send("Runtime.callFunctionOn", {
+            "objectId": object_id,
+            "functionDeclaration": "function () { this.scrollIntoView({block: 'center'}); this.click(); }",
+        })
+        return True
+
+    async def drag(self, selector: str, dx: float, dy: float = 0.0, duration: float = 0.2, steps: int = 10) -> bool:
+        """
+        按住元素中心拖动（滑块验证码）
+
+        Args:
+            selector: 元素选择器
+            dx / dy: 拖动距离（页面像素）
+            duration: 拖动持续时间（秒）
+            steps: 中间移动事件数
+
+        Returns:
+            bool: 是否找到元素
+        """
+        box = await self.box(selector)
+        if box is None:
+            return False
+        x, y = box[0] + box[2] / 2, box[1] + box[3] / 2
+        await self.send("Input.dispatchMouseEvent",
+                        {"type": "mousePressed", "x": x, "y": y, "button": "left", "clickCount": 1})
+        for step in range(1, steps + 1):
+            await asyncio.sleep(duration / steps)
+            await self.send("Input.dispatchMouseEvent", {
+                "type": "mouseMoved", "x": x + dx * step / steps, "y": y + dy * step / steps, "button": "left"})
+        await self.send("Input.dispatchMouseEvent",
+                        {"type": "mouseReleased", "x": x + dx, "y": y + dy, "button": "left", "clickCount": 1})
+        return True
+
+    async def fetch_bytes(self, url: str) -> bytes:
+        """在页面内请求资源（与页面使用同一cookie和出口代理），返回内容"""
+        encoded = await self.evaluate(
+            f"fetch({json.dumps(url)}).then(r => r.arrayBuffer()).then(b => {{"
+            "let s = ''; const a = new Uint8Array(b);"
+            "for (let i = 0; i < a.length; i += 8192) s += String.fromCharCode.apply(null, a.subarray(i, i + 8192));"
+            "return btoa(s); })", await_promise=True)
+        return base64.b64decode(encoded or "")
+
+    async def get_cookies(self) -> List[dict]:
+        return (await self.send("Network.getAllCookies")).get("cookies", [])
+
+    async def set_cookies(self, cookies: List[dict]):
+        if cookies:
+            await self.send("Network.setCookies", {"cookies": to_cookie_params(cookies)})
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self in self.browser.tabs:
+            self.browser.tabs.remove(self)
+        try:
+            await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+        except (CdpError, asyncio.TimeoutError):
+            pass
+
+
+class CdpBrowser:
+    """浏览器级别的CDP连接"""
+
+    def __init__(self, connection: CdpConnection, process: Optional[asyncio.subprocess.Process] = None,
+                 temp_dir: Optional[tempfile.TemporaryDirectory] = None, local: bool = True,
+                 command: Optional[List[str]] = None):
+        self.connection = connection
+        self.process = process
+        self._temp_dir = temp_dir
+        # launch() 的启动命令，重启时原样再次执行（同一用户数据目录）
+        self._command = command
+        # 浏览器是否在本机（远程浏览器的进程无法通过 /proc 采样内存）
+        self.local = local
+        self.tabs: List[CdpTab] = []
+
+    @staticmethod
+    def _websocket_url(endpoint: str) -> str:
+        """http://host:port 通过 /json/version 获取浏览器的websocket地址"""
+        if endpoint.startswith("ws"):
+            return endpoint
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        with opener.open(endpoint.rstrip("/") + "/json/version", timeout=10) as response:
+            return json.loads(response.read())["webSocketDebuggerUrl"]
+
+    @classmethod
+    async def connect(cls, endpoint: Optional[str] = None) -> 'CdpBrowser':
+        """
+        连接已启动的浏览器
+
+        Args:
+            endpoint: http://host:port 或 ws://... ，默认 CDP_ENDPOINT
+        """
+        ws_url = await run_blocking(cls._websocket_url, endpoint or Config.CDP_ENDPOINT)
+        local = urllib.parse.urlsplit(ws_url).hostname in LOCAL_HOSTS
+        return cls(await CdpConnection.open(ws_url), local=local)
+
+    @classmethod
+    async def launch(cls, binary: Optional[str] = None, headless: Optional[bool] = None, proxy: Optional[str] = None,
+                     user_data_dir: Optional[str] = None, timeout: float = 30.0) -> 'CdpBrowser':
+        """
+        启动本地Chrome并连接
+
+        Args:
+            binary: Chrome路径，默认 CDP_CHROME_PATH 或在PATH中查找
+            headless: 是否无头，默认 HEADLESS_MODE
+            proxy: 代理地址 host:port 或 http://host:port
+            user_data_dir: 用户数据目录，默认使用临时目录（关闭时删除）
+            timeout: 等待调试端口的秒数
+
+        Raises:
+            CdpError: 找不到Chrome或启动失败
+        """
+        binary = binary or Config.CDP_CHROME_PATH or next(filter(None, map(shutil.which, CHROME_BINARIES)), None)
+        if not binary:
+            raise CdpError("未找到Chrome，请设置 CDP_CHROME_PATH")
+        temp_dir = None
+        if not user_data_dir:
+            temp_dir = tempfile.TemporaryDirectory(prefix="cdp-profile-")
+            user_data_dir = temp_dir.name
+        args = ["--remote-debugging-port=0", f"--user-data-dir={user_data_dir}", "--no-first-run",
+                "--no-default-browser-check", "--no-sandbox", "--disable-dev-shm-usage", "about:blank"]
+        if (Config.HEADLESS_MODE if headless is None else headless):
+            args.insert(0, "--headless=new")
+        if proxy:
+            args.insert(0, f"--proxy-server={proxy if '://' in proxy else 'http://' + proxy}")
+        command = [binary, *args]
+        try:
+            process, connection = await cls._spawn(command, timeout)
+        except Exception:
+            if temp_dir:
+                temp_dir.cleanup()
+            raise
+        return cls(connection, process, temp_dir, command=command)
+
+    @classmethod
+    async def _spawn(cls, command: List[str], timeout: float) -> Tuple[asyncio.subprocess.Process, CdpConnection]:
+        """启动Chrome进程并连接调试地址，失败时结束进程"""
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        try:
+            ws_url = await asyncio.wait_for(cls._read_devtools_url(process), timeout)
+            return process, await CdpConnection.open(ws_url)
+        except Exception:
+            process.kill()
+            await process.wait()
+            raise
+
+    @staticmethod
+    async def _read_devtools_url(process: asyncio.subprocess.Process) -> str:
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                raise CdpError("Chrome启动失败，未输出调试地址")
+            match = DEVTOOLS_LISTENING.search(line.decode("utf-8", "replace"))
+            if match:
+                return match.group(1)
+
+    async def pid(self) -> Optional[int]:
+        """浏览器主进程ID（本引擎启动的取子进程，连接的本机浏览器通过 SystemInfo.getProcessInfo 查询）"""
+        if self.process:
+            return self.process.pid
+        if not self.local:
+            return None
+        try:
+            processes = (await self.connection.send("SystemInfo.getProcessInfo"))["processInfo"]
+        except (CdpError, KeyError, asyncio.TimeoutError) as e:
+            logger.warning(f"查询浏览器进程失败: {e}")
+            return None
+        return next((p["id"] for p in processes if p.get("type") == "browser"), None)
+
+    async def new_tab(self, url: str = "about:blank", user_agent: Optional[str] = None) -> CdpTab:
+        """新建标签页并启用页面/网络事件"""
+        target_id = (await self.connection.send("Target.createTarget", {"url": url}))["targetId"]
+        session_id = (await self.connection.send(
+            "Target.attachToTarget", {"targetId": target_id, "flatten": True}))["sessionId"]
+        tab = CdpTab(self, target_id, session_id)
+        await tab.enable(user_agent)
+        self.tabs.append(tab)
+        return tab
+
+    async def _exit_process(self):
+        try:
+            await asyncio.wait_for(self.connection.send("Browser.close"), 5)
+        except Exception:
+            self.process.kill()
+        await self.process.wait()
+
+    async def restart(self, timeout: float = 30.0):
+        """
+        重启由 launch() 启动的浏览器: 沿用启动命令和用户数据目录（cookie保留），原有标签页全部失效
+
+        Args:
+            timeout: 等待调试端口的秒数
+
+        Raises:
+            CdpError: 浏览器不是由 launch() 启动的，或重新启动失败
+        """
+        if not self.process or not self._command:
+            raise CdpError("浏览器不是由本引擎启动的，无法重启")
+        self.tabs.clear()
+        await self._exit_process()
+        await self.connection.close()
+        self.process, self.connection = await self._spawn(self._command, timeout)
+
+    async def close(self):
+        """关闭所有标签页；由本引擎启动的浏览器同时退出"""
+        for tab in list(self.tabs):
+            if not self.connection.closed:
+                await tab.close()
+        self.tabs.clear()
+        if self.process:
+            await self._exit_process()
+        await self.connection.close()
+        if self._temp_dir:
+            self._temp_dir.cleanup()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class CdpCrawlEngine:
+    """多个标签页并发处理任务"""
+
+    def __init__(self, browser: CdpBrowser, concurrency: Optional[int] = None, user_agent: Optional[str] = None,
+                 retry_engine: Optional[RetryEngine] = None, memory_governor: Optional[MemoryGovernor] = None):
+        """
+        Args:
+            browser: 已连接的浏览器
+            concurrency: 同时使用的标签页数，默认 CDP_CONCURRENCY
+            user_agent: 标签页的UA
+            retry_engine: 重试引擎，默认全局实例
+            memory_governor: 内存管理器，默认按 MAX_MEMORY_MB 创建（为0时不限制）
+        """
+        self.browser = browser
+        self.concurrency = max(1, concurrency or Config.CDP_CONCURRENCY)
+        self.user_agent = user_agent
+        self.retry = retry_engine or get_retry_engine()
+        self.memory_governor = memory_governor or open_memory_governor("cdp_crawler")
+        # 内存超限时加一，各worker处理完当前任务后发现自己的标签页属于旧一代就换新标签页
+        self.tab_generation = 0
+        self._browser_pid: Optional[int] = None
+        # 重启浏览器时暂停领取新任务，等进行中的任务结束；重启产生的一代标签页不再记为回收标签页
+        self._restart_generation = -1
+        self._restarting = False
+        self._inflight = 0
+        self._resume: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Condition] = None
+
+    async def run(self, items: List[Any], handler: Callable[[CdpTab, Any], Awaitable[Any]]) -> List[Any]:
+        """
+        处理所有任务
+
+        Args:
+            items: 任务列表（如关键词）
+            handler: 协程函数 handler(tab, item)，超时和浏览器断开时重试（断开时换新标签页）
+
+        Returns:
+            List: 与 items 顺序一致的结果，失败的任务为None
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            queue.put_nowait((index, item))
+        results: List[Any] = [None] * len(items)
+        # 在运行中的事件循环里创建（Python 3.8/3.9 的 asyncio 原语创建时绑定事件循环）
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._idle = asyncio.Condition()
+        workers = [self._worker(worker, queue, handler, results)
+                   for worker in range(min(self.concurrency, len(items)))]
+        await asyncio.gather(*workers)
+        return results
+
+    async def _govern_memory(self):
+        """采样浏览器内存，超过阈值时让所有标签页换新，需要重启且浏览器由本引擎启动时重启浏览器"""
+        if not self.memory_governor or self._restarting:
+            return
+        if self._browser_pid is None:
+            self._browser_pid = await self.browser.pid()
+            if self._browser_pid is None:
+                return
+        action = await run_blocking(self.memory_governor.check, self._browser_pid, len(self.browser.tabs))
+        if action == ACTION_RESTART_BROWSER and self.browser.process:
+            await self._restart_browser()
+        elif action != ACTION_NONE:
+            # 标签页共享浏览器的cookie，换新标签页不会丢失登录和验证状态；
+            # 连接的浏览器进程不归引擎管理，需要重启时同样按换新标签页处理
+            self.tab_generation += 1
+
+    async def _restart_browser(self):
+        """等进行中的任务结束后重启浏览器，各worker随后在新浏览器中新建标签页"""
+        self._restarting = True
+        self._resume.clear()
+        try:
+            async with self._idle:
+                await self._idle.wait_for(lambda: self._inflight == 0)
+            logger.info("内存回收，重启浏览器")
+            await self.browser.restart()
+            self._browser_pid = await self.browser.pid()
+            self.tab_generation += 1
+            self._restart_generation = self.tab_generation
+            await run_blocking(self.memory_governor.recycled, ACTION_RESTART_BROWSER,
+                               self._browser_pid, len(self.browser.tabs))
+        finally:
+            self._restarting = False
+            self._resume.set()
+
+    async def _worker(self, worker: int, queue: asyncio.Queue, handler, results: List[Any]):
+        tab = await self.browser.new_tab(user_agent=self.user_agent)
+        holder = {"tab": tab, "generation": self.tab_generation}
+
+        async def replace_tab(error: Exception, attempt: int):
+            if classify_error(error) == ERROR_BROWSER:
+                logger.warning(f"标签页 {worker} 断开，新建标签页（第{attempt}次）")
+                await holder["tab"].close()
+                holder["tab"] = await self.browser.new_tab(user_agent=self.user_agent)
+
+        async def call(item):
+            return await handler(holder["tab"], item)
+
+        try:
+            while True:
+                # 重启浏览器期间不领取任务，重启后标签页属于旧一代，领取前换新
+                await self._resume.wait()
+                if queue.empty():
+                    break
+                if holder["generation"] != self.tab_generation:
+                    logger.info(f"标签页 {worker} 内存回收，新建标签页")
+                    await holder["tab"].close()
+                    holder["tab"] = await self.browser.new_tab(user_agent=self.user_agent)
+                    holder["generation"] = self.tab_generation
+                    if self.memory_governor and self.tab_generation != self._restart_generation:
+                        await run_blocking(self.memory_governor.recycled, ACTION_RECYCLE_TABS,
+                                           self._browser_pid, len(self.browser.tabs))
+                index, item = queue.get_nowait()
+                self._inflight += 1
+                try:
+                    results[index] = await self.retry.call_async(
+                        call, item, dependency="browser", on_retry=replace_tab, retry_on=(ERROR_BROWSER, ERROR_TIMEOUT))
+                except Exception as e:
+                    logger.error(f"任务处理失败 {item}: {e}")
+                finally:
+                    async with self._idle:
+                        self._inflight -= 1
+                        self._idle.notify_all()
+                await self._govern_memory()
+        finally:
+            await holder["tab"].close()
@@ -0,0 +1,210 @@
+"""
+商品变化检测
+把每个商品参与比较的字段（PRODUCT_FINGERPRINT_FIELDS）规范化后计算指纹，和上次保存的指纹比较:
+    new       - 新商品，写入完整文档，快照集合记录一条基线
+    changed   - 指纹变化，只 $set 变化的字段，快照集合追加一条只包含变化字段的记录
+    unchanged - 指纹未变，不写库
+多个worker可能同时采集同一个商品，写入以库中保存的指纹为准:
+    更新    update 的条件包含 fingerprint != 新指纹，库中已是相同指纹时不匹配（未变化）；
+            匹配时按返回的更新前文档计算变化字段，不依赖本进程缓存的旧值
+    新增    以 $setOnInsert 插入（product_id 唯一索引），其他worker已插入时改为按指纹更新
+内存中的LRU索引只作为提示: 记录本进程见过的商品，命中时条件更新不匹配即可判定未变化，不再尝试插入。
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHANGE_NEW = "new"
+CHANGE_UPDATED = "changed"
+CHANGE_UNCHANGED = "unchanged"
+
+
+@dataclass
+class ChangeResult:
+    """一个商品的变化检测结果"""
+    product_id: str
+    status: str
+    fingerprint: str
+    previous_fingerprint: str = ""
+    changes: Dict[str, List[Any]] = field(default_factory=dict)  # 字段 -> [旧值, 新值]
+
+
+def _normalize(value: Any) -> Any:
+    """规范化字段值，避免 10 和 10.0、首尾空白等差异导致指纹变化"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        value = round(float(value), 4)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def tracked_values(document: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """取出参与比较的字段（已规范化）"""
+    return {name: _normalize(document.get(name)) for name in fields}
+
+
+def compute_fingerprint(values: Dict[str, Any]) -> str:
+    """
+    计算字段值的指纹
+
+    Args:
+        values: tracked_values() 的结果
+
+    Returns:
+        str: 16字节blake2b十六进制摘要
+    """
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FingerprintIndex:
+    """product_id -> (指纹, 字段值) 的LRU缓存"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Tuple[str, Dict[str, Any]]]' = OrderedDict()
+
+    def get(self, product_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._entries.get(product_id)
+        if entry is not None:
+            self._entries.move_to_end(product_id)
+        return entry
+
+    def put(self, product_id: str, fingerprint: str, values: Dict[str, Any]):
+        self._entries[product_id] = (fingerprint, values)
+        self._entries.move_to_end(product_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ChangeDetector:
+    """按指纹检测商品变化，只写入变化的部分"""
+
+    def __init__(self, collection, snapshot_collection=None, fields: Optional[List[str]] = None,
+                 cache_size: Optional[int] = None):
+        """
+        初始化变化检测
+
+        Args:
+            collection: 商品集合
+            snapshot_collection: 快照集合，为None时不记录历史
+            fields: 参与比较的字段，默认从配置读取
+            cache_size: 指纹缓存大小，默认从配置读取
+        """
+        self.collection = collection
+        self.snapshot_collection = snapshot_collection
+        self.fields = list(fields or Config.PRODUCT_FINGERPRINT_FIELDS)
+        self.index = FingerprintIndex(cache_size or Config.PRODUCT_FINGERPRINT_CACHE_SIZE)
+        self.stats = {CHANGE_NEW: 0, CHANGE_UPDATED: 0, CHANGE_UNCHANGED: 0}
+        self._lock = threading.Lock()
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        try:
+            # 唯一索引: 并发插入同一商品时只有一个成功
+            self.collection.create_index("product_id", unique=True)
+            if self.snapshot_collection is not None:
+                self.snapshot_collection.create_index([("product_id", 1), ("scraped_at", 1)])
+        except Exception as e:
+            logger.warning(f"创建商品指纹索引失败: {e}")
+
+    def save(self, product) -> ChangeResult:
+        """
+        检测并写入商品
+
+        Args:
+            product: ProductData 或商品字典
+
+        Returns:
+            ChangeResult: 检测结果（以库中保存的指纹为准）
+        """
+        document = product.to_dict() if hasattr(product, "to_dict") else dict(product)
+        document["product_id"] = str(document["product_id"])
+        scraped_at = document.get("scraped_at") or datetime.now().isoformat()
+        values = tracked_values(document, self.fields)
+        fingerprint = compute_fingerprint(values)
+        with self._lock:
+            result = self._update_if_changed(document, values, fingerprint, scraped_at)
+            if result is None and self.index.get(document["product_id"]) is None:
+                result = self._insert_if_missing(document, values, fingerprint, scraped_at)
+                if result is None:
+                    # 其他worker刚插入了该商品，按库中的指纹重新比较
+                    result = self._update_if_changed(document, values, fingerprint, scraped_at)
+            if result is None:
+                result = ChangeResult(document["product_id"], CHANGE_UNCHANGED, fingerprint, fingerprint)
+            self.index.put(result.product_id, result.fingerprint, values)
+            self.stats[result.status] += 1
+        return result
+
+    def _update_if_changed(self, document: Dict[str, Any], values: Dict[str, Any], fingerprint: str,
+                           scraped_at: str) -> Optional[ChangeResult]:
+        """
+        库中指纹与新指纹不同时更新（一次原子操作），返回None表示库中已是该指纹或商品不存在
+        """
+        product_id = document["product_id"]
+        update = {name: document.get(name) for name in self.fields}
+        update.update(fingerprint=fingerprint, last_changed_at=scraped_at, scraped_at=scraped_at)
+        projection = {name: 1 for name in self.fields}
+        projection["fingerprint"] = 1
+        before = self.collection.find_one_and_update(
+            {"product_id": product_id, "fingerprint": {"$ne": fingerprint}}, {"$set": update},
+            projection=projection, return_document=ReturnDocument.BEFORE)
+        if before is None:
+            return None
+        previous_values = tracked_values(before, self.fields)
+        # 加入指纹之前保存的旧文档没有指纹字段，按字段值计算
+        previous_fingerprint = before.get("fingerprint") or compute_fingerprint(previous_values)
+        changes = {name: [previous_values.get(name), value]
+                   for name, value in values.items() if previous_values.get(name) != value}
+        if not changes:
+            return ChangeResult(product_id, CHANGE_UNCHANGED, fingerprint, previous_fingerprint)
+        result = ChangeResult(product_id, CHANGE_UPDATED, fingerprint, previous_fingerprint, changes)
+        self._snapshot({"product_id": product_id, "scraped_at": scraped_at, "fingerprint": fingerprint,
+                        "previous_fingerprint": previous_fingerprint, "changes": changes})
+        return result
+
+    def _insert_if_missing(self, document: Dict[str, Any], values: Dict[str, Any], fingerprint: str,
+                           scraped_at: str) -> Optional[ChangeResult]:
+        """
+        商品不存在时插入，返回None表示商品已存在（其他worker已插入）
+        """
+        product_id = document["product_id"]
+        document = dict(document, fingerprint=fingerprint, first_seen_at=scraped_at, last_changed_at=scraped_at)
+        document.pop("_id", None)
+        try:
+            inserted = self.collection.update_one({"product_id": product_id}, {"$setOnInsert": document},
+                                                  upsert=True).upserted_id is not None
+        except DuplicateKeyError:
+            inserted = False
+        if not inserted:
+            return None
+        self._snapshot({"product_id": product_id, "scraped_at": scraped_at, "fingerprint": fingerprint,
+                        "values": values})
+        return ChangeResult(product_id, CHANGE_NEW, fingerprint)
+
+    def _snapshot(self, record: dict):
+        if self.snapshot_collection is None:
+            return
+        try:
+            self.snapshot_collection.insert_one(record)
+        except Exception as e:
+            # 快照只用于历史分析，写失败不影响商品本身
+            logger.error(f"写入商品快照失败: {e}")
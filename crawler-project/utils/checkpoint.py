@@ -0,0 +1,309 @@
+"""
+断点续爬日志
+以追加写的方式记录每个关键词、每一页的采集进度和最后的翻页游标，
+任务中途退出后重启时跳过已完成的关键词和页面，从断点继续。
+后端:
+    file  - <CHECKPOINT_DIR>/<run_id>.jsonl，每行一条事件
+    mongo - CHECKPOINT_COLLECTION 集合，每条事件一个文档
+一批关键词全部完成后调用 complete() 清空该批次的日志，下次运行重新开始。
+"""
+import os
+import json
+import time
+import hashlib
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 事件类型
+EVENT_KEYWORD_START = "keyword_start"
+EVENT_PAGE = "page"
+EVENT_KEYWORD_DONE = "keyword_done"
+EVENT_KEYWORD_FAILED = "keyword_failed"
+
+STATUS_PENDING = "pending"
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class KeywordProgress:
+    """单个关键词的采集进度"""
+    keyword: str
+    status: str = STATUS_PENDING
+    pages_done: List[int] = field(default_factory=list)
+    last_page: int = 0
+    cursor: Any = None             # 最后一页之后的翻页游标（如接口的页码/offset）
+    products: int = 0              # 已保存的商品数
+    attempts: int = 0              # 开始采集的次数（含重启后的重试）
+    error: str = ""
+
+    @property
+    def is_done(self) -> bool:
+        return self.status == STATUS_DONE
+
+    def next_page(self, first_page: int = 1) -> int:
+        """断点之后要采集的第一页"""
+        return max(first_page, self.last_page + 1)
+
+
+class FileJournalStore:
+    """JSON Lines 文件后端"""
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+
+    def load(self, run_id: str) -> List[dict]:
+        """读取全部事件，跳过进程崩溃时写了一半的行"""
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("run_id") == run_id:
+                    records.append(record)
+        return records
+
+    def append(self, record: dict):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            # 上次退出时最后一行没写完，先换行，避免新记录接在残行后面
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                self._file.write("\n")
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def clear(self, run_id: str):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MongoJournalStore:
+    """Mongo集合后端"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index([("run_id", 1), ("seq", 1)])
+        except Exception as e:
+            logger.warning(f"创建断点日志索引失败: {e}")
+
+    def load(self, run_id: str) -> List[dict]:
+        return list(self.collection.find({"run_id": run_id}).sort("seq", 1))
+
+    def append(self, record: dict):
+        # insert_one 会给传入的字典加上 _id，这里传副本
+        self.collection.insert_one(dict(record))
+
+    def clear(self, run_id: str):
+        self.collection.delete_many({"run_id": run_id})
+
+    def close(self):
+        pass
+
+
+class CrawlCheckpoint:
+    """关键词批次的断点日志"""
+
+    def __init__(self, run_id: str, store):
+        """
+        初始化断点日志，并从已有事件恢复进度
+
+        Args:
+            run_id: 批次ID，同一批关键词重启后应使用相同的ID
+            store: FileJournalStore 或 MongoJournalStore
+        """
+        self.run_id = run_id
+        self.store = store
+        self.progress: Dict[str, KeywordProgress] = {}
+        self._lock = threading.Lock()
+
+        records = store.load(run_id)
+        for record in records:
+            self._apply(record)
+        last_seq = max((record.get("seq", 0) for record in records), default=0)
+        self._seq = itertools.count(last_seq + 1)
+        self.resumed = bool(records)
+        if self.resumed:
+            summary = self.summary()
+            logger.info(f"从断点恢复: {run_id}, 已完成关键词 {summary['done']} 个, "
+                        f"进行中 {summary['in_progress']} 个, 已保存商品 {summary['products']} 个")
+
+    def _get(self, keyword: str) -> KeywordProgress:
+        progress = self.progress.get(keyword)
+        if progress is None:
+            progress = self.progress[keyword] = KeywordProgress(keyword)
+        return progress
+
+    def _apply(self, record: dict):
+        """把一条事件应用到内存中的进度"""
+        progress = self._get(record["keyword"])
+        event = record.get("event")
+        if event == EVENT_KEYWORD_START:
+            progress.status = STATUS_IN_PROGRESS
+            progress.attempts += 1
+        elif event == EVENT_PAGE:
+            page = record["page"]
+            if page not in progress.pages_done:
+                progress.pages_done.append(page)
+                progress.products += record.get("products", 0)
+            progress.last_page = max(progress.last_page, page)
+            progress.cursor = record.get("cursor")
+        elif event == EVENT_KEYWORD_DONE:
+            progress.status = STATUS_DONE
+            progress.error = ""
+        elif event == EVENT_KEYWORD_FAILED:
+            progress.status = STATUS_FAILED
+            progress.error = record.get("error", "")
+
+    def _record(self, event: str, keyword: str, **data):
+        with self._lock:
+            record = {"run_id": self.run_id, "seq": next(self._seq), "event": event,
+                      "keyword": keyword, "ts": time.time(), **data}
+            self._apply(record)
+            try:
+                self.store.append(record)
+            except Exception as e:
+                # 断点日志写失败不影响采集本身
+                logger.error(f"写入断点日志失败: {e}")
+
+    # ==================== 写入 ====================
+
+    def start_keyword(self, keyword: str):
+        """记录开始（或重新开始）采集关键词"""
+        self._record(EVENT_KEYWORD_START, keyword)
+
+    def record_page(self, keyword: str, page: int, products: int, cursor: Any = None):
+        """
+        记录一页已采集并保存完成
+
+        Args:
+            keyword: 关键词
+            page: 页码
+            products: 该页保存的商品数
+            cursor: 下一页的翻页游标
+        """
+        self._record(EVENT_PAGE, keyword, page=page, products=products, cursor=cursor)
+
+    def finish_keyword(self, keyword: str, failed: bool = False, error: str = ""):
+        """
+        记录关键词结束，失败的关键词在重启后会重新采集
+
+        Args:
+            keyword: 关键词
+            failed: 是否失败
+            error: 失败原因
+        """
+        if failed:
+            self._record(EVENT_KEYWORD_FAILED, keyword, error=error)
+        else:
+            self._record(EVENT_KEYWORD_DONE, keyword)
+
+    def complete(self):
+        """整批完成，清空日志"""
+        with self._lock:
+            try:
+                self.store.clear(self.run_id)
+                logger.info(f"批次已完成，清空断点日志: {self.run_id}")
+            except Exception as e:
+                logger.error(f"清空断点日志失败: {e}")
+
+    def close(self):
+        self.store.close()
+
+    # ==================== 查询 ====================
+
+    def get_progress(self, keyword: str) -> KeywordProgress:
+        """获取关键词进度（未记录过的关键词返回空进度）"""
+        return self.progress.get(keyword) or KeywordProgress(keyword)
+
+    def is_done(self, keyword: str) -> bool:
+        return self.get_progress(keyword).is_done
+
+    def pending(self, keywords: Iterable[str]) -> List[str]:
+        """过滤掉已完成的关键词，保持原顺序"""
+        return [keyword for keyword in keywords if not self.is_done(keyword)]
+
+    def summary(self) -> Dict[str, int]:
+        """按状态统计"""
+        counts = {STATUS_PENDING: 0, STATUS_IN_PROGRESS: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for progress in self.progress.values():
+            counts[progress.status] += 1
+        counts["products"] = sum(p.products for p in self.progress.values())
+        return counts
+
+
+def make_run_id(name: str, keywords: Iterable[str], max_pages: int) -> str:
+    """
+    生成批次ID：优先使用 CHECKPOINT_RUN_ID，否则由关键词列表和页数计算，
+    使同一批关键词在任务重启后得到相同的ID
+
+    Args:
+        name: 爬虫名称
+        keywords: 关键词列表
+        max_pages: 每个关键词的页数
+
+    Returns:
+        str: 批次ID
+    """
+    if Config.CHECKPOINT_RUN_ID:
+        return Config.CHECKPOINT_RUN_ID
+    digest = hashlib.sha1(f"{'|'.join(keywords)}#{max_pages}".encode('utf-8')).hexdigest()[:12]
+    return f"{name}-{digest}"
+
+
+def open_checkpoint(run_id: str, db=None, backend: Optional[str] = None) -> Optional[CrawlCheckpoint]:
+    """
+    按配置打开断点日志
+
+    Args:
+        run_id: 批次ID
+        db: Mongo数据库对象，mongo后端需要
+        backend: file / mongo，默认从配置读取
+
+    Returns:
+        Optional[CrawlCheckpoint]: 未启用或打开失败时返回None
+    """
+    if not Config.CHECKPOINT_ENABLED:
+        return None
+    backend = backend or Config.CHECKPOINT_BACKEND
+    try:
+        if backend == "mongo":
+            if db is None:
+                logger.warning("断点日志使用mongo后端但没有数据库连接，改用文件后端")
+            else:
+                return CrawlCheckpoint(run_id, MongoJournalStore(db[Config.CHECKPOINT_COLLECTION]))
+        path = os.path.join(Config.CHECKPOINT_DIR, f"{run_id}.jsonl")
+        return CrawlCheckpoint(run_id, FileJournalStore(path, fsync=Config.CHECKPOINT_FSYNC))
+    except Exception as e:
+        logger.error(f"打开断点日志失败: {e}")
+        return None
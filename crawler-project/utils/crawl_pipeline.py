@@ -0,0 +1,239 @@
+"""
+采集流水线
+浏览器取页、解析、入库三个阶段由有界队列连接，各阶段同时工作:
+    取页  调用方线程（浏览器），拿到原始数据（路由数据JSON文本 / 翻页接口商品列表）即提交，随后加载下一页或下一个关键词
+    解析  PIPELINE_PARSE_WORKERS 个解析线程
+    入库  单个入库线程，攒够 PIPELINE_PERSIST_BATCH_SIZE 条，或不足一批但最早的商品已等待 PIPELINE_PERSIST_INTERVAL 秒时写入
+队列满时提交阻塞（背压）: 解析或入库跟不上时浏览器随之放慢，内存中积压的页面不超过 PIPELINE_QUEUE_SIZE。
+解析阶段使用线程而不是进程: 解析函数是爬虫实例的方法，单页数据量小，序列化到子进程的开销大于解析本身。
+"""
+import time
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_ROUTER = "router"  # 搜索页 __MODERN_ROUTER_DATA__ 的JSON文本
+PAGE_API = "api"        # 翻页接口返回的商品列表
+
+_STOP = object()
+
+
+@dataclass
+class FetchedPage:
+    """取页阶段的产出: 未解析的原始页面数据"""
+    keyword: str
+    page: int
+    payload: Any
+    kind: str = PAGE_ROUTER
+
+
+class CrawlPipeline:
+    """取页 -> 解析 -> 入库 三阶段流水线"""
+
+    def __init__(self, parse: Callable[[FetchedPage], List[Dict]], persist: Callable[[List[Dict]], Any],
+                 parse_workers: int = None, queue_size: int = None, persist_batch_size: int = None,
+                 persist_interval: float = None, name: str = "crawl_pipeline", keep_results: bool = True):
+        """
+        初始化流水线
+
+        Args:
+            parse: 解析函数，原始页面 -> 商品字典列表（可能在多个线程中同时调用）
+            persist: 入库函数，接收一批商品字典（只在入库线程中调用），返回保存成功的商品数，
+                返回None视为整批成功，抛出异常视为整批失败
+            parse_workers: 解析线程数，默认 PIPELINE_PARSE_WORKERS
+            queue_size: 待解析页面和待入库商品批次的队列上限，默认 PIPELINE_QUEUE_SIZE
+            persist_batch_size: 每批写入商品数，默认 PIPELINE_PERSIST_BATCH_SIZE
+            persist_interval: 不足一批时最长等待秒数，默认 PIPELINE_PERSIST_INTERVAL
+            name: 线程名前缀
+            keep_results: 是否在内存中保留解析出的商品供 results() 返回，
+                长时间运行的采集应关闭，商品入库后即释放，只保留各关键词的商品数
+        """
+        self.parse = parse
+        self.persist = persist
+        self.parse_workers = max(1, parse_workers or Config.PIPELINE_PARSE_WORKERS)
+        self.queue_size = max(1, queue_size or Config.PIPELINE_QUEUE_SIZE)
+        self.persist_batch_size = max(1, persist_batch_size or Config.PIPELINE_PERSIST_BATCH_SIZE)
+        self.persist_interval = Config.PIPELINE_PERSIST_INTERVAL if persist_interval is None else persist_interval
+        self.name = name
+        self.keep_results = keep_results
+        self._pages = queue.Queue(maxsize=self.queue_size)
+        self._batches = queue.Queue(maxsize=self.queue_size)
+        self._results: Dict[str, Dict[int, List[Dict]]] = {}
+        self._keyword_counts: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.counts = {"pages": 0, "parsed": 0, "parse_errors": 0, "persisted": 0, "batches": 0,
+                       "persist_errors": 0}
+        self.fetch_blocked_seconds = 0.0
+        self.parse_blocked_seconds = 0.0
+
+    def start(self) -> 'CrawlPipeline':
+        """启动解析和入库线程"""
+        if self._started:
+            return self
+        self._started = True
+        for i in range(self.parse_workers):
+            self._threads.append(threading.Thread(target=self._parse_loop, name=f"{self.name}-parse-{i}",
+                                                  daemon=True))
+        self._persist_thread = threading.Thread(target=self._persist_loop, name=f"{self.name}-persist", daemon=True)
+        for thread in self._threads + [self._persist_thread]:
+            thread.start()
+        return self
+
+    def submit(self, page: FetchedPage):
+        """
+        提交原始页面，待解析页面已满时阻塞到有空位
+
+        Args:
+            page: 取页阶段的产出
+        """
+        if self._closed:
+            raise RuntimeError("流水线已关闭")
+        self.start()
+        start = time.perf_counter()
+        self._pages.put(page)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.counts["pages"] += 1
+            self.fetch_blocked_seconds += waited
+
+    def _parse_loop(self):
+        while True:
+            page = self._pages.get()
+            if page is _STOP:
+                return
+            try:
+                products = self.parse(page) or []
+            except Exception as e:
+                logger.error(f"解析第 {page.page} 页失败 [{page.keyword}]: {e}")
+                products = []
+                with self._lock:
+                    self.counts["parse_errors"] += 1
+            with self._lock:
+                if self.keep_results:
+                    self._results.setdefault(page.keyword, {})[page.page] = products
+                self._keyword_counts[page.keyword] = self._keyword_counts.get(page.keyword, 0) + len(products)
+                self.counts["parsed"] += len(products)
+            if products:
+                start = time.perf_counter()
+                self._batches.put(products)
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self.parse_blocked_seconds += waited
+
+    def _persist_loop(self):
+        buffer: List[Dict] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if buffer else None
+            try:
+                item = self._batches.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(buffer)
+                return
+            if item:
+                if not buffer:
+                    deadline = time.monotonic() + self.persist_interval
+                buffer.extend(item)
+            # 攒够的整批立即写入，不足一批的等到超时
+            while len(buffer) >= self.persist_batch_size:
+                self._write(buffer[:self.persist_batch_size])
+                buffer = buffer[self.persist_batch_size:]
+                deadline = time.monotonic() + self.persist_interval
+            if item is None:
+                self._write(buffer)
+                buffer = []
+
+    def _write(self, batch: List[Dict]):
+        if not batch:
+            return
+        try:
+            saved = self.persist(batch)
+        except Exception as e:
+            logger.error(f"批量保存 {len(batch)} 个商品失败: {e}")
+            saved, written = 0, 0
+        else:
+            saved, written = (len(batch) if saved is None else min(saved, len(batch))), 1
+            if saved < len(batch):
+                logger.error(f"批量保存 {len(batch)} 个商品，其中 {len(batch) - saved} 个失败")
+        # 写库失败不影响后续批次；失败的商品只计入 persist_errors，keep_results=False 时不会出现在任何结果中
+        with self._lock:
+            self.counts["persisted"] += saved
+            self.counts["persist_errors"] += len(batch) - saved
+            self.counts["batches"] += written
+
+    def close(self):
+        """等待已提交的页面全部解析、入库后停止线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if not self._started:
+            return
+        for _ in self._threads:
+            self._pages.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._batches.put(_STOP)
+        self._persist_thread.join()
+
+    def results(self) -> Dict[str, List[Dict]]:
+        """
+        各关键词已解析的商品，按页码顺序（keep_results=False 时为空）
+
+        Returns:
+            Dict[str, List[Dict]]: 关键词 -> 商品列表
+        """
+        with self._lock:
+            return {keyword: [product for page in sorted(pages) for product in pages[page]]
+                    for keyword, pages in self._results.items()}
+
+    def keyword_counts(self) -> Dict[str, int]:
+        """
+        各关键词已解析的商品数
+
+        Returns:
+            Dict[str, int]: 关键词 -> 商品数
+        """
+        with self._lock:
+            return dict(self._keyword_counts)
+
+    def stats(self) -> Dict:
+        """获取统计信息"""
+        with self._lock:
+            return {**self.counts, "fetch_blocked_seconds": round(self.fetch_blocked_seconds, 3),
+                    "parse_blocked_seconds": round(self.parse_blocked_seconds, 3),
+                    "pending_pages": self._pages.qsize()}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_crawl_pipeline(parse: Callable[[FetchedPage], List[Dict]], persist: Callable[[List[Dict]], Any],
+                        **kwargs) -> Optional[CrawlPipeline]:
+    """
+    按配置创建采集流水线
+
+    Args:
+        parse: 解析函数
+        persist: 入库函数
+        **kwargs: CrawlPipeline 的其他参数
+
+    Returns:
+        Optional[CrawlPipeline]: 未启用时返回None（调用方顺序采集）
+    """
+    if not Config.PIPELINE_ENABLED:
+        return None
+    return CrawlPipeline(parse, persist, **kwargs)
@@ -0,0 +1,245 @@
+"""
+采集统计累加器
+每采集一个商品就更新一次（O(1)），不再在统计时遍历全部商品:
+    计数器       关键词/商品/滑块等运行计数
+    去重计数     关键词、店铺数用 HyperLogLog 估计（数量少时精确），内存固定
+    流式分位数   价格和滑块处理耗时用对数分桶直方图，分位数相对误差不超过 STATS_RELATIVE_ACCURACY
+加锁更新，采集过程中可随时调用 snapshot() 查看。
+"""
+import math
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from config import Config
+
+# 输出的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """HyperLogLog 去重计数，数量不超过稀疏上限时保存哈希值精确计数"""
+
+    def __init__(self, precision: int = None):
+        """
+        Args:
+            precision: 寄存器数为 2^precision，标准误差约 1.04/sqrt(2^precision)
+        """
+        self.precision = min(16, max(4, precision or Config.STATS_HLL_PRECISION))
+        self.size = 1 << self.precision
+        self._sparse_limit = self.size // 8
+        self._sparse = set()
+        self._registers: Optional[bytearray] = None
+        # sum(2^-register) 按 2^64 放大后的整数，随寄存器更新增量维护，估计时不用遍历寄存器
+        self._scaled_sum = 0
+        self._zeros = 0
+
+    def add(self, value: str):
+        if value is None or value == "":
+            return
+        hashed = _hash64(str(value))
+        if self._registers is None:
+            self._sparse.add(hashed)
+            if len(self._sparse) > self._sparse_limit:
+                self._to_dense()
+            return
+        self._add_hash(hashed)
+
+    def _to_dense(self):
+        self._registers = bytearray(self.size)
+        self._scaled_sum = self.size << 64
+        self._zeros = self.size
+        for hashed in self._sparse:
+            self._add_hash(hashed)
+        self._sparse = set()
+
+    def _add_hash(self, hashed: int):
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        old = self._registers[index]
+        if rank > old:
+            self._registers[index] = rank
+            self._scaled_sum += (1 << (64 - rank)) - (1 << (64 - old))
+            if old == 0:
+                self._zeros -= 1
+
+    def count(self) -> int:
+        """估计不同值的个数"""
+        if self._registers is None:
+            return len(self._sparse)
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m * (1 << 64) / self._scaled_sum
+        if estimate <= 2.5 * m and self._zeros:
+            # 小基数时线性计数更准确
+            estimate = m * math.log(m / self._zeros)
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class QuantileSketch:
+    """对数分桶的流式分位数（DDSketch），桶数只与数值范围有关，与样本数无关"""
+
+    def __init__(self, relative_accuracy: float = None):
+        """
+        Args:
+            relative_accuracy: 分位数的相对误差
+        """
+        accuracy = relative_accuracy or Config.STATS_RELATIVE_ACCURACY
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        """加入一个非负值（负值按0计）"""
+        value = max(0.0, float(value))
+        if value <= 1e-9:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估计分位数
+
+        Args:
+            q: 0~1
+
+        Returns:
+            Optional[float]: 没有样本时返回None
+        """
+        if not self.count:
+            return None
+        if q <= 0 or q >= 1:
+            return self.min if q <= 0 else self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(self.max, max(self.min, value))
+        return self.max
+
+    def summary(self) -> Dict:
+        summary = {"count": self.count, "min": self.min, "max": self.max,
+                   "mean": self.total / self.count if self.count else None}
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = self.quantile(q)
+        return summary
+
+
+class CrawlStats:
+    """采集统计累加器，线程安全"""
+
+    def __init__(self, precision: int = None, relative_accuracy: float = None):
+        """
+        Args:
+            precision: HyperLogLog 精度，默认 STATS_HLL_PRECISION
+            relative_accuracy: 分位数相对误差，默认 STATS_RELATIVE_ACCURACY
+        """
+        self._precision = precision
+        self._accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.counters = Counter()
+            self.keywords = HyperLogLog(self._precision)
+            self.shops = HyperLogLog(self._precision)
+            self.prices = QuantileSketch(self._accuracy)
+            self.captcha_seconds = QuantileSketch(self._accuracy)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def record_product(self, product):
+        """
+        记录一个商品
+
+        Args:
+            product: ProductData
+        """
+        price = product.current_price or 0
+        with self._lock:
+            self.counters['products'] += 1
+            if product.slider_encountered:
+                self.counters['products_slider_encountered'] += 1
+            if product.slider_solved:
+                self.counters['products_slider_solved'] += 1
+            self.keywords.add(product.search_keyword)
+            self.shops.add(product.shop_name)
+            if price > 0:
+                self.prices.add(price)
+
+    def record_products(self, products: Iterable) -> int:
+        count = 0
+        for product in products:
+            self.record_product(product)
+            count += 1
+        return count
+
+    def record_captcha(self, solved: bool, seconds: float = None):
+        """
+        记录一次滑块验证
+
+        Args:
+            solved: 是否处理成功
+            seconds: 处理耗时，成功时计入耗时分位数
+        """
+        with self._lock:
+            self.counters['captcha_encountered'] += 1
+            if solved:
+                self.counters['captcha_solved'] += 1
+                if seconds is not None:
+                    self.captcha_seconds.add(seconds)
+
+    def snapshot(self) -> Dict:
+        """
+        获取当前统计，耗时与已采集的商品数无关
+
+        Returns:
+            Dict: 计数器、去重数和分位数
+        """
+        with self._lock:
+            snapshot = dict(self.counters)
+            snapshot.update({
+                "distinct_keywords": self.keywords.count(),
+                "distinct_shops": self.shops.count(),
+                "price": self.prices.summary(),
+                "captcha_seconds": self.captcha_seconds.summary(),
+            })
+        encountered = snapshot.get("captcha_encountered", 0)
+        snapshot["captcha_success_rate"] = snapshot.get("captcha_solved", 0) / encountered * 100 if encountered else 0
+        return snapshot
+
+
+def format_summary(summary: Dict, unit: str = "", digits: int = 2) -> str:
+    """把分位数摘要格式化为一行，没有样本时返回"无" """
+    if not summary.get("count"):
+        return "无"
+    parts = [f"p{int(q * 100)}={summary[f'p{int(q * 100)}']:.{digits}f}{unit}" for q in QUANTILES]
+    return f"{', '.join(parts)} (n={summary['count']})"
@@ -2,15 +2,19 @@
 MongoDB数据库操作工具
 实现基础的CRUD操作
 """
-import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from pymongo import MongoClient
+from typing import List, Optional, Dict, Any, Iterator, Iterable, Set
+from pymongo import MongoClient, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from pymongo.errors import ConnectionFailure, PyMongoError
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, PyMongoError
 
+from config import Config
 from models.product import ProductData
+from utils.metrics import MONGO_FLUSH_SECONDS, PRODUCT_CHANGES
+from utils.change_detection import ChangeDetector, ChangeResult
+from utils.logger import setup_logger, SAMPLED
+from utils.retry_engine import get_retry_engine, ERROR_MONGO
 
 
 class DatabaseManager:
@@ -33,7 +37,10 @@ class DatabaseManager:
         self.client: Optional[MongoClient] = None
         self.db: Optional[Database] = None
         self.collection: Optional[Collection] = None
-        self.logger = logging.getLogger(__name__)
+        self.snapshot_collection: Optional[Collection] = None
+        self.change_detector: Optional[ChangeDetector] = None
+        # 逐商品的入库日志带 SAMPLED 标记，需要 setup_logger 配置的抽样过滤器（和异步队列）
+        self.logger = setup_logger(__name__)
     
     def connect(self) -> bool:
         """
@@ -49,6 +56,7 @@ class DatabaseManager:
             
             self.db = self.client[self.database_name]
             self.collection = self.db[self.collection_name]
+            self.snapshot_collection = self.db[Config.SNAPSHOT_COLLECTION_NAME]
             
             self.logger.info(f"成功连接到MongoDB: {self.database_name}.{self.collection_name}")
             return True
@@ -64,27 +72,57 @@ class DatabaseManager:
         """断开数据库连接"""
         if self.client:
             self.client.close()
+            self.client = None
+            self.db = None
+            self.collection = None
+            self.snapshot_collection = None
+            self.change_detector = None
             self.logger.info("MongoDB连接已关闭")
     
+    def _write(self, func, *args):
+        """
+        执行写操作：Mongo网络抖动、主节点切换时按重试策略重试，Mongo熔断时直接抛出 CircuitOpenError
+        
+        超时或断线时服务端可能已经执行了写入，所以只有幂等的写操作（按 product_id 的
+        $setOnInsert upsert、$set 更新）可以经过这里
+        
+        Args:
+            func: 写操作函数
+            *args: 函数参数
+            
+        Returns:
+            写操作结果
+        """
+        return get_retry_engine().call(func, *args, dependency="mongo", retry_on=(ERROR_MONGO,))
+    
     def insert_product(self, product: ProductData) -> bool:
         """
-        插入单个商品数据
+        插入单个商品数据（按 product_id 以 $setOnInsert upsert，重试不会重复插入）
         
         Args:
             product: 商品数据对象
             
         Returns:
-            bool: 插入是否成功
+            bool: 是否插入了新商品，商品已存在时返回False
         """
         try:
             if self.collection is None:
                 self.logger.error("数据库未连接")
                 return False
             
-            result = self.collection.insert_one(product.to_dict())
-            self.logger.info(f"成功插入商品数据: {product.title}")
-            return result.inserted_id is not None
+            with MONGO_FLUSH_SECONDS.labels(operation="insert_one").time():
+                result = self._write(self.collection.update_one, {"product_id": product.product_id},
+                                     {"$setOnInsert": product.to_dict()}, True)
+            if result.upserted_id is None:
+                self.logger.info("商品已存在，跳过插入: %s", product.product_id, extra=SAMPLED)
+                return False
+            self.logger.info("成功插入商品数据: %s", product.title, extra=SAMPLED)
+            return True
             
+        except DuplicateKeyError:
+            # 其他worker同时插入了同一商品（product_id 唯一索引）
+            self.logger.info("商品已存在，跳过插入: %s", product.product_id, extra=SAMPLED)
+            return False
         except PyMongoError as e:
             self.logger.error(f"插入商品数据失败: {e}")
             return False
@@ -94,25 +132,36 @@ class DatabaseManager:
     
     def insert_products(self, products: List[ProductData]) -> int:
         """
-        批量插入商品数据
+        批量插入商品数据（一次无序 bulk_write，按 product_id 以 $setOnInsert upsert，重试不会重复插入）
         
         Args:
             products: 商品数据列表
             
         Returns:
-            int: 成功插入的数量
+            int: 新插入的数量，已存在的商品不计入
         """
         try:
             if self.collection is None or not products:
                 return 0
             
-            documents = [product.to_dict() for product in products]
-            result = self.collection.insert_many(documents)
+            operations = [UpdateOne({"product_id": product.product_id}, {"$setOnInsert": product.to_dict()},
+                                    upsert=True)
+                          for product in products]
+            with MONGO_FLUSH_SECONDS.labels(operation="insert_many").time():
+                result = self._write(self.collection.bulk_write, operations, False)
             
-            inserted_count = len(result.inserted_ids)
+            inserted_count = result.upserted_count
             self.logger.info(f"批量插入商品数据成功: {inserted_count}条")
             return inserted_count
             
+        except BulkWriteError as e:
+            # 只有重复键错误（其他worker同时插入了同一商品）时其余商品已正常写入
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                self.logger.error(f"批量插入失败: {e}")
+                return 0
+            inserted_count = e.details.get("nUpserted", 0)
+            self.logger.info(f"批量插入商品数据成功: {inserted_count}条")
+            return inserted_count
         except PyMongoError as e:
             self.logger.error(f"批量插入失败: {e}")
             return 0
@@ -120,6 +169,88 @@ class DatabaseManager:
             self.logger.error(f"批量插入异常: {e}")
             return 0
     
+    def save_product_delta(self, product: ProductData) -> Optional[ChangeResult]:
+        """
+        按指纹保存商品：新商品插入，变化的商品只更新变化字段并记录快照，未变化的商品不写库
+        
+        Args:
+            product: 商品数据对象
+            
+        Returns:
+            Optional[ChangeResult]: 变化检测结果，失败时返回None
+        """
+        try:
+            if self.collection is None:
+                self.logger.error("数据库未连接")
+                return None
+            
+            if self.change_detector is None or self.change_detector.collection is not self.collection:
+                self.change_detector = ChangeDetector(self.collection, self.snapshot_collection)
+            with MONGO_FLUSH_SECONDS.labels(operation="delta_write").time():
+                result = self._write(self.change_detector.save, product)
+            PRODUCT_CHANGES.labels(status=result.status).inc()
+            self.logger.info("商品%s: %s %s", result.status, product.product_id, result.changes or "", extra=SAMPLED)
+            return result
+            
+        except PyMongoError as e:
+            self.logger.error(f"保存商品变化失败: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"保存商品变化异常: {e}")
+            return None
+    
+    def update_products(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        批量更新商品字段（一次 bulk_write），不存在的商品不会新建
+        
+        Args:
+            updates: 商品ID -> 要设置的字段
+            
+        Returns:
+            int: 匹配到的商品数
+        """
+        try:
+            if self.collection is None or not updates:
+                return 0
+            
+            operations = [UpdateOne({"product_id": product_id}, {"$set": fields})
+                          for product_id, fields in updates.items()]
+            with MONGO_FLUSH_SECONDS.labels(operation="bulk_update").time():
+                result = self._write(self.collection.bulk_write, operations, False)
+            self.logger.info(f"批量更新商品数据成功: {result.matched_count}条")
+            return result.matched_count
+            
+        except PyMongoError as e:
+            self.logger.error(f"批量更新失败: {e}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"批量更新异常: {e}")
+            return 0
+    
+    def existing_product_ids(self, product_ids: Iterable[str]) -> Set[str]:
+        """
+        一次查询一批商品ID中已入库的部分（批量保存前去重）
+        
+        Args:
+            product_ids: 商品ID
+            
+        Returns:
+            Set[str]: 已存在的商品ID，查询失败时为空集合
+        """
+        try:
+            product_ids = list(product_ids)
+            if self.collection is None or not product_ids:
+                return set()
+            cursor = self.collection.find({"product_id": {"$in": product_ids}}, {"product_id": 1, "_id": 0})
+            return {doc["product_id"] for doc in cursor}
+            
+        except PyMongoError as e:
+            self.logger.error(f"查询已存在商品失败: {e}")
+            return set()
+        except Exception as e:
+            self.logger.error(f"查询已存在商品异常: {e}")
+            return set()
+    
     def save_product(self, product: ProductData) -> bool:
         """
         保存商品数据（兼容新旧接口）
@@ -171,6 +302,26 @@ class DatabaseManager:
             self.logger.error(f"查询数据异常: {e}")
             return []
     
+    def iter_products(self, query: Dict = None, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        逐条读取商品文档（游标按批从服务端取数据，不一次性加载到内存）
+        
+        Args:
+            query: 查询条件字典
+            batch_size: 游标每批读取的文档数
+            
+        Yields:
+            dict: 商品文档
+        """
+        if self.collection is None:
+            self.logger.error("数据库未连接")
+            return
+        try:
+            yield from self.collection.find(query or {}).batch_size(batch_size)
+        except PyMongoError as e:
+            self.logger.error(f"读取商品数据失败: {e}")
+            raise
+    
     def count_products(self, query: Dict = None) -> int:
         """
         统计商品数量
@@ -0,0 +1,244 @@
+"""
+关键词来源
+关键词不再整个读入列表后再按逗号切分，而是从来源逐个读取、规范化、去重并按分片过滤后产出:
+    file:<路径>              文本文件（每行一个，# 开头为注释，.gz 自动解压），十万级关键词无需先读完整个文件
+    mongo:<集合>[.<字段>]     Mongo集合的字段（默认 KEYWORD_MONGO_FIELD），游标分批读取
+    queue                    关键词已在共享任务队列中，只领取不加入
+    其他                     逗号分隔的关键词列表（兼容 --keywords / CRAWLAB_KEYWORDS）
+去重使用容量固定的布隆过滤器（内存不随关键词数增长，极少数关键词可能被误判为重复）；
+分片按规范化后关键词的哈希取模，同一关键词在任何进程、任何节点上都落在同一分片，
+KEYWORD_SHARD_COUNT 个任务分别设置 KEYWORD_SHARD_INDEX 即可不重不漏地分摊。
+"""
+import os
+import gzip
+import math
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SOURCE_LIST = "list"
+SOURCE_FILE = "file"
+SOURCE_MONGO = "mongo"
+SOURCE_QUEUE = "queue"
+
+# 超过该长度的行视为无效关键词
+MAX_KEYWORD_LENGTH = 200
+
+
+def normalize_keyword(text: str) -> str:
+    """全角转半角、去掉首尾空白并合并连续空白"""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).split())
+
+
+def keyword_digest(keyword: str) -> bytes:
+    """规范化关键词（不区分大小写）的哈希，用于去重和分片"""
+    return hashlib.blake2b(normalize_keyword(keyword).casefold().encode('utf-8'), digest_size=16).digest()
+
+
+def shard_of(keyword: str, shard_count: int) -> int:
+    """
+    关键词所属分片，与进程和机器无关
+
+    Args:
+        keyword: 关键词
+        shard_count: 分片数
+
+    Returns:
+        int: 0 ~ shard_count-1
+    """
+    return int.from_bytes(keyword_digest(keyword)[:8], 'big') % max(1, shard_count)
+
+
+class BloomFilter:
+    """容量固定的布隆过滤器"""
+
+    def __init__(self, capacity: int = None, error_rate: float = None):
+        """
+        Args:
+            capacity: 预计的不同元素数，超过后误判率上升
+            error_rate: 达到容量时的误判率
+        """
+        self.capacity = max(1, capacity or Config.KEYWORD_BLOOM_CAPACITY)
+        self.error_rate = error_rate or Config.KEYWORD_BLOOM_ERROR_RATE
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        # 两个64位哈希组合出 k 个位置（Kirsch-Mitzenmacher）
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add_digest(self, digest: bytes) -> bool:
+        """
+        加入元素哈希
+
+        Returns:
+            bool: 之前不存在（可能误判为已存在）时返回True
+        """
+        added = False
+        for position in self._positions(digest):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+            if self.count == self.capacity + 1:
+                logger.warning(f"关键词去重过滤器超过容量 {self.capacity}，误判率将升高，请调大 KEYWORD_BLOOM_CAPACITY")
+        return added
+
+    def add(self, item: str) -> bool:
+        return self.add_digest(hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest())
+
+    def __contains__(self, item: str) -> bool:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        return all(self._bits[p // 8] & (1 << (p % 8)) for p in self._positions(digest))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+def iter_list_keywords(text: str) -> Iterator[str]:
+    """逗号分隔的关键词"""
+    for keyword in (text or "").split(','):
+        yield keyword
+
+
+def iter_file_keywords(path: str) -> Iterator[str]:
+    """逐行读取关键词文件，.gz 文件自动解压"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.lstrip().startswith("#"):
+                yield line
+
+
+def iter_mongo_keywords(collection, field: str = None, query: Dict = None, batch_size: int = 1000) -> Iterator[str]:
+    """分批读取集合中的关键词字段"""
+    field = field or Config.KEYWORD_MONGO_FIELD
+    for document in collection.find(query or {}, {field: 1, "_id": 0}).batch_size(batch_size):
+        value = document.get(field)
+        if isinstance(value, str):
+            yield value
+
+
+class KeywordSource:
+    """关键词来源: 逐个规范化、去重、按分片过滤后产出，只能迭代一次"""
+
+    def __init__(self, keywords: Iterable[str], kind: str = SOURCE_LIST, shard_index: int = None,
+                 shard_count: int = None, dedupe: bool = True, capacity: int = None, error_rate: float = None):
+        """
+        Args:
+            keywords: 原始关键词
+            kind: 来源类型（list/file/mongo/queue）
+            shard_index: 本任务负责的分片，默认 KEYWORD_SHARD_INDEX
+            shard_count: 分片数，默认 KEYWORD_SHARD_COUNT
+            dedupe: 是否去重
+            capacity: 去重过滤器容量，默认 KEYWORD_BLOOM_CAPACITY
+            error_rate: 去重过滤器误判率，默认 KEYWORD_BLOOM_ERROR_RATE
+        """
+        self.kind = kind
+        self.shard_index = Config.KEYWORD_SHARD_INDEX if shard_index is None else shard_index
+        self.shard_count = max(1, shard_count or Config.KEYWORD_SHARD_COUNT)
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"分片序号 {self.shard_index} 超出范围 0~{self.shard_count - 1}")
+        self.bloom = BloomFilter(capacity, error_rate) if dedupe else None
+        self._keywords = keywords
+        self.counts = {"read": 0, "invalid": 0, "duplicate": 0, "other_shard": 0, "emitted": 0}
+
+    @property
+    def from_queue(self) -> bool:
+        """关键词在任务队列中，不需要加入"""
+        return self.kind == SOURCE_QUEUE
+
+    def __iter__(self) -> Iterator[str]:
+        counts = self.counts
+        for raw in self._keywords:
+            counts["read"] += 1
+            keyword = normalize_keyword(raw)
+            if not keyword or len(keyword) > MAX_KEYWORD_LENGTH:
+                counts["invalid"] += 1
+                continue
+            digest = keyword_digest(keyword)
+            if self.shard_count > 1 and int.from_bytes(digest[:8], 'big') % self.shard_count != self.shard_index:
+                counts["other_shard"] += 1
+                continue
+            if self.bloom is not None and not self.bloom.add_digest(digest):
+                counts["duplicate"] += 1
+                continue
+            counts["emitted"] += 1
+            yield keyword
+
+    def stats(self) -> Dict:
+        """获取统计信息"""
+        return {"source": self.kind, "shard": f"{self.shard_index}/{self.shard_count}", **self.counts}
+
+
+def parse_source_spec(spec: str) -> Tuple[str, str]:
+    """
+    解析关键词来源
+
+    Args:
+        spec: file:<路径> / mongo:<集合>[.<字段>] / queue / 逗号分隔的关键词
+
+    Returns:
+        Tuple[str, str]: (来源类型, 路径/集合/关键词文本)
+    """
+    spec = (spec or "").strip()
+    if spec == SOURCE_QUEUE:
+        return SOURCE_QUEUE, ""
+    for kind in (SOURCE_FILE, SOURCE_MONGO):
+        if spec.startswith(kind + ":"):
+            return kind, spec[len(kind) + 1:].strip()
+    return SOURCE_LIST, spec
+
+
+def open_keyword_source(spec: str = None, db=None, shard_index: int = None,
+                        shard_count: int = None) -> Optional[KeywordSource]:
+    """
+    按来源创建关键词流
+
+    Args:
+        spec: 关键词来源，默认 KEYWORD_SOURCE
+        db: Mongo数据库对象，mongo来源需要
+        shard_index: 本任务负责的分片
+        shard_count: 分片数
+
+    Returns:
+        Optional[KeywordSource]: 来源不可用时返回None
+    """
+    kind, target = parse_source_spec(Config.KEYWORD_SOURCE if spec is None else spec)
+    try:
+        if kind == SOURCE_FILE:
+            if not os.path.exists(target):
+                logger.error(f"关键词文件不存在: {target}")
+                return None
+            keywords = iter_file_keywords(target)
+        elif kind == SOURCE_MONGO:
+            if db is None:
+                logger.error("从Mongo读取关键词需要数据库连接")
+                return None
+            collection, _, field = target.partition(".")
+            keywords = iter_mongo_keywords(db[collection], field or None)
+        elif kind == SOURCE_QUEUE:
+            keywords = iter(())
+        else:
+            keywords = iter_list_keywords(target)
+        source = KeywordSource(keywords, kind, shard_index, shard_count)
+    except Exception as e:
+        logger.error(f"打开关键词来源失败: {e}")
+        return None
+    logger.info(f"关键词来源: {kind} {target if kind != SOURCE_LIST else ''}，分片 {source.shard_index}/{source.shard_count}")
+    return source
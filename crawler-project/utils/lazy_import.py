@@ -0,0 +1,122 @@
+"""
+延迟导入工具
+ddddocr、cv2、selenium、DrissionPage、pandas 等依赖导入耗时较长（ddddocr 会连带加载 onnxruntime），
+模块加载时只创建代理对象，第一次访问属性或调用时才真正导入。
+"""
+import types
+import importlib
+import importlib.util
+import threading
+from typing import Any, Dict, Optional
+
+_lock = threading.RLock()
+
+
+def module_available(name: str) -> bool:
+    """
+    判断模块是否已安装（只查找模块，不执行导入）
+
+    Args:
+        name: 模块名
+
+    Returns:
+        bool: 是否可导入
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule(types.ModuleType):
+    """模块代理，第一次访问属性时导入真实模块"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_target"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_target"] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_lazy_target"] is not None
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "已导入" if self.is_loaded else "未导入"
+        return f"<LazyModule '{self.__name__}' ({state})>"
+
+
+class LazyAttribute:
+    """模块属性代理（如类、常量集合），第一次访问属性或调用时导入"""
+
+    __slots__ = ("_module", "_attr", "_target")
+
+    def __init__(self, module: LazyModule, attr: str):
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def _load(self) -> Any:
+        if self._target is None:
+            self._target = getattr(self._module._load(), self._attr)
+        return self._target
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._load(), item)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyAttribute '{self._module.__name__}.{self._attr}'>"
+
+
+def lazy_import(name: str, attr: Optional[str] = None):
+    """
+    延迟导入模块或模块中的属性
+
+    Args:
+        name: 模块名，如 "ddddocr"、"selenium.webdriver.common.by"
+        attr: 属性名，如 "By"；为空时返回模块代理
+
+    Returns:
+        LazyModule 或 LazyAttribute 代理
+        （异常类不能用代理放在 except 子句里，应通过模块代理访问：except exceptions.TimeoutException）
+    """
+    module = LazyModule(name)
+    if attr is None:
+        return module
+    return LazyAttribute(module, attr)
+
+
+def lazy_package_getattr(package: str, exports: Dict[str, str]):
+    """
+    生成包 __init__ 使用的模块级 __getattr__（PEP 562），按需导入子模块中的导出对象
+
+    Args:
+        package: 包名（传入 __name__）
+        exports: 导出名 -> 相对子模块名，如 {"SliderHandler": ".slider"}
+
+    Returns:
+        __getattr__ 函数
+    """
+    def __getattr__(name: str) -> Any:
+        submodule = exports.get(name)
+        if submodule is None:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        return getattr(importlib.import_module(submodule, package), name)
+    return __getattr__
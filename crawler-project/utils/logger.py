@@ -3,17 +3,155 @@
 提供统一的日志记录功能
 """
 import os
+import queue
+import atexit
 import logging
+import threading
 import logging.handlers
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 from config import Config
 
+# 需要抽样输出的日志（如每个商品一条的日志）在 extra 中带上此标记
+SAMPLED = {"sampled": True}
+
+# 异步模式下各日志记录器的后台监听器
+_listeners: Dict[str, 'BatchingQueueListener'] = {}
+
+
+class Sampler:
+    """按key计数，每N次放行一次"""
+    
+    def __init__(self, every: int = 1):
+        self.every = max(1, int(every))
+        self._counts: Dict[object, int] = {}
+        self._lock = threading.Lock()
+    
+    def hit(self, key: object = None) -> bool:
+        """
+        判断本次是否放行
+        
+        Args:
+            key: 计数key，不同key独立计数
+            
+        Returns:
+            bool: 第1、N+1、2N+1...次返回True
+        """
+        if self.every <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class SamplingFilter(logging.Filter):
+    """对带 SAMPLED 标记的日志按消息模板抽样，其他日志全部放行"""
+    
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.sampler = Sampler(every)
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        # 使用 %s 占位的消息模板作为key，同一类日志共用计数
+        return self.sampler.hit((record.name, record.msg))
+
+
+class _DeferredFlushMixin:
+    """写入时不立即flush，由监听器在一批记录处理完后统一flush"""
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            if getattr(self, "shouldRollover", None) and self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    """批量flush的控制台处理器"""
+
+
+class BatchRotatingFileHandler(_DeferredFlushMixin, logging.handlers.RotatingFileHandler):
+    """批量flush的轮转文件处理器"""
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    进程内队列处理器
+    标准 QueueHandler 会在调用线程上格式化消息以便跨进程传递，
+    进程内队列不需要，消息格式化推迟到监听线程执行
+    （注意：参数中的可变对象在写出前被修改会反映到日志中）
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    批量处理的队列监听器
+    一次取出队列中已有的记录（最多batch_size条）交给处理器，整批处理完后再flush
+    """
+    
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 256,
+                 flush_interval: float = 0.5):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+    
+    def _monitor(self):
+        q = self.queue
+        while True:
+            try:
+                record = q.get(True, self.flush_interval)
+            except queue.Empty:
+                continue
+            batch: List[logging.LogRecord] = [record]
+            while len(batch) < self.batch_size and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._sentinel
+            for item in batch:
+                if item is not self._sentinel:
+                    self.handle(item)
+            for handler in self.handlers:
+                handler.flush()
+            if stop:
+                break
+
+
+def shutdown_logging():
+    """停止所有异步日志监听器，把队列中剩余的日志写完"""
+    for name in list(_listeners):
+        listener = _listeners.pop(name)
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+atexit.register(shutdown_logging)
+
+
+def is_async_logging(name: str = 'crawler') -> bool:
+    """判断日志记录器是否运行在异步模式"""
+    return name in _listeners
+
 
 def setup_logger(name: Optional[str] = None, 
                 level: Optional[str] = None,
-                log_file: Optional[str] = None) -> logging.Logger:
+                log_file: Optional[str] = None,
+                async_mode: Optional[bool] = None,
+                sample_every: Optional[int] = None) -> logging.Logger:
     """
     设置日志记录器
     
@@ -21,6 +159,8 @@ def setup_logger(name: Optional[str] = None,
         name: 日志记录器名称，默认为'crawler'
         level: 日志级别，默认从配置读取
         log_file: 日志文件名，默认从配置读取
+        async_mode: 是否使用队列异步写日志，默认从配置读取（LOG_ASYNC）
+        sample_every: 带 SAMPLED 标记的日志每N条输出1条，默认从配置读取（LOG_SAMPLE_EVERY）
         
     Returns:
         logging.Logger: 配置好的日志记录器
@@ -32,6 +172,10 @@ def setup_logger(name: Optional[str] = None,
         level = Config.LOG_LEVEL
     if log_file is None:
         log_file = Config.LOG_FILE
+    if async_mode is None:
+        async_mode = Config.LOG_ASYNC
+    if sample_every is None:
+        sample_every = Config.LOG_SAMPLE_EVERY
     
     # 创建日志记录器
     logger = logging.getLogger(name)
@@ -53,15 +197,18 @@ def setup_logger(name: Optional[str] = None,
         datefmt=Config.LOG_DATE_FORMAT
     )
     
+    # 异步模式下由后台线程批量写入，处理器不逐条flush
+    stream_handler_class = BatchStreamHandler if async_mode else logging.StreamHandler
+    file_handler_class = BatchRotatingFileHandler if async_mode else logging.handlers.RotatingFileHandler
+    
     # 创建控制台处理器
-    console_handler = logging.StreamHandler()
+    console_handler = stream_handler_class()
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
     
     # 创建文件处理器（带轮转）
     log_file_path = os.path.join(Config.LOG_DIR, log_file)
-    file_handler = logging.handlers.RotatingFileHandler(
+    file_handler = file_handler_class(
         filename=log_file_path,
         maxBytes=Config.LOG_MAX_SIZE,
         backupCount=Config.LOG_BACKUP_COUNT,
@@ -69,10 +216,30 @@ def setup_logger(name: Optional[str] = None,
     )
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    
+    sampling_filter = SamplingFilter(sample_every)
+    if async_mode:
+        # 调用方只负责入队，抽样在入队前完成，被丢弃的日志不占队列
+        log_queue = queue.Queue(-1)
+        queue_handler = LocalQueueHandler(log_queue)
+        queue_handler.setLevel(log_level)
+        queue_handler.addFilter(sampling_filter)
+        logger.addHandler(queue_handler)
+        listener = BatchingQueueListener(
+            log_queue, console_handler, file_handler,
+            batch_size=Config.LOG_ASYNC_BATCH_SIZE,
+            flush_interval=Config.LOG_ASYNC_FLUSH_INTERVAL
+        )
+        listener.start()
+        _listeners[name] = listener
+    else:
+        for handler in (console_handler, file_handler):
+            handler.addFilter(sampling_filter)
+            logger.addHandler(handler)
     
     # 记录初始化信息
-    logger.info(f"日志系统初始化完成 - 级别: {level}, 文件: {log_file_path}")
+    mode = "异步" if async_mode else "同步"
+    logger.info("日志系统初始化完成 - 级别: %s, 文件: %s, 模式: %s", level, log_file_path, mode)
     
     return logger
 
@@ -99,23 +266,28 @@ class CrawlerLogger:
     
     def info(self, message: str, **kwargs):
         """记录信息日志"""
-        self.logger.info(self._format_message(message, **kwargs))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(self._format_message(message, **kwargs))
     
     def warning(self, message: str, **kwargs):
         """记录警告日志"""
-        self.logger.warning(self._format_message(message, **kwargs))
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning(self._format_message(message, **kwargs))
     
     def error(self, message: str, **kwargs):
         """记录错误日志"""
-        self.logger.error(self._format_message(message, **kwargs))
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(self._format_message(message, **kwargs))
     
     def debug(self, message: str, **kwargs):
         """记录调试日志"""
-        self.logger.debug(self._format_message(message, **kwargs))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(self._format_message(message, **kwargs))
     
     def critical(self, message: str, **kwargs):
         """记录严重错误日志"""
-        self.logger.critical(self._format_message(message, **kwargs))
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self.logger.critical(self._format_message(message, **kwargs))
     
     def log_task_start(self, task_name: str, **kwargs):
         """记录任务开始"""
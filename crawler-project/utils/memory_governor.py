@@ -0,0 +1,224 @@
+"""
+浏览器内存管理
+长时间运行时浏览器的内存会不断增长（详情页标签页、网络监听缓存、渲染进程的页面缓存），
+定期采样浏览器进程树的常驻内存（主进程 + 渲染/GPU等子进程，读取 /proc），按阈值回收:
+    超过 MAX_MEMORY_MB × MEMORY_TAB_RECYCLE_RATIO 时回收标签页（关闭多余标签页、停止网络监听、当前页换成空白页）
+    超过 MAX_MEMORY_MB，或回收标签页后仍超过回收阈值时重启浏览器（cookie由调用方保存和恢复）
+每次采样和回收记录在内存时间线中，可导出为JSON Lines（MEMORY_TIMELINE_FILE）。
+"""
+import os
+import json
+import time
+import threading
+from collections import deque, Counter
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.metrics import read_process_rss, BROWSER_RSS_BYTES, BROWSER_RECYCLES
+
+logger = get_logger(__name__)
+
+ACTION_NONE = "none"
+ACTION_RECYCLE_TABS = "recycle_tabs"
+ACTION_RESTART_BROWSER = "restart_browser"
+
+MB = 1024 * 1024
+
+
+@dataclass
+class MemorySample:
+    """一次内存采样"""
+    timestamp: float
+    browser_rss: int   # 浏览器主进程
+    children_rss: int  # 渲染/GPU等子进程
+    tabs: int
+    action: str = ACTION_NONE
+    event: str = "sample"  # sample 为定期采样，after_<action> 为回收后的采样
+
+    @property
+    def total_rss(self) -> int:
+        return self.browser_rss + self.children_rss
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["total_rss"] = self.total_rss
+        return data
+
+
+class MemoryGovernor:
+    """按浏览器进程树的内存决定是否回收标签页或重启浏览器"""
+
+    def __init__(self, max_memory_mb: float = None, tab_recycle_ratio: float = None, check_interval: float = None,
+                 name: str = "crawler", history_size: int = 1000,
+                 rss_reader: Callable[[int, bool], int] = read_process_rss, clock=time.monotonic):
+        """
+        初始化内存管理器，未传入的参数从配置读取
+
+        Args:
+            max_memory_mb: 浏览器进程树的内存上限（MB），超过时重启浏览器
+            tab_recycle_ratio: 达到上限的该比例时回收标签页
+            check_interval: 两次采样的最小间隔（秒），间隔内的检查直接返回 ACTION_NONE
+            name: 指标和日志中的爬虫名称
+            history_size: 时间线保留的采样数
+            rss_reader: 读取RSS的函数 rss_reader(pid, include_children)（测试时替换）
+            clock: 时间函数（测试时替换）
+        """
+        self.max_bytes = int((max_memory_mb if max_memory_mb is not None else Config.MAX_MEMORY_MB) * MB)
+        if self.max_bytes <= 0:
+            raise ValueError("内存上限必须大于0")
+        ratio = Config.MEMORY_TAB_RECYCLE_RATIO if tab_recycle_ratio is None else tab_recycle_ratio
+        self.recycle_bytes = int(self.max_bytes * min(max(ratio, 0.0), 1.0))
+        self.check_interval = Config.MEMORY_CHECK_INTERVAL if check_interval is None else check_interval
+        self.name = name
+        self._rss_reader = rss_reader
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_check: Optional[float] = None
+        self._last_action = ACTION_NONE
+        self.timeline: deque = deque(maxlen=history_size)
+        self.recycles: Counter = Counter()
+        self.peak_rss = 0
+
+    def sample(self, pid: Optional[int], tabs: int = 0, event: str = "sample") -> MemorySample:
+        """
+        采样浏览器进程树的内存并记录到时间线
+
+        Args:
+            pid: 浏览器主进程ID
+            tabs: 当前标签页数
+            event: 时间线中的事件名
+
+        Returns:
+            MemorySample: 采样结果，pid为空时内存为0
+        """
+        browser_rss = self._rss_reader(pid, False) if pid else 0
+        total_rss = self._rss_reader(pid, True) if pid else 0
+        sample = MemorySample(time.time(), browser_rss, max(total_rss - browser_rss, 0), tabs, event=event)
+        BROWSER_RSS_BYTES.labels(crawler=self.name).set(sample.total_rss)
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, sample.total_rss)
+            self.timeline.append(sample)
+        return sample
+
+    def decide(self, sample: MemorySample) -> str:
+        """
+        按采样结果决定回收动作
+
+        Returns:
+            str: ACTION_NONE / ACTION_RECYCLE_TABS / ACTION_RESTART_BROWSER
+        """
+        if sample.total_rss >= self.max_bytes:
+            return ACTION_RESTART_BROWSER
+        if sample.total_rss >= self.recycle_bytes:
+            # 上次已经回收过标签页仍未降下来，说明内存在浏览器进程本身
+            return ACTION_RESTART_BROWSER if self._last_action == ACTION_RECYCLE_TABS else ACTION_RECYCLE_TABS
+        return ACTION_NONE
+
+    def check(self, pid: Optional[int], tabs: int = 0) -> str:
+        """
+        采样并决定回收动作（距上次检查不足 check_interval 时不采样）
+
+        Args:
+            pid: 浏览器主进程ID
+            tabs: 当前标签页数
+
+        Returns:
+            str: 需要执行的回收动作，调用方执行后调用 recycled() 记录
+        """
+        now = self._clock()
+        with self._lock:
+            if self._last_check is not None and now - self._last_check < self.check_interval:
+                return ACTION_NONE
+            self._last_check = now
+        sample = self.sample(pid, tabs)
+        action = self.decide(sample)
+        sample.action = action
+        with self._lock:
+            self._last_action = action
+        if action != ACTION_NONE:
+            logger.warning(f"[{self.name}] 浏览器内存 {sample.total_rss / MB:.0f}MB "
+                           f"(上限 {self.max_bytes / MB:.0f}MB, 标签页 {tabs})，执行 {action}")
+        return action
+
+    def recycled(self, action: str, pid: Optional[int], tabs: int = 0) -> MemorySample:
+        """
+        记录一次回收，并采样回收后的内存
+
+        Args:
+            action: 已执行的回收动作
+            pid: 回收后的浏览器主进程ID（重启后为新进程）
+            tabs: 回收后的标签页数
+        """
+        BROWSER_RECYCLES.labels(crawler=self.name, action=action).inc()
+        with self._lock:
+            self.recycles[action] += 1
+            if action == ACTION_RESTART_BROWSER:
+                self._last_action = ACTION_NONE
+        sample = self.sample(pid, tabs, event=f"after_{action}")
+        logger.info(f"[{self.name}] {action} 完成，浏览器内存 {sample.total_rss / MB:.0f}MB")
+        return sample
+
+    def export_timeline(self, path: Optional[str] = None) -> bool:
+        """
+        把内存时间线追加写入 JSON Lines 文件
+
+        Args:
+            path: 文件路径，默认 MEMORY_TIMELINE_FILE（为空时不写）
+
+        Returns:
+            bool: 是否写入
+        """
+        path = path or Config.MEMORY_TIMELINE_FILE
+        if not path:
+            return False
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                samples = list(self.timeline)
+            with open(path, 'a', encoding='utf-8') as f:
+                for sample in samples:
+                    f.write(json.dumps({"crawler": self.name, **sample.to_dict()}, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            logger.error(f"导出内存时间线失败: {e}")
+            return False
+
+    def stats(self) -> Dict:
+        """获取统计信息"""
+        with self._lock:
+            last = self.timeline[-1] if self.timeline else None
+            return {
+                "samples": len(self.timeline),
+                "max_memory_mb": self.max_bytes / MB,
+                "peak_rss_mb": round(self.peak_rss / MB, 1),
+                "last_rss_mb": round(last.total_rss / MB, 1) if last else 0.0,
+                "recycles": dict(self.recycles),
+            }
+
+    def timeline_dicts(self) -> List[dict]:
+        """时间线（字典形式）"""
+        with self._lock:
+            return [sample.to_dict() for sample in self.timeline]
+
+
+def open_memory_governor(name: str = "crawler") -> Optional[MemoryGovernor]:
+    """
+    按配置创建内存管理器
+
+    Args:
+        name: 指标和日志中的爬虫名称
+
+    Returns:
+        Optional[MemoryGovernor]: MAX_MEMORY_MB 为0（不限制）或创建失败时返回None
+    """
+    if Config.MAX_MEMORY_MB <= 0:
+        return None
+    try:
+        return MemoryGovernor(name=name)
+    except Exception as e:
+        logger.error(f"创建内存管理器失败: {e}")
+        return None
@@ -0,0 +1,516 @@
+"""
+运行指标
+Prometheus风格的计数器、仪表和直方图，适合长时间运行的爬虫进程:
+    - 可选的本地HTTP端点（/metrics，文本格式与Prometheus兼容）
+    - 定时写文件模式（原子替换，适合Crawlab任务或node_exporter textfile采集）
+"""
+import os
+import math
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """指标基类，按标签值保存子指标"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues, **labelkwargs):
+        """
+        获取指定标签值的子指标
+
+        Returns:
+            子指标（与无标签指标用法相同）
+        """
+        if labelkwargs:
+            labelvalues = tuple(str(labelkwargs[name]) for name in self.labelnames)
+        else:
+            labelvalues = tuple(str(v) for v in labelvalues)
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        with self._lock:
+            child = self._children.get(labelvalues)
+            if child is None:
+                child = self._children[labelvalues] = self._new_child()
+            return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} 有标签，请先调用 labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        """生成文本格式的样本行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = list(self._children.items())
+        for labelvalues, child in children:
+            lines.extend(self._collect_child(labelvalues, child))
+        return lines
+
+    def _collect_child(self, labelvalues, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.get())}"]
+
+
+class _Value:
+    """线程安全的数值"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = float(value)
+
+    def get(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class _CounterValue(_Value):
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        super().inc(amount)
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def get(self) -> float:
+        return self._default().get()
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def get(self) -> float:
+        return self._default().get()
+
+
+class _HistogramValue:
+    """直方图数据"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def time(self):
+        """计时上下文管理器，退出时记录耗时（秒）"""
+        return _Timer(self.observe)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _Timer:
+    def __init__(self, callback):
+        self._callback = callback
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._callback(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    """直方图（累计分桶）"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        buckets = tuple(sorted(float(b) for b in buckets))
+        if not buckets or buckets[-1] != math.inf:
+            buckets += (math.inf,)
+        self.buckets = buckets
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _collect_child(self, labelvalues, child) -> List[str]:
+        counts, total, count = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._pusher: Optional['FilePusher'] = None
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """获取或创建仪表"""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """生成Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def write_to_file(self, path: str) -> bool:
+        """
+        把当前指标写入文件（先写临时文件再原子替换）
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.error(f"写入指标文件失败: {e}")
+            return False
+
+    def start_http_server(self, port: int, host: str = "0.0.0.0") -> int:
+        """
+        启动 /metrics HTTP端点（后台线程）
+
+        Args:
+            port: 端口，0表示自动分配
+            host: 监听地址
+
+        Returns:
+            int: 实际监听的端口
+        """
+        if self._server:
+            return self._server.server_address[1]
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        actual_port = self._server.server_address[1]
+        logger.info(f"指标端点已启动: http://{host}:{actual_port}/metrics")
+        return actual_port
+
+    def start_file_pusher(self, path: str, interval: float = 15.0) -> 'FilePusher':
+        """
+        启动定时写文件
+
+        Args:
+            path: 输出路径
+            interval: 写入间隔（秒）
+
+        Returns:
+            FilePusher: 可调用 stop() 停止并做最后一次写入
+        """
+        if self._pusher is None:
+            self._pusher = FilePusher(self, path, interval)
+            self._pusher.start()
+            logger.info(f"指标定时写入: {path} (每{interval}秒)")
+        return self._pusher
+
+    def shutdown(self):
+        """停止HTTP端点和写文件线程，停止前写入最终指标"""
+        if self._pusher:
+            self._pusher.stop()
+            self._pusher = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class FilePusher(threading.Thread):
+    """定时把指标写入文件的后台线程"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float):
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.registry.write_to_file(self.path)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=5)
+        self.registry.write_to_file(self.path)
+
+
+def read_process_rss(pid: int, include_children: bool = True) -> int:
+    """
+    读取进程（及其子进程）的常驻内存，单位字节
+    依赖 /proc，非Linux平台返回0
+
+    Args:
+        pid: 进程ID
+        include_children: 是否累加子进程（Chrome的渲染进程）
+
+    Returns:
+        int: RSS字节数
+    """
+    pids = [pid]
+    if include_children:
+        try:
+            parents = {}
+            for entry in os.listdir("/proc"):
+                if entry.isdigit():
+                    try:
+                        with open(f"/proc/{entry}/stat", 'r') as f:
+                            # 进程名可能包含空格，取最后一个右括号之后的字段
+                            fields = f.read().rsplit(")", 1)[1].split()
+                        parents.setdefault(int(fields[1]), []).append(int(entry))
+                    except (OSError, IndexError, ValueError):
+                        continue
+            index = 0
+            while index < len(pids):
+                pids.extend(parents.get(pids[index], []))
+                index += 1
+        except OSError:
+            pass
+
+    total = 0
+    for process_id in pids:
+        try:
+            with open(f"/proc/{process_id}/status", 'r') as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+# 全局指标注册表实例
+registry = MetricsRegistry()
+
+# ==================== 爬虫指标 ====================
+
+PAGES_FETCHED = registry.counter("crawler_pages_fetched_total", "已请求的页面数", ["crawler"])
+PRODUCTS_PARSED = registry.counter("crawler_products_parsed_total", "已解析的商品数", ["crawler"])
+PRODUCTS_SAVED = registry.counter("crawler_products_saved_total", "已写入数据库的商品数", ["crawler"])
+DEDUP_HITS = registry.counter("crawler_dedup_hits_total", "因已存在而跳过的商品数", ["crawler"])
+PRODUCT_CHANGES = registry.counter("crawler_product_changes_total", "按指纹检测的商品变化（new/changed/unchanged）", ["status"])
+CAPTCHA_ENCOUNTERS = registry.counter("crawler_captcha_encounters_total", "遇到验证码的次数", ["handler"])
+CAPTCHA_SOLVES = registry.counter("crawler_captcha_solves_total", "验证码通过的次数", ["handler"])
+CAPTCHA_SOLVE_SECONDS = registry.histogram(
+    "crawler_captcha_solve_seconds", "验证码从检测到通过的耗时", ["handler"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60))
+MONGO_FLUSH_SECONDS = registry.histogram("crawler_mongo_flush_seconds", "MongoDB写入耗时", ["operation"])
+REQUESTS_TOTAL = registry.counter("crawler_requests_total", "经过请求间隔控制的请求数")
+BROWSER_RSS_BYTES = registry.gauge("crawler_browser_rss_bytes", "浏览器进程树的常驻内存", ["crawler"])
+BROWSER_RECYCLES = registry.counter("crawler_browser_recycles_total", "内存超限时回收标签页/重启浏览器的次数", ["crawler", "action"])
+RATE_LIMIT_RPS = registry.gauge("crawler_rate_limit_rps", "速率控制器当前允许的每秒请求数", ["host"])
+RATE_LIMIT_WAIT_SECONDS = registry.counter("crawler_rate_limit_wait_seconds_total", "速率控制器累计等待时间", ["host"])
+SESSIONS_RETIRED = registry.counter("crawler_sessions_retired_total", "因验证码过多被淘汰的浏览器会话数", ["reason"])
+PROXY_REQUESTS = registry.counter("crawler_proxy_requests_total", "经过代理池代理的请求数", ["proxy", "result"])
+PROXY_IN_FLIGHT = registry.gauge("crawler_proxy_in_flight", "代理当前被占用的并发数", ["proxy"])
+RETRY_ATTEMPTS = registry.counter("crawler_retry_attempts_total", "重试引擎记录的失败调用数", ["dependency", "error_class"])
+CIRCUIT_STATE = registry.gauge("crawler_circuit_state", "依赖熔断状态（0关闭/1半开/2熔断）", ["dependency"])
+RESULTS_EMITTED = registry.counter("crawler_results_emitted_total", "写入结果通道的结果数", ["sink"])
+PRODUCTS_ENRICHED = registry.counter("crawler_products_enriched_total", "详情补全的商品数（enriched/skipped/failed）", ["result"])
+
+
+def update_browser_rss(pid: Optional[int], crawler: str) -> int:
+    """
+    更新浏览器进程树的内存仪表
+
+    Args:
+        pid: 浏览器主进程ID
+        crawler: 爬虫名称标签
+
+    Returns:
+        int: RSS字节数
+    """
+    rss = read_process_rss(pid) if pid else 0
+    BROWSER_RSS_BYTES.labels(crawler=crawler).set(rss)
+    return rss
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取全局指标注册表实例"""
+    return registry
+
+
+def start_metrics_export(port: Optional[int] = None, file_path: Optional[str] = None,
+                         interval: Optional[float] = None) -> bool:
+    """
+    按配置启动指标导出（HTTP端点和/或定时写文件），未配置时什么也不做
+
+    Args:
+        port: HTTP端口，默认 Config.METRICS_PORT（0表示不启动）
+        file_path: 写文件路径，默认 Config.METRICS_FILE（空表示不写）
+        interval: 写文件间隔，默认 Config.METRICS_PUSH_INTERVAL
+
+    Returns:
+        bool: 是否启动了任何导出
+    """
+    port = Config.METRICS_PORT if port is None else port
+    file_path = Config.METRICS_FILE if file_path is None else file_path
+    interval = Config.METRICS_PUSH_INTERVAL if interval is None else interval
+    started = False
+    try:
+        if port:
+            registry.start_http_server(port)
+            started = True
+    except OSError as e:
+        logger.error(f"启动指标端点失败: {e}")
+    if file_path:
+        registry.start_file_pusher(file_path, interval)
+        started = True
+    return started
+
+
+def stop_metrics_export():
+    """停止指标导出（写文件模式会做最后一次写入）"""
+    registry.shutdown()
@@ -0,0 +1,475 @@
+"""
+价格/销量历史
+每次采集到商品时记录一条观测（价格、原价、销量、评论数、评分），同时增量更新小时和天两级汇总，
+查询价格走势、关键词下销量增长最快的商品时直接读汇总，不扫描原始观测。
+后端:
+    mongo - 原始观测写入时间序列集合（MongoDB 5.0+，低版本退化为普通集合），
+            汇总写入 <HISTORY_COLLECTION>_hourly / _daily，用 $min/$max/$inc 原子更新
+    file  - 原始观测按天追加到 <HISTORY_DIR>/raw/<日期>.jsonl（查询只读区间内的日期文件，超过保留天数的整天删除），
+            汇总保存在 hourly.json / daily.json，用于本地调试和测试
+"""
+import os
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+GRANULARITY_RAW = "raw"
+GRANULARITY_HOUR = "hour"
+GRANULARITY_DAY = "day"
+# 汇总粒度 -> 文件名/集合名后缀
+ROLLUP_SUFFIXES = {GRANULARITY_HOUR: "hourly", GRANULARITY_DAY: "daily"}
+
+
+@dataclass
+class Observation:
+    """一次采集到的商品价格和销量"""
+    product_id: str
+    keyword: str
+    ts: datetime
+    price: float
+    origin_price: float = 0.0
+    sold_count: int = 0
+    review_count: int = 0
+    rating: float = 0.0
+
+    @classmethod
+    def from_product(cls, product, keyword: Optional[str] = None, ts: Optional[datetime] = None) -> 'Observation':
+        """从 ProductData 创建"""
+        return cls(
+            product_id=str(product.product_id),
+            keyword=keyword or product.search_keyword,
+            ts=ts or product.scraped_at or datetime.now(),
+            price=float(product.current_price or 0),
+            origin_price=float(product.origin_price or 0),
+            sold_count=int(product.sold_count or 0),
+            review_count=int(product.review_count or 0),
+            rating=float(product.product_rating or 0),
+        )
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """观测时间所在汇总区间的起点"""
+    if granularity == GRANULARITY_HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def merge_rollup(rollup: Optional[dict], obs: Observation, bucket: datetime) -> dict:
+    """
+    把一条观测合并进汇总文档（文件后端使用，与Mongo后端的更新操作语义一致）
+
+    Returns:
+        dict: 更新后的汇总文档
+    """
+    if rollup is None:
+        rollup = {
+            "product_id": obs.product_id, "keyword": obs.keyword, "bucket": bucket,
+            "count": 0, "price_sum": 0.0, "price_min": obs.price, "price_max": obs.price,
+            "first_ts": obs.ts, "sold_first": obs.sold_count, "review_first": obs.review_count,
+            "last_ts": obs.ts,
+        }
+    rollup["count"] += 1
+    rollup["price_sum"] += obs.price
+    rollup["price_min"] = min(rollup["price_min"], obs.price)
+    rollup["price_max"] = max(rollup["price_max"], obs.price)
+    if obs.ts < rollup["first_ts"]:
+        rollup.update(first_ts=obs.ts, sold_first=obs.sold_count, review_first=obs.review_count)
+    if obs.ts >= rollup["last_ts"]:
+        rollup.update(last_ts=obs.ts, price_last=obs.price, sold_last=obs.sold_count,
+                      review_last=obs.review_count, rating_last=obs.rating)
+    return rollup
+
+
+def _trajectory_point(rollup: dict) -> dict:
+    return {
+        "bucket": rollup["bucket"],
+        "count": rollup["count"],
+        "price_min": rollup["price_min"],
+        "price_max": rollup["price_max"],
+        "price_avg": round(rollup["price_sum"] / rollup["count"], 4) if rollup["count"] else 0.0,
+        "price_last": rollup.get("price_last"),
+        "sold_last": rollup.get("sold_last"),
+    }
+
+
+def _velocity(product_id: str, first: dict, last: dict, min_hours: float) -> Optional[dict]:
+    """两条汇总之间的每天销量增长"""
+    hours = (last["last_ts"] - first["first_ts"]).total_seconds() / 3600
+    if hours < min_hours:
+        return None
+    sold_delta = last.get("sold_last", 0) - first.get("sold_first", 0)
+    return {
+        "product_id": product_id,
+        "sold_delta": sold_delta,
+        "hours": round(hours, 2),
+        "sales_per_day": round(sold_delta / hours * 24, 2),
+        "price_last": last.get("price_last"),
+    }
+
+
+class FileHistoryStore:
+    """文件后端"""
+
+    def __init__(self, directory: str, retention_days: float = 0):
+        """
+        Args:
+            directory: 历史数据目录
+            retention_days: 原始观测保留天数，打开时删除更早的日期文件，0为不删除
+        """
+        self.directory = directory
+        self.raw_dir = os.path.join(directory, "raw")
+        os.makedirs(self.raw_dir, exist_ok=True)
+        self.rollups: Dict[str, Dict[str, dict]] = {g: self._load_rollups(g) for g in ROLLUP_SUFFIXES}
+        self._raw_file = None
+        self._raw_day = None
+        self._dirty = False
+        if retention_days:
+            self._expire_raw(bucket_start(datetime.now() - timedelta(days=retention_days), GRANULARITY_DAY))
+
+    def _raw_path(self, day: datetime) -> str:
+        return os.path.join(self.raw_dir, f"{day:%Y-%m-%d}.jsonl")
+
+    def _raw_files(self) -> List[str]:
+        return sorted(os.path.join(self.raw_dir, name) for name in os.listdir(self.raw_dir) if name.endswith(".jsonl"))
+
+    def _raw_days(self, start: datetime, end: datetime) -> List[str]:
+        """[start, end) 覆盖的已有日期文件"""
+        first = self._raw_path(bucket_start(start, GRANULARITY_DAY))
+        last = self._raw_path(bucket_start(end, GRANULARITY_DAY))
+        return [path for path in self._raw_files() if first <= path <= last]
+
+    def _expire_raw(self, before: datetime):
+        """删除 before 当天之前的原始观测"""
+        cutoff = self._raw_path(before)
+        for path in self._raw_files():
+            if path >= cutoff:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除过期价格历史失败: {e}")
+
+    def _rollup_path(self, granularity: str) -> str:
+        return os.path.join(self.directory, f"{ROLLUP_SUFFIXES[granularity]}.json")
+
+    def _load_rollups(self, granularity: str) -> Dict[str, dict]:
+        path = self._rollup_path(granularity)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            rollups = json.load(f)
+        for rollup in rollups.values():
+            for key in ("bucket", "first_ts", "last_ts"):
+                rollup[key] = datetime.fromisoformat(rollup[key])
+        return rollups
+
+    def _raw_writer(self, day: datetime):
+        """当天原始观测文件的追加句柄，换日时关闭前一天的文件"""
+        if day != self._raw_day:
+            if self._raw_file is not None:
+                self._raw_file.close()
+            self._raw_file = open(self._raw_path(day), 'a', encoding='utf-8')
+            self._raw_day = day
+        return self._raw_file
+
+    def add(self, observations: List[Observation]):
+        lines_by_day: Dict[datetime, List[str]] = {}
+        for obs in observations:
+            record = dict(obs.__dict__, ts=obs.ts.isoformat())
+            lines_by_day.setdefault(bucket_start(obs.ts, GRANULARITY_DAY), []).append(
+                json.dumps(record, ensure_ascii=False) + "\n")
+            for granularity in ROLLUP_SUFFIXES:
+                bucket = bucket_start(obs.ts, granularity)
+                key = f"{obs.product_id}|{bucket.isoformat()}"
+                rollups = self.rollups[granularity]
+                rollups[key] = merge_rollup(rollups.get(key), obs, bucket)
+        for day, lines in lines_by_day.items():
+            writer = self._raw_writer(day)
+            writer.write("".join(lines))
+            writer.flush()
+        self._dirty = True
+
+    def flush(self):
+        """把汇总写回文件"""
+        if not self._dirty:
+            return
+        for granularity, rollups in self.rollups.items():
+            path = self._rollup_path(granularity)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(rollups, f, ensure_ascii=False, default=lambda v: v.isoformat())
+            os.replace(path + ".tmp", path)
+        self._dirty = False
+
+    def raw(self, product_id: str, start: datetime, end: datetime) -> List[dict]:
+        points = []
+        for path in self._raw_days(start, end):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record["product_id"] != product_id:
+                        continue
+                    record["ts"] = datetime.fromisoformat(record["ts"])
+                    if start <= record["ts"] < end:
+                        points.append(record)
+        return sorted(points, key=lambda r: r["ts"])
+
+    def rollups_for(self, granularity: str, start: datetime, end: datetime,
+                    product_id: Optional[str] = None, keyword: Optional[str] = None) -> List[dict]:
+        return sorted(
+            (r for r in self.rollups[granularity].values()
+             if start <= r["bucket"] < end
+             and (product_id is None or r["product_id"] == product_id)
+             and (keyword is None or r["keyword"] == keyword)),
+            key=lambda r: r["bucket"])
+
+    def top_sales_velocity(self, keyword: str, granularity: str, start: datetime, end: datetime,
+                           limit: int, min_hours: float) -> List[dict]:
+        by_product: Dict[str, List[dict]] = {}
+        for rollup in self.rollups_for(granularity, start, end, keyword=keyword):
+            by_product.setdefault(rollup["product_id"], []).append(rollup)
+        results = [_velocity(pid, rollups[0], rollups[-1], min_hours) for pid, rollups in by_product.items()]
+        results = [r for r in results if r]
+        results.sort(key=lambda r: r["sales_per_day"], reverse=True)
+        return results[:limit]
+
+    def close(self):
+        self.flush()
+        if self._raw_file is not None:
+            self._raw_file.close()
+            self._raw_file = None
+            self._raw_day = None
+
+
+class MongoHistoryStore:
+    """Mongo后端"""
+
+    def __init__(self, db, collection_name: str):
+        """
+        Args:
+            db: pymongo 数据库对象
+            collection_name: 原始观测集合名，汇总集合为 <名>_hourly / <名>_daily
+        """
+        self.raw_collection = self._time_series_collection(db, collection_name)
+        self.rollup_collections = {g: db[f"{collection_name}_{suffix}"] for g, suffix in ROLLUP_SUFFIXES.items()}
+        for collection in self.rollup_collections.values():
+            try:
+                collection.create_index([("product_id", 1), ("bucket", 1)], unique=True)
+                collection.create_index([("keyword", 1), ("bucket", 1)])
+            except Exception as e:
+                logger.warning(f"创建历史汇总索引失败: {e}")
+
+    @staticmethod
+    def _time_series_collection(db, name: str):
+        """创建时间序列集合，已存在或服务器不支持时直接使用普通集合"""
+        from pymongo.errors import CollectionInvalid, OperationFailure
+        options = {"timeseries": {"timeField": "ts", "metaField": "meta", "granularity": "hours"}}
+        if Config.HISTORY_RETENTION_DAYS:
+            options["expireAfterSeconds"] = int(Config.HISTORY_RETENTION_DAYS * 86400)
+        try:
+            db.create_collection(name, **options)
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            logger.warning(f"MongoDB不支持时间序列集合，使用普通集合: {e}")
+            db[name].create_index([("meta.product_id", 1), ("ts", 1)])
+        return db[name]
+
+    def add(self, observations: List[Observation]):
+        from pymongo import UpdateOne
+        raw = [{"ts": obs.ts, "meta": {"product_id": obs.product_id, "keyword": obs.keyword},
+                "price": obs.price, "origin_price": obs.origin_price, "sold_count": obs.sold_count,
+                "review_count": obs.review_count, "rating": obs.rating} for obs in observations]
+        self.raw_collection.insert_many(raw, ordered=False)
+
+        for granularity, collection in self.rollup_collections.items():
+            operations = []
+            for obs in observations:
+                bucket = bucket_start(obs.ts, granularity)
+                key = {"product_id": obs.product_id, "bucket": bucket}
+                operations.append(UpdateOne(key, {
+                    "$setOnInsert": {"keyword": obs.keyword, "first_ts": obs.ts,
+                                     "sold_first": obs.sold_count, "review_first": obs.review_count},
+                    "$inc": {"count": 1, "price_sum": obs.price},
+                    "$min": {"price_min": obs.price},
+                    "$max": {"price_max": obs.price, "last_ts": obs.ts},
+                }, upsert=True))
+                # 乱序到达、早于已有最早观测时覆盖 *_first 字段
+                operations.append(UpdateOne({**key, "first_ts": {"$gt": obs.ts}}, {"$set": {
+                    "first_ts": obs.ts, "sold_first": obs.sold_count, "review_first": obs.review_count,
+                }}))
+                # 只有不早于已有最后观测时才覆盖 *_last 字段
+                operations.append(UpdateOne({**key, "last_ts": {"$lte": obs.ts}}, {"$set": {
+                    "price_last": obs.price, "sold_last": obs.sold_count,
+                    "review_last": obs.review_count, "rating_last": obs.rating,
+                }}))
+            collection.bulk_write(operations, ordered=True)
+
+    def flush(self):
+        pass
+
+    def raw(self, product_id: str, start: datetime, end: datetime) -> List[dict]:
+        cursor = self.raw_collection.find(
+            {"meta.product_id": product_id, "ts": {"$gte": start, "$lt": end}}, {"_id": 0}).sort("ts", 1)
+        return [dict(doc.pop("meta"), **doc) for doc in cursor]
+
+    def rollups_for(self, granularity: str, start: datetime, end: datetime,
+                    product_id: Optional[str] = None, keyword: Optional[str] = None) -> List[dict]:
+        query: Dict[str, Any] = {"bucket": {"$gte": start, "$lt": end}}
+        if product_id is not None:
+            query["product_id"] = product_id
+        if keyword is not None:
+            query["keyword"] = keyword
+        return list(self.rollup_collections[granularity].find(query, {"_id": 0}).sort("bucket", 1))
+
+    def top_sales_velocity(self, keyword: str, granularity: str, start: datetime, end: datetime,
+                           limit: int, min_hours: float) -> List[dict]:
+        pipeline = [
+            {"$match": {"keyword": keyword, "bucket": {"$gte": start, "$lt": end}}},
+            {"$sort": {"bucket": 1}},
+            {"$group": {"_id": "$product_id",
+                        "first_ts": {"$first": "$first_ts"}, "sold_first": {"$first": "$sold_first"},
+                        "last_ts": {"$last": "$last_ts"}, "sold_last": {"$last": "$sold_last"},
+                        "price_last": {"$last": "$price_last"}}},
+            {"$addFields": {"hours": {"$divide": [{"$subtract": ["$last_ts", "$first_ts"]}, 3600 * 1000]}}},
+            {"$match": {"hours": {"$gte": max(min_hours, 1e-9)}}},
+            {"$addFields": {"sold_delta": {"$subtract": ["$sold_last", "$sold_first"]}}},
+            {"$addFields": {"sales_per_day": {"$multiply": [{"$divide": ["$sold_delta", "$hours"]}, 24]}}},
+            {"$sort": {"sales_per_day": -1}},
+            {"$limit": limit},
+        ]
+        return [{"product_id": doc["_id"], "sold_delta": doc["sold_delta"], "hours": round(doc["hours"], 2),
+                 "sales_per_day": round(doc["sales_per_day"], 2), "price_last": doc.get("price_last")}
+                for doc in self.rollup_collections[granularity].aggregate(pipeline)]
+
+    def close(self):
+        pass
+
+
+class PriceHistory:
+    """价格/销量历史的记录和查询接口"""
+
+    def __init__(self, store):
+        """
+        Args:
+            store: FileHistoryStore 或 MongoHistoryStore
+        """
+        self.store = store
+        self._lock = threading.Lock()
+
+    # ==================== 记录 ====================
+
+    def record(self, product, keyword: Optional[str] = None, ts: Optional[datetime] = None):
+        """记录单个商品"""
+        self.record_many([product], keyword, ts)
+
+    def record_many(self, products: Iterable[Any], keyword: Optional[str] = None,
+                    ts: Optional[datetime] = None) -> int:
+        """
+        批量记录一次采集到的商品
+
+        Args:
+            products: ProductData 列表
+            keyword: 关键词，默认使用商品的 search_keyword
+            ts: 观测时间，默认使用商品的 scraped_at
+
+        Returns:
+            int: 记录的观测数
+        """
+        observations = [Observation.from_product(p, keyword, ts) for p in products if p.product_id]
+        if not observations:
+            return 0
+        try:
+            with self._lock:
+                self.store.add(observations)
+            return len(observations)
+        except Exception as e:
+            # 历史数据只用于分析，写失败不影响采集
+            logger.error(f"记录价格历史失败: {e}")
+            return 0
+
+    def flush(self):
+        with self._lock:
+            self.store.flush()
+
+    def close(self):
+        with self._lock:
+            self.store.close()
+
+    # ==================== 查询 ====================
+
+    def price_trajectory(self, product_id: str, granularity: str = GRANULARITY_DAY,
+                         start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+        """
+        商品价格走势
+
+        Args:
+            product_id: 商品ID
+            granularity: raw / hour / day
+            start: 起始时间（含），默认30天前
+            end: 结束时间（不含），默认现在
+
+        Returns:
+            List[dict]: 按时间排序的点；汇总粒度包含 bucket、price_min/max/avg/last、sold_last
+        """
+        end = end or datetime.now()
+        start = start or end - timedelta(days=30)
+        if granularity == GRANULARITY_RAW:
+            return self.store.raw(product_id, start, end)
+        return [_trajectory_point(r) for r in self.store.rollups_for(granularity, start, end, product_id=product_id)]
+
+    def top_sales_velocity(self, keyword: str, days: float = 7, limit: int = 10,
+                           granularity: str = GRANULARITY_DAY, min_hours: float = 1.0,
+                           end: Optional[datetime] = None) -> List[dict]:
+        """
+        关键词下销量增长最快的商品
+
+        Args:
+            keyword: 关键词
+            days: 统计最近多少天
+            limit: 返回数量
+            granularity: 使用的汇总粒度，hour 更精确，day 读取的文档更少
+            min_hours: 首末观测间隔小于该值的商品不参与排序
+            end: 统计截止时间，默认现在
+
+        Returns:
+            List[dict]: product_id、sold_delta、hours、sales_per_day、price_last，按 sales_per_day 降序
+        """
+        end = end or datetime.now()
+        start = bucket_start(end - timedelta(days=days), granularity)
+        return self.store.top_sales_velocity(keyword, granularity, start, end, limit, min_hours)
+
+
+def open_price_history(db=None, backend: Optional[str] = None) -> Optional[PriceHistory]:
+    """
+    按配置创建价格历史
+
+    Args:
+        db: Mongo数据库对象，mongo后端需要
+        backend: file / mongo，默认从配置读取
+
+    Returns:
+        Optional[PriceHistory]: 未启用或创建失败时返回None
+    """
+    if not Config.HISTORY_ENABLED:
+        return None
+    backend = backend or Config.HISTORY_BACKEND
+    try:
+        if backend == "mongo":
+            if db is None:
+                logger.warning("价格历史使用mongo后端但没有数据库连接，改用文件后端")
+            else:
+                return PriceHistory(MongoHistoryStore(db, Config.HISTORY_COLLECTION))
+        return PriceHistory(FileHistoryStore(Config.HISTORY_DIR, Config.HISTORY_RETENTION_DAYS))
+    except Exception as e:
+        logger.error(f"创建价格历史失败: {e}")
+        return None
@@ -0,0 +1,203 @@
+"""
+商品详情补全
+搜索结果中没有商品描述、评价时间和分类，搜索采集时这些字段为空或固定值（categories="TikTok Shop"）；
+逐个打开详情页太慢，不在搜索采集中进行，而是由独立的后台任务（run_enrichment_worker.py）补全:
+    队列    商品ID进入单独的任务队列（ENRICH_QUEUE_NAME），多个worker共同领取
+    索引    商品文档记录 enriched_at，ENRICH_REFRESH_HOURS 内补全过的商品直接跳过
+    写入    每批商品详情解析后一次 bulk_write 更新，只设置补全字段，不影响搜索采集的变化检测
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.work_queue import WorkQueue, get_work_queue
+
+logger = get_logger(__name__)
+
+# 详情页补全的字段（shipping_fee 参与变化检测，由搜索采集维护，这里不覆盖）
+ENRICHED_FIELDS = ("desc_detail", "latest_review_fmt", "earliest_review_fmt", "categories")
+DETAIL_PAGE_KEY = "view/product/(product_id)/page"
+
+
+def find_product_info(router_data: str) -> Optional[Dict]:
+    """
+    从详情页 __MODERN_ROUTER_DATA__ 的JSON文本中取 product_info 组件数据
+
+    Args:
+        router_data: 页面数据JSON文本
+
+    Returns:
+        Optional[Dict]: product_info，页面结构不匹配时返回None
+    """
+    try:
+        loader_data = json.loads(router_data).get("loaderData", {})
+    except (TypeError, ValueError):
+        return None
+    pages = [loader_data[DETAIL_PAGE_KEY]] if DETAIL_PAGE_KEY in loader_data else list(loader_data.values())
+    for page_data in pages:
+        if not isinstance(page_data, dict):
+            continue
+        for component in page_data.get("page_config", {}).get("components_map", []):
+            if component.get("component_type") == "product_info":
+                return component.get("component_data", {}).get("product_info")
+    return None
+
+
+def parse_review_time(value: Any) -> Optional[datetime]:
+    """评价时间: 秒/毫秒时间戳（数字或数字字符串）或ISO格式字符串"""
+    try:
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # 毫秒级时间戳转换为秒
+            return datetime.fromtimestamp(value / 1000 if value > 10 ** 12 else value)
+        if isinstance(value, str) and value:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        pass
+    return None
+
+
+def _review_times(review_detail: Dict) -> List[datetime]:
+    info = review_detail.get("review_time_info") or {}
+    times = [parse_review_time(info.get("latest_review_time")), parse_review_time(info.get("earliest_review_time"))]
+    if not any(times):
+        times = [parse_review_time(review_detail.get("latest_review_date")),
+                 parse_review_time(review_detail.get("earliest_review_date"))]
+    if not any(times):
+        # 没有汇总时间时从评价列表中取
+        reviews = list(review_detail.get("reviews") or [])
+        reviews += [item["review"] for item in review_detail.get("review_items") or [] if "review" in item]
+        times = [parse_review_time(review.get("create_time") or review.get("review_time")
+                                   or review.get("review_timestamp")) for review in reviews]
+    return sorted(t for t in times if t)
+
+
+def _desc_text(desc_detail: Any) -> str:
+    try:
+        items = json.loads(desc_detail) if isinstance(desc_detail, str) else desc_detail or []
+    except ValueError:
+        return str(desc_detail)
+    parts = []
+    for item in items:
+        if item.get("type") == "text":
+            parts.append(item.get("text", ""))
+        elif item.get("type") == "ul":
+            parts.append(" ".join(item.get("content", [])))
+    return " ".join(part for part in parts if part)
+
+
+def _category_path(product_info: Dict) -> str:
+    categories = product_info.get("categories") or product_info.get("product_base", {}).get("categories") or []
+    names = [c.get("category_name") or c.get("name", "") if isinstance(c, dict) else str(c) for c in categories]
+    return " > ".join(name for name in names if name)
+
+
+def parse_detail_fields(product_info: Dict) -> Dict[str, str]:
+    """
+    解析详情页中补全的字段
+
+    Args:
+        product_info: 详情页 product_info 组件数据
+
+    Returns:
+        Dict[str, str]: 补全字段，详情页没有分类时不包含 categories（保留原值）
+    """
+    fields = {"desc_detail": _desc_text(product_info.get("product_base", {}).get("desc_detail", "[]")),
+              "latest_review_fmt": "", "earliest_review_fmt": ""}
+    times = _review_times(product_info.get("product_detail_review") or {})
+    if times:
+        fields["earliest_review_fmt"] = times[0].strftime("%Y-%m-%d")
+        fields["latest_review_fmt"] = times[-1].strftime("%Y-%m-%d")
+    categories = _category_path(product_info)
+    if categories:
+        fields["categories"] = categories
+    return fields
+
+
+class EnrichmentIndex:
+    """按商品文档的 enriched_at 判断是否需要补全"""
+
+    def __init__(self, collection, refresh_hours: float = None):
+        """
+        Args:
+            collection: 商品集合
+            refresh_hours: 补全结果的有效期（小时），默认 ENRICH_REFRESH_HOURS
+        """
+        self.collection = collection
+        self.refresh_hours = Config.ENRICH_REFRESH_HOURS if refresh_hours is None else refresh_hours
+        try:
+            self.collection.create_index("enriched_at")
+        except Exception as e:
+            logger.warning(f"创建补全时间索引失败: {e}")
+
+    def _cutoff(self) -> str:
+        return (datetime.now() - timedelta(hours=self.refresh_hours)).isoformat()
+
+    def stale(self, product_ids: Iterable[str]) -> List[str]:
+        """
+        过滤掉有效期内补全过的商品（一次查询）
+
+        Args:
+            product_ids: 商品ID
+
+        Returns:
+            List[str]: 需要补全的商品ID（去重，保持顺序）
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return []
+        cursor = self.collection.find({"product_id": {"$in": product_ids}, "enriched_at": {"$gte": self._cutoff()}},
+                                      {"product_id": 1, "_id": 0})
+        fresh = {doc["product_id"] for doc in cursor}
+        return [product_id for product_id in product_ids if product_id not in fresh]
+
+    def iter_stale_ids(self, limit: int = 0, batch_size: int = 1000) -> Iterator[str]:
+        """
+        遍历从未补全或补全已过期的商品ID
+
+        Args:
+            limit: 最多返回数量，0为不限
+            batch_size: 游标每批读取的文档数
+        """
+        count = 0
+        for query in ({"enriched_at": None}, {"enriched_at": {"$lt": self._cutoff()}}):
+            for doc in self.collection.find(query, {"product_id": 1, "_id": 0}).batch_size(batch_size):
+                if limit and count >= limit:
+                    return
+                if doc.get("product_id"):
+                    count += 1
+                    yield str(doc["product_id"])
+
+    @staticmethod
+    def enriched_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+        """要写入商品文档的字段（附带补全时间）"""
+        return dict(fields, enriched_at=datetime.now().isoformat())
+
+
+def open_enrichment_queue(db=None) -> Optional[WorkQueue]:
+    """
+    详情补全任务队列，后端为 ENRICH_QUEUE_BACKEND / WORK_QUEUE_BACKEND，都未配置时为进程内队列
+
+    Args:
+        db: Mongo数据库对象，mongo后端需要
+
+    Returns:
+        Optional[WorkQueue]: 创建失败时返回None
+    """
+    backend = Config.ENRICH_QUEUE_BACKEND or Config.WORK_QUEUE_BACKEND or "memory"
+    return get_work_queue(backend, Config.ENRICH_QUEUE_NAME, db=db)
+
+
+def seed_enrichment_queue(queue: WorkQueue, index: EnrichmentIndex, limit: int = 0) -> int:
+    """
+    把需要补全的商品ID加入队列（已在队列中的不重复加入）
+
+    Returns:
+        int: 新加入的数量
+    """
+    added = queue.put_many(index.iter_stale_ids(limit))
+    logger.info(f"详情补全队列加入 {added} 个商品")
+    return added
@@ -0,0 +1,386 @@
+"""
+商品数据流式导出
+商品边采集边写入文件（或从数据库游标逐批读出），内存占用与导出总量无关:
+    jsonl    每行一个商品（OUTPUT_FORMATS 中的 json 按 JSON Lines 写出）
+    csv      表头为商品字段
+    parquet  列式存储，每 EXPORT_PARQUET_ROW_GROUP 个商品写一个行组（需要 pyarrow）
+写入中的文件带 .part 后缀，写满 EXPORT_ROTATE_RECORDS 条或 EXPORT_ROTATE_MB 后落盘并重命名为正式文件，
+读取方只会看到完整的文件。EXPORT_COMPRESSION=gzip 时 jsonl/csv 写为 .gz，parquet 使用gzip编码。
+"""
+import io
+import os
+import csv
+import gzip
+import json
+from dataclasses import fields
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from models.product import ProductData
+from utils.logger import get_logger
+from utils.lazy_import import lazy_import, module_available
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+logger = get_logger(__name__)
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ALIASES = {"json": FORMAT_JSONL, "jsonl": FORMAT_JSONL, "csv": FORMAT_CSV, "parquet": FORMAT_PARQUET}
+COMPRESSION_GZIP = "gzip"
+
+# 导出字段与 ProductData 一致
+EXPORT_FIELDS = [f.name for f in fields(ProductData)]
+_PARQUET_TYPES = {float: "float64", int: "int64", bool: "bool_"}
+
+
+def product_record(product, field_names: List[str] = EXPORT_FIELDS) -> dict:
+    """
+    把商品转换为导出记录
+
+    Args:
+        product: ProductData 或数据库文档/字典
+        field_names: 导出的字段
+
+    Returns:
+        dict: 只包含导出字段，时间转为ISO格式字符串
+    """
+    data = product.to_dict() if isinstance(product, ProductData) else product
+    record = {}
+    for name in field_names:
+        value = data.get(name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        record[name] = value
+    return record
+
+
+def parse_output_path(path: str) -> Tuple[str, List[str], str]:
+    """
+    按输出路径的扩展名确定格式
+
+    Args:
+        path: 如 output/products.jsonl.gz、output/products.parquet，没有可识别扩展名时按 OUTPUT_FORMATS 输出
+
+    Returns:
+        Tuple[str, List[str], str]: (不带扩展名的路径, 格式列表, 压缩方式)
+    """
+    base, compression = path, ""
+    if base.endswith(".gz"):
+        base, compression = base[:-3], COMPRESSION_GZIP
+    stem, ext = os.path.splitext(base)
+    fmt = FORMAT_ALIASES.get(ext.lstrip(".").lower())
+    if fmt:
+        return stem, [fmt], compression
+    return base, [], compression
+
+
+class _FormatWriter:
+    """单个格式的导出文件，写入 .part 临时文件，finalize() 时落盘并重命名"""
+
+    extension = ""
+
+    def __init__(self, path: str, field_names: List[str], compression: str = ""):
+        self.path = path
+        self.part_path = path + ".part"
+        self.field_names = field_names
+        self.compression = compression
+        self.records = 0
+        self._raw = None
+
+    @property
+    def size(self) -> int:
+        """已写入磁盘的字节数（压缩后）"""
+        return self._raw.tell() if self._raw else 0
+
+    def _open_text(self):
+        self._raw = open(self.part_path, 'wb')
+        stream = gzip.GzipFile(fileobj=self._raw, mode='wb') if self.compression == COMPRESSION_GZIP else self._raw
+        return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    def write(self, record: dict):
+        raise NotImplementedError
+
+    def _close_stream(self):
+        raise NotImplementedError
+
+    def finalize(self) -> str:
+        """关闭文件，fsync后原子重命名为正式文件"""
+        self._close_stream()
+        if self._raw and not self._raw.closed:
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self):
+        """放弃文件，删除临时文件"""
+        try:
+            self._close_stream()
+        except Exception:
+            pass
+        if self._raw and not self._raw.closed:
+            self._raw.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+class JsonlWriter(_FormatWriter):
+    extension = ".jsonl"
+
+    def __init__(self, path: str, field_names: List[str], compression: str = ""):
+        super().__init__(path, field_names, compression)
+        self._text = self._open_text()
+
+    def write(self, record: dict):
+        self._text.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.records += 1
+
+    def _close_stream(self):
+        if self._text is not None:
+            # TextIOWrapper.close() 会连带关闭原始文件，分离后再关闭gzip流，原始文件留给 finalize() fsync
+            self._text.flush()
+            stream = self._text.detach()
+            self._text = None
+            if stream is not self._raw:
+                stream.close()
+
+
+class CsvWriter(JsonlWriter):
+    extension = ".csv"
+
+    def __init__(self, path: str, field_names: List[str], compression: str = ""):
+        super().__init__(path, field_names, compression)
+        self._csv = csv.DictWriter(self._text, fieldnames=field_names, extrasaction='ignore')
+        self._csv.writeheader()
+
+    def write(self, record: dict):
+        self._csv.writerow(record)
+        self.records += 1
+
+
+class ParquetWriter(_FormatWriter):
+    extension = ".parquet"
+
+    def __init__(self, path: str, field_names: List[str], compression: str = "", row_group_size: int = None):
+        super().__init__(path, field_names, compression)
+        self.row_group_size = max(1, row_group_size or Config.EXPORT_PARQUET_ROW_GROUP)
+        types = {f.name: f.type for f in fields(ProductData)}
+        self.schema = pa.schema([
+            (name, getattr(pa, _PARQUET_TYPES.get(types.get(name), "string"))()) for name in field_names])
+        self._writer = pq.ParquetWriter(self.part_path, self.schema,
+                                        compression="gzip" if compression == COMPRESSION_GZIP else "snappy")
+        self._rows: List[dict] = []
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    def _flush_rows(self):
+        if self._rows:
+            columns = {name: [row.get(name) for row in self._rows] for name in self.field_names}
+            self._writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+            self._rows = []
+
+    def write(self, record: dict):
+        self._rows.append({k: (str(v) if v is not None and self.schema.field(k).type == pa.string() else v)
+                           for k, v in record.items()})
+        self.records += 1
+        if len(self._rows) >= self.row_group_size:
+            self._flush_rows()
+
+    def _close_stream(self):
+        if self._writer is not None:
+            self._flush_rows()
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {FORMAT_JSONL: JsonlWriter, FORMAT_CSV: CsvWriter, FORMAT_PARQUET: ParquetWriter}
+
+
+class ProductExporter:
+    """商品流式导出，同时写多个格式，按条数/大小轮转文件"""
+
+    def __init__(self, base_path: str, formats: List[str] = None, rotate_records: int = None,
+                 rotate_mb: float = None, compression: str = None, field_names: List[str] = None):
+        """
+        初始化导出器，未传入的参数从配置读取
+
+        Args:
+            base_path: 不带扩展名的输出路径，如 output/exports/products
+            formats: 格式列表（json/jsonl/csv/parquet）
+            rotate_records: 每个文件最多条数，0表示不按条数轮转
+            rotate_mb: 每个文件最大MB（压缩后），0表示不按大小轮转
+            compression: gzip 或空
+            field_names: 导出字段，默认 ProductData 全部字段
+
+        Raises:
+            ValueError: 没有可用的格式
+        """
+        self.base_path = base_path
+        self.compression = Config.EXPORT_COMPRESSION if compression is None else compression
+        self.rotate_records = Config.EXPORT_ROTATE_RECORDS if rotate_records is None else rotate_records
+        self.rotate_bytes = int((Config.EXPORT_ROTATE_MB if rotate_mb is None else rotate_mb) * 1024 * 1024)
+        self.field_names = field_names or EXPORT_FIELDS
+        self.formats = []
+        for name in formats or Config.OUTPUT_FORMATS:
+            fmt = FORMAT_ALIASES.get(name.strip().lower())
+            if fmt is None:
+                logger.warning(f"不支持的导出格式: {name}")
+            elif fmt == FORMAT_PARQUET and not module_available("pyarrow"):
+                logger.error("导出Parquet需要安装 pyarrow，跳过该格式")
+            elif fmt not in self.formats:
+                self.formats.append(fmt)
+        if not self.formats:
+            raise ValueError("没有可用的导出格式")
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.rotating = self.rotate_records > 0 or self.rotate_bytes > 0
+        self._writers: Dict[str, _FormatWriter] = {}
+        self._parts: Dict[str, int] = {fmt: 0 for fmt in self.formats}
+        self.files: List[str] = []
+        self.records = 0
+
+    def _file_path(self, fmt: str) -> str:
+        suffix = f"-{self._parts[fmt]:05d}" if self.rotating else ""
+        extension = WRITERS[fmt].extension
+        if self.compression == COMPRESSION_GZIP and fmt != FORMAT_PARQUET:
+            extension += ".gz"
+        return f"{self.base_path}{suffix}{extension}"
+
+    def _writer(self, fmt: str) -> _FormatWriter:
+        writer = self._writers.get(fmt)
+        if writer is None:
+            self._parts[fmt] += 1
+            writer = WRITERS[fmt](self._file_path(fmt), self.field_names, self.compression)
+            self._writers[fmt] = writer
+        return writer
+
+    def _finalize(self, fmt: str):
+        writer = self._writers.pop(fmt)
+        self.files.append(writer.finalize())
+        logger.info(f"导出文件完成: {writer.path} ({writer.records} 条)")
+
+    def write(self, product):
+        """
+        写入一个商品
+
+        Args:
+            product: ProductData 或数据库文档/字典
+        """
+        record = product_record(product, self.field_names)
+        for fmt in self.formats:
+            writer = self._writer(fmt)
+            writer.write(record)
+            if ((self.rotate_records and writer.records >= self.rotate_records)
+                    or (self.rotate_bytes and writer.size >= self.rotate_bytes)):
+                self._finalize(fmt)
+        self.records += 1
+
+    def write_many(self, products: Iterable) -> int:
+        """
+        写入多个商品
+
+        Returns:
+            int: 写入的商品数
+        """
+        count = 0
+        for product in products:
+            self.write(product)
+            count += 1
+        return count
+
+    def close(self) -> List[str]:
+        """
+        完成所有写入中的文件
+
+        Returns:
+            List[str]: 本次导出的全部文件
+        """
+        for fmt in list(self._writers):
+            self._finalize(fmt)
+        return list(self.files)
+
+    def abort(self):
+        """放弃写入中的文件（已完成轮转的文件保留）"""
+        for writer in self._writers.values():
+            writer.abort()
+        self._writers.clear()
+
+    def stats(self) -> Dict:
+        """获取统计信息"""
+        return {"records": self.records, "formats": list(self.formats), "files": len(self.files)}
+
+    def __enter__(self) -> 'ProductExporter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def open_product_exporter(output_path: Optional[str], formats: List[str] = None) -> Optional[ProductExporter]:
+    """
+    按输出路径创建导出器
+
+    Args:
+        output_path: 输出路径，扩展名为 .jsonl/.json/.csv/.parquet（可加 .gz）时只输出该格式，
+                     否则作为文件名前缀按 OUTPUT_FORMATS 输出
+        formats: 指定格式，优先于扩展名
+
+    Returns:
+        Optional[ProductExporter]: 未指定输出路径或创建失败时返回None
+    """
+    if not output_path:
+        return None
+    base, path_formats, compression = parse_output_path(output_path)
+    try:
+        return ProductExporter(base, formats or path_formats or None, compression=compression or None)
+    except Exception as e:
+        logger.error(f"创建导出器失败: {e}")
+        return None
+
+
+def export_products(products: Iterable, output_path: str, formats: List[str] = None) -> List[str]:
+    """
+    导出商品（可迭代对象逐个读取）
+
+    Returns:
+        List[str]: 导出的文件，失败时为空列表
+    """
+    exporter = open_product_exporter(output_path, formats)
+    if exporter is None:
+        return []
+    try:
+        exporter.write_many(products)
+    except Exception as e:
+        logger.error(f"导出商品失败: {e}")
+        exporter.abort()
+        return []
+    return exporter.close()
+
+
+def export_from_database(db_manager, output_path: str, query: Dict = None, formats: List[str] = None,
+                         batch_size: int = 1000) -> List[str]:
+    """
+    把数据库中的商品流式导出到文件（游标逐批读取，不一次性加载）
+
+    Args:
+        db_manager: 已连接的 DatabaseManager
+        output_path: 输出路径
+        query: 查询条件
+        formats: 导出格式
+        batch_size: 游标每批读取的文档数
+
+    Returns:
+        List[str]: 导出的文件
+    """
+    return export_products(db_manager.iter_products(query, batch_size=batch_size), output_path, formats)
@@ -0,0 +1,302 @@
+"""
+代理池
+管理多个出口代理，按延迟和失败率打分:
+    每个代理同时最多被 PROXY_MAX_CONCURRENCY 个请求/浏览器使用，超出时等待其他代理空闲
+    同一个worker优先继续使用上次分配的代理（粘性分配），浏览器会话和出口IP保持一致
+    连续失败 PROXY_FAILURE_THRESHOLD 次的代理进入冷却，冷却时间随连续失败次数翻倍
+    check_all() 通过代理请求 PROXY_CHECK_URL 探测可用性和延迟
+代理地址格式为 host:port 或 http://host:port。
+"""
+import time
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.metrics import PROXY_REQUESTS, PROXY_IN_FLIGHT
+
+logger = get_logger(__name__)
+
+# 延迟指数移动平均的权重
+LATENCY_EMA_ALPHA = 0.3
+# 打分时的参考延迟（毫秒），延迟等于该值时分数减半
+LATENCY_REFERENCE_MS = 1000.0
+# 冷却时间最多翻倍的次数
+MAX_COOLDOWN_DOUBLINGS = 5
+
+
+def normalize_proxy_url(address: str) -> str:
+    """host:port 补全为 http://host:port"""
+    return address if "://" in address else f"http://{address}"
+
+
+@dataclass
+class ProxyState:
+    """单个代理的健康统计"""
+    address: str
+    latency_ms: Optional[float] = None   # 延迟指数移动平均
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    in_flight: int = 0
+    cooldown_until: float = 0.0
+    last_error: str = ""
+
+    def score(self) -> float:
+        """健康分: 平滑后的成功率，按延迟打折"""
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        latency = self.latency_ms if self.latency_ms is not None else LATENCY_REFERENCE_MS / 2
+        return success_rate / (1 + latency / LATENCY_REFERENCE_MS)
+
+    def to_dict(self) -> dict:
+        return {
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "score": round(self.score(), 3),
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class ProxyLease:
+    """一次代理分配"""
+    address: str
+    worker_id: Optional[str]
+    acquired_at: float
+
+    @property
+    def url(self) -> str:
+        return normalize_proxy_url(self.address)
+
+
+class ProxyPool:
+    """按健康分分配代理，限制每个代理的并发数"""
+
+    def __init__(self, proxies: List[str], max_concurrency: int = None, failure_threshold: int = None,
+                 cooldown_seconds: float = None, clock=time.monotonic):
+        """
+        初始化代理池，未传入的参数从配置读取
+
+        Args:
+            proxies: 代理地址列表
+            max_concurrency: 每个代理的最大并发数
+            failure_threshold: 连续失败多少次后进入冷却
+            cooldown_seconds: 第一次冷却的时间
+            clock: 时间函数（测试时替换）
+        """
+        if not proxies:
+            raise ValueError("代理池至少需要一个代理")
+        self.max_concurrency = max(1, max_concurrency or Config.PROXY_MAX_CONCURRENCY)
+        self.failure_threshold = max(1, failure_threshold or Config.PROXY_FAILURE_THRESHOLD)
+        self.cooldown_seconds = Config.PROXY_COOLDOWN_SECONDS if cooldown_seconds is None else cooldown_seconds
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.proxies: Dict[str, ProxyState] = {address: ProxyState(address) for address in dict.fromkeys(proxies)}
+        self.sticky: Dict[str, str] = {}  # worker_id -> 代理地址
+
+    def _available(self, state: ProxyState, now: float) -> bool:
+        return now >= state.cooldown_until and state.in_flight < self.max_concurrency
+
+    def _choose(self, worker_id: Optional[str], now: float) -> Optional[ProxyState]:
+        """优先沿用worker上次的代理，否则取可用代理中分数最高、并发最少的"""
+        if worker_id in self.sticky:
+            state = self.proxies.get(self.sticky[worker_id])
+            if state and self._available(state, now):
+                return state
+        candidates = [s for s in self.proxies.values() if self._available(s, now)]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda s: (s.score(), -s.in_flight))
+
+    def acquire(self, worker_id: Optional[str] = None, timeout: Optional[float] = None) -> Optional[ProxyLease]:
+        """
+        分配一个代理，所有代理都满载或在冷却时等待
+
+        Args:
+            worker_id: worker标识，同一worker优先分配同一个代理
+            timeout: 最多等待的秒数，None表示一直等待
+
+        Returns:
+            Optional[ProxyLease]: 分配结果，超时返回None
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            while True:
+                now = self._clock()
+                state = self._choose(worker_id, now)
+                if state is not None:
+                    state.in_flight += 1
+                    PROXY_IN_FLIGHT.labels(proxy=state.address).set(state.in_flight)
+                    if worker_id is not None:
+                        previous = self.sticky.get(worker_id)
+                        if previous and previous != state.address:
+                            logger.info(f"{worker_id} 的代理从 {previous} 切换到 {state.address}")
+                        self.sticky[worker_id] = state.address
+                    return ProxyLease(state.address, worker_id, now)
+                if deadline is not None and now >= deadline:
+                    logger.warning("没有可用代理（全部满载或冷却中）")
+                    return None
+                # 冷却结束不会有通知，最多等1秒后重新检查
+                wait = 1.0 if deadline is None else min(1.0, deadline - now)
+                self._cond.wait(wait)
+
+    def release(self, lease: ProxyLease, ok: Optional[bool] = None, latency: Optional[float] = None,
+                error: str = ""):
+        """
+        归还代理
+
+        Args:
+            lease: acquire 的返回值
+            ok: 本次使用是否成功，None表示不计入统计（如浏览器关闭时归还）
+            latency: 请求耗时（秒）
+            error: 失败原因
+        """
+        with self._cond:
+            state = self.proxies.get(lease.address)
+            if state is not None:
+                state.in_flight = max(0, state.in_flight - 1)
+                PROXY_IN_FLIGHT.labels(proxy=state.address).set(state.in_flight)
+            self._cond.notify_all()
+        if ok is not None:
+            self.report(lease.address, ok, latency, error)
+
+    def report(self, address: str, ok: bool, latency: Optional[float] = None, error: str = ""):
+        """
+        记录一次经过该代理的请求结果（浏览器长期持有代理时逐页调用）
+
+        Args:
+            address: 代理地址
+            ok: 是否成功
+            latency: 耗时（秒）
+            error: 失败原因
+        """
+        with self._cond:
+            state = self.proxies.get(address)
+            if state is None:
+                return
+            PROXY_REQUESTS.labels(proxy=address, result="ok" if ok else "error").inc()
+            if ok:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.cooldown_until = 0.0
+                if latency is not None:
+                    latency_ms = latency * 1000
+                    state.latency_ms = latency_ms if state.latency_ms is None else \
+                        state.latency_ms + LATENCY_EMA_ALPHA * (latency_ms - state.latency_ms)
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            state.last_error = error
+            extra = state.consecutive_failures - self.failure_threshold
+            if extra >= 0:
+                cooldown = self.cooldown_seconds * 2 ** min(extra, MAX_COOLDOWN_DOUBLINGS)
+                state.cooldown_until = self._clock() + cooldown
+                logger.warning(f"代理 {address} 连续失败 {state.consecutive_failures} 次，冷却 {cooldown:.0f} 秒: {error}")
+
+    def healthy(self, address: str) -> bool:
+        """代理是否不在冷却中"""
+        with self._cond:
+            state = self.proxies.get(address)
+            return state is not None and self._clock() >= state.cooldown_until
+
+    @contextmanager
+    def lease(self, worker_id: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Optional[ProxyLease]]:
+        """
+        单个请求使用代理: 按耗时和是否抛出异常记录结果
+
+        Yields:
+            Optional[ProxyLease]: 分配结果，超时为None
+        """
+        lease = self.acquire(worker_id, timeout)
+        if lease is None:
+            yield None
+            return
+        start = time.perf_counter()
+        try:
+            yield lease
+        except Exception as e:
+            self.release(lease, ok=False, error=str(e))
+            raise
+        self.release(lease, ok=True, latency=time.perf_counter() - start)
+
+    def check(self, address: str, url: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        通过代理请求检测地址，结果计入代理统计
+
+        Args:
+            address: 代理地址
+            url: 检测地址，默认 PROXY_CHECK_URL
+            timeout: 超时秒数，默认 PROXY_CHECK_TIMEOUT
+
+        Returns:
+            bool: 是否可用
+        """
+        proxy_url = normalize_proxy_url(address)
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({"http": proxy_url, "https": proxy_url}))
+        start = time.perf_counter()
+        try:
+            with opener.open(url or Config.PROXY_CHECK_URL, timeout=timeout or Config.PROXY_CHECK_TIMEOUT) as response:
+                response.read()
+        except Exception as e:
+            self.report(address, False, error=str(e))
+            return False
+        self.report(address, True, time.perf_counter() - start)
+        return True
+
+    def check_all(self, url: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """并发检测所有代理"""
+        addresses = list(self.proxies)
+        with ThreadPoolExecutor(max_workers=min(8, len(addresses))) as executor:
+            results = executor.map(lambda address: self.check(address, url, timeout), addresses)
+            return dict(zip(addresses, results))
+
+    def stats(self) -> Dict[str, dict]:
+        """各代理的健康统计"""
+        with self._cond:
+            now = self._clock()
+            result = {}
+            for address, state in self.proxies.items():
+                result[address] = state.to_dict()
+                result[address]["cooling"] = now < state.cooldown_until
+            return result
+
+
+# 全局实例（按配置创建，同一进程的worker共享并发限制）
+_proxy_pool: Optional[ProxyPool] = None
+_proxy_pool_lock = threading.Lock()
+
+
+def open_proxy_pool(proxies: Optional[List[str]] = None) -> Optional[ProxyPool]:
+    """
+    按配置创建代理池
+
+    Args:
+        proxies: 代理地址列表，默认 PROXY_POOL
+
+    Returns:
+        Optional[ProxyPool]: 没有配置代理或创建失败时返回None
+    """
+    proxies = proxies if proxies is not None else Config.PROXY_POOL
+    if not proxies:
+        return None
+    try:
+        return ProxyPool(proxies)
+    except Exception as e:
+        logger.error(f"创建代理池失败: {e}")
+        return None
+
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+    """获取进程内共享的代理池，没有配置代理时返回None"""
+    global _proxy_pool
+    if _proxy_pool is None:
+        with _proxy_pool_lock:
+            if _proxy_pool is None:
+                _proxy_pool = open_proxy_pool()
+    return _proxy_pool
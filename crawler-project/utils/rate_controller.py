@@ -0,0 +1,229 @@
+"""
+自适应请求速率控制
+每个目标域名一个令牌桶，按页面请求的结果调整速率（AIMD）:
+    正常页面   - 速率加 RATE_INCREASE_STEP（最近验证码比例超过目标值或处于冷却期时不提速）
+    遇到验证码 - 速率乘以 RATE_CAPTCHA_BACKOFF，并在 RATE_COOLDOWN_SECONDS 内不再提速
+    请求出错   - 速率乘以 RATE_ERROR_BACKOFF
+页面加载正常时逐步缩短等待，验证码变多时迅速放慢，取代固定的 random_delay 区间。
+"""
+import time
+import random
+import asyncio
+import threading
+import urllib.parse
+from typing import Callable, Dict, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.metrics import RATE_LIMIT_RPS, RATE_LIMIT_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+OUTCOME_OK = "ok"
+OUTCOME_CAPTCHA = "captcha"
+OUTCOME_ERROR = "error"
+
+# 验证码比例指数移动平均的权重（约等于最近10次请求）
+CAPTCHA_EMA_ALPHA = 0.1
+
+
+class HostRateController:
+    """单个域名的令牌桶 + AIMD速率调整"""
+
+    def __init__(self, host: str, initial_rps: float = None, min_rps: float = None, max_rps: float = None,
+                 increase_step: float = None, captcha_backoff: float = None, error_backoff: float = None,
+                 burst: float = None, target_captcha_rate: float = None, cooldown_seconds: float = None,
+                 jitter: float = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化速率控制，未传入的参数从配置读取
+
+        Args:
+            host: 域名
+            initial_rps: 初始每秒请求数
+            min_rps / max_rps: 速率上下限
+            increase_step: 每个正常请求增加的每秒请求数
+            captcha_backoff: 遇到验证码时的降速系数
+            error_backoff: 请求出错时的降速系数
+            burst: 令牌桶容量（允许连续发出的请求数）
+            target_captcha_rate: 最近验证码比例高于该值时不提速
+            cooldown_seconds: 降速后暂停提速的时间
+            jitter: 等待时间随机抖动比例
+            clock / sleep: 时间函数（测试时替换）
+        """
+        def pick(value, default):
+            return default if value is None else value
+
+        self.host = host
+        self.rate = pick(initial_rps, Config.RATE_INITIAL_RPS)
+        self.min_rps = pick(min_rps, Config.RATE_MIN_RPS)
+        self.max_rps = pick(max_rps, Config.RATE_MAX_RPS)
+        self.increase_step = pick(increase_step, Config.RATE_INCREASE_STEP)
+        self.captcha_backoff = pick(captcha_backoff, Config.RATE_CAPTCHA_BACKOFF)
+        self.error_backoff = pick(error_backoff, Config.RATE_ERROR_BACKOFF)
+        self.burst = max(1.0, pick(burst, Config.RATE_BURST))
+        self.target_captcha_rate = pick(target_captcha_rate, Config.RATE_TARGET_CAPTCHA_RATE)
+        self.cooldown_seconds = pick(cooldown_seconds, Config.RATE_COOLDOWN_SECONDS)
+        self.jitter = pick(jitter, Config.RATE_JITTER)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self.tokens = 1.0              # 第一个请求不等待
+        self.captcha_ratio = 0.0       # 最近验证码比例（指数移动平均）
+        self.cooldown_until = 0.0
+        self.counts = {OUTCOME_OK: 0, OUTCOME_CAPTCHA: 0, OUTCOME_ERROR: 0}
+        self.waited_seconds = 0.0
+        self._updated_at = clock()
+        RATE_LIMIT_RPS.labels(host=host).set(self.rate)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌（不等待）
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> float:
+        """
+        等待直到允许发出下一个请求
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve()
+        if wait <= 0:
+            return 0.0
+        if self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._sleep(wait)
+        with self._lock:
+            self.waited_seconds += wait
+        RATE_LIMIT_WAIT_SECONDS.labels(host=self.host).inc(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """acquire 的 asyncio 版本，等待时不阻塞事件循环"""
+        wait = self.reserve()
+        if wait <= 0:
+            return 0.0
+        if self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(wait)
+        with self._lock:
+            self.waited_seconds += wait
+        RATE_LIMIT_WAIT_SECONDS.labels(host=self.host).inc(wait)
+        return wait
+
+    def record(self, outcome: str):
+        """
+        记录一次请求的结果并调整速率
+
+        Args:
+            outcome: OUTCOME_OK / OUTCOME_CAPTCHA / OUTCOME_ERROR
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            hit = 1.0 if outcome == OUTCOME_CAPTCHA else 0.0
+            self.captcha_ratio += CAPTCHA_EMA_ALPHA * (hit - self.captcha_ratio)
+            previous = self.rate
+
+            if outcome == OUTCOME_CAPTCHA:
+                self.rate = max(self.min_rps, self.rate * self.captcha_backoff)
+                self.cooldown_until = now + self.cooldown_seconds
+            elif outcome == OUTCOME_ERROR:
+                self.rate = max(self.min_rps, self.rate * self.error_backoff)
+                self.cooldown_until = now + self.cooldown_seconds
+            elif now >= self.cooldown_until and self.captcha_ratio <= self.target_captcha_rate:
+                self.rate = min(self.max_rps, self.rate + self.increase_step)
+
+        if self.rate != previous:
+            RATE_LIMIT_RPS.labels(host=self.host).set(self.rate)
+            if outcome != OUTCOME_OK:
+                logger.info(f"{self.host} 遇到{outcome}，降速 {previous:.2f} -> {self.rate:.2f} 请求/秒")
+
+    def snapshot(self) -> dict:
+        """当前状态"""
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "captcha_ratio": round(self.captcha_ratio, 3),
+                "waited_seconds": round(self.waited_seconds, 2),
+                **self.counts,
+            }
+
+
+class RateController:
+    """按域名管理速率控制"""
+
+    def __init__(self, enabled: Optional[bool] = None, **params):
+        """
+        Args:
+            enabled: 是否启用，默认从配置读取；关闭时 acquire 不等待
+            **params: 传给 HostRateController 的参数
+        """
+        self.enabled = Config.RATE_CONTROL_ENABLED if enabled is None else enabled
+        self.params = params
+        self.hosts: Dict[str, HostRateController] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """URL的域名，传入的已经是域名时原样返回"""
+        return urllib.parse.urlsplit(url).netloc or url
+
+    def get(self, url: str) -> HostRateController:
+        host = self.host_of(url)
+        controller = self.hosts.get(host)
+        if controller is None:
+            with self._lock:
+                controller = self.hosts.get(host)
+                if controller is None:
+                    controller = self.hosts[host] = HostRateController(host, **self.params)
+        return controller
+
+    def acquire(self, url: str) -> float:
+        """
+        请求 url 之前调用，按该域名当前速率等待
+
+        Returns:
+            float: 等待的秒数
+        """
+        if not self.enabled:
+            return 0.0
+        return self.get(url).acquire()
+
+    async def acquire_async(self, url: str) -> float:
+        """acquire 的 asyncio 版本"""
+        if not self.enabled:
+            return 0.0
+        return await self.get(url).acquire_async()
+
+    def record(self, url: str, outcome: str):
+        """记录请求结果"""
+        if self.enabled:
+            self.get(url).record(outcome)
+
+    def stats(self) -> Dict[str, dict]:
+        """各域名的速率和结果统计"""
+        return {host: controller.snapshot() for host, controller in self.hosts.items()}
+
+
+# 全局实例
+rate_controller = RateController()
+
+
+def get_rate_controller() -> RateController:
+    """获取速率控制器实例"""
+    return rate_controller
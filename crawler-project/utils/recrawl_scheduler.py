@@ -0,0 +1,407 @@
+"""
+增量重爬调度
+记录每个关键词每次采集到的商品及其价格、销量、评论数，比较相邻两次采集的变化
+（价格变动、销量/评论增长、新出现的商品），估计每小时的变化率，据此计算自适应的重爬间隔：
+    间隔 = RECRAWL_TARGET_CHANGE / 每小时变化率，限制在 [最小间隔, 最大间隔] 之间
+生成的采集计划按到期程度排序，变化快的关键词优先，变化慢的关键词很少重爬。
+后端:
+    file  - RECRAWL_STATE_FILE，全部状态的JSON快照（先写临时文件再替换）加上追加写的变更日志
+            （<文件>.log，每次采集只追加该关键词一行），日志行数超过关键词数时合并进快照
+    mongo - RECRAWL_COLLECTION 集合，每个关键词一个文档
+"""
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 参与变化检测的字段
+TRACKED_FIELDS = ("current_price", "sold_count", "review_count")
+
+REASON_NEW = "new"            # 从未采集过
+REASON_DUE = "due"            # 已到重爬时间
+REASON_NOT_DUE = "not_due"    # 未到重爬时间
+
+
+@dataclass
+class KeywordChange:
+    """一次采集与上一次采集相比的变化"""
+    keyword: str
+    products: int = 0
+    new_products: int = 0
+    changed_products: int = 0
+    price_changes: int = 0
+    sold_delta: int = 0
+    review_delta: int = 0
+    change_ratio: float = 0.0      # (新商品 + 有变化的商品) / 本次商品数
+    elapsed_hours: float = 0.0     # 距上次采集的小时数，首次采集为0
+
+
+@dataclass
+class KeywordState:
+    """单个关键词的变化历史"""
+    keyword: str
+    last_crawled_at: float = 0.0
+    interval_hours: float = 0.0
+    change_rate: float = 0.0       # 每小时变化比例（指数移动平均）
+    new_rate: float = 0.0          # 每次采集新商品比例（指数移动平均）
+    crawls: int = 0
+    products: Dict[str, List[float]] = field(default_factory=dict)  # product_id -> [价格, 销量, 评论数]
+
+    @property
+    def due_at(self) -> float:
+        return self.last_crawled_at + self.interval_hours * 3600
+
+    def to_dict(self) -> dict:
+        data = {key: value for key, value in self.__dict__.items() if key != "products"}
+        # 商品ID可能包含 "." 等Mongo不允许做字段名的字符，保存为列表
+        data["products"] = [[product_id] + values for product_id, values in self.products.items()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'KeywordState':
+        return cls(
+            keyword=data["keyword"],
+            last_crawled_at=float(data.get("last_crawled_at", 0)),
+            interval_hours=float(data.get("interval_hours", 0)),
+            change_rate=float(data.get("change_rate", 0)),
+            new_rate=float(data.get("new_rate", 0)),
+            crawls=int(data.get("crawls", 0)),
+            products={row[0]: list(row[1:]) for row in data.get("products", [])},
+        )
+
+
+@dataclass
+class RecrawlPlanItem:
+    """采集计划中的一个关键词"""
+    keyword: str
+    reason: str
+    priority: float                # 越大越优先
+    overdue: float = 0.0           # 距上次采集的时间 / 重爬间隔，>=1 表示到期
+    interval_hours: float = 0.0
+    change_rate: float = 0.0
+    due_at: float = 0.0
+
+    @property
+    def due(self) -> bool:
+        return self.reason != REASON_NOT_DUE
+
+
+class FileStateStore:
+    """JSON文件后端: 快照 + 追加写的变更日志"""
+
+    def __init__(self, path: str, compact_min_entries: int = 100):
+        """
+        Args:
+            path: 快照文件路径，变更日志为 <path>.log
+            compact_min_entries: 日志至少积累这么多行才合并（同时要求超过关键词数，合并的开销按采集次数均摊）
+        """
+        self.path = path
+        self.log_path = path + ".log"
+        self.compact_min_entries = compact_min_entries
+        self._log_entries = 0
+        self._partial_line = False
+
+    def load(self) -> List[dict]:
+        keywords: Dict[str, dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    keywords = {data["keyword"]: data for data in json.load(f).get("keywords", [])}
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"读取重爬状态失败，重新开始记录: {e}")
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._partial_line = not line.endswith("\n")
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        # 进程在写最后一行时退出
+                        continue
+                    keywords[data["keyword"]] = data
+                    self._log_entries += 1
+        return list(keywords.values())
+
+    def save(self, states: Dict[str, KeywordState], changed: KeywordState):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            # 写了一半的行单独成行，不影响本次记录
+            f.write(("\n" if self._partial_line else "") + json.dumps(changed.to_dict(), ensure_ascii=False) + "\n")
+        self._partial_line = False
+        self._log_entries += 1
+        if self._log_entries > max(self.compact_min_entries, len(states)):
+            self.compact(states)
+
+    def compact(self, states: Dict[str, KeywordState]):
+        """把全部状态写入快照并清空变更日志"""
+        if not states and not self._log_entries:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"keywords": [state.to_dict() for state in states.values()]}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        # 快照已包含日志中的全部变更，此时退出最多重放一遍日志
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_entries = 0
+
+    def close(self, states: Dict[str, KeywordState]):
+        self.compact(states)
+
+
+class MongoStateStore:
+    """Mongo集合后端"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index("keyword", unique=True)
+        except Exception as e:
+            logger.warning(f"创建重爬状态索引失败: {e}")
+
+    def load(self) -> List[dict]:
+        return list(self.collection.find({}))
+
+    def save(self, states: Dict[str, KeywordState], changed: KeywordState):
+        # 只写本次更新的关键词
+        self.collection.update_one({"keyword": changed.keyword}, {"$set": changed.to_dict()}, upsert=True)
+
+    def close(self, states: Dict[str, KeywordState]):
+        pass
+
+
+def _tracked_values(product: Any) -> Optional[tuple]:
+    """取出商品ID和参与变化检测的字段，支持 ProductData 和字典"""
+    if isinstance(product, dict):
+        get = product.get
+    else:
+        get = lambda name: getattr(product, name, None)
+    product_id = get("product_id")
+    if not product_id:
+        return None
+    try:
+        return str(product_id), [float(get(name) or 0) for name in TRACKED_FIELDS]
+    except (TypeError, ValueError):
+        return None
+
+
+class RecrawlScheduler:
+    """按变化率安排关键词重爬"""
+
+    def __init__(self, store, min_interval_hours: float = None, max_interval_hours: float = None,
+                 default_interval_hours: float = None, target_change: float = None, alpha: float = 0.5):
+        """
+        初始化调度器，并从存储加载历史状态
+
+        Args:
+            store: FileStateStore 或 MongoStateStore
+            min_interval_hours: 最小重爬间隔（小时）
+            max_interval_hours: 最大重爬间隔（小时）
+            default_interval_hours: 首次采集后的重爬间隔（小时）
+            target_change: 重爬时期望发生变化的商品比例
+            alpha: 变化率指数移动平均的权重，越大越看重最近一次
+        """
+        self.store = store
+        self.min_interval = Config.RECRAWL_MIN_INTERVAL_HOURS if min_interval_hours is None else min_interval_hours
+        self.max_interval = Config.RECRAWL_MAX_INTERVAL_HOURS if max_interval_hours is None else max_interval_hours
+        self.default_interval = (Config.RECRAWL_DEFAULT_INTERVAL_HOURS
+                                 if default_interval_hours is None else default_interval_hours)
+        self.target_change = Config.RECRAWL_TARGET_CHANGE if target_change is None else target_change
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.states: Dict[str, KeywordState] = {}
+        for data in store.load():
+            state = KeywordState.from_dict(data)
+            self.states[state.keyword] = state
+
+    def get_state(self, keyword: str) -> KeywordState:
+        """获取关键词状态（未采集过的关键词返回空状态）"""
+        return self.states.get(keyword) or KeywordState(keyword)
+
+    def _interval_for(self, change_rate: float) -> float:
+        if change_rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_change / change_rate))
+
+    @staticmethod
+    def _price_changed(old: float, new: float) -> bool:
+        if old == new:
+            return False
+        return abs(new - old) > Config.RECRAWL_PRICE_CHANGE_PCT * max(abs(old), 0.01)
+
+    # ==================== 记录采集结果 ====================
+
+    def observe(self, keyword: str, products: Iterable[Any], crawled_at: Optional[float] = None) -> KeywordChange:
+        """
+        记录一次采集结果，更新变化率和重爬间隔
+
+        Args:
+            keyword: 关键词
+            products: 本次采集到的商品（ProductData 或字典）
+            crawled_at: 采集时间戳，默认当前时间
+
+        Returns:
+            KeywordChange: 与上次采集相比的变化
+        """
+        crawled_at = time.time() if crawled_at is None else crawled_at
+        with self._lock:
+            state = self.states.get(keyword) or KeywordState(keyword)
+            change = KeywordChange(keyword)
+            current = {}
+            for product in products:
+                values = _tracked_values(product)
+                if values:
+                    current[values[0]] = values[1]
+            change.products = len(current)
+
+            first_crawl = state.crawls == 0
+            for product_id, (price, sold, reviews) in current.items():
+                previous = state.products.get(product_id)
+                if previous is None:
+                    change.new_products += 1
+                    continue
+                old_price, old_sold, old_reviews = previous
+                price_changed = self._price_changed(old_price, price)
+                change.price_changes += price_changed
+                change.sold_delta += int(max(0, sold - old_sold))
+                change.review_delta += int(max(0, reviews - old_reviews))
+                if price_changed or sold != old_sold or reviews != old_reviews:
+                    change.changed_products += 1
+
+            if first_crawl:
+                # 首次采集只建立基线
+                change.new_products = 0
+                state.interval_hours = self.default_interval
+            elif change.products:
+                change.elapsed_hours = max((crawled_at - state.last_crawled_at) / 3600, 1 / 60)
+                change.change_ratio = (change.new_products + change.changed_products) / change.products
+                hourly_rate = change.change_ratio / change.elapsed_hours
+                new_ratio = change.new_products / change.products
+                if state.crawls == 1:
+                    state.change_rate, state.new_rate = hourly_rate, new_ratio
+                else:
+                    state.change_rate = self.alpha * hourly_rate + (1 - self.alpha) * state.change_rate
+                    state.new_rate = self.alpha * new_ratio + (1 - self.alpha) * state.new_rate
+                state.interval_hours = self._interval_for(state.change_rate)
+
+            # 更新商品快照，最近出现的商品排在后面，超过上限时丢弃最早的
+            for product_id, values in current.items():
+                state.products.pop(product_id, None)
+                state.products[product_id] = values
+            overflow = len(state.products) - Config.RECRAWL_MAX_TRACKED_PRODUCTS
+            for product_id in list(state.products)[:max(0, overflow)]:
+                del state.products[product_id]
+
+            state.crawls += 1
+            state.last_crawled_at = crawled_at
+            self.states[keyword] = state
+            try:
+                self.store.save(self.states, state)
+            except Exception as e:
+                logger.error(f"保存重爬状态失败: {e}")
+
+        logger.info(f"关键词 '{keyword}' 变化: 新商品{change.new_products}, 变化商品{change.changed_products}"
+                    f"/{change.products}, 下次重爬间隔 {state.interval_hours:.1f} 小时")
+        return change
+
+    def close(self):
+        """保存状态（文件后端把变更日志合并进快照）"""
+        with self._lock:
+            try:
+                self.store.close(self.states)
+            except Exception as e:
+                logger.error(f"保存重爬状态失败: {e}")
+
+    # ==================== 采集计划 ====================
+
+    def plan(self, keywords: Iterable[str], now: Optional[float] = None) -> List[RecrawlPlanItem]:
+        """
+        生成采集计划：从未采集过的关键词最先，其余按到期程度和新商品比例排序
+
+        Args:
+            keywords: 候选关键词
+            now: 当前时间戳
+
+        Returns:
+            List[RecrawlPlanItem]: 按优先级从高到低排序（包含未到期的关键词）
+        """
+        now = time.time() if now is None else now
+        items = []
+        for keyword in dict.fromkeys(keywords):
+            state = self.states.get(keyword)
+            if state is None or state.crawls == 0:
+                items.append(RecrawlPlanItem(keyword, REASON_NEW, float("inf")))
+                continue
+            interval = state.interval_hours or self.default_interval
+            overdue = (now - state.last_crawled_at) / (interval * 3600)
+            items.append(RecrawlPlanItem(
+                keyword=keyword,
+                reason=REASON_DUE if overdue >= 1 else REASON_NOT_DUE,
+                priority=overdue * (1 + state.new_rate),
+                overdue=overdue,
+                interval_hours=interval,
+                change_rate=state.change_rate,
+                due_at=state.last_crawled_at + interval * 3600,
+            ))
+        # 排序稳定，优先级相同时保持原关键词顺序
+        items.sort(key=lambda item: item.priority, reverse=True)
+        return items
+
+    def due_keywords(self, keywords: Iterable[str], now: Optional[float] = None,
+                     budget: Optional[int] = None) -> List[str]:
+        """
+        本次运行需要采集的关键词
+
+        Args:
+            keywords: 候选关键词
+            now: 当前时间戳
+            budget: 最多采集的关键词数，默认从配置读取，0表示不限
+
+        Returns:
+            List[str]: 按优先级排序的到期关键词
+        """
+        budget = Config.RECRAWL_BUDGET if budget is None else budget
+        plan = self.plan(keywords, now)
+        due = [item.keyword for item in plan if item.due]
+        if budget:
+            due = due[:budget]
+        logger.info(f"重爬计划: 候选{len(plan)}个, 到期{sum(1 for item in plan if item.due)}个, 本次采集{len(due)}个")
+        return due
+
+
+def open_recrawl_scheduler(db=None, backend: Optional[str] = None) -> Optional[RecrawlScheduler]:
+    """
+    按配置创建重爬调度器
+
+    Args:
+        db: Mongo数据库对象，mongo后端需要
+        backend: file / mongo，默认从配置读取
+
+    Returns:
+        Optional[RecrawlScheduler]: 未启用或创建失败时返回None
+    """
+    if not Config.RECRAWL_ENABLED:
+        return None
+    backend = backend or Config.RECRAWL_BACKEND
+    try:
+        if backend == "mongo":
+            if db is None:
+                logger.warning("重爬状态使用mongo后端但没有数据库连接，改用文件后端")
+            else:
+                return RecrawlScheduler(MongoStateStore(db[Config.RECRAWL_COLLECTION]))
+        return RecrawlScheduler(FileStateStore(Config.RECRAWL_STATE_FILE))
+    except Exception as e:
+        logger.error(f"创建重爬调度器失败: {e}")
+        return None
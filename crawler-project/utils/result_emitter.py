@@ -0,0 +1,267 @@
+"""
+Crawlab结果输出
+采集结果不再逐条 print(json.dumps(...)) 混在调试输出中，而是缓存后按批写入单独的结果通道:
+    crawlab  Crawlab SDK 的 save_item（未安装 crawlab-sdk 时写本地结果文件代替）
+    file     JSON Lines 结果文件（RESULT_FILE）
+    stdout   每批一次写出到标准输出，期间 print() 的调试信息改写到标准错误，结果流中只有结果
+每批最多 RESULT_BATCH_SIZE 条、RESULT_BATCH_MAX_KB，距上次写出超过 RESULT_FLUSH_INTERVAL 秒时也会写出。
+写出失败的批次保留，RESULT_FLUSH_INTERVAL 秒后（或显式 flush/close 时）按原顺序重试；关闭时仍写不出的结果
+写入本地待补交文件（UNSENT_RESULT_DIR），连本地文件也写不了时 close() 抛出 ResultEmitError。
+"""
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from config import Config
+from utils.logger import get_logger
+from utils.lazy_import import lazy_import, module_available
+from utils.metrics import RESULTS_EMITTED
+from utils.product_export import product_record
+
+crawlab_sdk = lazy_import("crawlab")
+
+logger = get_logger(__name__)
+
+SINK_CRAWLAB = "crawlab"
+SINK_FILE = "file"
+SINK_STDOUT = "stdout"
+
+
+class ResultEmitError(Exception):
+    """结果既没有写入结果通道，也没有写入本地待补交文件"""
+
+
+class FileResultSink:
+    """JSON Lines 结果文件，每批一次写入并flush"""
+
+    name = SINK_FILE
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write_batch(self, lines: List[str], records: List[dict]):
+        self._file.write("".join(line + "\n" for line in lines))
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class StdoutResultSink:
+    """标准输出结果流，打开期间 print() 输出改写到标准错误"""
+
+    name = SINK_STDOUT
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._saved_stdout = sys.stdout
+        sys.stdout = sys.stderr
+
+    def write_batch(self, lines: List[str], records: List[dict]):
+        self.stream.write("".join(line + "\n" for line in lines))
+        self.stream.flush()
+
+    def close(self):
+        if sys.stdout is sys.stderr:
+            sys.stdout = self._saved_stdout
+
+
+class CrawlabResultSink:
+    """Crawlab SDK 结果通道"""
+
+    name = SINK_CRAWLAB
+
+    def __init__(self, save_item: Callable = None):
+        self.save_item = save_item or crawlab_sdk.save_item
+
+    def write_batch(self, lines: List[str], records: List[dict]):
+        self.save_item(*records)
+
+    def close(self):
+        pass
+
+
+class ResultEmitter:
+    """按批写出采集结果"""
+
+    def __init__(self, sink, batch_size: int = None, max_batch_kb: float = None, flush_interval: float = None,
+                 clock=time.monotonic):
+        """
+        初始化结果输出，未传入的参数从配置读取
+
+        Args:
+            sink: 结果通道（write_batch(lines, records) / close()）
+            batch_size: 每批最多条数
+            max_batch_kb: 每批最大KB（单条超过时单独成批）
+            flush_interval: 距上次写出超过该秒数时写出
+            clock: 时间函数（测试时替换）
+        """
+        self.sink = sink
+        self.batch_size = max(1, batch_size or Config.RESULT_BATCH_SIZE)
+        self.max_batch_bytes = int((max_batch_kb or Config.RESULT_BATCH_MAX_KB) * 1024)
+        self.flush_interval = Config.RESULT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._lines: List[str] = []
+        self._records: List[dict] = []
+        self._bytes = 0
+        self._last_flush = clock()
+        self._retry_at = 0.0
+        self._unsent: Deque[Tuple[List[str], List[dict]]] = deque()
+        self.emitted = 0
+        self.batches = 0
+        self.failures = 0
+        self.unsent_file = ""
+
+    def emit(self, result):
+        """
+        加入一条结果
+
+        Args:
+            result: ProductData 或结果字典（商品字典按导出字段整理）
+        """
+        record = product_record(result) if not isinstance(result, dict) or "product_id" in result else result
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        size = len(line.encode('utf-8')) + 1
+        with self._lock:
+            if self._lines and self._bytes + size > self.max_batch_bytes:
+                self._flush_locked()
+            self._lines.append(line)
+            self._records.append(json.loads(line))
+            self._bytes += size
+            if (len(self._lines) >= self.batch_size or self._bytes >= self.max_batch_bytes
+                    or self._clock() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def emit_many(self, results) -> int:
+        count = 0
+        for result in results:
+            self.emit(result)
+            count += 1
+        return count
+
+    def _flush_locked(self, force: bool = False) -> bool:
+        """
+        当前批次加入待写出队列，按顺序写出；写出失败的批次保留到下次重试
+
+        Args:
+            force: 忽略失败后的重试间隔
+
+        Returns:
+            bool: 是否已全部写出
+        """
+        now = self._clock()
+        self._last_flush = now
+        if self._lines:
+            self._unsent.append((self._lines, self._records))
+            self._lines, self._records, self._bytes = [], [], 0
+        if not force and now < self._retry_at:
+            return False
+        while self._unsent:
+            lines, records = self._unsent[0]
+            try:
+                self.sink.write_batch(lines, records)
+            except Exception as e:
+                self.failures += 1
+                self._retry_at = now + self.flush_interval
+                logger.error(f"写出 {len(lines)} 条结果失败，共 {self._unsent_count()} 条保留待重试: {e}")
+                return False
+            self._unsent.popleft()
+            self.emitted += len(lines)
+            self.batches += 1
+            RESULTS_EMITTED.labels(sink=self.sink.name).inc(len(lines))
+        return True
+
+    def _unsent_count(self) -> int:
+        return sum(len(lines) for lines, _ in self._unsent) + len(self._lines)
+
+    def _spill_unsent(self):
+        """结果通道关闭前仍写不出的结果写入本地待补交文件"""
+        path = os.path.join(Config.UNSENT_RESULT_DIR, f"{os.getenv('CRAWLAB_TASK_ID', 'local')}-"
+                            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}.jsonl")
+        count = self._unsent_count()
+        try:
+            os.makedirs(Config.UNSENT_RESULT_DIR, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                for lines, _ in self._unsent:
+                    f.write("".join(line + "\n" for line in lines))
+        except OSError as e:
+            raise ResultEmitError(f"{count} 条结果未写出，写入待补交文件 {path} 失败: {e}") from e
+        self._unsent.clear()
+        self.unsent_file = path
+        logger.error(f"{count} 条结果未能写入 {self.sink.name} 通道，已保存到 {path}，请补交")
+
+    def flush(self) -> bool:
+        """
+        写出缓存的结果（包括之前写出失败的批次）
+
+        Returns:
+            bool: 是否已全部写出
+        """
+        with self._lock:
+            return self._flush_locked(force=True)
+
+    def close(self):
+        """
+        写出剩余结果并关闭通道
+
+        Raises:
+            ResultEmitError: 结果通道和本地待补交文件都写入失败
+        """
+        with self._lock:
+            try:
+                if not self._flush_locked(force=True):
+                    self._spill_unsent()
+            finally:
+                self.sink.close()
+
+    def stats(self) -> Dict:
+        """获取统计信息"""
+        with self._lock:
+            return {"sink": self.sink.name, "emitted": self.emitted, "batches": self.batches,
+                    "pending": self._unsent_count(), "failures": self.failures}
+
+
+def _local_result_file() -> str:
+    task_id = os.getenv("CRAWLAB_TASK_ID", "local")
+    return Config.RESULT_FILE or os.path.join(Config.OUTPUT_DIR, "results", f"{task_id}.jsonl")
+
+
+def open_result_emitter(sink: Optional[str] = None) -> Optional[ResultEmitter]:
+    """
+    按配置创建结果输出
+
+    Args:
+        sink: 结果通道（crawlab/file/stdout），默认 RESULT_SINK
+
+    Returns:
+        Optional[ResultEmitter]: 未配置结果通道或创建失败时返回None
+    """
+    sink = (Config.RESULT_SINK if sink is None else sink).lower()
+    if not sink:
+        return None
+    try:
+        if sink == SINK_CRAWLAB:
+            if module_available("crawlab"):
+                return ResultEmitter(CrawlabResultSink())
+            logger.warning("未安装 crawlab-sdk，结果写入本地文件代替")
+            return ResultEmitter(FileResultSink(_local_result_file()))
+        if sink == SINK_FILE:
+            return ResultEmitter(FileResultSink(_local_result_file()))
+        if sink == SINK_STDOUT:
+            return ResultEmitter(StdoutResultSink())
+        logger.error(f"不支持的结果通道: {sink}")
+        return None
+    except Exception as e:
+        logger.error(f"创建结果输出失败: {e}")
+        return None
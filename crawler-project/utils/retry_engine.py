@@ -0,0 +1,365 @@
+"""
+重试与熔断
+在 RetryManager 的基础上按错误类型区分重试策略，并为每个依赖（Mongo、浏览器、目标站点等）维护熔断器:
+    captcha          验证码无法通过，长间隔少量重试，不计入熔断
+    timeout          页面/请求超时
+    mongo_transient  Mongo网络抖动、主节点切换等可重试错误
+    browser_crash    浏览器断开、会话失效，重试前可通过 on_retry 重启浏览器
+    other            其他错误（重复键、数据校验、解析失败等调用方自身的错误），不计入熔断
+依赖连续 CIRCUIT_FAILURE_THRESHOLD 次调用失败（重试用尽）后熔断，CIRCUIT_RECOVERY_SECONDS 内的调用直接抛出 CircuitOpenError，
+不再逐个在重试等待中耗尽时间；之后放行一次试探调用，成功则恢复。只有 retry_on 允许重试的错误类型才计入熔断。
+同时提供同步（call）和 asyncio（call_async）两种调用方式，异步版本的等待不阻塞事件循环。
+"""
+import time
+import random
+import asyncio
+import inspect
+import threading
+import functools
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+from config import Config
+from utils.logger import get_logger
+from utils.metrics import RETRY_ATTEMPTS, CIRCUIT_STATE
+from utils.anti_detection import RetryManager
+
+logger = get_logger(__name__)
+
+ERROR_CAPTCHA = "captcha"
+ERROR_TIMEOUT = "timeout"
+ERROR_MONGO = "mongo_transient"
+ERROR_BROWSER = "browser_crash"
+ERROR_OTHER = "other"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+_CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+# pymongo 中可以重试的错误类型（按类名判断，避免导入pymongo）
+MONGO_TRANSIENT_ERRORS = {
+    "AutoReconnect", "NetworkTimeout", "ConnectionFailure", "ServerSelectionTimeoutError",
+    "NotPrimaryError", "WaitQueueTimeoutError", "ExecutionTimeout",
+}
+# 浏览器断开/会话失效的错误类型和错误信息
+BROWSER_CRASH_ERRORS = {
+    "InvalidSessionIdException", "NoSuchWindowException", "PageDisconnectedError", "BrowserConnectError",
+    "ContextLostError", "TargetClosedError",
+}
+BROWSER_CRASH_MESSAGES = (
+    "chrome not reachable", "session deleted", "disconnected", "target window already closed",
+    "no such window", "browser has closed", "连接已断开", "target crashed", "target closed",
+    "session with given id not found",
+)
+
+
+class CaptchaBlockedError(Exception):
+    """验证码无法通过"""
+
+
+class CircuitOpenError(Exception):
+    """依赖已熔断，调用被直接拒绝"""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} 已熔断，{retry_after:.1f}秒后重试")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+@dataclass
+class RetryPolicy:
+    """一类错误的重试策略"""
+    max_attempts: int
+    base_delay: float
+    max_delay: float = 30.0
+    jitter: float = 0.5            # 等待时间随机增加的比例
+    trips_breaker: bool = True     # 是否计入依赖的熔断失败次数
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间（指数退避）"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * (1 + random.uniform(0, self.jitter)) if self.jitter else delay
+
+
+def default_policies() -> Dict[str, RetryPolicy]:
+    """各类错误的默认重试策略"""
+    return {
+        ERROR_CAPTCHA: RetryPolicy(max_attempts=2, base_delay=10.0, max_delay=60.0, trips_breaker=False),
+        ERROR_TIMEOUT: RetryPolicy(max_attempts=3, base_delay=2.0),
+        ERROR_MONGO: RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=10.0),
+        ERROR_BROWSER: RetryPolicy(max_attempts=2, base_delay=5.0),
+        ERROR_OTHER: RetryPolicy(max_attempts=Config.MAX_RETRY, base_delay=1.0, trips_breaker=False),
+    }
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    判断错误类型
+
+    Args:
+        error: 异常
+
+    Returns:
+        str: ERROR_CAPTCHA / ERROR_TIMEOUT / ERROR_MONGO / ERROR_BROWSER / ERROR_OTHER
+    """
+    names = {cls.__name__ for cls in type(error).__mro__}
+    message = str(error).lower()
+    if isinstance(error, CaptchaBlockedError):
+        return ERROR_CAPTCHA
+    if names & MONGO_TRANSIENT_ERRORS:
+        return ERROR_MONGO
+    has_label = getattr(error, "has_error_label", None)
+    if has_label and (has_label("RetryableWriteError") or has_label("TransientTransactionError")):
+        return ERROR_MONGO
+    if names & BROWSER_CRASH_ERRORS or any(text in message for text in BROWSER_CRASH_MESSAGES):
+        return ERROR_BROWSER
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or any("Timeout" in name for name in names) \
+            or "timed out" in message or "超时" in message:
+        return ERROR_TIMEOUT
+    # 包装过的异常按原始异常判断
+    if error.__cause__ is not None and error.__cause__ is not error:
+        return classify_error(error.__cause__)
+    return ERROR_OTHER
+
+
+class CircuitBreaker:
+    """单个依赖的熔断器"""
+
+    def __init__(self, name: str, failure_threshold: int = None, recovery_timeout: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: 依赖名称
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断持续时间（秒），之后放行一次试探调用
+            clock: 时间函数（测试时替换）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_timeout = Config.CIRCUIT_RECOVERY_SECONDS if recovery_timeout is None else recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"熔断器 {self.name}: {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_STATE.labels(dependency=self.name).set(_CIRCUIT_STATE_VALUES[state])
+
+    def before_call(self):
+        """
+        调用前检查，熔断中抛出 CircuitOpenError
+
+        Raises:
+            CircuitOpenError: 依赖熔断中（或半开状态已有试探调用在进行）
+        """
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return
+            remaining = self.opened_at + self.recovery_timeout - self._clock()
+            if self.state == CIRCUIT_OPEN and remaining <= 0:
+                self._set_state(CIRCUIT_HALF_OPEN)
+            if self.state == CIRCUIT_HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, remaining))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CIRCUIT_CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+                self._set_state(CIRCUIT_OPEN)
+
+    def release_probe(self):
+        """调用因不计入熔断的错误结束时，释放半开状态的试探名额"""
+        with self._lock:
+            self._probing = False
+
+
+class RetryEngine(RetryManager):
+    """按错误类型重试、按依赖熔断的重试管理器"""
+
+    def __init__(self, policies: Optional[Dict[str, RetryPolicy]] = None, failure_threshold: int = None,
+                 recovery_timeout: float = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, async_sleep=asyncio.sleep):
+        """
+        初始化重试引擎
+
+        Args:
+            policies: 各类错误的重试策略，未指定的类型使用默认策略
+            failure_threshold / recovery_timeout: 熔断器参数，默认从配置读取
+            clock / sleep / async_sleep: 时间函数（测试时替换）
+        """
+        super().__init__(max_attempts=Config.MAX_RETRY)
+        self.policies = default_policies()
+        self.policies.update(policies or {})
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, dependency: str) -> CircuitBreaker:
+        """获取依赖的熔断器"""
+        with self._lock:
+            if dependency not in self.breakers:
+                self.breakers[dependency] = CircuitBreaker(
+                    dependency, self.failure_threshold, self.recovery_timeout, self._clock)
+            return self.breakers[dependency]
+
+    def _on_failure(self, error: BaseException, attempt: int, dependency: str,
+                    retry_on: Optional[Iterable[str]]) -> Optional[float]:
+        """
+        记录一次失败，不再重试时把本次调用的失败计入依赖的熔断器
+        （retry_on 之外的错误类型说明依赖本身正常，不计入）
+
+        Returns:
+            Optional[float]: 重试前的等待秒数，不再重试时返回None
+        """
+        error_class = classify_error(error)
+        policy = self.policies.get(error_class, self.policies[ERROR_OTHER])
+        RETRY_ATTEMPTS.labels(dependency=dependency, error_class=error_class).inc()
+
+        retryable_class = retry_on is None or error_class in retry_on
+        if retryable_class and attempt < policy.max_attempts:
+            delay = policy.delay(attempt)
+            logger.warning(f"{dependency} 调用失败（{error_class}，第{attempt}次），{delay:.2f}秒后重试: {error}")
+            return delay
+        logger.error(f"{dependency} 调用失败（{error_class}，第{attempt}次），不再重试: {error}")
+        breaker = self.breaker(dependency)
+        if retryable_class and policy.trips_breaker:
+            breaker.record_failure()
+        else:
+            breaker.release_probe()
+        return None
+
+    def call(self, func: Callable, *args, dependency: str = "default", on_retry: Optional[Callable] = None,
+             retry_on: Optional[Iterable[str]] = None, **kwargs):
+        """
+        同步调用，失败时按错误类型重试
+
+        Args:
+            func: 要执行的函数
+            dependency: 依赖名称（熔断器按该名称区分）
+            on_retry: 重试前调用 on_retry(error, attempt)，如重启浏览器
+            retry_on: 只重试这些错误类型，None表示按策略重试所有类型
+
+        Returns:
+            函数执行结果
+
+        Raises:
+            CircuitOpenError: 依赖熔断中
+            Exception: 不再重试时抛出最后一次异常
+        """
+        breaker = self.breaker(dependency)
+        breaker.before_call()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_failure(e, attempt, dependency, retry_on)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                if on_retry:
+                    try:
+                        on_retry(e, attempt)
+                    except Exception:
+                        breaker.record_failure()
+                        raise
+                continue
+            breaker.record_success()
+            if attempt > 1:
+                logger.info(f"{dependency} 重试成功 - 第{attempt}次尝试")
+            return result
+
+    async def call_async(self, func: Callable, *args, dependency: str = "default",
+                         on_retry: Optional[Callable] = None, retry_on: Optional[Iterable[str]] = None, **kwargs):
+        """
+        asyncio 调用，参数同 call；func 和 on_retry 可以是协程函数，重试等待不阻塞事件循环
+        """
+        breaker = self.breaker(dependency)
+        breaker.before_call()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                delay = self._on_failure(e, attempt, dependency, retry_on)
+                if delay is None:
+                    raise
+                await self._async_sleep(delay)
+                if on_retry:
+                    try:
+                        hook = on_retry(e, attempt)
+                        if inspect.isawaitable(hook):
+                            await hook
+                    except Exception:
+                        breaker.record_failure()
+                        raise
+                continue
+            breaker.record_success()
+            if attempt > 1:
+                logger.info(f"{dependency} 重试成功 - 第{attempt}次尝试")
+            return result
+
+    def execute_with_retry(self, func, *args, **kwargs):
+        """兼容 RetryManager 的接口，按错误类型重试"""
+        return self.call(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, dict]:
+        """各依赖的熔断状态"""
+        return {name: {"state": b.state, "failures": b.failures} for name, b in self.breakers.items()}
+
+
+# 全局实例
+retry_engine = RetryEngine()
+
+
+def get_retry_engine() -> RetryEngine:
+    """获取重试引擎实例"""
+    return retry_engine
+
+
+def retryable(dependency: str, retry_on: Optional[Iterable[str]] = None, engine: Optional[RetryEngine] = None):
+    """
+    装饰器：函数调用经过重试引擎，普通函数和协程函数都适用
+
+    Args:
+        dependency: 依赖名称
+        retry_on: 只重试这些错误类型
+        engine: 重试引擎，默认全局实例
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await (engine or retry_engine).call_async(
+                    func, *args, dependency=dependency, retry_on=retry_on, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return (engine or retry_engine).call(func, *args, dependency=dependency, retry_on=retry_on, **kwargs)
+        return wrapper
+    return decorator
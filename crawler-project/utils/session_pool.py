@@ -0,0 +1,386 @@
+"""
+浏览器会话池
+每个会话是一组固定的浏览器指纹（User-Agent、窗口大小、代理、用户数据目录）加上它积累的cookie。
+按会话统计最近的验证码比例:
+    健康的会话（验证码少、正常页面多）优先分配，cookie保存在本地，重启后继续使用已经"养熟"的会话
+    验证码比例超过 SESSION_MAX_CAPTCHA_RATE 或连续遇到验证码的会话被淘汰，删除cookie和用户数据目录，补充新的指纹
+会话池只在一个进程内共享（分配状态 in_use 在内存中，sessions.json 整体重写）: open_session_pool 为每个进程
+领取 SESSION_POOL_DIR 下第一个未被占用的 worker-<n> 目录（目录内 .lock 文件加排他锁，进程退出时自动释放），
+同一台机器上的多个进程各用各的会话，重启后领取到同一编号的目录继续使用原有会话。
+会话池状态保存在 <目录>/sessions.json，cookie保存在 <目录>/cookies/<会话ID>.json。
+"""
+import os
+import json
+import time
+import uuid
+import random
+import shutil
+import threading
+from dataclasses import dataclass, asdict
+from typing import IO, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from config import Config
+from utils.logger import get_logger
+from utils.metrics import SESSIONS_RETIRED
+from utils.rate_controller import OUTCOME_CAPTCHA, OUTCOME_ERROR
+from utils.work_queue import make_worker_id
+
+logger = get_logger(__name__)
+
+RETIRE_CAPTCHA_RATE = "captcha_rate"
+RETIRE_CONSECUTIVE = "consecutive_captchas"
+
+# 会话验证码比例指数移动平均的权重
+SESSION_EMA_ALPHA = 0.2
+
+# 一个 SESSION_POOL_DIR 下最多的 worker 目录数（同时运行的进程数）
+MAX_WORKER_DIRS = 64
+
+# CDP Network.setCookies 接受的cookie字段
+COOKIE_PARAM_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+
+def to_cookie_params(cookies: List[dict]) -> List[dict]:
+    """
+    把浏览器导出的cookie转换为可写回浏览器的格式
+
+    Args:
+        cookies: Network.getAllCookies / DrissionPage 导出的cookie列表
+
+    Returns:
+        List[dict]: 只保留 CookieParam 字段，会话cookie（expires<0）不带过期时间
+    """
+    return [
+        {k: v for k, v in cookie.items()
+         if k in COOKIE_PARAM_FIELDS and not (k == 'expires' and (v is None or v < 0))}
+        for cookie in cookies if cookie.get('name')
+    ]
+
+
+def lock_pool_dir(pool_dir: str) -> Optional[IO]:
+    """
+    对会话池目录加进程间排他锁（不等待）
+
+    Args:
+        pool_dir: 会话池目录，不存在时创建
+
+    Returns:
+        Optional[IO]: 锁文件句柄，关闭即释放；目录已被其他进程占用时返回None
+    """
+    os.makedirs(pool_dir, exist_ok=True)
+    handle = open(os.path.join(pool_dir, ".lock"), 'a+', encoding='utf-8')
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    # 记录占用者，便于排查
+    handle.seek(0)
+    handle.truncate()
+    handle.write(make_worker_id() + "\n")
+    handle.flush()
+    return handle
+
+
+@dataclass
+class BrowserSession:
+    """一个浏览器会话的指纹和健康统计"""
+    session_id: str
+    user_agent: str
+    window_size: Tuple[int, int]
+    proxy: str = ""
+    profile_dir: str = ""
+    created_at: float = 0.0
+    last_used_at: float = 0.0
+    pages: int = 0
+    captchas: int = 0
+    errors: int = 0
+    captcha_ratio: float = 0.0       # 最近验证码比例（指数移动平均）
+    consecutive_captchas: int = 0
+
+    @property
+    def fingerprint(self) -> Tuple[str, Tuple[int, int], str]:
+        return self.user_agent, tuple(self.window_size), self.proxy
+
+    def health(self) -> float:
+        """健康分，越高越优先分配: 验证码越少越好，正常页面多的会话cookie更"熟"""
+        clean_pages = self.pages - self.captchas - self.errors
+        return (1.0 - self.captcha_ratio) + min(clean_pages, 50) / 500
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["window_size"] = list(self.window_size)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BrowserSession':
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        known["window_size"] = tuple(known.get("window_size") or (1920, 1080))
+        return cls(**known)
+
+
+class SessionPool:
+    """按验证码比例分配、淘汰浏览器会话"""
+
+    def __init__(self, pool_dir: str, size: int = None, max_captcha_rate: float = None, min_pages: int = None,
+                 max_consecutive_captchas: int = None, user_agents: Optional[Sequence[str]] = None,
+                 window_sizes: Optional[Sequence[Tuple[int, int]]] = None, proxies: Optional[Sequence[str]] = None,
+                 clock=time.time, dir_lock: Optional[IO] = None):
+        """
+        初始化会话池，未传入的参数从配置读取
+
+        Args:
+            pool_dir: 会话池目录（状态文件、cookie、用户数据目录）
+            size: 保持的可用会话数
+            max_captcha_rate: 最近验证码比例超过该值时淘汰会话
+            min_pages: 会话至少访问多少页后才按验证码比例淘汰
+            max_consecutive_captchas: 连续遇到多少次验证码时立即淘汰
+            user_agents / window_sizes / proxies: 生成新会话时可选的指纹
+            clock: 时间函数（测试时替换）
+            dir_lock: lock_pool_dir 返回的目录锁，close 时释放
+        """
+        self.pool_dir = pool_dir
+        self.size = max(1, size or Config.SESSION_POOL_SIZE)
+        self.max_captcha_rate = Config.SESSION_MAX_CAPTCHA_RATE if max_captcha_rate is None else max_captcha_rate
+        self.min_pages = Config.SESSION_MIN_PAGES if min_pages is None else min_pages
+        self.max_consecutive_captchas = max_consecutive_captchas or Config.SESSION_MAX_CONSECUTIVE_CAPTCHAS
+        self.user_agents = list(user_agents or Config.USER_AGENTS)
+        self.window_sizes = [tuple(size) for size in (window_sizes or Config.WINDOW_SIZES)]
+        self.proxies = list(proxies if proxies is not None else Config.SESSION_PROXIES) or [""]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dir_lock = dir_lock
+
+        self.sessions: Dict[str, BrowserSession] = {}
+        self.in_use = set()
+        self.retired_total = 0
+        self._load()
+
+    # ==================== 持久化 ====================
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.pool_dir, "sessions.json")
+
+    def cookie_path(self, session: BrowserSession) -> str:
+        return os.path.join(self.pool_dir, "cookies", f"{session.session_id}.json")
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data.get("sessions", []):
+                session = BrowserSession.from_dict(item)
+                self.sessions[session.session_id] = session
+            self.retired_total = data.get("retired_total", 0)
+            logger.info(f"加载会话池: {len(self.sessions)} 个会话")
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"读取会话池状态失败，重新生成会话: {e}")
+
+    def _save(self):
+        os.makedirs(self.pool_dir, exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"sessions": [s.to_dict() for s in self.sessions.values()],
+                       "retired_total": self.retired_total}, f, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+
+    def save_cookies(self, session: BrowserSession, cookies: List[dict]) -> bool:
+        """
+        保存会话的cookie
+
+        Args:
+            session: 会话
+            cookies: 浏览器导出的cookie列表
+
+        Returns:
+            bool: 是否保存成功（会话已淘汰时不保存）
+        """
+        if session.session_id not in self.sessions:
+            return False
+        path = self.cookie_path(session)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(cookies, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            return True
+        except (OSError, TypeError) as e:
+            logger.error(f"保存会话cookie失败: {e}")
+            return False
+
+    def load_cookies(self, session: BrowserSession) -> List[dict]:
+        """读取会话保存的cookie，没有时返回空列表"""
+        path = self.cookie_path(session)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取会话cookie失败: {e}")
+            return []
+
+    # ==================== 分配和淘汰 ====================
+
+    def _new_session(self) -> BrowserSession:
+        """生成新会话，优先使用当前没有会话在用的指纹组合"""
+        combos = [(ua, size, proxy) for ua in self.user_agents for size in self.window_sizes for proxy in self.proxies]
+        active = {s.fingerprint for s in self.sessions.values()}
+        user_agent, window_size, proxy = random.choice([c for c in combos if c not in active] or combos)
+        session_id = uuid.uuid4().hex[:12]
+        now = self._clock()
+        session = BrowserSession(
+            session_id=session_id, user_agent=user_agent, window_size=window_size, proxy=proxy,
+            profile_dir=os.path.join(self.pool_dir, "profiles", session_id), created_at=now, last_used_at=now,
+        )
+        self.sessions[session_id] = session
+        return session
+
+    def acquire(self) -> BrowserSession:
+        """
+        分配一个会话: 会话不足时补充新会话，然后取空闲会话中健康分最高的
+
+        Returns:
+            BrowserSession: 分配的会话，用完后调用 release
+        """
+        with self._lock:
+            while len(self.sessions) < self.size:
+                self._new_session()
+            idle = [s for s in self.sessions.values() if s.session_id not in self.in_use]
+            session = max(idle, key=lambda s: s.health()) if idle else self._new_session()
+            session.last_used_at = self._clock()
+            self.in_use.add(session.session_id)
+            self._save()
+        logger.info(f"分配会话 {session.session_id}（验证码比例 {session.captcha_ratio:.2f}，"
+                    f"已访问 {session.pages} 页）")
+        return session
+
+    def release(self, session: BrowserSession, cookies: Optional[List[dict]] = None):
+        """
+        归还会话
+
+        Args:
+            session: 会话
+            cookies: 浏览器当前的cookie，传入时保存供下次使用
+        """
+        if cookies:
+            self.save_cookies(session, cookies)
+        with self._lock:
+            self.in_use.discard(session.session_id)
+            if session.session_id in self.sessions:
+                self._save()
+
+    def record(self, session: BrowserSession, outcome: str) -> bool:
+        """
+        记录会话一次页面请求的结果
+
+        Args:
+            session: 会话
+            outcome: OUTCOME_OK / OUTCOME_CAPTCHA / OUTCOME_ERROR
+
+        Returns:
+            bool: 会话是否因此被淘汰（调用方应关闭浏览器并重新分配会话）
+        """
+        with self._lock:
+            if session.session_id not in self.sessions:
+                return True
+            session.pages += 1
+            session.last_used_at = self._clock()
+            if outcome == OUTCOME_ERROR:
+                session.errors += 1
+            else:
+                hit = 1.0 if outcome == OUTCOME_CAPTCHA else 0.0
+                session.captcha_ratio += SESSION_EMA_ALPHA * (hit - session.captcha_ratio)
+                if outcome == OUTCOME_CAPTCHA:
+                    session.captchas += 1
+                    session.consecutive_captchas += 1
+                else:
+                    session.consecutive_captchas = 0
+
+            reason = None
+            if session.consecutive_captchas >= self.max_consecutive_captchas:
+                reason = RETIRE_CONSECUTIVE
+            elif session.pages >= self.min_pages and session.captcha_ratio > self.max_captcha_rate:
+                reason = RETIRE_CAPTCHA_RATE
+            if reason:
+                self._retire(session, reason)
+            self._save()
+        return reason is not None
+
+    def _retire(self, session: BrowserSession, reason: str):
+        """淘汰会话，删除cookie和用户数据目录（已被标记的指纹继续使用只会更多验证码）"""
+        self.sessions.pop(session.session_id, None)
+        self.in_use.discard(session.session_id)
+        self.retired_total += 1
+        SESSIONS_RETIRED.labels(reason=reason).inc()
+        try:
+            if os.path.exists(self.cookie_path(session)):
+                os.remove(self.cookie_path(session))
+        except OSError as e:
+            logger.warning(f"删除会话cookie失败: {e}")
+        if session.profile_dir:
+            shutil.rmtree(session.profile_dir, ignore_errors=True)
+        logger.warning(f"淘汰会话 {session.session_id}（{reason}，访问 {session.pages} 页，"
+                       f"验证码 {session.captchas} 次）")
+
+    def close(self):
+        """释放会话池目录，之后其他进程可以领取"""
+        if self._dir_lock:
+            self._dir_lock.close()
+            self._dir_lock = None
+
+    def stats(self) -> dict:
+        """会话池统计"""
+        with self._lock:
+            return {
+                "sessions": len(self.sessions),
+                "in_use": len(self.in_use),
+                "retired_total": self.retired_total,
+                "captcha_ratio": {s.session_id: round(s.captcha_ratio, 3) for s in self.sessions.values()},
+            }
+
+
+def open_session_pool(pool_dir: Optional[str] = None) -> Optional[SessionPool]:
+    """
+    按配置创建会话池，领取 pool_dir 下第一个未被其他进程占用的 worker-<n> 目录
+
+    Args:
+        pool_dir: 会话池根目录，默认从配置读取
+
+    Returns:
+        Optional[SessionPool]: 未启用、目录都被占用或创建失败时返回None
+    """
+    if not Config.SESSION_POOL_ENABLED:
+        return None
+    base_dir = pool_dir or Config.SESSION_POOL_DIR
+    try:
+        for slot in range(MAX_WORKER_DIRS):
+            worker_dir = os.path.join(base_dir, f"worker-{slot}")
+            dir_lock = lock_pool_dir(worker_dir)
+            if dir_lock is None:
+                continue
+            try:
+                pool = SessionPool(worker_dir, dir_lock=dir_lock)
+            except Exception:
+                dir_lock.close()
+                raise
+            logger.info(f"会话池目录: {worker_dir}")
+            return pool
+        logger.error(f"会话池目录 {base_dir} 下 {MAX_WORKER_DIRS} 个worker目录都已被占用")
+        return None
+    except Exception as e:
+        logger.error(f"创建会话池失败: {e}")
+        return None
@@ -0,0 +1,312 @@
+"""
+阶段耗时追踪
+以嵌套span记录每个关键词的采集过程（navigate → captcha → parse → paginate → persist），
+可导出为JSON Lines或Chrome trace格式（chrome://tracing / Perfetto 打开）。
+未启用时 span() 返回共享的空对象，几乎没有开销。
+"""
+import os
+import json
+import time
+import itertools
+import threading
+import functools
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ("span_id", "parent", "name", "attributes", "children",
+                 "start", "end", "start_wall", "thread_id")
+
+    def __init__(self, span_id: int, name: str, parent: Optional['Span'] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = span_id
+        self.parent = parent
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.children: List['Span'] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.start_wall = time.time()
+        self.thread_id = threading.get_ident()
+
+    def set_attribute(self, key: str, value: Any):
+        """设置属性"""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        """批量设置属性"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def walk(self, depth: int = 0):
+        """深度优先遍历，返回 (span, depth)"""
+        yield self, depth
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def to_dict(self) -> dict:
+        """转换为嵌套字典"""
+        return {
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    """span() 返回的上下文管理器"""
+
+    __slots__ = ("tracer", "name", "attributes", "span")
+
+    def __init__(self, tracer: 'Tracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer._start_span(self.name, self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.span.set_attribute("error", f"{exc_type.__name__}: {exc_val}")
+        self.tracer._end_span(self.span)
+        return False
+
+
+class Tracer:
+    """span追踪器，每个线程维护独立的span栈"""
+
+    def __init__(self, enabled: bool = False, max_roots: int = 1000):
+        """
+        初始化追踪器
+
+        Args:
+            enabled: 是否启用
+            max_roots: 最多保留的根span数量，超出后丢弃最早的
+        """
+        self.enabled = enabled
+        self.max_roots = max_roots
+        self.roots: List[Span] = []
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _start_span(self, name: str, attributes: Dict[str, Any]) -> Span:
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(next(self._ids), name, parent, attributes)
+        if parent is not None:
+            parent.children.append(span)
+        stack.append(span)
+        return span
+
+    def _end_span(self, span: Span):
+        span.end = time.perf_counter()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        if span.parent is None:
+            with self._lock:
+                self.roots.append(span)
+                if len(self.roots) > self.max_roots:
+                    del self.roots[0]
+
+    def span(self, name: str, **attributes):
+        """
+        创建一个span（作为上下文管理器使用）
+
+        Args:
+            name: span名称
+            **attributes: 属性
+
+        Returns:
+            上下文管理器，进入后得到Span（追踪关闭时为空对象）
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+    def current_span(self):
+        """获取当前线程正在进行的span"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        stack = self._stack()
+        return stack[-1] if stack else _NOOP_SPAN
+
+    def traced(self, name: Optional[str] = None):
+        """
+        装饰器：把函数调用记录为span
+
+        Args:
+            name: span名称，默认为函数名
+        """
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """清空已记录的span"""
+        with self._lock:
+            self.roots = []
+
+    # ==================== 导出 ====================
+
+    def to_jsonl_records(self) -> List[dict]:
+        """展开为一行一个span的记录"""
+        records = []
+        for root in list(self.roots):
+            for span, depth in root.walk():
+                records.append({
+                    "trace_id": root.span_id,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent.span_id if span.parent else None,
+                    "name": span.name,
+                    "depth": depth,
+                    "start": span.start_wall,
+                    "duration_ms": round(span.duration_ms, 3),
+                    "thread_id": span.thread_id,
+                    "attributes": span.attributes,
+                })
+        return records
+
+    def to_chrome_trace(self) -> dict:
+        """转换为Chrome trace事件格式"""
+        events = []
+        pid = os.getpid()
+        for root in list(self.roots):
+            # 用根span的墙钟时间对齐各线程
+            origin_us = root.start_wall * 1e6 - root.start * 1e6
+            for span, _ in root.walk():
+                events.append({
+                    "name": span.name,
+                    "cat": "crawler",
+                    "ph": "X",
+                    "ts": round(origin_us + span.start * 1e6, 1),
+                    "dur": round(span.duration_ms * 1000, 1),
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": span.attributes,
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> bool:
+        """
+        导出追踪数据，.jsonl 导出为JSON Lines，其他扩展名导出为Chrome trace
+
+        Args:
+            path: 输出文件路径
+
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                if path.endswith(".jsonl"):
+                    for record in self.to_jsonl_records():
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                else:
+                    json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+            logger.info(f"追踪数据已导出: {path} ({len(self.roots)} 个根span)")
+            return True
+        except OSError as e:
+            logger.error(f"导出追踪数据失败: {e}")
+            return False
+
+    def format_tree(self, root: Span, min_ms: float = 0.0) -> str:
+        """
+        格式化span树，显示每个阶段耗时及占父span的比例
+
+        Args:
+            root: 根span
+            min_ms: 只显示耗时不少于该值的span
+
+        Returns:
+            str: 缩进文本
+        """
+        lines = []
+        for span, depth in root.walk():
+            if span.duration_ms < min_ms and span is not root:
+                continue
+            share = ""
+            if span.parent is not None and span.parent.duration_ms > 0:
+                share = f" ({span.duration_ms / span.parent.duration_ms * 100:.0f}%)"
+            attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            lines.append(f"{'  ' * depth}{span.name}: {span.duration_ms:.1f}ms{share} {attrs}".rstrip())
+        return "\n".join(lines)
+
+
+# 全局追踪器实例
+tracer = Tracer(enabled=Config.TRACE_ENABLED)
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器实例"""
+    return tracer
+
+
+def export_trace(path: Optional[str] = None) -> bool:
+    """
+    按配置导出全局追踪数据
+
+    Args:
+        path: 输出路径，默认使用 Config.TRACE_FILE
+
+    Returns:
+        bool: 是否导出
+    """
+    path = path or Config.TRACE_FILE
+    if not tracer.enabled or not path:
+        return False
+    return tracer.export(path)
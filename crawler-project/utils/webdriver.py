@@ -18,6 +18,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 
 from config import Config
 from utils.logger import get_logger
+from utils.session_pool import to_cookie_params
 
 logger = get_logger(__name__)
 
@@ -25,17 +26,19 @@ logger = get_logger(__name__)
 class WebDriverManager:
     """WebDriver管理器 - 基于TikTok项目经验"""
     
-    def __init__(self, headless: bool = None, proxy: str = None):
+    def __init__(self, headless: bool = None, proxy: str = None, session=None):
         """
         初始化WebDriver管理器
         
         Args:
             headless: 是否使用无头模式，None时从配置读取
             proxy: 代理服务器地址
+            session: 会话池分配的 BrowserSession，传入时使用会话固定的UA、窗口大小、代理和用户数据目录
         """
         self.driver: Optional[webdriver.Chrome] = None
         self.headless = headless if headless is not None else Config.HEADLESS_MODE
-        self.proxy = proxy
+        self.session = session
+        self.proxy = proxy or (session.proxy if session else None)
         self.current_user_agent = None
         self.current_window_size = None
         
@@ -77,12 +80,16 @@ class WebDriverManager:
             chrome_options.add_argument('--disable-renderer-backgrounding')
             chrome_options.add_argument('--disable-backgrounding-occluded-windows')
             
-            # 随机User-Agent
-            self.current_user_agent = random.choice(Config.USER_AGENTS)
+            # User-Agent和窗口大小：使用会话时固定，否则随机
+            if self.session:
+                self.current_user_agent = self.session.user_agent
+                self.current_window_size = tuple(self.session.window_size)
+                if self.session.profile_dir:
+                    chrome_options.add_argument(f'--user-data-dir={os.path.abspath(self.session.profile_dir)}')
+            else:
+                self.current_user_agent = random.choice(Config.USER_AGENTS)
+                self.current_window_size = random.choice(Config.WINDOW_SIZES)
             chrome_options.add_argument(f'--user-agent={self.current_user_agent}')
-            
-            # 随机窗口大小
-            self.current_window_size = random.choice(Config.WINDOW_SIZES)
             chrome_options.add_argument(f'--window-size={self.current_window_size[0]},{self.current_window_size[1]}')
             
             # 代理配置
@@ -123,6 +130,9 @@ class WebDriverManager:
             # 执行反检测脚本
             self.execute_anti_detection_script()
             
+            if self.session:
+                logger.info(f"使用会话: {self.session.session_id}")
+            
             logger.info(f"Chrome WebDriver创建成功")
             logger.info(f"User-Agent: {self.current_user_agent}")
             logger.info(f"窗口大小: {self.current_window_size}")
@@ -181,6 +191,41 @@ class WebDriverManager:
         except Exception as e:
             logger.warning(f"执行反检测脚本失败: {e}")
     
+    def get_cookies(self) -> List[Dict[str, Any]]:
+        """
+        导出浏览器所有域名的cookie（保存到会话池）
+        
+        Returns:
+            List[Dict]: cookie列表，失败时返回空列表
+        """
+        try:
+            if not self.driver:
+                return []
+            return self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        except Exception as e:
+            logger.warning(f"导出cookie失败: {e}")
+            return []
+    
+    def set_cookies(self, cookies: List[Dict[str, Any]]) -> bool:
+        """
+        写入cookie（恢复会话池保存的cookie），不需要先打开对应域名的页面
+        
+        Args:
+            cookies: get_cookies 导出的cookie列表
+            
+        Returns:
+            bool: 是否写入成功
+        """
+        try:
+            if not self.driver or not cookies:
+                return False
+            self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': to_cookie_params(cookies)})
+            logger.info(f"恢复 {len(cookies)} 个cookie")
+            return True
+        except Exception as e:
+            logger.warning(f"恢复cookie失败: {e}")
+            return False
+    
     def get_driver(self) -> webdriver.Chrome:
         """
         获取WebDriver实例
@@ -510,7 +555,8 @@ class WebDriverManager:
             'user_agent': self.current_user_agent,
             'window_size': self.current_window_size,
             'proxy': self.proxy,
-            'headless': self.headless
+            'headless': self.headless,
+            'session_id': self.session.session_id if self.session else None
         }
         
         try:
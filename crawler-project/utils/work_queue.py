@@ -0,0 +1,658 @@
+"""
+分布式关键词任务队列
+多个Crawlab节点上的任务从同一个队列动态领取关键词，取代每个任务各自采集一份静态关键词列表。
+支持:
+    租约（lease）       领取后在可见性超时内只属于一个worker，超时未确认则重新回到队列
+    确认/失败（ack/nack）失败的关键词按重试次数延迟重试，超过次数进入dead状态
+    续约（extend）      长时间采集时延长租约
+    优先级              priority越大越先被领取，同优先级先入先出
+后端:
+    redis  - 依赖 redis 包，领取/确认通过Lua脚本保证原子性（单机Redis）
+    mongo  - 使用 find_one_and_update 原子领取
+    memory - 进程内实现，用于本地调试和测试
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import itertools
+import threading
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATE_READY = "ready"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_DEAD = "dead"
+
+# 排序分数中优先级的权重，保证同优先级内按入队顺序
+PRIORITY_WEIGHT = 10 ** 12
+
+
+@dataclass
+class WorkItem:
+    """队列中的一个关键词任务"""
+    keyword: str
+    priority: int = 0
+    payload: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0              # 已领取次数
+    max_retries: int = 3           # 首次之外最多重试次数
+    state: str = STATE_READY
+    seq: int = 0
+    available_at: float = 0.0      # 重试延迟期间不可领取
+    leased_until: float = 0.0
+    lease_token: str = ""
+    worker_id: str = ""
+    error: str = ""
+    enqueued_at: float = 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        """重试次数是否已用完"""
+        return self.attempts > self.max_retries
+
+
+class WorkQueue:
+    """任务队列接口，各后端实现相同的方法"""
+
+    backend = ""
+
+    def __init__(self, name: str = None, visibility_timeout: float = None,
+                 max_retries: int = None, retry_delay: float = None):
+        """
+        初始化队列
+
+        Args:
+            name: 队列名，默认从配置读取
+            visibility_timeout: 租约时长（秒）
+            max_retries: 失败后最多重试次数
+            retry_delay: 失败后重新可领取前的等待时间（秒）
+        """
+        self.name = name or Config.WORK_QUEUE_NAME
+        self.visibility_timeout = visibility_timeout if visibility_timeout is not None else Config.WORK_QUEUE_VISIBILITY_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else Config.WORK_QUEUE_MAX_RETRIES
+        self.retry_delay = retry_delay if retry_delay is not None else Config.WORK_QUEUE_RETRY_DELAY
+
+    def put(self, keyword: str, priority: int = 0, payload: Optional[Dict[str, Any]] = None,
+            max_retries: Optional[int] = None) -> bool:
+        """
+        加入关键词。已在队列中（待领取或已领取）的关键词不重复加入，
+        已完成或dead的关键词重新加入后从头开始
+
+        Returns:
+            bool: 是否加入
+        """
+        raise NotImplementedError
+
+    def put_many(self, keywords: Iterable[str], priority: int = 0,
+                 payload: Optional[Dict[str, Any]] = None) -> int:
+        """
+        批量加入关键词
+
+        Returns:
+            int: 实际加入的数量
+        """
+        return sum(1 for keyword in keywords if keyword and self.put(keyword, priority, payload))
+
+    def lease(self, worker_id: str, visibility_timeout: Optional[float] = None) -> Optional[WorkItem]:
+        """
+        领取优先级最高的关键词，领取前先回收超时的租约
+
+        Args:
+            worker_id: 领取者标识
+            visibility_timeout: 本次租约时长，默认使用队列配置
+
+        Returns:
+            Optional[WorkItem]: 领取到的任务，队列为空时返回None
+        """
+        raise NotImplementedError
+
+    def ack(self, item: WorkItem) -> bool:
+        """
+        确认完成
+
+        Returns:
+            bool: 租约是否仍然有效（已超时被别人领走时返回False）
+        """
+        raise NotImplementedError
+
+    def nack(self, item: WorkItem, error: str = "", retry: bool = True) -> bool:
+        """
+        标记失败，重试次数未用完时延迟后重新入队，否则进入dead状态
+
+        Returns:
+            bool: 租约是否仍然有效
+        """
+        raise NotImplementedError
+
+    def extend(self, item: WorkItem, visibility_timeout: Optional[float] = None) -> bool:
+        """
+        续约
+
+        Returns:
+            bool: 租约是否仍然有效
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """按状态统计任务数"""
+        raise NotImplementedError
+
+    def purge(self):
+        """清空队列"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _new_item(self, keyword: str, priority: int, payload: Optional[Dict[str, Any]],
+                  max_retries: Optional[int], seq: int) -> WorkItem:
+        return WorkItem(
+            keyword=keyword,
+            priority=int(priority),
+            payload=dict(payload or {}),
+            max_retries=self.max_retries if max_retries is None else max_retries,
+            seq=seq,
+            enqueued_at=time.time(),
+        )
+
+    @staticmethod
+    def _new_token() -> str:
+        return uuid.uuid4().hex
+
+
+class MemoryWorkQueue(WorkQueue):
+    """进程内队列（多线程安全）"""
+
+    backend = "memory"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._items: Dict[str, WorkItem] = {}
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def put(self, keyword, priority=0, payload=None, max_retries=None) -> bool:
+        with self._lock:
+            existing = self._items.get(keyword)
+            if existing is not None and existing.state in (STATE_READY, STATE_LEASED):
+                return False
+            self._items[keyword] = self._new_item(keyword, priority, payload, max_retries, next(self._seq))
+            return True
+
+    def _requeue_expired(self, now: float):
+        for item in self._items.values():
+            if item.state == STATE_LEASED and item.leased_until < now:
+                item.state = STATE_DEAD if item.exhausted else STATE_READY
+                item.lease_token = ""
+                item.worker_id = ""
+                item.available_at = now
+                item.error = "visibility timeout"
+                logger.warning(f"租约超时: {item.keyword} (第{item.attempts}次领取) -> {item.state}")
+
+    def lease(self, worker_id, visibility_timeout=None) -> Optional[WorkItem]:
+        now = time.time()
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        with self._lock:
+            self._requeue_expired(now)
+            ready = [item for item in self._items.values()
+                     if item.state == STATE_READY and item.available_at <= now]
+            if not ready:
+                return None
+            item = min(ready, key=lambda i: (-i.priority, i.seq))
+            item.state = STATE_LEASED
+            item.attempts += 1
+            item.lease_token = self._new_token()
+            item.worker_id = worker_id
+            item.leased_until = now + timeout
+            return dataclasses.replace(item, payload=dict(item.payload))
+
+    def _holding(self, item: WorkItem) -> Optional[WorkItem]:
+        current = self._items.get(item.keyword)
+        if current is None or current.state != STATE_LEASED or current.lease_token != item.lease_token:
+            return None
+        return current
+
+    def ack(self, item) -> bool:
+        with self._lock:
+            current = self._holding(item)
+            if current is None:
+                return False
+            current.state = STATE_DONE
+            current.lease_token = ""
+            current.error = ""
+            return True
+
+    def nack(self, item, error="", retry=True) -> bool:
+        with self._lock:
+            current = self._holding(item)
+            if current is None:
+                return False
+            current.lease_token = ""
+            current.worker_id = ""
+            current.error = error
+            if retry and not current.exhausted:
+                current.state = STATE_READY
+                current.available_at = time.time() + self.retry_delay
+            else:
+                current.state = STATE_DEAD
+            return True
+
+    def extend(self, item, visibility_timeout=None) -> bool:
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        with self._lock:
+            current = self._holding(item)
+            if current is None:
+                return False
+            current.leased_until = time.time() + timeout
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        counts = {STATE_READY: 0, STATE_LEASED: 0, STATE_DONE: 0, STATE_DEAD: 0}
+        with self._lock:
+            for item in self._items.values():
+                counts[item.state] += 1
+        return counts
+
+    def purge(self):
+        with self._lock:
+            self._items.clear()
+
+
+# ==================== Redis后端 ====================
+
+# 把到期的重试任务和超时的租约移回ready，再弹出分数最小（优先级最高、最早入队）的任务
+_LEASE_SCRIPT = """
+local ready, delayed, leased, dead = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local base, now = ARGV[1], tonumber(ARGV[2])
+for _, kw in ipairs(redis.call('ZRANGEBYSCORE', delayed, '-inf', now)) do
+    redis.call('ZREM', delayed, kw)
+    redis.call('ZADD', ready, redis.call('HGET', base .. kw, 'score'), kw)
+end
+for _, kw in ipairs(redis.call('ZRANGEBYSCORE', leased, '-inf', now)) do
+    local item = base .. kw
+    redis.call('ZREM', leased, kw)
+    redis.call('HSET', item, 'lease_token', '', 'worker_id', '', 'error', 'visibility timeout')
+    if tonumber(redis.call('HGET', item, 'attempts')) > tonumber(redis.call('HGET', item, 'max_retries')) then
+        redis.call('HSET', item, 'state', 'dead')
+        redis.call('ZADD', dead, now, kw)
+    else
+        redis.call('HSET', item, 'state', 'ready')
+        redis.call('ZADD', ready, redis.call('HGET', item, 'score'), kw)
+    end
+end
+local popped = redis.call('ZPOPMIN', ready)
+if #popped == 0 then
+    return nil
+end
+local kw = popped[1]
+local item = base .. kw
+redis.call('HINCRBY', item, 'attempts', 1)
+redis.call('HSET', item, 'state', 'leased', 'lease_token', ARGV[3], 'worker_id', ARGV[4], 'leased_until', ARGV[5])
+redis.call('ZADD', leased, ARGV[5], kw)
+return redis.call('HGETALL', item)
+"""
+
+# 待领取或已领取的关键词不重复加入
+_PUT_SCRIPT = """
+local item, ready, done, dead = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local state = redis.call('HGET', item, 'state')
+if state == 'ready' or state == 'leased' then
+    return 0
+end
+redis.call('DEL', item)
+redis.call('HSET', item, unpack(ARGV, 2))
+redis.call('ZADD', ready, ARGV[1], redis.call('HGET', item, 'keyword'))
+redis.call('SREM', done, redis.call('HGET', item, 'keyword'))
+redis.call('ZREM', dead, redis.call('HGET', item, 'keyword'))
+return 1
+"""
+
+_ACK_SCRIPT = """
+local item, leased, done = KEYS[1], KEYS[2], KEYS[3]
+if redis.call('HGET', item, 'lease_token') ~= ARGV[1] then
+    return 0
+end
+redis.call('ZREM', leased, ARGV[2])
+redis.call('HSET', item, 'state', 'done', 'lease_token', '', 'error', '')
+redis.call('SADD', done, ARGV[2])
+return 1
+"""
+
+_NACK_SCRIPT = """
+local item, leased, delayed, dead = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+if redis.call('HGET', item, 'lease_token') ~= ARGV[1] then
+    return 0
+end
+local kw = ARGV[2]
+redis.call('ZREM', leased, kw)
+redis.call('HSET', item, 'lease_token', '', 'worker_id', '', 'error', ARGV[3])
+local exhausted = tonumber(redis.call('HGET', item, 'attempts')) > tonumber(redis.call('HGET', item, 'max_retries'))
+if ARGV[4] == '1' and not exhausted then
+    redis.call('HSET', item, 'state', 'ready')
+    redis.call('ZADD', delayed, ARGV[5], kw)
+else
+    redis.call('HSET', item, 'state', 'dead')
+    redis.call('ZADD', dead, ARGV[6], kw)
+end
+return 1
+"""
+
+_EXTEND_SCRIPT = """
+local item, leased = KEYS[1], KEYS[2]
+if redis.call('HGET', item, 'lease_token') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', item, 'leased_until', ARGV[3])
+redis.call('ZADD', leased, ARGV[3], ARGV[2])
+return 1
+"""
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Redis队列
+    键结构（<p> = <WORK_QUEUE_REDIS_PREFIX>:<队列名>）:
+        <p>:ready    ZSET  待领取，分数 = -priority * 10^12 + seq
+        <p>:delayed  ZSET  等待重试，分数 = 可领取时间
+        <p>:leased   ZSET  已领取，分数 = 租约到期时间
+        <p>:dead     ZSET  重试次数用完
+        <p>:done     SET   已完成
+        <p>:item:<kw> HASH 任务详情
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, *args, prefix: str = None, **kwargs):
+        """
+        Args:
+            client: redis.Redis 实例（decode_responses=True）
+            prefix: 键前缀，默认从配置读取
+        """
+        super().__init__(*args, **kwargs)
+        self.client = client
+        base = f"{prefix or Config.WORK_QUEUE_REDIS_PREFIX}:{self.name}"
+        self.item_prefix = f"{base}:item:"
+        self.keys = {name: f"{base}:{name}" for name in ("ready", "delayed", "leased", "dead", "done", "seq")}
+        self._lease = client.register_script(_LEASE_SCRIPT)
+        self._put = client.register_script(_PUT_SCRIPT)
+        self._ack = client.register_script(_ACK_SCRIPT)
+        self._nack = client.register_script(_NACK_SCRIPT)
+        self._extend = client.register_script(_EXTEND_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str = None, **kwargs) -> 'RedisWorkQueue':
+        """按URL创建（需要安装 redis 包）"""
+        import redis
+        client = redis.Redis.from_url(url or Config.REDIS_URL, decode_responses=True)
+        return cls(client, **kwargs)
+
+    def _item_key(self, keyword: str) -> str:
+        return self.item_prefix + keyword
+
+    def put(self, keyword, priority=0, payload=None, max_retries=None) -> bool:
+        seq = self.client.incr(self.keys["seq"])
+        item = self._new_item(keyword, priority, payload, max_retries, seq)
+        score = -item.priority * PRIORITY_WEIGHT + seq
+        fields = dataclasses.asdict(item)
+        fields["payload"] = json.dumps(item.payload, ensure_ascii=False)
+        fields["score"] = score
+        args = [score]
+        for key, value in fields.items():
+            args.extend([key, value])
+        keys = [self._item_key(keyword), self.keys["ready"], self.keys["done"], self.keys["dead"]]
+        return bool(self._put(keys=keys, args=args))
+
+    def lease(self, worker_id, visibility_timeout=None) -> Optional[WorkItem]:
+        now = time.time()
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        keys = [self.keys["ready"], self.keys["delayed"], self.keys["leased"], self.keys["dead"]]
+        result = self._lease(keys=keys, args=[self.item_prefix, now, self._new_token(), worker_id, now + timeout])
+        if not result:
+            return None
+        return self._to_item(dict(zip(result[::2], result[1::2])))
+
+    @staticmethod
+    def _to_item(data: Dict[str, str]) -> WorkItem:
+        return WorkItem(
+            keyword=data["keyword"],
+            priority=int(data.get("priority", 0)),
+            payload=json.loads(data.get("payload") or "{}"),
+            attempts=int(data.get("attempts", 0)),
+            max_retries=int(data.get("max_retries", 0)),
+            state=data.get("state", STATE_READY),
+            seq=int(data.get("seq", 0)),
+            available_at=float(data.get("available_at", 0)),
+            leased_until=float(data.get("leased_until", 0)),
+            lease_token=data.get("lease_token", ""),
+            worker_id=data.get("worker_id", ""),
+            error=data.get("error", ""),
+            enqueued_at=float(data.get("enqueued_at", 0)),
+        )
+
+    def ack(self, item) -> bool:
+        keys = [self._item_key(item.keyword), self.keys["leased"], self.keys["done"]]
+        return bool(self._ack(keys=keys, args=[item.lease_token, item.keyword]))
+
+    def nack(self, item, error="", retry=True) -> bool:
+        now = time.time()
+        keys = [self._item_key(item.keyword), self.keys["leased"], self.keys["delayed"], self.keys["dead"]]
+        args = [item.lease_token, item.keyword, error, "1" if retry else "0", now + self.retry_delay, now]
+        return bool(self._nack(keys=keys, args=args))
+
+    def extend(self, item, visibility_timeout=None) -> bool:
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        keys = [self._item_key(item.keyword), self.keys["leased"]]
+        return bool(self._extend(keys=keys, args=[item.lease_token, item.keyword, time.time() + timeout]))
+
+    def stats(self) -> Dict[str, int]:
+        pipe = self.client.pipeline()
+        pipe.zcard(self.keys["ready"])
+        pipe.zcard(self.keys["delayed"])
+        pipe.zcard(self.keys["leased"])
+        pipe.scard(self.keys["done"])
+        pipe.zcard(self.keys["dead"])
+        ready, delayed, leased, done, dead = pipe.execute()
+        return {STATE_READY: ready + delayed, STATE_LEASED: leased, STATE_DONE: done, STATE_DEAD: dead}
+
+    def purge(self):
+        item_keys = list(self.client.scan_iter(match=self.item_prefix + "*"))
+        keys = list(self.keys.values()) + item_keys
+        if keys:
+            self.client.delete(*keys)
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+# ==================== Mongo后端 ====================
+
+class MongoWorkQueue(WorkQueue):
+    """Mongo队列，每个关键词一个文档，_id = <队列名>:<关键词>"""
+
+    backend = "mongo"
+
+    def __init__(self, collection, *args, **kwargs):
+        """
+        Args:
+            collection: pymongo 集合
+        """
+        super().__init__(*args, **kwargs)
+        self.collection = collection
+        try:
+            self.collection.create_index([("queue", 1), ("state", 1), ("priority", -1), ("seq", 1)])
+            self.collection.create_index([("queue", 1), ("state", 1), ("leased_until", 1)])
+        except Exception as e:
+            logger.warning(f"创建任务队列索引失败: {e}")
+
+    def _doc_id(self, keyword: str) -> str:
+        return f"{self.name}:{keyword}"
+
+    def put(self, keyword, priority=0, payload=None, max_retries=None) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        # 多节点同时入队时用纳秒时间戳作为先后顺序
+        item = self._new_item(keyword, priority, payload, max_retries, time.time_ns())
+        doc = dataclasses.asdict(item)
+        doc["queue"] = self.name
+        try:
+            self.collection.insert_one({"_id": self._doc_id(keyword), **doc})
+            return True
+        except DuplicateKeyError:
+            result = self.collection.update_one(
+                {"_id": self._doc_id(keyword), "state": {"$in": [STATE_DONE, STATE_DEAD]}},
+                {"$set": doc}
+            )
+            return result.modified_count == 1
+
+    def _requeue_expired(self, now: float):
+        expired = {"queue": self.name, "state": STATE_LEASED, "leased_until": {"$lt": now}}
+        reset = {"lease_token": "", "worker_id": "", "error": "visibility timeout"}
+        self.collection.update_many(
+            {**expired, "$expr": {"$gt": ["$attempts", "$max_retries"]}},
+            {"$set": {**reset, "state": STATE_DEAD}}
+        )
+        result = self.collection.update_many(expired, {"$set": {**reset, "state": STATE_READY, "available_at": now}})
+        if result.modified_count:
+            logger.warning(f"回收超时租约 {result.modified_count} 个")
+
+    def lease(self, worker_id, visibility_timeout=None) -> Optional[WorkItem]:
+        from pymongo import ReturnDocument
+        now = time.time()
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        self._requeue_expired(now)
+        doc = self.collection.find_one_and_update(
+            {"queue": self.name, "state": STATE_READY, "available_at": {"$lte": now}},
+            {"$set": {"state": STATE_LEASED, "lease_token": self._new_token(),
+                      "worker_id": worker_id, "leased_until": now + timeout},
+             "$inc": {"attempts": 1}},
+            sort=[("priority", -1), ("seq", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return None
+        names = {f.name for f in dataclasses.fields(WorkItem)}
+        return WorkItem(**{key: value for key, value in doc.items() if key in names})
+
+    def _update_leased(self, item: WorkItem, update: dict) -> bool:
+        result = self.collection.update_one(
+            {"_id": self._doc_id(item.keyword), "state": STATE_LEASED, "lease_token": item.lease_token},
+            update
+        )
+        return result.matched_count == 1
+
+    def ack(self, item) -> bool:
+        return self._update_leased(item, {"$set": {"state": STATE_DONE, "lease_token": "", "error": ""}})
+
+    def nack(self, item, error="", retry=True) -> bool:
+        now = time.time()
+        update = {"lease_token": "", "worker_id": "", "error": error}
+        if retry and not item.exhausted:
+            update.update(state=STATE_READY, available_at=now + self.retry_delay)
+        else:
+            update.update(state=STATE_DEAD)
+        return self._update_leased(item, {"$set": update})
+
+    def extend(self, item, visibility_timeout=None) -> bool:
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        return self._update_leased(item, {"$set": {"leased_until": time.time() + timeout}})
+
+    def stats(self) -> Dict[str, int]:
+        return {state: self.collection.count_documents({"queue": self.name, "state": state})
+                for state in (STATE_READY, STATE_LEASED, STATE_DONE, STATE_DEAD)}
+
+    def purge(self):
+        self.collection.delete_many({"queue": self.name})
+
+
+# ==================== 创建与消费 ====================
+
+_memory_queues: Dict[str, MemoryWorkQueue] = {}
+
+
+def get_work_queue(backend: Optional[str] = None, name: Optional[str] = None, db=None) -> Optional[WorkQueue]:
+    """
+    按配置创建任务队列
+
+    Args:
+        backend: redis / mongo / memory，默认从配置读取（WORK_QUEUE_BACKEND）
+        name: 队列名
+        db: Mongo数据库对象，mongo后端需要
+
+    Returns:
+        Optional[WorkQueue]: 未配置或创建失败时返回None
+    """
+    backend = backend or Config.WORK_QUEUE_BACKEND
+    try:
+        if backend == "redis":
+            return RedisWorkQueue.from_url(name=name)
+        if backend == "mongo":
+            if db is None:
+                logger.error("任务队列使用mongo后端但没有数据库连接")
+                return None
+            return MongoWorkQueue(db[Config.WORK_QUEUE_COLLECTION], name=name)
+        if backend == "memory":
+            key = name or Config.WORK_QUEUE_NAME
+            if key not in _memory_queues:
+                _memory_queues[key] = MemoryWorkQueue(name=key)
+            return _memory_queues[key]
+        if backend:
+            logger.error(f"未知的任务队列后端: {backend}")
+        return None
+    except ImportError as e:
+        logger.error(f"任务队列依赖未安装（redis后端需要 pip install redis）: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"创建任务队列失败: {e}")
+        return None
+
+
+def make_worker_id() -> str:
+    """worker标识：Crawlab节点ID（或主机名）+ 进程号"""
+    node = os.getenv("CRAWLAB_NODE_ID") or socket.gethostname()
+    return f"{node}:{os.getpid()}"
+
+
+def iter_leases(queue: WorkQueue, worker_id: str, poll_interval: Optional[float] = None,
+                idle_timeout: Optional[float] = None, should_stop=None) -> Iterator[WorkItem]:
+    """
+    持续领取任务。队列没有可领取的任务时，如果还有其他worker持有租约或有等待重试的任务，
+    按poll_interval轮询等待（这些任务可能失败或超时后回到队列），空闲超过idle_timeout后结束
+
+    Args:
+        queue: 任务队列
+        worker_id: worker标识
+        poll_interval: 轮询间隔（秒）
+        idle_timeout: 最长空闲等待（秒）
+        should_stop: 可选的停止判断函数
+
+    Yields:
+        WorkItem: 领取到的任务，调用方负责 ack / nack
+    """
+    poll_interval = Config.WORK_QUEUE_POLL_INTERVAL if poll_interval is None else poll_interval
+    idle_timeout = Config.WORK_QUEUE_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+    idle_since = None
+    while not (should_stop and should_stop()):
+        item = queue.lease(worker_id)
+        if item is not None:
+            idle_since = None
+            yield item
+            continue
+        stats = queue.stats()
+        if not stats[STATE_READY] and not stats[STATE_LEASED]:
+            logger.info(f"任务队列已空: {stats}")
+            return
+        idle_since = idle_since or time.monotonic()
+        if time.monotonic() - idle_since >= idle_timeout:
+            logger.info(f"等待任务超时（{idle_timeout}秒），退出: {stats}")
+            return
+        time.sleep(poll_interval)